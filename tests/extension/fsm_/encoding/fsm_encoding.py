@@ -0,0 +1,75 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+
+def mkLed(encoding='onehot', width=None):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    valid = m.OutputReg('valid', initval=0)
+    count = m.OutputReg('count', 8, initval=0)
+
+    fsm = FSM(m, 'fsm', clk, rst, width=width, encoding=encoding)
+
+    fsm.goto_next()
+
+    # assert valid, then de-assert at the next cycle
+    fsm(
+        valid(1)
+    )
+    fsm.Delay(1)(
+        valid(0)
+    )
+    fsm.goto_next()
+
+    # loop
+    loop = fsm.current
+    fsm(
+        count.inc()
+    )
+    fsm.goto_next()
+
+    fsm.If(count < 4).goto(loop)
+    fsm.If(count >= 4).goto_next()
+
+    fsm(
+        valid(1)
+    )
+    fsm.goto_next()
+
+    fsm.make_always()
+
+    return m
+
+def mkTest():
+    m = Module('test')
+    clk = m.Reg('CLK')
+    rst = m.Reg('RST')
+    valid = m.Wire('valid')
+    count = m.Wire('count', 8)
+
+    uut = m.Instance(mkLed(), 'uut',
+                     ports=(('CLK', clk), ('RST', rst), ('valid', valid),
+                            ('count', count)))
+
+    simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, period=100)
+
+    init.add(
+        Delay(1000),
+        Systask('finish'),
+    )
+
+    return m
+    
+if __name__ == '__main__':
+    test = mkTest()
+    verilog = test.to_verilog('tmp.v')
+    print(verilog)
@@ -0,0 +1,190 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import fsm_encoding
+from veriloggen import *
+import veriloggen.thread as vthread
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  wire valid;
+  wire [8-1:0] count;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .valid(valid),
+    .count(count)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST,
+  output reg valid,
+  output reg [8-1:0] count
+);
+
+  reg [6-1:0] fsm;
+  localparam fsm_init = 6'b1;
+  reg [6-1:0] _d1_fsm;
+  reg _fsm_cond_1_0_1;
+  localparam fsm_1 = 6'b10;
+  localparam fsm_2 = 6'b100;
+  localparam fsm_3 = 6'b1000;
+  localparam fsm_4 = 6'b10000;
+  localparam fsm_5 = 6'b100000;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      fsm <= fsm_init;
+      _d1_fsm <= fsm_init;
+      valid <= 0;
+      _fsm_cond_1_0_1 <= 0;
+      count <= 0;
+    end else begin
+      _d1_fsm <= fsm;
+      case(1'd1)
+        _d1_fsm[1]: begin
+          if(_fsm_cond_1_0_1) begin
+            valid <= 0;
+          end 
+        end
+      endcase
+      case(1'd1)
+        fsm[0]: begin
+          fsm <= fsm_1;
+        end
+        fsm[1]: begin
+          valid <= 1;
+          _fsm_cond_1_0_1 <= 1;
+          fsm <= fsm_2;
+        end
+        fsm[2]: begin
+          count <= count + 1;
+          fsm <= fsm_3;
+        end
+        fsm[3]: begin
+          if(count < 4) begin
+            fsm <= fsm_2;
+          end 
+          if(count >= 4) begin
+            fsm <= fsm_4;
+          end 
+        end
+        fsm[4]: begin
+          valid <= 1;
+          fsm <= fsm_5;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+"""
+
+def test():
+    veriloggen.reset()
+    test_module = fsm_encoding.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_gray():
+    veriloggen.reset()
+    m = fsm_encoding.mkLed(encoding='gray')
+    m.to_verilog()
+
+    fsm = m.find_identifier('fsm')
+    assert(fsm.width == 3)
+    values = [m.find_identifier('fsm_%d' % i).value.value for i in range(1, 6)]
+    assert(values == [1, 3, 2, 6, 7])
+
+
+def test_binary():
+    veriloggen.reset()
+    m = fsm_encoding.mkLed(encoding='binary')
+    m.to_verilog()
+
+    # the minimum width for 6 states
+    assert(m.find_identifier('fsm').width == 3)
+    assert(m.find_identifier('_d1_fsm').width == 3)
+    assert(m.find_identifier('fsm_5').value == 5)
+
+
+def test_too_narrow():
+    veriloggen.reset()
+
+    try:
+        m = fsm_encoding.mkLed(encoding='onehot', width=4)
+    except ValueError as e:
+        assert(e.args[0] == "FSM 'fsm' requires 6 bits for 6 states, not 4")
+    else:
+        assert(False)
+
+
+def test_thread():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 4)
+
+    def blink():
+        myram.write(0, 1)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink,
+                        fsm_width=None, fsm_encoding='onehot')
+    fsm = th.start()
+    code = m.to_verilog()
+
+    # the write port is enabled by a bit of the state register
+    assert('reg [3-1:0] th_blink;' in code)
+    assert('if(th_blink[1]) begin' in code)
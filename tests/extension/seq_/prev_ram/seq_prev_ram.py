@@ -0,0 +1,155 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+
+def mkLed(delay=16):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    en = m.Input('en')
+    x = m.Input('x', 32)
+    y = m.OutputReg('y', 32, initval=0)
+    z = m.OutputReg('z', 32, initval=0)
+
+    seq = Seq(m, 'seq', clk, rst)
+
+    # circular buffers on RAMs instead of 'delay' registers
+    seq(
+        y(seq.Prev(x, delay, ram_threshold=8))
+    )
+    seq(
+        z(seq.Prev(x, delay, cond=en, ram_threshold=8))
+    )
+
+    seq.make_always()
+
+    return m
+
+
+def mkTest():
+    m = Module('test')
+
+    # target instance
+    led = mkLed()
+    
+    # copy paras and ports
+    params = m.copy_params(led)
+    ports = m.copy_sim_ports(led)
+
+    clk = ports['CLK']
+    rst = ports['RST']
+    en = ports['en']
+    x = ports['x']
+    y = ports['y']
+    z = ports['z']
+    
+    uut = m.Instance(led, 'uut',
+                     params=m.connect_params(led),
+                     ports=m.connect_ports(led))
+
+    reset_stmt = []
+    reset_stmt.append( en(0) )
+    reset_stmt.append( x(0) )
+    
+    simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, reset_stmt, period=100)
+
+    nclk = simulation.next_clock
+    
+    init.add(
+        Delay(1000),
+        
+        [ (nclk(clk), en(i % 3 != 0), x(i+10)) for i in range(40) ],
+        nclk(clk), en(0), x(0),
+        
+        Delay(1000),
+        Systask('finish'),
+    )
+
+    return m
+
+
+def mkCompare(delay=5, initval=3, numcycles=100):
+    """ self-checking comparison of the RAM delay lines with the register chains """
+
+    m = Module('test')
+    clk = m.Reg('CLK')
+    cyc = m.Reg('cyc', 32, initval=0)
+
+    # reset at the beginning and once more in the middle
+    rst = m.Wire('RST')
+    rst.assign(Ors(cyc < 4, Ands(cyc >= 50, cyc < 53)))
+
+    x = m.Wire('x', 32)
+    x.assign(cyc * 7 + 1)
+    en = m.Wire('en')
+    en.assign(cyc % 3 != 0)
+
+    seq = Seq(m, 'seq', clk, rst)
+    y_reg = seq.Prev(x, delay, initval=initval)
+    y_ram = seq.Prev(x, delay, initval=initval, ram_threshold=2)
+    # the register chain with cond
+    z_reg = x
+    for i in range(delay):
+        r = m.Reg('z_reg_%d' % i, 32, initval=initval)
+        seq.If(en)(
+            r(z_reg)
+        )
+        z_reg = r
+    z_ram = seq.Prev(x, delay, initval=initval, cond=en, ram_threshold=2)
+    seq.make_always()
+
+    errors = m.Reg('errors', 32, initval=0)
+
+    m.Always(Posedge(clk))(
+        cyc(cyc + 1),
+        # the registers are undefined before the first reset
+        If(Ands(cyc > 0, Ors(y_reg != y_ram, z_reg != z_ram)))(
+            errors(errors + 1),
+            Systask('display', 'cyc:%d y:%d/%d z:%d/%d',
+                    cyc, y_reg, y_ram, z_reg, z_ram)
+        ),
+        If(cyc == numcycles)(
+            If(errors == 0)(
+                Systask('display', '# verify: PASSED')
+            ).Else(
+                Systask('display', '# verify: FAILED')
+            ),
+            Systask('finish')
+        )
+    )
+
+    simulation.setup_clock(m, clk, hperiod=5)
+
+    return m
+
+
+def run(filename='tmp.v', simtype='iverilog', outputfile=None):
+
+    if outputfile is None:
+        outputfile = os.path.splitext(os.path.basename(__file__))[0] + '.out'
+
+    test = mkCompare()
+
+    if filename is not None:
+        test.to_verilog(filename)
+
+    sim = simulation.Simulator(test, sim=simtype)
+    rslt = sim.run(outputfile=outputfile)
+    lines = rslt.splitlines()
+    if simtype == 'verilator' and lines[-1].startswith('-'):
+        rslt = '\n'.join(lines[:-1])
+    return rslt
+
+    
+if __name__ == '__main__':
+    test = mkTest()
+    verilog = test.to_verilog('tmp.v')
+    print(verilog)
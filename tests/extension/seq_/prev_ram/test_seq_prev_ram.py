@@ -0,0 +1,438 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import veriloggen
+import seq_prev_ram
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  reg en;
+  reg [32-1:0] x;
+  wire [32-1:0] y;
+  wire [32-1:0] z;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .en(en),
+    .x(x),
+    .y(y),
+    .z(z)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    en = 0;
+    x = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 10;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 11;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 12;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 13;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 14;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 15;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 16;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 17;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 18;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 19;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 20;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 21;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 22;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 23;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 24;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 25;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 26;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 27;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 28;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 29;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 30;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 31;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 32;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 33;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 34;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 35;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 36;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 37;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 38;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 39;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 40;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 41;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 42;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 43;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 44;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 45;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 46;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 47;
+    @(posedge CLK);
+    #1;
+    en = 1;
+    x = 48;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 49;
+    @(posedge CLK);
+    #1;
+    en = 0;
+    x = 0;
+    #1000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST,
+  input en,
+  input [32-1:0] x,
+  output reg [32-1:0] y,
+  output reg [32-1:0] z
+);
+
+  wire [4-1:0] _x_ram_16_0_addr;
+  wire [32-1:0] _x_ram_16_0_rdata;
+  wire [32-1:0] _x_ram_16_0_wdata;
+  wire _x_ram_16_0_wenable;
+  wire [4-1:0] _x_ram_16_1_addr;
+  wire [32-1:0] _x_ram_16_1_rdata;
+  wire [32-1:0] _x_ram_16_1_wdata;
+  wire _x_ram_16_1_wenable;
+
+  _x_ram_16
+  _x_ram_16
+  (
+    .CLK(CLK),
+    ._x_ram_16_0_addr(_x_ram_16_0_addr),
+    ._x_ram_16_0_rdata(_x_ram_16_0_rdata),
+    ._x_ram_16_0_wdata(_x_ram_16_0_wdata),
+    ._x_ram_16_0_wenable(_x_ram_16_0_wenable),
+    ._x_ram_16_1_addr(_x_ram_16_1_addr),
+    ._x_ram_16_1_rdata(_x_ram_16_1_rdata),
+    ._x_ram_16_1_wdata(_x_ram_16_1_wdata),
+    ._x_ram_16_1_wenable(_x_ram_16_1_wenable)
+  );
+
+  reg [4-1:0] _x_ram_16_wptr;
+  reg [5-1:0] _x_ram_16_count;
+  wire [4-1:0] _x_ram_16_raddr;
+  assign _x_ram_16_raddr = _x_ram_16_wptr + 1 - 16;
+  assign _x_ram_16_0_addr = _x_ram_16_wptr;
+  assign _x_ram_16_0_wdata = x;
+  assign _x_ram_16_0_wenable = 1;
+  assign _x_ram_16_1_addr = _x_ram_16_raddr;
+  assign _x_ram_16_1_wdata = 0;
+  assign _x_ram_16_1_wenable = 0;
+  wire [32-1:0] _x_ram_16_data;
+  assign _x_ram_16_data = (_x_ram_16_count == 16)? _x_ram_16_1_rdata : 0;
+  wire [4-1:0] _x_ram_16_0_0_addr;
+  wire [32-1:0] _x_ram_16_0_0_rdata;
+  wire [32-1:0] _x_ram_16_0_0_wdata;
+  wire _x_ram_16_0_0_wenable;
+  wire [4-1:0] _x_ram_16_0_1_addr;
+  wire [32-1:0] _x_ram_16_0_1_rdata;
+  wire [32-1:0] _x_ram_16_0_1_wdata;
+  wire _x_ram_16_0_1_wenable;
+
+  _x_ram_16_0
+  _x_ram_16_0
+  (
+    .CLK(CLK),
+    ._x_ram_16_0_0_addr(_x_ram_16_0_0_addr),
+    ._x_ram_16_0_0_rdata(_x_ram_16_0_0_rdata),
+    ._x_ram_16_0_0_wdata(_x_ram_16_0_0_wdata),
+    ._x_ram_16_0_0_wenable(_x_ram_16_0_0_wenable),
+    ._x_ram_16_0_1_addr(_x_ram_16_0_1_addr),
+    ._x_ram_16_0_1_rdata(_x_ram_16_0_1_rdata),
+    ._x_ram_16_0_1_wdata(_x_ram_16_0_1_wdata),
+    ._x_ram_16_0_1_wenable(_x_ram_16_0_1_wenable)
+  );
+
+  reg [4-1:0] _x_ram_16_0_wptr;
+  reg [5-1:0] _x_ram_16_0_count;
+  wire [4-1:0] _x_ram_16_0_raddr;
+  assign _x_ram_16_0_raddr = _x_ram_16_0_wptr + ((en)? 1 : 0) - 16;
+  assign _x_ram_16_0_0_addr = _x_ram_16_0_wptr;
+  assign _x_ram_16_0_0_wdata = x;
+  assign _x_ram_16_0_0_wenable = en;
+  assign _x_ram_16_0_1_addr = _x_ram_16_0_raddr;
+  assign _x_ram_16_0_1_wdata = 0;
+  assign _x_ram_16_0_1_wenable = 0;
+  wire [32-1:0] _x_ram_16_0_data;
+  assign _x_ram_16_0_data = (_x_ram_16_0_count == 16)? _x_ram_16_0_1_rdata : 0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _x_ram_16_wptr <= 0;
+      _x_ram_16_count <= 0;
+      y <= 0;
+      _x_ram_16_0_wptr <= 0;
+      _x_ram_16_0_count <= 0;
+      z <= 0;
+    end else begin
+      _x_ram_16_wptr <= _x_ram_16_wptr + 1;
+      if(_x_ram_16_count < 16) begin
+        _x_ram_16_count <= _x_ram_16_count + 1;
+      end 
+      y <= _x_ram_16_data;
+      if(en) begin
+        _x_ram_16_0_wptr <= _x_ram_16_0_wptr + 1;
+      end 
+      if(en && (_x_ram_16_0_count < 16)) begin
+        _x_ram_16_0_count <= _x_ram_16_0_count + 1;
+      end 
+      z <= _x_ram_16_0_data;
+    end
+  end
+
+
+endmodule
+
+
+
+module _x_ram_16
+(
+  input CLK,
+  input [4-1:0] _x_ram_16_0_addr,
+  output [32-1:0] _x_ram_16_0_rdata,
+  input [32-1:0] _x_ram_16_0_wdata,
+  input _x_ram_16_0_wenable,
+  input [4-1:0] _x_ram_16_1_addr,
+  output [32-1:0] _x_ram_16_1_rdata,
+  input [32-1:0] _x_ram_16_1_wdata,
+  input _x_ram_16_1_wenable
+);
+
+  reg [4-1:0] _x_ram_16_0_daddr;
+  reg [4-1:0] _x_ram_16_1_daddr;
+  reg [32-1:0] mem [0:16-1];
+
+  always @(posedge CLK) begin
+    if(_x_ram_16_0_wenable) begin
+      mem[_x_ram_16_0_addr] <= _x_ram_16_0_wdata;
+    end 
+    _x_ram_16_0_daddr <= _x_ram_16_0_addr;
+  end
+
+  assign _x_ram_16_0_rdata = mem[_x_ram_16_0_daddr];
+
+  always @(posedge CLK) begin
+    if(_x_ram_16_1_wenable) begin
+      mem[_x_ram_16_1_addr] <= _x_ram_16_1_wdata;
+    end 
+    _x_ram_16_1_daddr <= _x_ram_16_1_addr;
+  end
+
+  assign _x_ram_16_1_rdata = mem[_x_ram_16_1_daddr];
+
+endmodule
+
+
+
+module _x_ram_16_0
+(
+  input CLK,
+  input [4-1:0] _x_ram_16_0_0_addr,
+  output [32-1:0] _x_ram_16_0_0_rdata,
+  input [32-1:0] _x_ram_16_0_0_wdata,
+  input _x_ram_16_0_0_wenable,
+  input [4-1:0] _x_ram_16_0_1_addr,
+  output [32-1:0] _x_ram_16_0_1_rdata,
+  input [32-1:0] _x_ram_16_0_1_wdata,
+  input _x_ram_16_0_1_wenable
+);
+
+  reg [4-1:0] _x_ram_16_0_0_daddr;
+  reg [4-1:0] _x_ram_16_0_1_daddr;
+  reg [32-1:0] mem [0:16-1];
+
+  always @(posedge CLK) begin
+    if(_x_ram_16_0_0_wenable) begin
+      mem[_x_ram_16_0_0_addr] <= _x_ram_16_0_0_wdata;
+    end 
+    _x_ram_16_0_0_daddr <= _x_ram_16_0_0_addr;
+  end
+
+  assign _x_ram_16_0_0_rdata = mem[_x_ram_16_0_0_daddr];
+
+  always @(posedge CLK) begin
+    if(_x_ram_16_0_1_wenable) begin
+      mem[_x_ram_16_0_1_addr] <= _x_ram_16_0_1_wdata;
+    end 
+    _x_ram_16_0_1_daddr <= _x_ram_16_0_1_addr;
+  end
+
+  assign _x_ram_16_0_1_rdata = mem[_x_ram_16_0_1_daddr];
+
+endmodule
+"""
+def test():
+    veriloggen.reset()
+    test_module = seq_prev_ram.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_compare(request):
+    veriloggen.reset()
+
+    simtype = request.config.getoption('--sim')
+
+    rslt = seq_prev_ram.run(filename=None, simtype=simtype,
+                            outputfile=os.path.splitext(os.path.basename(__file__))[0] + '.out')
+
+    verify_rslt = rslt.splitlines()[-1]
+    assert(verify_rslt == '# verify: PASSED')
@@ -0,0 +1,350 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import stream_dag
+from veriloggen.stream import dag, visitor
+
+expected_verilog = """
+module test;
+
+  reg CLK;
+  reg RST;
+  reg signed [32-1:0] xdata;
+  reg signed [32-1:0] ydata;
+  wire signed [32-1:0] zdata;
+
+  main
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .xdata(xdata),
+    .ydata(ydata),
+    .zdata(zdata)
+  );
+
+  reg reset_done;
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    reset_done = 0;
+    xdata = 0;
+    ydata = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    reset_done = 1;
+    @(posedge CLK);
+    #1;
+    #10000;
+    $finish;
+  end
+
+  reg [32-1:0] send_fsm;
+  localparam send_fsm_init = 0;
+  reg [32-1:0] send_count;
+  reg [32-1:0] recv_fsm;
+  localparam recv_fsm_init = 0;
+  reg [32-1:0] recv_count;
+  localparam send_fsm_1 = 1;
+  localparam send_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      send_fsm <= send_fsm_init;
+      send_count <= 0;
+    end else begin
+      case(send_fsm)
+        send_fsm_init: begin
+          if(reset_done) begin
+            send_fsm <= send_fsm_1;
+          end 
+        end
+        send_fsm_1: begin
+          xdata <= xdata + 1;
+          ydata <= ydata + 2;
+          $display("xdata=%d", xdata);
+          $display("ydata=%d", ydata);
+          send_count <= send_count + 1;
+          if(send_count == 20) begin
+            send_fsm <= send_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+  localparam recv_fsm_1 = 1;
+  localparam recv_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      recv_fsm <= recv_fsm_init;
+      recv_count <= 0;
+    end else begin
+      case(recv_fsm)
+        recv_fsm_init: begin
+          if(reset_done) begin
+            recv_fsm <= recv_fsm_1;
+          end 
+        end
+        recv_fsm_1: begin
+          $display("zdata=%d", zdata);
+          recv_count <= recv_count + 1;
+          if(recv_count == 30) begin
+            recv_fsm <= recv_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module main
+(
+  input CLK,
+  input RST,
+  input signed [32-1:0] xdata,
+  input signed [32-1:0] ydata,
+  output signed [32-1:0] zdata
+);
+
+  reg signed [32-1:0] _plus_data_2;
+  reg [1-1:0] _eq_data_4;
+  reg signed [32-1:0] __delay_data_9;
+  wire signed [64-1:0] _times_mul_odata_3;
+  reg signed [64-1:0] _times_mul_odata_reg_3;
+  wire signed [32-1:0] _times_data_3;
+  assign _times_data_3 = _times_mul_odata_reg_3;
+  wire _times_mul_update_3;
+  assign _times_mul_update_3 = 1'd1;
+
+  multiplier_0
+  _times_mul_3
+  (
+    .CLK(CLK),
+    .update(_times_mul_update_3),
+    .a(_plus_data_2),
+    .b(__delay_data_9),
+    .c(_times_mul_odata_3)
+  );
+
+  reg [1-1:0] __delay_data_10;
+  reg signed [32-1:0] __delay_data_17;
+  reg [1-1:0] __delay_data_11;
+  reg signed [32-1:0] __delay_data_18;
+  reg [1-1:0] __delay_data_12;
+  reg signed [32-1:0] __delay_data_19;
+  reg [1-1:0] __delay_data_13;
+  reg signed [32-1:0] __delay_data_20;
+  reg [1-1:0] __delay_data_14;
+  reg signed [32-1:0] __delay_data_21;
+  reg [1-1:0] __delay_data_15;
+  reg signed [32-1:0] __delay_data_22;
+  reg [1-1:0] __delay_data_16;
+  reg signed [32-1:0] __delay_data_23;
+  reg signed [32-1:0] _reduceadd_data_7;
+  reg signed [32-1:0] __delay_data_24;
+  reg signed [32-1:0] _plus_data_8;
+  assign zdata = _plus_data_8;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _plus_data_2 <= 0;
+      _eq_data_4 <= 0;
+      __delay_data_9 <= 0;
+      _times_mul_odata_reg_3 <= 0;
+      __delay_data_10 <= 0;
+      __delay_data_17 <= 0;
+      __delay_data_11 <= 0;
+      __delay_data_18 <= 0;
+      __delay_data_12 <= 0;
+      __delay_data_19 <= 0;
+      __delay_data_13 <= 0;
+      __delay_data_20 <= 0;
+      __delay_data_14 <= 0;
+      __delay_data_21 <= 0;
+      __delay_data_15 <= 0;
+      __delay_data_22 <= 0;
+      __delay_data_16 <= 0;
+      __delay_data_23 <= 0;
+      _reduceadd_data_7 <= 1'sd0;
+      __delay_data_24 <= 0;
+      _plus_data_8 <= 0;
+    end else begin
+      _plus_data_2 <= xdata + ydata;
+      _eq_data_4 <= xdata == 1'sd0;
+      __delay_data_9 <= xdata;
+      _times_mul_odata_reg_3 <= _times_mul_odata_3;
+      __delay_data_10 <= _eq_data_4;
+      __delay_data_17 <= _plus_data_2;
+      __delay_data_11 <= __delay_data_10;
+      __delay_data_18 <= __delay_data_17;
+      __delay_data_12 <= __delay_data_11;
+      __delay_data_19 <= __delay_data_18;
+      __delay_data_13 <= __delay_data_12;
+      __delay_data_20 <= __delay_data_19;
+      __delay_data_14 <= __delay_data_13;
+      __delay_data_21 <= __delay_data_20;
+      __delay_data_15 <= __delay_data_14;
+      __delay_data_22 <= __delay_data_21;
+      __delay_data_16 <= __delay_data_15;
+      __delay_data_23 <= __delay_data_22;
+      _reduceadd_data_7 <= _reduceadd_data_7 + _times_data_3;
+      if(__delay_data_16) begin
+        _reduceadd_data_7 <= 1'sd0 + _times_data_3;
+      end 
+      __delay_data_24 <= __delay_data_23;
+      _plus_data_8 <= _reduceadd_data_7 + __delay_data_24;
+    end
+  end
+
+
+endmodule
+
+
+
+module multiplier_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+
+  multiplier_core_0
+  mult
+  (
+    .CLK(CLK),
+    .update(update),
+    .a(a),
+    .b(b),
+    .c(c)
+  );
+
+
+endmodule
+
+
+
+module multiplier_core_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+  reg signed [32-1:0] _a;
+  reg signed [32-1:0] _b;
+  wire signed [64-1:0] _mul;
+  reg signed [64-1:0] _pipe_mul0;
+  reg signed [64-1:0] _pipe_mul1;
+  reg signed [64-1:0] _pipe_mul2;
+  reg signed [64-1:0] _pipe_mul3;
+  reg signed [64-1:0] _pipe_mul4;
+  assign _mul = _a * _b;
+  assign c = _pipe_mul4;
+
+  always @(posedge CLK) begin
+    if(update) begin
+      _a <= a;
+      _b <= b;
+      _pipe_mul0 <= _mul;
+      _pipe_mul1 <= _pipe_mul0;
+      _pipe_mul2 <= _pipe_mul1;
+      _pipe_mul3 <= _pipe_mul2;
+      _pipe_mul4 <= _pipe_mul3;
+    end 
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = stream_dag.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_graph():
+    veriloggen.reset()
+    st = stream_dag.mkStream()
+    g = dag.Graph(st.nodes)
+
+    for pos, node in enumerate(g.order):
+        assert(g.index[node.object_id] == pos)
+        for i in g.fanin[pos]:
+            assert(i < pos)
+            assert(pos in g.fanout[i])
+
+    input_vars = set()
+    output_vars = set()
+    for node in st.nodes:
+        input_vars.update(visitor.InputVisitor().visit(node))
+        output_vars.update(visitor.OutputVisitor().visit(node))
+
+    assert(_ids(g.get_inputs()) == _ids(input_vars))
+    assert(_ids(g.get_outputs()) == _ids(output_vars))
+
+    sub = g.subgraph(g.get_outputs())
+    assert([node.object_id for node in sub.order] ==
+           [node.object_id for node in g.order])
+
+
+def test_inputs():
+    veriloggen.reset()
+    import veriloggen.stream as stream
+
+    a = stream.Variable('a')
+    size = stream.Variable('size')
+    sum = stream.ReduceAdd(a, size)
+    buf = stream.Scratchpad(a, a, 4)
+    out = buf.read(a)
+
+    assert(dag._input_attrs(sum) ==
+           ('right', 'initval', 'enable', 'reset', 'size'))
+    assert(dag._input_attrs(sum, ('size', )) ==
+           ('right', 'initval', 'enable', 'reset'))
+    assert(dag._input_attrs(out) == ('left', 'right'))
+    assert(_ids(dag._get_inputs(sum, ('size', ))) == _ids([a, sum.initval]))
+    assert([var for var, port in dag._get_edges(sum)] ==
+           dag._get_inputs(sum))
+
+
+def _ids(nodes):
+    return sorted([node.object_id for node in nodes])
@@ -0,0 +1,436 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import stream_delay_ram
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  reg signed [32-1:0] xdata;
+  reg signed [32-1:0] ydata;
+  wire signed [32-1:0] zdata;
+
+  main
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .xdata(xdata),
+    .ydata(ydata),
+    .zdata(zdata)
+  );
+
+  reg reset_done;
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    reset_done = 0;
+    xdata = 0;
+    ydata = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    reset_done = 1;
+    @(posedge CLK);
+    #1;
+    #10000;
+    $finish;
+  end
+
+  reg [32-1:0] send_fsm;
+  localparam send_fsm_init = 0;
+  reg [32-1:0] send_count;
+  reg [32-1:0] recv_fsm;
+  localparam recv_fsm_init = 0;
+  reg [32-1:0] recv_count;
+  localparam send_fsm_1 = 1;
+  localparam send_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      send_fsm <= send_fsm_init;
+      send_count <= 0;
+    end else begin
+      case(send_fsm)
+        send_fsm_init: begin
+          if(reset_done) begin
+            send_fsm <= send_fsm_1;
+          end 
+        end
+        send_fsm_1: begin
+          xdata <= xdata + 1;
+          ydata <= ydata + 2;
+          $display("xdata=%d", xdata);
+          $display("ydata=%d", ydata);
+          send_count <= send_count + 1;
+          if(send_count == 20) begin
+            send_fsm <= send_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+  localparam recv_fsm_1 = 1;
+  localparam recv_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      recv_fsm <= recv_fsm_init;
+      recv_count <= 0;
+    end else begin
+      case(recv_fsm)
+        recv_fsm_init: begin
+          if(reset_done) begin
+            recv_fsm <= recv_fsm_1;
+          end 
+        end
+        recv_fsm_1: begin
+          $display("zdata=%d", zdata);
+          recv_count <= recv_count + 1;
+          if(recv_count == 30) begin
+            recv_fsm <= recv_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module main
+(
+  input CLK,
+  input RST,
+  input signed [32-1:0] xdata,
+  input signed [32-1:0] ydata,
+  output signed [32-1:0] zdata
+);
+
+  wire signed [64-1:0] _times_mul_odata_2;
+  reg signed [64-1:0] _times_mul_odata_reg_2;
+  wire signed [32-1:0] _times_data_2;
+  assign _times_data_2 = _times_mul_odata_reg_2;
+  wire _times_mul_update_2;
+  assign _times_mul_update_2 = 1'd1;
+
+  multiplier_0
+  _times_mul_2
+  (
+    .CLK(CLK),
+    .update(_times_mul_update_2),
+    .a(xdata),
+    .b(ydata),
+    .c(_times_mul_odata_2)
+  );
+
+  reg signed [32-1:0] __delay_data_5;
+  reg signed [32-1:0] __delay_data_6;
+  reg signed [32-1:0] __delay_data_7;
+  reg signed [32-1:0] __delay_data_8;
+  reg signed [32-1:0] __delay_data_9;
+  reg signed [32-1:0] __delay_data_10;
+  reg signed [32-1:0] __delay_data_11;
+  wire signed [64-1:0] _times_mul_odata_3;
+  reg signed [64-1:0] _times_mul_odata_reg_3;
+  wire signed [32-1:0] _times_data_3;
+  assign _times_data_3 = _times_mul_odata_reg_3;
+  wire _times_mul_update_3;
+  assign _times_mul_update_3 = 1'd1;
+
+  multiplier_1
+  _times_mul_3
+  (
+    .CLK(CLK),
+    .update(_times_mul_update_3),
+    .a(_times_data_2),
+    .b(__delay_data_11),
+    .c(_times_mul_odata_3)
+  );
+
+  wire [4-1:0] _xdata_ram_14_0_addr;
+  wire [32-1:0] _xdata_ram_14_0_rdata;
+  wire [32-1:0] _xdata_ram_14_0_wdata;
+  wire _xdata_ram_14_0_wenable;
+  wire [4-1:0] _xdata_ram_14_1_addr;
+  wire [32-1:0] _xdata_ram_14_1_rdata;
+  wire [32-1:0] _xdata_ram_14_1_wdata;
+  wire _xdata_ram_14_1_wenable;
+
+  _xdata_ram_14
+  _xdata_ram_14
+  (
+    .CLK(CLK),
+    ._xdata_ram_14_0_addr(_xdata_ram_14_0_addr),
+    ._xdata_ram_14_0_rdata(_xdata_ram_14_0_rdata),
+    ._xdata_ram_14_0_wdata(_xdata_ram_14_0_wdata),
+    ._xdata_ram_14_0_wenable(_xdata_ram_14_0_wenable),
+    ._xdata_ram_14_1_addr(_xdata_ram_14_1_addr),
+    ._xdata_ram_14_1_rdata(_xdata_ram_14_1_rdata),
+    ._xdata_ram_14_1_wdata(_xdata_ram_14_1_wdata),
+    ._xdata_ram_14_1_wenable(_xdata_ram_14_1_wenable)
+  );
+
+  reg [4-1:0] _xdata_ram_14_wptr;
+  reg [4-1:0] _xdata_ram_14_count;
+  wire [4-1:0] _xdata_ram_14_raddr;
+  assign _xdata_ram_14_raddr = _xdata_ram_14_wptr + 1 - 14;
+  assign _xdata_ram_14_0_addr = _xdata_ram_14_wptr;
+  assign _xdata_ram_14_0_wdata = xdata;
+  assign _xdata_ram_14_0_wenable = 1;
+  assign _xdata_ram_14_1_addr = _xdata_ram_14_raddr;
+  assign _xdata_ram_14_1_wdata = 0;
+  assign _xdata_ram_14_1_wenable = 0;
+  wire signed [32-1:0] _xdata_ram_14_data;
+  assign _xdata_ram_14_data = (_xdata_ram_14_count == 14)? _xdata_ram_14_1_rdata : 0;
+  reg signed [32-1:0] _plus_data_4;
+  assign zdata = _plus_data_4;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _times_mul_odata_reg_2 <= 0;
+      __delay_data_5 <= 0;
+      __delay_data_6 <= 0;
+      __delay_data_7 <= 0;
+      __delay_data_8 <= 0;
+      __delay_data_9 <= 0;
+      __delay_data_10 <= 0;
+      __delay_data_11 <= 0;
+      _times_mul_odata_reg_3 <= 0;
+      _xdata_ram_14_wptr <= 0;
+      _xdata_ram_14_count <= 0;
+      _plus_data_4 <= 0;
+    end else begin
+      _times_mul_odata_reg_2 <= _times_mul_odata_2;
+      __delay_data_5 <= ydata;
+      __delay_data_6 <= __delay_data_5;
+      __delay_data_7 <= __delay_data_6;
+      __delay_data_8 <= __delay_data_7;
+      __delay_data_9 <= __delay_data_8;
+      __delay_data_10 <= __delay_data_9;
+      __delay_data_11 <= __delay_data_10;
+      _times_mul_odata_reg_3 <= _times_mul_odata_3;
+      _xdata_ram_14_wptr <= _xdata_ram_14_wptr + 1;
+      if(_xdata_ram_14_count < 14) begin
+        _xdata_ram_14_count <= _xdata_ram_14_count + 1;
+      end 
+      _plus_data_4 <= _times_data_3 + _xdata_ram_14_data;
+    end
+  end
+
+
+endmodule
+
+
+
+module multiplier_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+
+  multiplier_core_0
+  mult
+  (
+    .CLK(CLK),
+    .update(update),
+    .a(a),
+    .b(b),
+    .c(c)
+  );
+
+
+endmodule
+
+
+
+module multiplier_core_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+  reg signed [32-1:0] _a;
+  reg signed [32-1:0] _b;
+  wire signed [64-1:0] _mul;
+  reg signed [64-1:0] _pipe_mul0;
+  reg signed [64-1:0] _pipe_mul1;
+  reg signed [64-1:0] _pipe_mul2;
+  reg signed [64-1:0] _pipe_mul3;
+  reg signed [64-1:0] _pipe_mul4;
+  assign _mul = _a * _b;
+  assign c = _pipe_mul4;
+
+  always @(posedge CLK) begin
+    if(update) begin
+      _a <= a;
+      _b <= b;
+      _pipe_mul0 <= _mul;
+      _pipe_mul1 <= _pipe_mul0;
+      _pipe_mul2 <= _pipe_mul1;
+      _pipe_mul3 <= _pipe_mul2;
+      _pipe_mul4 <= _pipe_mul3;
+    end 
+  end
+
+
+endmodule
+
+
+
+module multiplier_1
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+
+  multiplier_core_1
+  mult
+  (
+    .CLK(CLK),
+    .update(update),
+    .a(a),
+    .b(b),
+    .c(c)
+  );
+
+
+endmodule
+
+
+
+module multiplier_core_1
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+  reg signed [32-1:0] _a;
+  reg signed [32-1:0] _b;
+  wire signed [64-1:0] _mul;
+  reg signed [64-1:0] _pipe_mul0;
+  reg signed [64-1:0] _pipe_mul1;
+  reg signed [64-1:0] _pipe_mul2;
+  reg signed [64-1:0] _pipe_mul3;
+  reg signed [64-1:0] _pipe_mul4;
+  assign _mul = _a * _b;
+  assign c = _pipe_mul4;
+
+  always @(posedge CLK) begin
+    if(update) begin
+      _a <= a;
+      _b <= b;
+      _pipe_mul0 <= _mul;
+      _pipe_mul1 <= _pipe_mul0;
+      _pipe_mul2 <= _pipe_mul1;
+      _pipe_mul3 <= _pipe_mul2;
+      _pipe_mul4 <= _pipe_mul3;
+    end 
+  end
+
+
+endmodule
+
+
+
+module _xdata_ram_14
+(
+  input CLK,
+  input [4-1:0] _xdata_ram_14_0_addr,
+  output [32-1:0] _xdata_ram_14_0_rdata,
+  input [32-1:0] _xdata_ram_14_0_wdata,
+  input _xdata_ram_14_0_wenable,
+  input [4-1:0] _xdata_ram_14_1_addr,
+  output [32-1:0] _xdata_ram_14_1_rdata,
+  input [32-1:0] _xdata_ram_14_1_wdata,
+  input _xdata_ram_14_1_wenable
+);
+
+  reg [4-1:0] _xdata_ram_14_0_daddr;
+  reg [4-1:0] _xdata_ram_14_1_daddr;
+  reg [32-1:0] mem [0:16-1];
+
+  always @(posedge CLK) begin
+    if(_xdata_ram_14_0_wenable) begin
+      mem[_xdata_ram_14_0_addr] <= _xdata_ram_14_0_wdata;
+    end 
+    _xdata_ram_14_0_daddr <= _xdata_ram_14_0_addr;
+  end
+
+  assign _xdata_ram_14_0_rdata = mem[_xdata_ram_14_0_daddr];
+
+  always @(posedge CLK) begin
+    if(_xdata_ram_14_1_wenable) begin
+      mem[_xdata_ram_14_1_addr] <= _xdata_ram_14_1_wdata;
+    end 
+    _xdata_ram_14_1_daddr <= _xdata_ram_14_1_addr;
+  end
+
+  assign _xdata_ram_14_1_rdata = mem[_xdata_ram_14_1_daddr];
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = stream_delay_ram.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_stats():
+    veriloggen.reset()
+    st = stream_delay_ram.mkStream()
+    st.to_module('main')
+    stats = st.get_stats()
+
+    assert(stats['pipeline_depth'] == 15)
+    assert(stats['num_delay_rams'] == 1)
+    assert(stats['delay_ram_bits'] == 14 * 32)
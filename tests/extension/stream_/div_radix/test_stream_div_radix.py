@@ -0,0 +1,1073 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import stream_div_radix
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  reg signed [16-1:0] xdata;
+  reg signed [16-1:0] ydata;
+  wire signed [16-1:0] qdata;
+  wire signed [16-1:0] rdata;
+
+  main
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .xdata(xdata),
+    .ydata(ydata),
+    .qdata(qdata),
+    .rdata(rdata)
+  );
+
+  reg reset_done;
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    reset_done = 0;
+    xdata = 0;
+    ydata = 1;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    reset_done = 1;
+    @(posedge CLK);
+    #1;
+    #10000;
+    $finish;
+  end
+
+  reg [32-1:0] send_fsm;
+  localparam send_fsm_init = 0;
+  reg [32-1:0] send_count;
+  reg [32-1:0] recv_fsm;
+  localparam recv_fsm_init = 0;
+  reg [32-1:0] recv_count;
+  localparam send_fsm_1 = 1;
+  localparam send_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      send_fsm <= send_fsm_init;
+      send_count <= 0;
+    end else begin
+      case(send_fsm)
+        send_fsm_init: begin
+          if(reset_done) begin
+            send_fsm <= send_fsm_1;
+          end 
+        end
+        send_fsm_1: begin
+          xdata <= xdata + 100;
+          ydata <= ydata + 3;
+          $display("xdata=%d", xdata);
+          $display("ydata=%d", ydata);
+          send_count <= send_count + 1;
+          if(send_count == 20) begin
+            send_fsm <= send_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+  localparam recv_fsm_1 = 1;
+  localparam recv_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      recv_fsm <= recv_fsm_init;
+      recv_count <= 0;
+    end else begin
+      case(recv_fsm)
+        recv_fsm_init: begin
+          if(reset_done) begin
+            recv_fsm <= recv_fsm_1;
+          end 
+        end
+        recv_fsm_1: begin
+          $display("qdata=%d", qdata);
+          $display("rdata=%d", rdata);
+          recv_count <= recv_count + 1;
+          if(recv_count == 30) begin
+            recv_fsm <= recv_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module main
+(
+  input CLK,
+  input RST,
+  input signed [16-1:0] xdata,
+  input signed [16-1:0] ydata,
+  output signed [16-1:0] qdata,
+  output signed [16-1:0] rdata
+);
+
+  reg signed [16-1:0] _divide_div_ldata_2;
+  reg signed [16-1:0] _divide_div_rdata_2;
+  reg [16-1:0] _divide_div_abs_ldata_2;
+  reg [16-1:0] _divide_div_abs_rdata_2;
+  wire _divide_div_osign_2;
+  wire signed [16-1:0] _divide_div_abs_odata_2;
+  reg signed [16-1:0] _divide_div_odata_2;
+  wire signed [16-1:0] _divide_data_2;
+  assign _divide_data_2 = _divide_div_odata_2;
+  reg _divide_div_sign_tmp_0_2;
+  reg _divide_div_sign_tmp_1_2;
+  reg _divide_div_sign_tmp_2_2;
+  reg _divide_div_sign_tmp_3_2;
+  reg _divide_div_sign_tmp_4_2;
+  reg _divide_div_sign_tmp_5_2;
+  reg _divide_div_sign_tmp_6_2;
+  reg _divide_div_sign_tmp_7_2;
+  reg _divide_div_sign_tmp_8_2;
+  reg _divide_div_sign_tmp_9_2;
+  reg _divide_div_sign_tmp_10_2;
+  assign _divide_div_osign_2 = _divide_div_sign_tmp_10_2;
+  wire _divide_div_update_2;
+  assign _divide_div_update_2 = 1'd1;
+
+  DividerRadix4_16
+  _divide_div_2
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .update(_divide_div_update_2),
+    .enable(1'd1),
+    .in_a(_divide_div_abs_ldata_2),
+    .in_b(_divide_div_abs_rdata_2),
+    .rslt(_divide_div_abs_odata_2)
+  );
+
+  reg signed [16-1:0] _mod_mod_ldata_3;
+  reg signed [16-1:0] _mod_mod_rdata_3;
+  reg [16-1:0] _mod_div_abs_ldata_3;
+  reg [16-1:0] _mod_div_abs_rdata_3;
+  wire _mod_mod_osign_3;
+  wire signed [16-1:0] _mod_mod_abs_odata_3;
+  reg signed [16-1:0] _mod_mod_odata_3;
+  wire signed [16-1:0] _mod_data_3;
+  assign _mod_data_3 = _mod_mod_odata_3;
+  reg _mod_div_sign_tmp_0_3;
+  reg _mod_div_sign_tmp_1_3;
+  reg _mod_div_sign_tmp_2_3;
+  reg _mod_div_sign_tmp_3_3;
+  reg _mod_div_sign_tmp_4_3;
+  reg _mod_div_sign_tmp_5_3;
+  reg _mod_div_sign_tmp_6_3;
+  reg _mod_div_sign_tmp_7_3;
+  reg _mod_div_sign_tmp_8_3;
+  assign _mod_mod_osign_3 = _mod_div_sign_tmp_8_3;
+  wire _mod_mod_update_3;
+  assign _mod_mod_update_3 = 1'd1;
+
+  DividerRadix8_16
+  _mod_div_3
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .update(_mod_mod_update_3),
+    .enable(1'd1),
+    .in_a(_mod_div_abs_ldata_3),
+    .in_b(_mod_div_abs_rdata_3),
+    .mod(_mod_mod_abs_odata_3)
+  );
+
+  reg signed [16-1:0] __delay_data_4;
+  reg signed [16-1:0] __delay_data_5;
+  assign qdata = _divide_data_2;
+  assign rdata = __delay_data_5;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _divide_div_ldata_2 <= 0;
+      _divide_div_rdata_2 <= 0;
+      _divide_div_abs_ldata_2 <= 0;
+      _divide_div_abs_rdata_2 <= 0;
+      _divide_div_odata_2 <= 0;
+      _divide_div_sign_tmp_0_2 <= 0;
+      _divide_div_sign_tmp_1_2 <= 0;
+      _divide_div_sign_tmp_2_2 <= 0;
+      _divide_div_sign_tmp_3_2 <= 0;
+      _divide_div_sign_tmp_4_2 <= 0;
+      _divide_div_sign_tmp_5_2 <= 0;
+      _divide_div_sign_tmp_6_2 <= 0;
+      _divide_div_sign_tmp_7_2 <= 0;
+      _divide_div_sign_tmp_8_2 <= 0;
+      _divide_div_sign_tmp_9_2 <= 0;
+      _divide_div_sign_tmp_10_2 <= 0;
+      _mod_mod_ldata_3 <= 0;
+      _mod_mod_rdata_3 <= 0;
+      _mod_div_abs_ldata_3 <= 0;
+      _mod_div_abs_rdata_3 <= 0;
+      _mod_mod_odata_3 <= 0;
+      _mod_div_sign_tmp_0_3 <= 0;
+      _mod_div_sign_tmp_1_3 <= 0;
+      _mod_div_sign_tmp_2_3 <= 0;
+      _mod_div_sign_tmp_3_3 <= 0;
+      _mod_div_sign_tmp_4_3 <= 0;
+      _mod_div_sign_tmp_5_3 <= 0;
+      _mod_div_sign_tmp_6_3 <= 0;
+      _mod_div_sign_tmp_7_3 <= 0;
+      _mod_div_sign_tmp_8_3 <= 0;
+      __delay_data_4 <= 0;
+      __delay_data_5 <= 0;
+    end else begin
+      _divide_div_ldata_2 <= xdata;
+      _divide_div_rdata_2 <= ydata;
+      _divide_div_abs_ldata_2 <= (_divide_div_ldata_2[15] == 0)? _divide_div_ldata_2 : ~_divide_div_ldata_2 + 1;
+      _divide_div_abs_rdata_2 <= (_divide_div_rdata_2[15] == 0)? _divide_div_rdata_2 : ~_divide_div_rdata_2 + 1;
+      _divide_div_odata_2 <= (_divide_div_osign_2 == 0)? _divide_div_abs_odata_2 : ~_divide_div_abs_odata_2 + 1;
+      _divide_div_sign_tmp_0_2 <= !((_divide_div_ldata_2[15] == 0) && (_divide_div_rdata_2[15] == 0) || (_divide_div_ldata_2[15] == 1) && (_divide_div_rdata_2[15] == 1));
+      _divide_div_sign_tmp_1_2 <= _divide_div_sign_tmp_0_2;
+      _divide_div_sign_tmp_2_2 <= _divide_div_sign_tmp_1_2;
+      _divide_div_sign_tmp_3_2 <= _divide_div_sign_tmp_2_2;
+      _divide_div_sign_tmp_4_2 <= _divide_div_sign_tmp_3_2;
+      _divide_div_sign_tmp_5_2 <= _divide_div_sign_tmp_4_2;
+      _divide_div_sign_tmp_6_2 <= _divide_div_sign_tmp_5_2;
+      _divide_div_sign_tmp_7_2 <= _divide_div_sign_tmp_6_2;
+      _divide_div_sign_tmp_8_2 <= _divide_div_sign_tmp_7_2;
+      _divide_div_sign_tmp_9_2 <= _divide_div_sign_tmp_8_2;
+      _divide_div_sign_tmp_10_2 <= _divide_div_sign_tmp_9_2;
+      _mod_mod_ldata_3 <= xdata;
+      _mod_mod_rdata_3 <= ydata;
+      _mod_div_abs_ldata_3 <= (_mod_mod_ldata_3[15] == 0)? _mod_mod_ldata_3 : ~_mod_mod_ldata_3 + 1;
+      _mod_div_abs_rdata_3 <= (_mod_mod_rdata_3[15] == 0)? _mod_mod_rdata_3 : ~_mod_mod_rdata_3 + 1;
+      _mod_mod_odata_3 <= (_mod_mod_osign_3 == 0)? _mod_mod_abs_odata_3 : ~_mod_mod_abs_odata_3 + 1;
+      _mod_div_sign_tmp_0_3 <= !((_mod_mod_ldata_3[15] == 0) && (_mod_mod_rdata_3[15] == 0) || (_mod_mod_ldata_3[15] == 1) && (_mod_mod_rdata_3[15] == 1));
+      _mod_div_sign_tmp_1_3 <= _mod_div_sign_tmp_0_3;
+      _mod_div_sign_tmp_2_3 <= _mod_div_sign_tmp_1_3;
+      _mod_div_sign_tmp_3_3 <= _mod_div_sign_tmp_2_3;
+      _mod_div_sign_tmp_4_3 <= _mod_div_sign_tmp_3_3;
+      _mod_div_sign_tmp_5_3 <= _mod_div_sign_tmp_4_3;
+      _mod_div_sign_tmp_6_3 <= _mod_div_sign_tmp_5_3;
+      _mod_div_sign_tmp_7_3 <= _mod_div_sign_tmp_6_3;
+      _mod_div_sign_tmp_8_3 <= _mod_div_sign_tmp_7_3;
+      __delay_data_4 <= _mod_data_3;
+      __delay_data_5 <= __delay_data_4;
+    end
+  end
+
+
+endmodule
+
+
+
+module DividerRadix4_16
+(
+  input CLK,
+  input RST,
+  input [16-1:0] in_a,
+  input [16-1:0] in_b,
+  input update,
+  input enable,
+  output reg [16-1:0] rslt,
+  output reg [16-1:0] mod,
+  output reg valid
+);
+
+  wire [16-1:0] abs_in_a;
+  assign abs_in_a = (in_a[15])? ~in_a + 1 : in_a;
+  wire [16-1:0] abs_in_b;
+  assign abs_in_b = (in_b[15])? ~in_b + 1 : in_b;
+  reg stage_valid_0;
+  reg in_a_positive_0;
+  reg in_b_positive_0;
+  reg [32-1:0] dividend_0;
+  reg [32-1:0] divisor_0;
+  reg [16-1:0] stage_rslt_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_0 <= 0;
+      in_a_positive_0 <= 0;
+      in_b_positive_0 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_0 <= enable;
+        in_a_positive_0 <= in_a[15] == 0;
+        in_b_positive_0 <= in_b[15] == 0;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_0 <= abs_in_a;
+      divisor_0 <= abs_in_b << 15;
+      stage_rslt_0 <= 0;
+    end 
+  end
+
+  reg stage_valid_1;
+  reg in_a_positive_1;
+  reg in_b_positive_1;
+  reg [32-1:0] dividend_1;
+  reg [32-1:0] divisor_1;
+  reg [16-1:0] stage_rslt_1;
+  wire [32-1:0] sub_value_0_0;
+  assign sub_value_0_0 = dividend_0 - divisor_0;
+  wire [32-1:0] step_dividend_0_0;
+  assign step_dividend_0_0 = (!sub_value_0_0[31])? sub_value_0_0 : dividend_0;
+  wire [32-1:0] sub_value_0_1;
+  assign sub_value_0_1 = step_dividend_0_0 - (divisor_0 >> 1);
+  wire [32-1:0] step_dividend_0_1;
+  assign step_dividend_0_1 = (!sub_value_0_1[31])? sub_value_0_1 : step_dividend_0_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_1 <= 0;
+      in_a_positive_1 <= 0;
+      in_b_positive_1 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_1 <= stage_valid_0;
+        in_a_positive_1 <= in_a_positive_0;
+        in_b_positive_1 <= in_b_positive_0;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_1 <= step_dividend_0_1;
+      divisor_1 <= (divisor_0 >> 1) >> 1;
+      stage_rslt_1 <= { { stage_rslt_0, !sub_value_0_0[31] }, !sub_value_0_1[31] };
+    end 
+  end
+
+  reg stage_valid_2;
+  reg in_a_positive_2;
+  reg in_b_positive_2;
+  reg [32-1:0] dividend_2;
+  reg [32-1:0] divisor_2;
+  reg [16-1:0] stage_rslt_2;
+  wire [32-1:0] sub_value_1_0;
+  assign sub_value_1_0 = dividend_1 - divisor_1;
+  wire [32-1:0] step_dividend_1_0;
+  assign step_dividend_1_0 = (!sub_value_1_0[31])? sub_value_1_0 : dividend_1;
+  wire [32-1:0] sub_value_1_1;
+  assign sub_value_1_1 = step_dividend_1_0 - (divisor_1 >> 1);
+  wire [32-1:0] step_dividend_1_1;
+  assign step_dividend_1_1 = (!sub_value_1_1[31])? sub_value_1_1 : step_dividend_1_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_2 <= 0;
+      in_a_positive_2 <= 0;
+      in_b_positive_2 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_2 <= stage_valid_1;
+        in_a_positive_2 <= in_a_positive_1;
+        in_b_positive_2 <= in_b_positive_1;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_2 <= step_dividend_1_1;
+      divisor_2 <= (divisor_1 >> 1) >> 1;
+      stage_rslt_2 <= { { stage_rslt_1, !sub_value_1_0[31] }, !sub_value_1_1[31] };
+    end 
+  end
+
+  reg stage_valid_3;
+  reg in_a_positive_3;
+  reg in_b_positive_3;
+  reg [32-1:0] dividend_3;
+  reg [32-1:0] divisor_3;
+  reg [16-1:0] stage_rslt_3;
+  wire [32-1:0] sub_value_2_0;
+  assign sub_value_2_0 = dividend_2 - divisor_2;
+  wire [32-1:0] step_dividend_2_0;
+  assign step_dividend_2_0 = (!sub_value_2_0[31])? sub_value_2_0 : dividend_2;
+  wire [32-1:0] sub_value_2_1;
+  assign sub_value_2_1 = step_dividend_2_0 - (divisor_2 >> 1);
+  wire [32-1:0] step_dividend_2_1;
+  assign step_dividend_2_1 = (!sub_value_2_1[31])? sub_value_2_1 : step_dividend_2_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_3 <= 0;
+      in_a_positive_3 <= 0;
+      in_b_positive_3 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_3 <= stage_valid_2;
+        in_a_positive_3 <= in_a_positive_2;
+        in_b_positive_3 <= in_b_positive_2;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_3 <= step_dividend_2_1;
+      divisor_3 <= (divisor_2 >> 1) >> 1;
+      stage_rslt_3 <= { { stage_rslt_2, !sub_value_2_0[31] }, !sub_value_2_1[31] };
+    end 
+  end
+
+  reg stage_valid_4;
+  reg in_a_positive_4;
+  reg in_b_positive_4;
+  reg [32-1:0] dividend_4;
+  reg [32-1:0] divisor_4;
+  reg [16-1:0] stage_rslt_4;
+  wire [32-1:0] sub_value_3_0;
+  assign sub_value_3_0 = dividend_3 - divisor_3;
+  wire [32-1:0] step_dividend_3_0;
+  assign step_dividend_3_0 = (!sub_value_3_0[31])? sub_value_3_0 : dividend_3;
+  wire [32-1:0] sub_value_3_1;
+  assign sub_value_3_1 = step_dividend_3_0 - (divisor_3 >> 1);
+  wire [32-1:0] step_dividend_3_1;
+  assign step_dividend_3_1 = (!sub_value_3_1[31])? sub_value_3_1 : step_dividend_3_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_4 <= 0;
+      in_a_positive_4 <= 0;
+      in_b_positive_4 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_4 <= stage_valid_3;
+        in_a_positive_4 <= in_a_positive_3;
+        in_b_positive_4 <= in_b_positive_3;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_4 <= step_dividend_3_1;
+      divisor_4 <= (divisor_3 >> 1) >> 1;
+      stage_rslt_4 <= { { stage_rslt_3, !sub_value_3_0[31] }, !sub_value_3_1[31] };
+    end 
+  end
+
+  reg stage_valid_5;
+  reg in_a_positive_5;
+  reg in_b_positive_5;
+  reg [32-1:0] dividend_5;
+  reg [32-1:0] divisor_5;
+  reg [16-1:0] stage_rslt_5;
+  wire [32-1:0] sub_value_4_0;
+  assign sub_value_4_0 = dividend_4 - divisor_4;
+  wire [32-1:0] step_dividend_4_0;
+  assign step_dividend_4_0 = (!sub_value_4_0[31])? sub_value_4_0 : dividend_4;
+  wire [32-1:0] sub_value_4_1;
+  assign sub_value_4_1 = step_dividend_4_0 - (divisor_4 >> 1);
+  wire [32-1:0] step_dividend_4_1;
+  assign step_dividend_4_1 = (!sub_value_4_1[31])? sub_value_4_1 : step_dividend_4_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_5 <= 0;
+      in_a_positive_5 <= 0;
+      in_b_positive_5 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_5 <= stage_valid_4;
+        in_a_positive_5 <= in_a_positive_4;
+        in_b_positive_5 <= in_b_positive_4;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_5 <= step_dividend_4_1;
+      divisor_5 <= (divisor_4 >> 1) >> 1;
+      stage_rslt_5 <= { { stage_rslt_4, !sub_value_4_0[31] }, !sub_value_4_1[31] };
+    end 
+  end
+
+  reg stage_valid_6;
+  reg in_a_positive_6;
+  reg in_b_positive_6;
+  reg [32-1:0] dividend_6;
+  reg [32-1:0] divisor_6;
+  reg [16-1:0] stage_rslt_6;
+  wire [32-1:0] sub_value_5_0;
+  assign sub_value_5_0 = dividend_5 - divisor_5;
+  wire [32-1:0] step_dividend_5_0;
+  assign step_dividend_5_0 = (!sub_value_5_0[31])? sub_value_5_0 : dividend_5;
+  wire [32-1:0] sub_value_5_1;
+  assign sub_value_5_1 = step_dividend_5_0 - (divisor_5 >> 1);
+  wire [32-1:0] step_dividend_5_1;
+  assign step_dividend_5_1 = (!sub_value_5_1[31])? sub_value_5_1 : step_dividend_5_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_6 <= 0;
+      in_a_positive_6 <= 0;
+      in_b_positive_6 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_6 <= stage_valid_5;
+        in_a_positive_6 <= in_a_positive_5;
+        in_b_positive_6 <= in_b_positive_5;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_6 <= step_dividend_5_1;
+      divisor_6 <= (divisor_5 >> 1) >> 1;
+      stage_rslt_6 <= { { stage_rslt_5, !sub_value_5_0[31] }, !sub_value_5_1[31] };
+    end 
+  end
+
+  reg stage_valid_7;
+  reg in_a_positive_7;
+  reg in_b_positive_7;
+  reg [32-1:0] dividend_7;
+  reg [32-1:0] divisor_7;
+  reg [16-1:0] stage_rslt_7;
+  wire [32-1:0] sub_value_6_0;
+  assign sub_value_6_0 = dividend_6 - divisor_6;
+  wire [32-1:0] step_dividend_6_0;
+  assign step_dividend_6_0 = (!sub_value_6_0[31])? sub_value_6_0 : dividend_6;
+  wire [32-1:0] sub_value_6_1;
+  assign sub_value_6_1 = step_dividend_6_0 - (divisor_6 >> 1);
+  wire [32-1:0] step_dividend_6_1;
+  assign step_dividend_6_1 = (!sub_value_6_1[31])? sub_value_6_1 : step_dividend_6_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_7 <= 0;
+      in_a_positive_7 <= 0;
+      in_b_positive_7 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_7 <= stage_valid_6;
+        in_a_positive_7 <= in_a_positive_6;
+        in_b_positive_7 <= in_b_positive_6;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_7 <= step_dividend_6_1;
+      divisor_7 <= (divisor_6 >> 1) >> 1;
+      stage_rslt_7 <= { { stage_rslt_6, !sub_value_6_0[31] }, !sub_value_6_1[31] };
+    end 
+  end
+
+  reg stage_valid_8;
+  reg in_a_positive_8;
+  reg in_b_positive_8;
+  reg [32-1:0] dividend_8;
+  reg [32-1:0] divisor_8;
+  reg [16-1:0] stage_rslt_8;
+  wire [32-1:0] sub_value_7_0;
+  assign sub_value_7_0 = dividend_7 - divisor_7;
+  wire [32-1:0] step_dividend_7_0;
+  assign step_dividend_7_0 = (!sub_value_7_0[31])? sub_value_7_0 : dividend_7;
+  wire [32-1:0] sub_value_7_1;
+  assign sub_value_7_1 = step_dividend_7_0 - (divisor_7 >> 1);
+  wire [32-1:0] step_dividend_7_1;
+  assign step_dividend_7_1 = (!sub_value_7_1[31])? sub_value_7_1 : step_dividend_7_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_8 <= 0;
+      in_a_positive_8 <= 0;
+      in_b_positive_8 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_8 <= stage_valid_7;
+        in_a_positive_8 <= in_a_positive_7;
+        in_b_positive_8 <= in_b_positive_7;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_8 <= step_dividend_7_1;
+      divisor_8 <= (divisor_7 >> 1) >> 1;
+      stage_rslt_8 <= { { stage_rslt_7, !sub_value_7_0[31] }, !sub_value_7_1[31] };
+    end 
+  end
+
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      valid <= 0;
+    end else begin
+      if(update) begin
+        valid <= stage_valid_8;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      rslt <= (in_a_positive_8 == in_b_positive_8)? stage_rslt_8 : ~stage_rslt_8 + 1;
+      mod <= (in_a_positive_8)? dividend_8[15:0] : ~dividend_8[15:0] + 1;
+    end 
+  end
+
+
+endmodule
+
+
+
+module DividerRadix8_16
+(
+  input CLK,
+  input RST,
+  input [16-1:0] in_a,
+  input [16-1:0] in_b,
+  input update,
+  input enable,
+  output reg [16-1:0] rslt,
+  output reg [16-1:0] mod,
+  output reg valid
+);
+
+  wire [16-1:0] abs_in_a;
+  assign abs_in_a = (in_a[15])? ~in_a + 1 : in_a;
+  wire [16-1:0] abs_in_b;
+  assign abs_in_b = (in_b[15])? ~in_b + 1 : in_b;
+  reg stage_valid_0;
+  reg in_a_positive_0;
+  reg in_b_positive_0;
+  reg [34-1:0] dividend_0;
+  reg [34-1:0] divisor_0;
+  reg [18-1:0] stage_rslt_0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_0 <= 0;
+      in_a_positive_0 <= 0;
+      in_b_positive_0 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_0 <= enable;
+        in_a_positive_0 <= in_a[15] == 0;
+        in_b_positive_0 <= in_b[15] == 0;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_0 <= abs_in_a;
+      divisor_0 <= abs_in_b << 17;
+      stage_rslt_0 <= 0;
+    end 
+  end
+
+  reg stage_valid_1;
+  reg in_a_positive_1;
+  reg in_b_positive_1;
+  reg [34-1:0] dividend_1;
+  reg [34-1:0] divisor_1;
+  reg [18-1:0] stage_rslt_1;
+  wire [34-1:0] sub_value_0_0;
+  assign sub_value_0_0 = dividend_0 - divisor_0;
+  wire [34-1:0] step_dividend_0_0;
+  assign step_dividend_0_0 = (!sub_value_0_0[33])? sub_value_0_0 : dividend_0;
+  wire [34-1:0] sub_value_0_1;
+  assign sub_value_0_1 = step_dividend_0_0 - (divisor_0 >> 1);
+  wire [34-1:0] step_dividend_0_1;
+  assign step_dividend_0_1 = (!sub_value_0_1[33])? sub_value_0_1 : step_dividend_0_0;
+  wire [34-1:0] sub_value_0_2;
+  assign sub_value_0_2 = step_dividend_0_1 - ((divisor_0 >> 1) >> 1);
+  wire [34-1:0] step_dividend_0_2;
+  assign step_dividend_0_2 = (!sub_value_0_2[33])? sub_value_0_2 : step_dividend_0_1;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_1 <= 0;
+      in_a_positive_1 <= 0;
+      in_b_positive_1 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_1 <= stage_valid_0;
+        in_a_positive_1 <= in_a_positive_0;
+        in_b_positive_1 <= in_b_positive_0;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_1 <= step_dividend_0_2;
+      divisor_1 <= ((divisor_0 >> 1) >> 1) >> 1;
+      stage_rslt_1 <= { { { stage_rslt_0, !sub_value_0_0[33] }, !sub_value_0_1[33] }, !sub_value_0_2[33] };
+    end 
+  end
+
+  reg stage_valid_2;
+  reg in_a_positive_2;
+  reg in_b_positive_2;
+  reg [34-1:0] dividend_2;
+  reg [34-1:0] divisor_2;
+  reg [18-1:0] stage_rslt_2;
+  wire [34-1:0] sub_value_1_0;
+  assign sub_value_1_0 = dividend_1 - divisor_1;
+  wire [34-1:0] step_dividend_1_0;
+  assign step_dividend_1_0 = (!sub_value_1_0[33])? sub_value_1_0 : dividend_1;
+  wire [34-1:0] sub_value_1_1;
+  assign sub_value_1_1 = step_dividend_1_0 - (divisor_1 >> 1);
+  wire [34-1:0] step_dividend_1_1;
+  assign step_dividend_1_1 = (!sub_value_1_1[33])? sub_value_1_1 : step_dividend_1_0;
+  wire [34-1:0] sub_value_1_2;
+  assign sub_value_1_2 = step_dividend_1_1 - ((divisor_1 >> 1) >> 1);
+  wire [34-1:0] step_dividend_1_2;
+  assign step_dividend_1_2 = (!sub_value_1_2[33])? sub_value_1_2 : step_dividend_1_1;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_2 <= 0;
+      in_a_positive_2 <= 0;
+      in_b_positive_2 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_2 <= stage_valid_1;
+        in_a_positive_2 <= in_a_positive_1;
+        in_b_positive_2 <= in_b_positive_1;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_2 <= step_dividend_1_2;
+      divisor_2 <= ((divisor_1 >> 1) >> 1) >> 1;
+      stage_rslt_2 <= { { { stage_rslt_1, !sub_value_1_0[33] }, !sub_value_1_1[33] }, !sub_value_1_2[33] };
+    end 
+  end
+
+  reg stage_valid_3;
+  reg in_a_positive_3;
+  reg in_b_positive_3;
+  reg [34-1:0] dividend_3;
+  reg [34-1:0] divisor_3;
+  reg [18-1:0] stage_rslt_3;
+  wire [34-1:0] sub_value_2_0;
+  assign sub_value_2_0 = dividend_2 - divisor_2;
+  wire [34-1:0] step_dividend_2_0;
+  assign step_dividend_2_0 = (!sub_value_2_0[33])? sub_value_2_0 : dividend_2;
+  wire [34-1:0] sub_value_2_1;
+  assign sub_value_2_1 = step_dividend_2_0 - (divisor_2 >> 1);
+  wire [34-1:0] step_dividend_2_1;
+  assign step_dividend_2_1 = (!sub_value_2_1[33])? sub_value_2_1 : step_dividend_2_0;
+  wire [34-1:0] sub_value_2_2;
+  assign sub_value_2_2 = step_dividend_2_1 - ((divisor_2 >> 1) >> 1);
+  wire [34-1:0] step_dividend_2_2;
+  assign step_dividend_2_2 = (!sub_value_2_2[33])? sub_value_2_2 : step_dividend_2_1;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_3 <= 0;
+      in_a_positive_3 <= 0;
+      in_b_positive_3 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_3 <= stage_valid_2;
+        in_a_positive_3 <= in_a_positive_2;
+        in_b_positive_3 <= in_b_positive_2;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_3 <= step_dividend_2_2;
+      divisor_3 <= ((divisor_2 >> 1) >> 1) >> 1;
+      stage_rslt_3 <= { { { stage_rslt_2, !sub_value_2_0[33] }, !sub_value_2_1[33] }, !sub_value_2_2[33] };
+    end 
+  end
+
+  reg stage_valid_4;
+  reg in_a_positive_4;
+  reg in_b_positive_4;
+  reg [34-1:0] dividend_4;
+  reg [34-1:0] divisor_4;
+  reg [18-1:0] stage_rslt_4;
+  wire [34-1:0] sub_value_3_0;
+  assign sub_value_3_0 = dividend_3 - divisor_3;
+  wire [34-1:0] step_dividend_3_0;
+  assign step_dividend_3_0 = (!sub_value_3_0[33])? sub_value_3_0 : dividend_3;
+  wire [34-1:0] sub_value_3_1;
+  assign sub_value_3_1 = step_dividend_3_0 - (divisor_3 >> 1);
+  wire [34-1:0] step_dividend_3_1;
+  assign step_dividend_3_1 = (!sub_value_3_1[33])? sub_value_3_1 : step_dividend_3_0;
+  wire [34-1:0] sub_value_3_2;
+  assign sub_value_3_2 = step_dividend_3_1 - ((divisor_3 >> 1) >> 1);
+  wire [34-1:0] step_dividend_3_2;
+  assign step_dividend_3_2 = (!sub_value_3_2[33])? sub_value_3_2 : step_dividend_3_1;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_4 <= 0;
+      in_a_positive_4 <= 0;
+      in_b_positive_4 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_4 <= stage_valid_3;
+        in_a_positive_4 <= in_a_positive_3;
+        in_b_positive_4 <= in_b_positive_3;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_4 <= step_dividend_3_2;
+      divisor_4 <= ((divisor_3 >> 1) >> 1) >> 1;
+      stage_rslt_4 <= { { { stage_rslt_3, !sub_value_3_0[33] }, !sub_value_3_1[33] }, !sub_value_3_2[33] };
+    end 
+  end
+
+  reg stage_valid_5;
+  reg in_a_positive_5;
+  reg in_b_positive_5;
+  reg [34-1:0] dividend_5;
+  reg [34-1:0] divisor_5;
+  reg [18-1:0] stage_rslt_5;
+  wire [34-1:0] sub_value_4_0;
+  assign sub_value_4_0 = dividend_4 - divisor_4;
+  wire [34-1:0] step_dividend_4_0;
+  assign step_dividend_4_0 = (!sub_value_4_0[33])? sub_value_4_0 : dividend_4;
+  wire [34-1:0] sub_value_4_1;
+  assign sub_value_4_1 = step_dividend_4_0 - (divisor_4 >> 1);
+  wire [34-1:0] step_dividend_4_1;
+  assign step_dividend_4_1 = (!sub_value_4_1[33])? sub_value_4_1 : step_dividend_4_0;
+  wire [34-1:0] sub_value_4_2;
+  assign sub_value_4_2 = step_dividend_4_1 - ((divisor_4 >> 1) >> 1);
+  wire [34-1:0] step_dividend_4_2;
+  assign step_dividend_4_2 = (!sub_value_4_2[33])? sub_value_4_2 : step_dividend_4_1;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_5 <= 0;
+      in_a_positive_5 <= 0;
+      in_b_positive_5 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_5 <= stage_valid_4;
+        in_a_positive_5 <= in_a_positive_4;
+        in_b_positive_5 <= in_b_positive_4;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_5 <= step_dividend_4_2;
+      divisor_5 <= ((divisor_4 >> 1) >> 1) >> 1;
+      stage_rslt_5 <= { { { stage_rslt_4, !sub_value_4_0[33] }, !sub_value_4_1[33] }, !sub_value_4_2[33] };
+    end 
+  end
+
+  reg stage_valid_6;
+  reg in_a_positive_6;
+  reg in_b_positive_6;
+  reg [34-1:0] dividend_6;
+  reg [34-1:0] divisor_6;
+  reg [18-1:0] stage_rslt_6;
+  wire [34-1:0] sub_value_5_0;
+  assign sub_value_5_0 = dividend_5 - divisor_5;
+  wire [34-1:0] step_dividend_5_0;
+  assign step_dividend_5_0 = (!sub_value_5_0[33])? sub_value_5_0 : dividend_5;
+  wire [34-1:0] sub_value_5_1;
+  assign sub_value_5_1 = step_dividend_5_0 - (divisor_5 >> 1);
+  wire [34-1:0] step_dividend_5_1;
+  assign step_dividend_5_1 = (!sub_value_5_1[33])? sub_value_5_1 : step_dividend_5_0;
+  wire [34-1:0] sub_value_5_2;
+  assign sub_value_5_2 = step_dividend_5_1 - ((divisor_5 >> 1) >> 1);
+  wire [34-1:0] step_dividend_5_2;
+  assign step_dividend_5_2 = (!sub_value_5_2[33])? sub_value_5_2 : step_dividend_5_1;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      stage_valid_6 <= 0;
+      in_a_positive_6 <= 0;
+      in_b_positive_6 <= 0;
+    end else begin
+      if(update) begin
+        stage_valid_6 <= stage_valid_5;
+        in_a_positive_6 <= in_a_positive_5;
+        in_b_positive_6 <= in_b_positive_5;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      dividend_6 <= step_dividend_5_2;
+      divisor_6 <= ((divisor_5 >> 1) >> 1) >> 1;
+      stage_rslt_6 <= { { { stage_rslt_5, !sub_value_5_0[33] }, !sub_value_5_1[33] }, !sub_value_5_2[33] };
+    end 
+  end
+
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      valid <= 0;
+    end else begin
+      if(update) begin
+        valid <= stage_valid_6;
+      end 
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(update) begin
+      rslt <= (in_a_positive_6 == in_b_positive_6)? stage_rslt_6 : ~stage_rslt_6 + 1;
+      mod <= (in_a_positive_6)? dividend_6[15:0] : ~dividend_6[15:0] + 1;
+    end 
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = stream_div_radix.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_latency():
+    from veriloggen.stream import div
+
+    assert(div.get_latency(32) == 32 + 5)
+    assert(div.get_latency(32, 4) == 16 + 5)
+    assert(div.get_latency(16, 8) == 6 + 5)
+
+    import veriloggen.stream as stream
+
+    veriloggen.reset()
+    x = stream.Variable('xdata', width=16)
+    y = stream.Variable('ydata', width=16)
+    q = stream.Div(x, y, radix=4)
+    r = stream.Mod(x, y, radix=8)
+    q.output('qdata')
+    r.output('rdata')
+    st = stream.Stream(q, r)
+    st.to_module('main')
+
+    assert(q.latency == 13)
+    assert(r.latency == 11)
+    assert(st.max_stage == 13)
+
+
+def test_radix():
+    from veriloggen.stream import div
+
+    try:
+        div.get_latency(32, 3)
+    except ValueError as e:
+        assert(e.args[0] == 'radix must be a power of 2, not 3')
+        return
+
+    assert(False)
+
+
+def test_radix_arg():
+    import veriloggen.stream as stream
+    import veriloggen.dataflow as dataflow
+
+    veriloggen.reset()
+    x = stream.Variable('xdata', width=16)
+    y = stream.Variable('ydata', width=16)
+
+    try:
+        stream.Div(x, y, radix=6)
+    except ValueError as e:
+        assert(e.args[0] == 'radix must be a power of 2, not 6')
+    else:
+        assert(False)
+
+    try:
+        stream.Mod(x, y, radix=1)
+    except ValueError as e:
+        assert(e.args[0] == 'radix must be a power of 2, not 1')
+    else:
+        assert(False)
+
+    # the latency follows the radix from the construction
+    assert(stream.Div(x, y, radix=4).latency == 13)
+    assert(stream.Mod(x, y).latency == 21)
+
+    a = dataflow.Variable('adata', width=16)
+    b = dataflow.Variable('bdata', width=16)
+    assert(dataflow.Div(a, b, radix=8).latency == 11)
+    assert(dataflow.Mod(a, b, radix=2).latency == 21)
+
+    try:
+        dataflow.Div(a, b, radix=0)
+    except ValueError as e:
+        assert(e.args[0] == 'radix must be a power of 2, not 0')
+    else:
+        assert(False)
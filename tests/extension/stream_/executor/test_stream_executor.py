@@ -0,0 +1,423 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import numpy as np
+import veriloggen
+import veriloggen.stream as stream
+import stream_executor
+from veriloggen import *
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  reg signed [32-1:0] xdata;
+  reg signed [32-1:0] ydata;
+  wire signed [32-1:0] zdata;
+  wire [1-1:0] vdata;
+
+  main
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .xdata(xdata),
+    .ydata(ydata),
+    .zdata(zdata),
+    .vdata(vdata)
+  );
+
+  reg reset_done;
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    reset_done = 0;
+    xdata = 0;
+    ydata = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    reset_done = 1;
+    @(posedge CLK);
+    #1;
+    #10000;
+    $finish;
+  end
+
+  reg [32-1:0] send_fsm;
+  localparam send_fsm_init = 0;
+  reg [32-1:0] send_count;
+  reg [32-1:0] recv_fsm;
+  localparam recv_fsm_init = 0;
+  reg [32-1:0] recv_count;
+  localparam send_fsm_1 = 1;
+  localparam send_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      send_fsm <= send_fsm_init;
+      send_count <= 0;
+    end else begin
+      case(send_fsm)
+        send_fsm_init: begin
+          if(reset_done) begin
+            send_fsm <= send_fsm_1;
+          end 
+        end
+        send_fsm_1: begin
+          xdata <= xdata + 1;
+          ydata <= ydata + 2;
+          $display("xdata=%d", xdata);
+          $display("ydata=%d", ydata);
+          send_count <= send_count + 1;
+          if(send_count == 20) begin
+            send_fsm <= send_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+  localparam recv_fsm_1 = 1;
+  localparam recv_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      recv_fsm <= recv_fsm_init;
+      recv_count <= 0;
+    end else begin
+      case(recv_fsm)
+        recv_fsm_init: begin
+          if(reset_done) begin
+            recv_fsm <= recv_fsm_1;
+          end 
+        end
+        recv_fsm_1: begin
+          $display("zdata=%d", zdata);
+          $display("vdata=%d", vdata);
+          recv_count <= recv_count + 1;
+          if(recv_count == 30) begin
+            recv_fsm <= recv_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module main
+(
+  input CLK,
+  input RST,
+  input signed [32-1:0] xdata,
+  input signed [32-1:0] ydata,
+  output signed [32-1:0] zdata,
+  output [1-1:0] vdata
+);
+
+  reg signed [32-1:0] _minus_data_2;
+  reg signed [32-1:0] __delay_data_16;
+  wire signed [64-1:0] _times_mul_odata_3;
+  reg signed [64-1:0] _times_mul_odata_reg_3;
+  wire signed [32-1:0] _times_data_3;
+  assign _times_data_3 = _times_mul_odata_reg_3;
+  wire _times_mul_update_3;
+  assign _times_mul_update_3 = 1'd1;
+
+  multiplier_0
+  _times_mul_3
+  (
+    .CLK(CLK),
+    .update(_times_mul_update_3),
+    .a(_minus_data_2),
+    .b(__delay_data_16),
+    .c(_times_mul_odata_3)
+  );
+
+  reg [1-1:0] _greaterthan_data_6;
+  reg [1-1:0] __delay_data_17;
+  reg [1-1:0] __delay_data_18;
+  reg [1-1:0] __delay_data_19;
+  reg [1-1:0] __delay_data_20;
+  reg [1-1:0] __delay_data_21;
+  reg [1-1:0] __delay_data_22;
+  reg signed [32-1:0] _sra_data_4;
+  reg [1-1:0] __delay_data_23;
+  reg signed [32-1:0] _uminus_data_8;
+  reg [1-1:0] __delay_data_24;
+  reg signed [32-1:0] __delay_data_25;
+  reg signed [32-1:0] _cond_data_9;
+  reg signed [32-1:0] _reduceadd_data_12;
+  reg [5-1:0] _reduceadd_count_12;
+  reg [1-1:0] _pulse_data_15;
+  reg [5-1:0] _pulse_count_15;
+  assign zdata = _reduceadd_data_12;
+  assign vdata = _pulse_data_15;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _minus_data_2 <= 0;
+      __delay_data_16 <= 0;
+      _times_mul_odata_reg_3 <= 0;
+      _greaterthan_data_6 <= 0;
+      __delay_data_17 <= 0;
+      __delay_data_18 <= 0;
+      __delay_data_19 <= 0;
+      __delay_data_20 <= 0;
+      __delay_data_21 <= 0;
+      __delay_data_22 <= 0;
+      _sra_data_4 <= 0;
+      __delay_data_23 <= 0;
+      _uminus_data_8 <= 0;
+      __delay_data_24 <= 0;
+      __delay_data_25 <= 0;
+      _cond_data_9 <= 0;
+      _reduceadd_data_12 <= 1'sd0;
+      _reduceadd_count_12 <= 0;
+      _pulse_data_15 <= 1'sd0;
+      _pulse_count_15 <= 0;
+    end else begin
+      _minus_data_2 <= xdata - ydata;
+      __delay_data_16 <= xdata;
+      _times_mul_odata_reg_3 <= _times_mul_odata_3;
+      _greaterthan_data_6 <= _minus_data_2 > 1'sd0;
+      __delay_data_17 <= _greaterthan_data_6;
+      __delay_data_18 <= __delay_data_17;
+      __delay_data_19 <= __delay_data_18;
+      __delay_data_20 <= __delay_data_19;
+      __delay_data_21 <= __delay_data_20;
+      __delay_data_22 <= __delay_data_21;
+      _sra_data_4 <= _times_data_3 >>> 3'sd2;
+      __delay_data_23 <= __delay_data_22;
+      _uminus_data_8 <= -_sra_data_4;
+      __delay_data_24 <= __delay_data_23;
+      __delay_data_25 <= _sra_data_4;
+      _cond_data_9 <= (__delay_data_24)? __delay_data_25 : _uminus_data_8;
+      _reduceadd_data_12 <= _reduceadd_data_12 + _cond_data_9;
+      _reduceadd_count_12 <= (_reduceadd_count_12 >= 4'sd4 - 1)? 0 : _reduceadd_count_12 + 1;
+      if(_reduceadd_count_12 == 0) begin
+        _reduceadd_data_12 <= 1'sd0 + _cond_data_9;
+      end 
+      _pulse_data_15 <= _pulse_count_15 >= 4'sd4 - 1;
+      _pulse_count_15 <= (_pulse_count_15 >= 4'sd4 - 1)? 0 : _pulse_count_15 + 1;
+      if(_pulse_count_15 == 0) begin
+        _pulse_data_15 <= _pulse_count_15 >= 4'sd4 - 1;
+      end 
+    end
+  end
+
+
+endmodule
+
+
+
+module multiplier_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+
+  multiplier_core_0
+  mult
+  (
+    .CLK(CLK),
+    .update(update),
+    .a(a),
+    .b(b),
+    .c(c)
+  );
+
+
+endmodule
+
+
+
+module multiplier_core_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+  reg signed [32-1:0] _a;
+  reg signed [32-1:0] _b;
+  wire signed [64-1:0] _mul;
+  reg signed [64-1:0] _pipe_mul0;
+  reg signed [64-1:0] _pipe_mul1;
+  reg signed [64-1:0] _pipe_mul2;
+  reg signed [64-1:0] _pipe_mul3;
+  reg signed [64-1:0] _pipe_mul4;
+  assign _mul = _a * _b;
+  assign c = _pipe_mul4;
+
+  always @(posedge CLK) begin
+    if(update) begin
+      _a <= a;
+      _b <= b;
+      _pipe_mul0 <= _mul;
+      _pipe_mul1 <= _pipe_mul0;
+      _pipe_mul2 <= _pipe_mul1;
+      _pipe_mul3 <= _pipe_mul2;
+      _pipe_mul4 <= _pipe_mul3;
+    end 
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = stream_executor.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_execute():
+    veriloggen.reset()
+    st = stream_executor.mkStream()
+
+    xdata = np.arange(-10, 20)
+    ydata = np.arange(0, 60, 2)
+    rslt = st.execute({'xdata': xdata, 'ydata': ydata})
+
+    zdata = []
+    vdata = []
+    total = 0
+    for i, (x, y) in enumerate(zip(xdata.tolist(), ydata.tolist())):
+        a = x - y
+        c = (a * x) >> 2
+        d = c if a > 0 else -c
+        total = d if i % 4 == 0 else total + d
+        zdata.append(total)
+        vdata.append(1 if i % 4 == 3 else 0)
+
+    assert(rslt['zdata'].tolist() == zdata)
+    assert(rslt['vdata'].tolist() == vdata)
+
+    # the implemented stream gives the same values
+    st.to_module('main')
+    rslt = st.execute({'xdata': xdata, 'ydata': ydata})
+    assert(rslt['zdata'].tolist() == zdata)
+    assert(rslt['vdata'].tolist() == vdata)
+
+
+def test_fixed_point():
+    veriloggen.reset()
+    x = stream.Variable('xdata', width=16, point=8)
+    y = stream.Variable('ydata', width=8, signed=False)
+    z = x * x + y
+    z.output('zdata')
+    st = stream.Stream(z)
+
+    rslt = st.execute({'xdata': [1.5, -0.25, 100.0], 'ydata': 3}, raw=False)
+    # 100.0 * 100.0 wraps around in the 16-bit product
+    assert(rslt['zdata'].tolist() == [5.25, 3.0625, 19.0])
+
+
+def mkManager():
+    m = Module('main')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    return m, stream.StreamManager(m, clk, rst, aswire=True, no_hook=True)
+
+
+def test_reduce_enable():
+    veriloggen.reset()
+    m, strm = mkManager()
+    x = strm.Variable('xdata')
+    e = strm.Variable('edata', width=1, signed=False)
+    z = strm.ReduceAdd(x, enable=e)
+    z.output('zdata')
+    strm.implement()
+
+    xdata = np.arange(1, 11)
+    edata = np.array([1, 0, 1, 1, 0, 0, 1, 0, 1, 1])
+    rslt = strm.execute({'xdata': xdata, 'edata': edata})
+
+    assert(rslt['zdata'].tolist() == np.cumsum(xdata * edata).tolist())
+
+
+def test_scratchpad():
+    veriloggen.reset()
+    m, strm = mkManager()
+    x = strm.Variable('xdata')
+    a = strm.Variable('adata', width=2, signed=False)
+    b = strm.Variable('bdata', width=2, signed=False)
+    sp = strm.Scratchpad(x, a, 4)
+    z = sp.read(b)
+    z.output('zdata')
+    strm.implement()
+
+    # each sample reads the address written by the previous one
+    xdata = np.arange(100, 110)
+    adata = np.arange(10) % 4
+    bdata = (np.arange(10) - 1) % 4
+    rslt = strm.execute({'xdata': xdata, 'adata': adata, 'bdata': bdata})
+
+    assert(rslt['zdata'].tolist() == [0] + list(range(100, 109)))
+
+
+def test_substream_cond():
+    veriloggen.reset()
+    m, sub_strm = mkManager()
+    a = sub_strm.Variable('adata')
+    c = a + 1
+    c.output('cdata')
+
+    clk = m.find_identifier('CLK')
+    rst = m.find_identifier('RST')
+    strm = stream.StreamManager(m, clk, rst, aswire=True, no_hook=True)
+    x = strm.Variable('xdata')
+    sub = strm.Substream(sub_strm)
+    # the condition is a signal outside of the stream
+    sub.write('adata', x, cond=m.Reg('en', initval=0))
+    z = sub.read('cdata')
+    z.output('zdata')
+    strm.implement()
+
+    try:
+        rslt = strm.execute({'xdata': np.arange(4)})
+    except NotImplementedError as e:
+        assert(e.args[0] ==
+               "conditional write to 'adata' of Substream is not supported.")
+    else:
+        assert(False)
@@ -0,0 +1,313 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import stream_graph_export
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  reg signed [32-1:0] xdata;
+  reg signed [32-1:0] ydata;
+  wire signed [32-1:0] zdata;
+
+  main
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .xdata(xdata),
+    .ydata(ydata),
+    .zdata(zdata)
+  );
+
+  reg reset_done;
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    reset_done = 0;
+    xdata = 0;
+    ydata = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    reset_done = 1;
+    @(posedge CLK);
+    #1;
+    #10000;
+    $finish;
+  end
+
+  reg [32-1:0] send_fsm;
+  localparam send_fsm_init = 0;
+  reg [32-1:0] send_count;
+  reg [32-1:0] recv_fsm;
+  localparam recv_fsm_init = 0;
+  reg [32-1:0] recv_count;
+  localparam send_fsm_1 = 1;
+  localparam send_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      send_fsm <= send_fsm_init;
+      send_count <= 0;
+    end else begin
+      case(send_fsm)
+        send_fsm_init: begin
+          if(reset_done) begin
+            send_fsm <= send_fsm_1;
+          end 
+        end
+        send_fsm_1: begin
+          xdata <= xdata + 1;
+          ydata <= ydata + 2;
+          $display("xdata=%d", xdata);
+          $display("ydata=%d", ydata);
+          send_count <= send_count + 1;
+          if(send_count == 20) begin
+            send_fsm <= send_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+  localparam recv_fsm_1 = 1;
+  localparam recv_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      recv_fsm <= recv_fsm_init;
+      recv_count <= 0;
+    end else begin
+      case(recv_fsm)
+        recv_fsm_init: begin
+          if(reset_done) begin
+            recv_fsm <= recv_fsm_1;
+          end 
+        end
+        recv_fsm_1: begin
+          $display("zdata=%d", zdata);
+          recv_count <= recv_count + 1;
+          if(recv_count == 30) begin
+            recv_fsm <= recv_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module main
+(
+  input CLK,
+  input RST,
+  input signed [32-1:0] xdata,
+  input signed [32-1:0] ydata,
+  output signed [32-1:0] zdata
+);
+
+  wire signed [32-1:0] _plus_data_2;
+  assign _plus_data_2 = xdata + ydata;
+  wire signed [32-1:0] _minus_data_3;
+  assign _minus_data_3 = _plus_data_2 - ydata;
+  wire signed [64-1:0] _times_mul_odata_4;
+  reg signed [64-1:0] _times_mul_odata_reg_4;
+  wire signed [32-1:0] _times_data_4;
+  assign _times_data_4 = _times_mul_odata_reg_4;
+  wire _times_mul_update_4;
+  assign _times_mul_update_4 = 1'd1;
+
+  multiplier_0
+  _times_mul_4
+  (
+    .CLK(CLK),
+    .update(_times_mul_update_4),
+    .a(_minus_data_3),
+    .b(xdata),
+    .c(_times_mul_odata_4)
+  );
+
+  reg signed [32-1:0] __delay_data_6;
+  reg signed [32-1:0] __delay_data_7;
+  reg signed [32-1:0] __delay_data_8;
+  reg signed [32-1:0] __delay_data_9;
+  reg signed [32-1:0] __delay_data_10;
+  reg signed [32-1:0] __delay_data_11;
+  reg signed [32-1:0] __delay_data_12;
+  reg signed [32-1:0] _plus_data_5;
+  assign zdata = _plus_data_5;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _times_mul_odata_reg_4 <= 0;
+      __delay_data_6 <= 0;
+      __delay_data_7 <= 0;
+      __delay_data_8 <= 0;
+      __delay_data_9 <= 0;
+      __delay_data_10 <= 0;
+      __delay_data_11 <= 0;
+      __delay_data_12 <= 0;
+      _plus_data_5 <= 0;
+    end else begin
+      _times_mul_odata_reg_4 <= _times_mul_odata_4;
+      __delay_data_6 <= ydata;
+      __delay_data_7 <= __delay_data_6;
+      __delay_data_8 <= __delay_data_7;
+      __delay_data_9 <= __delay_data_8;
+      __delay_data_10 <= __delay_data_9;
+      __delay_data_11 <= __delay_data_10;
+      __delay_data_12 <= __delay_data_11;
+      _plus_data_5 <= _times_data_4 + __delay_data_12;
+    end
+  end
+
+
+endmodule
+
+
+
+module multiplier_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+
+  multiplier_core_0
+  mult
+  (
+    .CLK(CLK),
+    .update(update),
+    .a(a),
+    .b(b),
+    .c(c)
+  );
+
+
+endmodule
+
+
+
+module multiplier_core_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+  reg signed [32-1:0] _a;
+  reg signed [32-1:0] _b;
+  wire signed [64-1:0] _mul;
+  reg signed [64-1:0] _pipe_mul0;
+  reg signed [64-1:0] _pipe_mul1;
+  reg signed [64-1:0] _pipe_mul2;
+  reg signed [64-1:0] _pipe_mul3;
+  reg signed [64-1:0] _pipe_mul4;
+  assign _mul = _a * _b;
+  assign c = _pipe_mul4;
+
+  always @(posedge CLK) begin
+    if(update) begin
+      _a <= a;
+      _b <= b;
+      _pipe_mul0 <= _mul;
+      _pipe_mul1 <= _pipe_mul0;
+      _pipe_mul2 <= _pipe_mul1;
+      _pipe_mul3 <= _pipe_mul2;
+      _pipe_mul4 <= _pipe_mul3;
+    end 
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = stream_graph_export.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_graph():
+    veriloggen.reset()
+    st = stream_graph_export.mkStream()
+    st.to_module('main')
+    g = st.export_graph()
+
+    stats = g['graph']
+    assert(stats['num_nodes'] == 13)
+    assert(stats['num_links'] == 15)
+    assert(stats['pipeline_depth'] == 8)
+    assert(stats['num_delay_registers'] == 7)
+    assert(stats['delay_register_bits'] == 7 * 32)
+    assert(stats['delay_ram_bits'] == 0)
+    assert(stats['num_multipliers'] == 1)
+    assert(stats['longest_zero_latency_chain'] == 2)
+
+    nodes = dict([(node['name'], node) for node in g['nodes']])
+    times = nodes['_times_data_4']
+    assert(times['operator'] == 'Times')
+    assert(times['width'] == 32)
+    assert(times['point'] == 0)
+    assert(times['start_stage'] == 0)
+    assert(times['end_stage'] == 7)
+    assert(times['latency'] == 7)
+    assert(times['fanout'] == 1)
+    assert(nodes['ydata']['fanout'] == 3)
+    assert(nodes['_plus_data_5']['output'] == 'zdata')
+
+
+def test_json():
+    import os
+    import json
+
+    veriloggen.reset()
+    st = stream_graph_export.mkStream()
+    st.to_module('main')
+    g = st.export_graph('tmp.json')
+
+    with open('tmp.json') as f:
+        rslt = json.load(f)
+    os.remove('tmp.json')
+
+    assert(rslt == json.loads(json.dumps(g)))
@@ -0,0 +1,439 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import veriloggen.stream as stream
+import stream_initiation_interval
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  reg ivalid;
+  wire iready;
+  wire ovalid;
+  reg oready;
+  reg signed [32-1:0] xdata;
+  reg signed [32-1:0] ydata;
+  wire signed [32-1:0] zdata;
+
+  main
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .ivalid(ivalid),
+    .iready(iready),
+    .ovalid(ovalid),
+    .oready(oready),
+    .xdata(xdata),
+    .ydata(ydata),
+    .zdata(zdata)
+  );
+
+  reg reset_done;
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    reset_done = 0;
+    xdata = 0;
+    ydata = 0;
+    ivalid = 0;
+    oready = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    reset_done = 1;
+    @(posedge CLK);
+    #1;
+    #10000;
+    $finish;
+  end
+
+  reg [32-1:0] send_fsm;
+  localparam send_fsm_init = 0;
+  reg [32-1:0] send_count;
+  reg [32-1:0] recv_fsm;
+  localparam recv_fsm_init = 0;
+  reg [32-1:0] recv_count;
+  localparam send_fsm_1 = 1;
+  localparam send_fsm_2 = 2;
+  localparam send_fsm_3 = 3;
+  localparam send_fsm_4 = 4;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      send_fsm <= send_fsm_init;
+      send_count <= 0;
+    end else begin
+      case(send_fsm)
+        send_fsm_init: begin
+          if(reset_done) begin
+            send_fsm <= send_fsm_1;
+          end 
+        end
+        send_fsm_1: begin
+          ivalid <= 0;
+          send_count <= send_count + 1;
+          if(send_count == 10) begin
+            send_count <= 0;
+          end 
+          if(send_count == 10) begin
+            send_fsm <= send_fsm_2;
+          end 
+        end
+        send_fsm_2: begin
+          xdata <= 0;
+          ydata <= 0;
+          ivalid <= 1;
+          send_count <= send_count + 1;
+          send_fsm <= send_fsm_3;
+        end
+        send_fsm_3: begin
+          if(iready) begin
+            xdata <= xdata + 1;
+            ydata <= ydata + 2;
+            ivalid <= 1;
+            $display("xdata=%d", xdata);
+            $display("ydata=%d", ydata);
+            send_count <= send_count + 1;
+          end 
+          if(iready && (send_count == 20)) begin
+            ivalid <= 0;
+          end 
+          if(iready && (send_count == 20)) begin
+            send_fsm <= send_fsm_4;
+          end 
+        end
+      endcase
+    end
+  end
+
+  localparam recv_fsm_1 = 1;
+  localparam recv_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      recv_fsm <= recv_fsm_init;
+      recv_count <= 0;
+    end else begin
+      case(recv_fsm)
+        recv_fsm_init: begin
+          if(reset_done) begin
+            recv_fsm <= recv_fsm_1;
+          end 
+        end
+        recv_fsm_1: begin
+          recv_count <= recv_count + 1;
+          if(recv_count == 20) begin
+            recv_count <= 0;
+          end 
+          if(recv_count == 20) begin
+            recv_fsm <= recv_fsm_2;
+          end 
+        end
+        recv_fsm_2: begin
+          oready <= !oready;
+          if(ovalid && oready) begin
+            $display("zdata=%d", zdata);
+            recv_count <= recv_count + 1;
+          end 
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module main
+(
+  input CLK,
+  input RST,
+  input ivalid,
+  output iready,
+  output ovalid,
+  input oready,
+  input signed [32-1:0] xdata,
+  input signed [32-1:0] ydata,
+  output signed [32-1:0] zdata
+);
+
+  wire _tmp_0;
+  assign _tmp_0 = !ovalid || oready;
+  reg [2-1:0] _stream_phase_0;
+  reg _ivalid_0;
+  reg _ivalid_1;
+  reg _ivalid_2;
+  reg _ivalid_3;
+  reg _ivalid_4;
+  reg _ivalid_5;
+  reg _ivalid_6;
+  reg _ivalid_7;
+  reg _ivalid_8;
+  reg _ivalid_9;
+  assign ovalid = _ivalid_9;
+  assign iready = _tmp_0 && (_stream_phase_0 == 0);
+  wire signed [32-1:0] _times_data_2;
+  reg signed [32-1:0] __delay_data_7;
+  reg signed [32-1:0] __delay_data_8;
+  wire signed [32-1:0] _times_data_3;
+  reg signed [32-1:0] __delay_data_10;
+  wire signed [32-1:0] _times_data_4;
+  reg signed [32-1:0] __delay_data_9;
+  reg signed [32-1:0] _plus_data_5;
+  reg signed [32-1:0] _plus_data_6;
+  wire signed [32-1:0] _times_in0_13;
+  assign _times_in0_13 = (_stream_phase_0 == 0)? xdata : 
+                         (_stream_phase_0 == 1)? __delay_data_7 : __delay_data_10;
+  wire signed [32-1:0] _times_in1_13;
+  assign _times_in1_13 = (_stream_phase_0 == 0)? xdata : 
+                         (_stream_phase_0 == 1)? __delay_data_8 : __delay_data_10;
+  wire signed [64-1:0] _times_mul_odata_13;
+  reg signed [64-1:0] _times_mul_odata_reg_13;
+  wire signed [32-1:0] _times_data_13;
+  assign _times_data_13 = _times_mul_odata_reg_13;
+  wire _times_mul_update_13;
+  assign _times_mul_update_13 = _tmp_0;
+
+  multiplier_0
+  _times_mul_13
+  (
+    .CLK(CLK),
+    .update(_times_mul_update_13),
+    .a(_times_in0_13),
+    .b(_times_in1_13),
+    .c(_times_mul_odata_13)
+  );
+
+  assign _times_data_2 = _times_data_13;
+  assign _times_data_3 = _times_data_13;
+  assign _times_data_4 = _times_data_13;
+  assign zdata = _plus_data_6;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _stream_phase_0 <= 0;
+      _ivalid_0 <= 0;
+      _ivalid_1 <= 0;
+      _ivalid_2 <= 0;
+      _ivalid_3 <= 0;
+      _ivalid_4 <= 0;
+      _ivalid_5 <= 0;
+      _ivalid_6 <= 0;
+      _ivalid_7 <= 0;
+      _ivalid_8 <= 0;
+      _ivalid_9 <= 0;
+      __delay_data_7 <= 0;
+      __delay_data_8 <= 0;
+      __delay_data_10 <= 0;
+      __delay_data_9 <= 0;
+      _plus_data_5 <= 0;
+      _plus_data_6 <= 0;
+      _times_mul_odata_reg_13 <= 0;
+    end else begin
+      if(_tmp_0) begin
+        _stream_phase_0 <= (_stream_phase_0 == 2)? 0 : _stream_phase_0 + 1;
+      end 
+      if(_tmp_0) begin
+        _ivalid_0 <= ivalid && (_stream_phase_0 == 0);
+      end 
+      if(_tmp_0) begin
+        _ivalid_1 <= _ivalid_0;
+      end 
+      if(_tmp_0) begin
+        _ivalid_2 <= _ivalid_1;
+      end 
+      if(_tmp_0) begin
+        _ivalid_3 <= _ivalid_2;
+      end 
+      if(_tmp_0) begin
+        _ivalid_4 <= _ivalid_3;
+      end 
+      if(_tmp_0) begin
+        _ivalid_5 <= _ivalid_4;
+      end 
+      if(_tmp_0) begin
+        _ivalid_6 <= _ivalid_5;
+      end 
+      if(_tmp_0) begin
+        _ivalid_7 <= _ivalid_6;
+      end 
+      if(_tmp_0) begin
+        _ivalid_8 <= _ivalid_7;
+      end 
+      if(_tmp_0) begin
+        _ivalid_9 <= _ivalid_8;
+      end 
+      if(_tmp_0) begin
+        __delay_data_7 <= xdata;
+      end 
+      if(_tmp_0) begin
+        __delay_data_8 <= ydata;
+      end 
+      if(_tmp_0) begin
+        __delay_data_10 <= __delay_data_8;
+      end 
+      if(_tmp_0) begin
+        __delay_data_9 <= _times_data_2;
+      end 
+      if(_tmp_0) begin
+        _plus_data_5 <= __delay_data_9 + _times_data_3;
+      end 
+      if(_tmp_0) begin
+        _plus_data_6 <= _plus_data_5 + _times_data_4;
+      end 
+      if(_tmp_0) begin
+        _times_mul_odata_reg_13 <= _times_mul_odata_13;
+      end 
+    end
+  end
+
+
+endmodule
+
+
+
+module multiplier_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+
+  multiplier_core_0
+  mult
+  (
+    .CLK(CLK),
+    .update(update),
+    .a(a),
+    .b(b),
+    .c(c)
+  );
+
+
+endmodule
+
+
+
+module multiplier_core_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+  reg signed [32-1:0] _a;
+  reg signed [32-1:0] _b;
+  wire signed [64-1:0] _mul;
+  reg signed [64-1:0] _pipe_mul0;
+  reg signed [64-1:0] _pipe_mul1;
+  reg signed [64-1:0] _pipe_mul2;
+  reg signed [64-1:0] _pipe_mul3;
+  reg signed [64-1:0] _pipe_mul4;
+  assign _mul = _a * _b;
+  assign c = _pipe_mul4;
+
+  always @(posedge CLK) begin
+    if(update) begin
+      _a <= a;
+      _b <= b;
+      _pipe_mul0 <= _mul;
+      _pipe_mul1 <= _pipe_mul0;
+      _pipe_mul2 <= _pipe_mul1;
+      _pipe_mul3 <= _pipe_mul2;
+      _pipe_mul4 <= _pipe_mul3;
+    end 
+  end
+
+
+endmodule
+"""
+def test():
+    veriloggen.reset()
+    test_module = stream_initiation_interval.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_stats():
+    veriloggen.reset()
+    st = stream_initiation_interval.mkStream()
+    st.to_module('main')
+    stats = st.get_stats()
+
+    assert(stats['initiation_interval'] == 3)
+    assert(stats['num_shared_units'] == 1)
+    assert(stats['num_shared_nodes'] == 3)
+    assert(stats['max_issue']['Times'] == 1)
+
+
+def test_too_few_resources():
+    veriloggen.reset()
+    x = stream.Variable('xdata')
+    y = stream.Variable('ydata')
+    z = x * x + x * y + y * y
+    z.output('zdata')
+    st = stream.Stream(z, ivalid='ivalid', ovalid='ovalid',
+                       initiation_interval=2,
+                       scheduler='list', resources={'Times': 1})
+
+    try:
+        st.to_module('main')
+    except ValueError as e:
+        assert(e.args[0] ==
+               "3 'Times' operators exceed 2 slots for initiation_interval 2")
+        return
+
+    assert(False)
+
+
+def test_no_ivalid():
+    veriloggen.reset()
+    x = stream.Variable('xdata')
+    y = stream.Variable('ydata')
+    z = x * y
+    z.output('zdata')
+    st = stream.Stream(z, initiation_interval=2)
+
+    try:
+        st.to_module('main')
+    except ValueError as e:
+        assert(e.args[0] == "'ivalid' is required for initiation_interval > 1.")
+        return
+
+    assert(False)
@@ -0,0 +1,404 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import stream_lut_shared
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  reg signed [32-1:0] xdata;
+  reg signed [32-1:0] ydata;
+  wire [16-1:0] zdata;
+
+  main
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .xdata(xdata),
+    .ydata(ydata),
+    .zdata(zdata)
+  );
+
+  reg reset_done;
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    reset_done = 0;
+    xdata = 0;
+    ydata = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    reset_done = 1;
+    @(posedge CLK);
+    #1;
+    #10000;
+    $finish;
+  end
+
+  reg [32-1:0] send_fsm;
+  localparam send_fsm_init = 0;
+  reg [32-1:0] send_count;
+  reg [32-1:0] recv_fsm;
+  localparam recv_fsm_init = 0;
+  reg [32-1:0] recv_count;
+  localparam send_fsm_1 = 1;
+  localparam send_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      send_fsm <= send_fsm_init;
+      send_count <= 0;
+    end else begin
+      case(send_fsm)
+        send_fsm_init: begin
+          if(reset_done) begin
+            send_fsm <= send_fsm_1;
+          end 
+        end
+        send_fsm_1: begin
+          xdata <= xdata + 1;
+          ydata <= ydata + 2;
+          $display("xdata=%d", xdata);
+          $display("ydata=%d", ydata);
+          send_count <= send_count + 1;
+          if(send_count == 20) begin
+            send_fsm <= send_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+  localparam recv_fsm_1 = 1;
+  localparam recv_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      recv_fsm <= recv_fsm_init;
+      recv_count <= 0;
+    end else begin
+      case(recv_fsm)
+        recv_fsm_init: begin
+          if(reset_done) begin
+            recv_fsm <= recv_fsm_1;
+          end 
+        end
+        recv_fsm_1: begin
+          $display("zdata=%d", zdata);
+          recv_count <= recv_count + 1;
+          if(recv_count == 30) begin
+            recv_fsm <= recv_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module main
+(
+  input CLK,
+  input RST,
+  input signed [32-1:0] xdata,
+  input signed [32-1:0] ydata,
+  output [16-1:0] zdata
+);
+
+  wire [4-1:0] _lut_lut_address_2;
+  assign _lut_lut_address_2 = xdata;
+  wire [16-1:0] _lut_data_2;
+
+  _lut_LUT_ROM_2
+  _lut_lut_2
+  (
+    .CLK(CLK),
+    .addr(_lut_lut_address_2),
+    .enable(1'd1),
+    .val(_lut_data_2)
+  );
+
+  wire [4-1:0] _lut_lut_address_3;
+  assign _lut_lut_address_3 = ydata;
+  wire [16-1:0] _lut_data_3;
+
+  _lut_LUT_ROM_2
+  _lut_lut_3
+  (
+    .CLK(CLK),
+    .addr(_lut_lut_address_3),
+    .enable(1'd1),
+    .val(_lut_data_3)
+  );
+
+  reg signed [32-1:0] _plus_data_4;
+  wire [4-1:0] _lut_lut_address_5;
+  assign _lut_lut_address_5 = _plus_data_4;
+  wire [16-1:0] _lut_data_5;
+
+  _lut_LUT_ROM_5
+  _lut_lut_5
+  (
+    .CLK(CLK),
+    .addr(_lut_lut_address_5),
+    .enable(1'd1),
+    .val(_lut_data_5)
+  );
+
+  reg [16-1:0] _plus_data_6;
+  reg [16-1:0] _plus_data_7;
+  assign zdata = _plus_data_7;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _plus_data_4 <= 0;
+      _plus_data_6 <= 0;
+      _plus_data_7 <= 0;
+    end else begin
+      _plus_data_4 <= xdata + ydata;
+      _plus_data_6 <= _lut_data_2 + _lut_data_3;
+      _plus_data_7 <= _plus_data_6 + _lut_data_5;
+    end
+  end
+
+
+endmodule
+
+
+
+module _lut_LUT_ROM_2
+(
+  input CLK,
+  input [4-1:0] addr,
+  input enable,
+  output reg [16-1:0] val
+);
+
+
+  always @(posedge CLK) begin
+    if(enable) begin
+      case(addr)
+        0: begin
+          val <= 0;
+        end
+        1: begin
+          val <= 1;
+        end
+        2: begin
+          val <= 4;
+        end
+        3: begin
+          val <= 9;
+        end
+        4: begin
+          val <= 16;
+        end
+        5: begin
+          val <= 25;
+        end
+        6: begin
+          val <= 36;
+        end
+        7: begin
+          val <= 49;
+        end
+        8: begin
+          val <= 64;
+        end
+        9: begin
+          val <= 81;
+        end
+        10: begin
+          val <= 100;
+        end
+        11: begin
+          val <= 121;
+        end
+        12: begin
+          val <= 144;
+        end
+        13: begin
+          val <= 169;
+        end
+        14: begin
+          val <= 196;
+        end
+        15: begin
+          val <= 225;
+        end
+      endcase
+    end 
+  end
+
+
+endmodule
+
+
+
+module _lut_LUT_ROM_5
+(
+  input CLK,
+  input [4-1:0] addr,
+  input enable,
+  output reg [16-1:0] val
+);
+
+
+  always @(posedge CLK) begin
+    if(enable) begin
+      case(addr)
+        0: begin
+          val <= 0;
+        end
+        1: begin
+          val <= 1;
+        end
+        2: begin
+          val <= 8;
+        end
+        3: begin
+          val <= 27;
+        end
+        4: begin
+          val <= 64;
+        end
+        5: begin
+          val <= 125;
+        end
+        6: begin
+          val <= 216;
+        end
+        7: begin
+          val <= 343;
+        end
+        8: begin
+          val <= 512;
+        end
+        9: begin
+          val <= 729;
+        end
+        10: begin
+          val <= 1000;
+        end
+        11: begin
+          val <= 1331;
+        end
+        12: begin
+          val <= 1728;
+        end
+        13: begin
+          val <= 2197;
+        end
+        14: begin
+          val <= 2744;
+        end
+        15: begin
+          val <= 3375;
+        end
+      endcase
+    end 
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = stream_lut_shared.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_shared():
+    veriloggen.reset()
+    code = stream_lut_shared.mkMain().to_verilog()
+
+    roms = [line for line in code.splitlines()
+            if line.startswith('module') and 'LUT_ROM' in line]
+    assert(len(roms) == 2)
+    assert(code.count('LUT_ROM_') == 2 + 3)
+
+
+def test_memimg():
+    import os
+    import veriloggen.stream as stream
+
+    veriloggen.reset()
+    x = stream.Variable('xdata')
+    a = stream.LUT(x, [0, 1, -1, 0x7f], 8, memimg='tmp_lut.hex')
+    b = stream.LUT(x, [0, 1, -1, 0x7f], 8, memimg='tmp_lut.hex')
+    z = a + b
+    z.output('zdata')
+    code = stream.Stream(z).to_module('main').to_verilog()
+
+    with open('tmp_lut.hex') as f:
+        lines = f.read().splitlines()
+    os.remove('tmp_lut.hex')
+
+    assert(lines == ['00', '01', 'ff', '7f'])
+    assert('$readmemh("tmp_lut.hex", mem);' in code)
+    assert('val <= mem[addr];' in code)
+    assert('case' not in code)
+    assert(code.count('$readmemh') == 1)
+
+
+def test_memimg_conflict():
+    import os
+    import veriloggen.stream as stream
+
+    veriloggen.reset()
+    x = stream.Variable('xdata')
+    a = stream.LUT(x, [0, 1, 2, 3], 8, memimg='tmp_lut.hex')
+    b = stream.LUT(x, [3, 2, 1, 0], 8, memimg='tmp_lut.hex')
+    z = a + b
+    z.output('zdata')
+
+    try:
+        stream.Stream(z).to_module('main')
+    except ValueError as e:
+        assert(e.args[0] == "memory image 'tmp_lut.hex' is already written "
+               "with different contents.")
+    else:
+        assert(False)
+    finally:
+        with open('tmp_lut.hex') as f:
+            lines = f.read().splitlines()
+        os.remove('tmp_lut.hex')
+
+    assert(lines == ['00', '01', '02', '03'])
@@ -0,0 +1,381 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import stream_narrow_widths
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  reg signed [32-1:0] xdata;
+  reg signed [32-1:0] ydata;
+  wire [32-1:0] zdata;
+
+  main
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .xdata(xdata),
+    .ydata(ydata),
+    .zdata(zdata)
+  );
+
+  reg reset_done;
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    reset_done = 0;
+    xdata = 0;
+    ydata = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #1000;
+    reset_done = 1;
+    @(posedge CLK);
+    #1;
+    #10000;
+    $finish;
+  end
+
+  reg [32-1:0] send_fsm;
+  localparam send_fsm_init = 0;
+  reg [32-1:0] send_count;
+  reg [32-1:0] recv_fsm;
+  localparam recv_fsm_init = 0;
+  reg [32-1:0] recv_count;
+  localparam send_fsm_1 = 1;
+  localparam send_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      send_fsm <= send_fsm_init;
+      send_count <= 0;
+    end else begin
+      case(send_fsm)
+        send_fsm_init: begin
+          if(reset_done) begin
+            send_fsm <= send_fsm_1;
+          end 
+        end
+        send_fsm_1: begin
+          xdata <= xdata + 1;
+          ydata <= ydata + 2;
+          $display("xdata=%d", xdata);
+          $display("ydata=%d", ydata);
+          send_count <= send_count + 1;
+          if(send_count == 20) begin
+            send_fsm <= send_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+  localparam recv_fsm_1 = 1;
+  localparam recv_fsm_2 = 2;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      recv_fsm <= recv_fsm_init;
+      recv_count <= 0;
+    end else begin
+      case(recv_fsm)
+        recv_fsm_init: begin
+          if(reset_done) begin
+            recv_fsm <= recv_fsm_1;
+          end 
+        end
+        recv_fsm_1: begin
+          $display("zdata=%d", zdata);
+          recv_count <= recv_count + 1;
+          if(recv_count == 30) begin
+            recv_fsm <= recv_fsm_2;
+          end 
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module main
+(
+  input CLK,
+  input RST,
+  input signed [32-1:0] xdata,
+  input signed [32-1:0] ydata,
+  output [32-1:0] zdata
+);
+
+  wire signed [64-1:0] _times_mul_odata_2;
+  reg signed [64-1:0] _times_mul_odata_reg_2;
+  wire signed [16-1:0] _times_data_2;
+  assign _times_data_2 = _times_mul_odata_reg_2;
+  wire _times_mul_update_2;
+  assign _times_mul_update_2 = 1'd1;
+
+  multiplier_0
+  _times_mul_2
+  (
+    .CLK(CLK),
+    .update(_times_mul_update_2),
+    .a(xdata),
+    .b(ydata),
+    .c(_times_mul_odata_2)
+  );
+
+  reg signed [11-1:0] _reduceadd_data_6;
+  reg [6-1:0] _reduceadd_count_6;
+  reg [1-1:0] _greaterthan_data_7;
+  reg [32-1:0] _and_data_10;
+  reg signed [32-1:0] __delay_data_13;
+  reg signed [32-1:0] __delay_data_14;
+  reg [1-1:0] __delay_data_20;
+  reg signed [11-1:0] __delay_data_27;
+  reg [32-1:0] __delay_data_34;
+  reg signed [32-1:0] __delay_data_15;
+  reg [1-1:0] __delay_data_21;
+  reg signed [11-1:0] __delay_data_28;
+  reg [32-1:0] __delay_data_35;
+  reg signed [32-1:0] __delay_data_16;
+  reg [1-1:0] __delay_data_22;
+  reg signed [11-1:0] __delay_data_29;
+  reg [32-1:0] __delay_data_36;
+  reg signed [32-1:0] __delay_data_17;
+  reg [1-1:0] __delay_data_23;
+  reg signed [11-1:0] __delay_data_30;
+  reg [32-1:0] __delay_data_37;
+  reg signed [32-1:0] __delay_data_18;
+  reg [1-1:0] __delay_data_24;
+  reg signed [11-1:0] __delay_data_31;
+  reg [32-1:0] __delay_data_38;
+  reg signed [32-1:0] __delay_data_19;
+  reg [1-1:0] __delay_data_25;
+  reg signed [11-1:0] __delay_data_32;
+  reg [32-1:0] __delay_data_39;
+  reg signed [16-1:0] _plus_data_3;
+  reg [1-1:0] __delay_data_26;
+  reg signed [11-1:0] __delay_data_33;
+  reg [32-1:0] __delay_data_40;
+  reg signed [32-1:0] _cond_data_9;
+  reg [32-1:0] __delay_data_41;
+  reg [32-1:0] _plus_data_12;
+  assign zdata = _plus_data_12;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _times_mul_odata_reg_2 <= 0;
+      _reduceadd_data_6 <= 1'sd0;
+      _reduceadd_count_6 <= 0;
+      _greaterthan_data_7 <= 0;
+      _and_data_10 <= 0;
+      __delay_data_13 <= 0;
+      __delay_data_14 <= 0;
+      __delay_data_20 <= 0;
+      __delay_data_27 <= 0;
+      __delay_data_34 <= 0;
+      __delay_data_15 <= 0;
+      __delay_data_21 <= 0;
+      __delay_data_28 <= 0;
+      __delay_data_35 <= 0;
+      __delay_data_16 <= 0;
+      __delay_data_22 <= 0;
+      __delay_data_29 <= 0;
+      __delay_data_36 <= 0;
+      __delay_data_17 <= 0;
+      __delay_data_23 <= 0;
+      __delay_data_30 <= 0;
+      __delay_data_37 <= 0;
+      __delay_data_18 <= 0;
+      __delay_data_24 <= 0;
+      __delay_data_31 <= 0;
+      __delay_data_38 <= 0;
+      __delay_data_19 <= 0;
+      __delay_data_25 <= 0;
+      __delay_data_32 <= 0;
+      __delay_data_39 <= 0;
+      _plus_data_3 <= 0;
+      __delay_data_26 <= 0;
+      __delay_data_33 <= 0;
+      __delay_data_40 <= 0;
+      _cond_data_9 <= 0;
+      __delay_data_41 <= 0;
+      _plus_data_12 <= 0;
+    end else begin
+      _times_mul_odata_reg_2 <= _times_mul_odata_2;
+      _reduceadd_data_6 <= _reduceadd_data_6 + ydata;
+      _reduceadd_count_6 <= (_reduceadd_count_6 >= 5'sd8 - 1)? 0 : _reduceadd_count_6 + 1;
+      if(_reduceadd_count_6 == 0) begin
+        _reduceadd_data_6 <= 1'sd0 + ydata;
+      end 
+      _greaterthan_data_7 <= xdata > 8'sd100;
+      _and_data_10 <= xdata & 5'sd15;
+      __delay_data_13 <= xdata;
+      __delay_data_14 <= __delay_data_13;
+      __delay_data_20 <= _greaterthan_data_7;
+      __delay_data_27 <= _reduceadd_data_6;
+      __delay_data_34 <= _and_data_10;
+      __delay_data_15 <= __delay_data_14;
+      __delay_data_21 <= __delay_data_20;
+      __delay_data_28 <= __delay_data_27;
+      __delay_data_35 <= __delay_data_34;
+      __delay_data_16 <= __delay_data_15;
+      __delay_data_22 <= __delay_data_21;
+      __delay_data_29 <= __delay_data_28;
+      __delay_data_36 <= __delay_data_35;
+      __delay_data_17 <= __delay_data_16;
+      __delay_data_23 <= __delay_data_22;
+      __delay_data_30 <= __delay_data_29;
+      __delay_data_37 <= __delay_data_36;
+      __delay_data_18 <= __delay_data_17;
+      __delay_data_24 <= __delay_data_23;
+      __delay_data_31 <= __delay_data_30;
+      __delay_data_38 <= __delay_data_37;
+      __delay_data_19 <= __delay_data_18;
+      __delay_data_25 <= __delay_data_24;
+      __delay_data_32 <= __delay_data_31;
+      __delay_data_39 <= __delay_data_38;
+      _plus_data_3 <= _times_data_2 + __delay_data_19;
+      __delay_data_26 <= __delay_data_25;
+      __delay_data_33 <= __delay_data_32;
+      __delay_data_40 <= __delay_data_39;
+      _cond_data_9 <= (__delay_data_26)? _plus_data_3 : __delay_data_33;
+      __delay_data_41 <= __delay_data_40;
+      _plus_data_12 <= _cond_data_9 + __delay_data_41;
+    end
+  end
+
+
+endmodule
+
+
+
+module multiplier_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+
+  multiplier_core_0
+  mult
+  (
+    .CLK(CLK),
+    .update(update),
+    .a(a),
+    .b(b),
+    .c(c)
+  );
+
+
+endmodule
+
+
+
+module multiplier_core_0
+(
+  input CLK,
+  input update,
+  input [32-1:0] a,
+  input [32-1:0] b,
+  output [64-1:0] c
+);
+
+  reg signed [32-1:0] _a;
+  reg signed [32-1:0] _b;
+  wire signed [64-1:0] _mul;
+  reg signed [64-1:0] _pipe_mul0;
+  reg signed [64-1:0] _pipe_mul1;
+  reg signed [64-1:0] _pipe_mul2;
+  reg signed [64-1:0] _pipe_mul3;
+  reg signed [64-1:0] _pipe_mul4;
+  assign _mul = _a * _b;
+  assign c = _pipe_mul4;
+
+  always @(posedge CLK) begin
+    if(update) begin
+      _a <= a;
+      _b <= b;
+      _pipe_mul0 <= _mul;
+      _pipe_mul1 <= _pipe_mul0;
+      _pipe_mul2 <= _pipe_mul1;
+      _pipe_mul3 <= _pipe_mul2;
+      _pipe_mul4 <= _pipe_mul3;
+    end 
+  end
+
+
+endmodule
+"""
+def test():
+    veriloggen.reset()
+    test_module = stream_narrow_widths.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_stats():
+    veriloggen.reset()
+    st = stream_narrow_widths.mkStream()
+    st.to_module('main')
+    stats = st.get_stats()
+
+    assert(stats['num_narrowed'] == 3)
+    assert(stats['narrowed']['_times_data_2'] == (32, 16))
+    assert(stats['narrowed']['_plus_data_3'] == (32, 16))
+    assert(stats['narrowed']['_reduceadd_data_6'] == (32, 11))
+    # keep_width()
+    assert('_and_data_10' not in stats['narrowed'])
+
+
+def test_execute():
+    veriloggen.reset()
+    xs = [(i * 37) % 256 for i in range(64)]
+    ys = [(i * 13) % 201 - 100 for i in range(64)]
+
+    st = stream_narrow_widths.mkStream()
+    st.to_module('main')
+    narrowed = st.execute({'xdata': xs, 'ydata': ys})
+
+    veriloggen.reset()
+    st = stream_narrow_widths.mkStream()
+    st.narrow_widths = False
+    st.to_module('main')
+    original = st.execute({'xdata': xs, 'ydata': ys})
+
+    assert(list(narrowed['zdata']) == list(original['zdata']))
@@ -0,0 +1,325 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import thread_ast_cache
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+  wire [8-1:0] LED;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .LED(LED)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #10000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST,
+  output [8-1:0] LED
+);
+
+  reg [8-1:0] count_0;
+  reg [8-1:0] count_1;
+  reg [8-1:0] count_2;
+  reg [8-1:0] count_3;
+  reg [32-1:0] th_countup_0;
+  localparam th_countup_0_init = 0;
+  reg signed [32-1:0] _th_countup_0_count_0;
+  reg signed [32-1:0] _th_countup_0_times_1;
+  reg signed [32-1:0] _th_countup_0_inc_2;
+  reg signed [32-1:0] _th_countup_0_i_3;
+  reg [32-1:0] th_countup_1;
+  localparam th_countup_1_init = 0;
+  reg signed [32-1:0] _th_countup_1_count_4;
+  reg signed [32-1:0] _th_countup_1_times_5;
+  reg signed [32-1:0] _th_countup_1_inc_6;
+  reg signed [32-1:0] _th_countup_1_i_7;
+  reg [32-1:0] th_countup_2;
+  localparam th_countup_2_init = 0;
+  reg signed [32-1:0] _th_countup_2_count_8;
+  reg signed [32-1:0] _th_countup_2_times_9;
+  reg signed [32-1:0] _th_countup_2_inc_10;
+  reg signed [32-1:0] _th_countup_2_i_11;
+  reg [32-1:0] th_countup_3;
+  localparam th_countup_3_init = 0;
+  reg signed [32-1:0] _th_countup_3_count_12;
+  reg signed [32-1:0] _th_countup_3_times_13;
+  reg signed [32-1:0] _th_countup_3_inc_14;
+  reg signed [32-1:0] _th_countup_3_i_15;
+  assign LED = count_3;
+  localparam th_countup_0_1 = 1;
+  localparam th_countup_0_2 = 2;
+  localparam th_countup_0_3 = 3;
+  localparam th_countup_0_4 = 4;
+  localparam th_countup_0_5 = 5;
+  localparam th_countup_0_6 = 6;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_countup_0 <= th_countup_0_init;
+      _th_countup_0_count_0 <= 0;
+      _th_countup_0_times_1 <= 0;
+      _th_countup_0_inc_2 <= 0;
+      _th_countup_0_i_3 <= 0;
+    end else begin
+      case(th_countup_0)
+        th_countup_0_init: begin
+          _th_countup_0_count_0 <= count_0;
+          _th_countup_0_times_1 <= 10;
+          _th_countup_0_inc_2 <= 1;
+          th_countup_0 <= th_countup_0_1;
+        end
+        th_countup_0_1: begin
+          _th_countup_0_count_0 <= 0;
+          th_countup_0 <= th_countup_0_2;
+        end
+        th_countup_0_2: begin
+          _th_countup_0_i_3 <= 0;
+          th_countup_0 <= th_countup_0_3;
+        end
+        th_countup_0_3: begin
+          if(_th_countup_0_i_3 < _th_countup_0_times_1) begin
+            th_countup_0 <= th_countup_0_4;
+          end else begin
+            th_countup_0 <= th_countup_0_6;
+          end
+        end
+        th_countup_0_4: begin
+          _th_countup_0_count_0 <= _th_countup_0_count_0 + _th_countup_0_inc_2;
+          th_countup_0 <= th_countup_0_5;
+        end
+        th_countup_0_5: begin
+          _th_countup_0_i_3 <= _th_countup_0_i_3 + 1;
+          th_countup_0 <= th_countup_0_3;
+        end
+      endcase
+    end
+  end
+
+  localparam th_countup_1_1 = 1;
+  localparam th_countup_1_2 = 2;
+  localparam th_countup_1_3 = 3;
+  localparam th_countup_1_4 = 4;
+  localparam th_countup_1_5 = 5;
+  localparam th_countup_1_6 = 6;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_countup_1 <= th_countup_1_init;
+      _th_countup_1_count_4 <= 0;
+      _th_countup_1_times_5 <= 0;
+      _th_countup_1_inc_6 <= 0;
+      _th_countup_1_i_7 <= 0;
+    end else begin
+      case(th_countup_1)
+        th_countup_1_init: begin
+          _th_countup_1_count_4 <= count_1;
+          _th_countup_1_times_5 <= 11;
+          _th_countup_1_inc_6 <= 2;
+          th_countup_1 <= th_countup_1_1;
+        end
+        th_countup_1_1: begin
+          _th_countup_1_count_4 <= 0;
+          th_countup_1 <= th_countup_1_2;
+        end
+        th_countup_1_2: begin
+          _th_countup_1_i_7 <= 0;
+          th_countup_1 <= th_countup_1_3;
+        end
+        th_countup_1_3: begin
+          if(_th_countup_1_i_7 < _th_countup_1_times_5) begin
+            th_countup_1 <= th_countup_1_4;
+          end else begin
+            th_countup_1 <= th_countup_1_6;
+          end
+        end
+        th_countup_1_4: begin
+          _th_countup_1_count_4 <= _th_countup_1_count_4 + _th_countup_1_inc_6;
+          th_countup_1 <= th_countup_1_5;
+        end
+        th_countup_1_5: begin
+          _th_countup_1_i_7 <= _th_countup_1_i_7 + 1;
+          th_countup_1 <= th_countup_1_3;
+        end
+      endcase
+    end
+  end
+
+  localparam th_countup_2_1 = 1;
+  localparam th_countup_2_2 = 2;
+  localparam th_countup_2_3 = 3;
+  localparam th_countup_2_4 = 4;
+  localparam th_countup_2_5 = 5;
+  localparam th_countup_2_6 = 6;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_countup_2 <= th_countup_2_init;
+      _th_countup_2_count_8 <= 0;
+      _th_countup_2_times_9 <= 0;
+      _th_countup_2_inc_10 <= 0;
+      _th_countup_2_i_11 <= 0;
+    end else begin
+      case(th_countup_2)
+        th_countup_2_init: begin
+          _th_countup_2_count_8 <= count_2;
+          _th_countup_2_times_9 <= 12;
+          _th_countup_2_inc_10 <= 3;
+          th_countup_2 <= th_countup_2_1;
+        end
+        th_countup_2_1: begin
+          _th_countup_2_count_8 <= 0;
+          th_countup_2 <= th_countup_2_2;
+        end
+        th_countup_2_2: begin
+          _th_countup_2_i_11 <= 0;
+          th_countup_2 <= th_countup_2_3;
+        end
+        th_countup_2_3: begin
+          if(_th_countup_2_i_11 < _th_countup_2_times_9) begin
+            th_countup_2 <= th_countup_2_4;
+          end else begin
+            th_countup_2 <= th_countup_2_6;
+          end
+        end
+        th_countup_2_4: begin
+          _th_countup_2_count_8 <= _th_countup_2_count_8 + _th_countup_2_inc_10;
+          th_countup_2 <= th_countup_2_5;
+        end
+        th_countup_2_5: begin
+          _th_countup_2_i_11 <= _th_countup_2_i_11 + 1;
+          th_countup_2 <= th_countup_2_3;
+        end
+      endcase
+    end
+  end
+
+  localparam th_countup_3_1 = 1;
+  localparam th_countup_3_2 = 2;
+  localparam th_countup_3_3 = 3;
+  localparam th_countup_3_4 = 4;
+  localparam th_countup_3_5 = 5;
+  localparam th_countup_3_6 = 6;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_countup_3 <= th_countup_3_init;
+      _th_countup_3_count_12 <= 0;
+      _th_countup_3_times_13 <= 0;
+      _th_countup_3_inc_14 <= 0;
+      _th_countup_3_i_15 <= 0;
+    end else begin
+      case(th_countup_3)
+        th_countup_3_init: begin
+          _th_countup_3_count_12 <= count_3;
+          _th_countup_3_times_13 <= 13;
+          _th_countup_3_inc_14 <= 4;
+          th_countup_3 <= th_countup_3_1;
+        end
+        th_countup_3_1: begin
+          _th_countup_3_count_12 <= 0;
+          th_countup_3 <= th_countup_3_2;
+        end
+        th_countup_3_2: begin
+          _th_countup_3_i_15 <= 0;
+          th_countup_3 <= th_countup_3_3;
+        end
+        th_countup_3_3: begin
+          if(_th_countup_3_i_15 < _th_countup_3_times_13) begin
+            th_countup_3 <= th_countup_3_4;
+          end else begin
+            th_countup_3 <= th_countup_3_6;
+          end
+        end
+        th_countup_3_4: begin
+          _th_countup_3_count_12 <= _th_countup_3_count_12 + _th_countup_3_inc_14;
+          th_countup_3 <= th_countup_3_5;
+        end
+        th_countup_3_5: begin
+          _th_countup_3_i_15 <= _th_countup_3_i_15 + 1;
+          th_countup_3 <= th_countup_3_3;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = thread_ast_cache.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_cache():
+    import ast
+    from veriloggen.thread import compiler
+
+    veriloggen.reset()
+    thread_ast_cache.mkLed()
+
+    codes = [code for code in compiler._function_asts.keys()
+             if code.co_name == 'countup' and
+             code.co_filename == thread_ast_cache.__file__]
+    assert(len(codes) == 1)
+
+    tree = compiler._function_asts[codes[0]]
+    assert(isinstance(tree, ast.FunctionDef))
+    assert([arg.arg for arg in tree.args.args] == ['count', 'times', 'inc'])
+
+    tables = [functions for key, functions in compiler._function_tables.items()
+              if key == (codes[0], )]
+    assert(len(tables) == 1)
+    assert(tables[0]['countup'] is tree)
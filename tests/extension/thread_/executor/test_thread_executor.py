@@ -0,0 +1,754 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import thread_executor
+from veriloggen import *
+import veriloggen.thread as vthread
+from veriloggen.thread.executor import Executor, default_cycles
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #10000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST
+);
+
+  reg [10-1:0] myram_0_addr;
+  wire [32-1:0] myram_0_rdata;
+  reg [32-1:0] myram_0_wdata;
+  reg myram_0_wenable;
+
+  myram
+  inst_myram
+  (
+    .CLK(CLK),
+    .myram_0_addr(myram_0_addr),
+    .myram_0_rdata(myram_0_rdata),
+    .myram_0_wdata(myram_0_wdata),
+    .myram_0_wenable(myram_0_wenable)
+  );
+
+  reg myfifo_enq;
+  reg [32-1:0] myfifo_wdata;
+  wire myfifo_full;
+  wire myfifo_almost_full;
+  reg myfifo_deq;
+  wire [32-1:0] myfifo_rdata;
+  wire myfifo_empty;
+  wire myfifo_almost_empty;
+
+  myfifo
+  inst_myfifo
+  (
+    .CLK(CLK),
+    .RST(RST),
+    .myfifo_enq(myfifo_enq),
+    .myfifo_wdata(myfifo_wdata),
+    .myfifo_full(myfifo_full),
+    .myfifo_almost_full(myfifo_almost_full),
+    .myfifo_deq(myfifo_deq),
+    .myfifo_rdata(myfifo_rdata),
+    .myfifo_empty(myfifo_empty),
+    .myfifo_almost_empty(myfifo_almost_empty)
+  );
+
+  reg [6-1:0] count_myfifo;
+  reg [32-1:0] th_blink;
+  localparam th_blink_init = 0;
+  reg signed [32-1:0] _th_blink_size_0;
+  reg signed [32-1:0] _th_blink_i_1;
+  reg _myram_cond_0_1;
+  reg _tmp_0;
+  reg _myram_cond_1_1;
+  reg _myram_cond_2_1;
+  reg _myram_cond_2_2;
+  reg signed [32-1:0] _tmp_1;
+  reg signed [32-1:0] _th_blink_v_2;
+  reg _myfifo_cond_0_1;
+  reg [32-1:0] th_consume;
+  localparam th_consume_init = 0;
+  reg _th_consume_called;
+  reg signed [32-1:0] _th_consume_size_3;
+  reg signed [32-1:0] _th_consume_size_4;
+  reg signed [32-1:0] _th_consume_sum_5;
+  reg signed [32-1:0] _th_consume_i_6;
+  reg _tmp_2;
+  reg _myfifo_cond_1_1;
+  reg _myfifo_cond_2_1;
+  reg _myfifo_cond_3_1;
+  reg _myfifo_cond_3_2;
+  reg signed [32-1:0] _tmp_3;
+  reg signed [32-1:0] _th_consume_v_7;
+  reg signed [32-1:0] _th_consume_tmp_8_9;
+  reg signed [32-1:0] _th_blink_sum_10;
+  reg signed [32-1:0] _th_blink_tmp_11_12;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      myram_0_addr <= 0;
+      myram_0_wdata <= 0;
+      myram_0_wenable <= 0;
+      _myram_cond_0_1 <= 0;
+      _myram_cond_1_1 <= 0;
+      _tmp_0 <= 0;
+      _myram_cond_2_1 <= 0;
+      _myram_cond_2_2 <= 0;
+    end else begin
+      if(_myram_cond_2_2) begin
+        _tmp_0 <= 0;
+      end 
+      if(_myram_cond_0_1) begin
+        myram_0_wenable <= 0;
+      end 
+      if(_myram_cond_1_1) begin
+        _tmp_0 <= 1;
+      end 
+      _myram_cond_2_2 <= _myram_cond_2_1;
+      if(th_blink == 3) begin
+        myram_0_addr <= _th_blink_i_1;
+        myram_0_wdata <= _th_blink_i_1 * 3 + 1;
+        myram_0_wenable <= 1;
+      end 
+      _myram_cond_0_1 <= th_blink == 3;
+      if(th_blink == 7) begin
+        myram_0_addr <= _th_blink_i_1;
+      end 
+      _myram_cond_1_1 <= th_blink == 7;
+      _myram_cond_2_1 <= th_blink == 7;
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      count_myfifo <= 0;
+      myfifo_wdata <= 0;
+      myfifo_enq <= 0;
+      _myfifo_cond_0_1 <= 0;
+      myfifo_deq <= 0;
+      _myfifo_cond_1_1 <= 0;
+      _tmp_2 <= 0;
+      _myfifo_cond_2_1 <= 0;
+      _myfifo_cond_3_1 <= 0;
+      _myfifo_cond_3_2 <= 0;
+    end else begin
+      if(_myfifo_cond_3_2) begin
+        _tmp_2 <= 0;
+      end 
+      if(_myfifo_cond_0_1) begin
+        myfifo_enq <= 0;
+      end 
+      if(_myfifo_cond_1_1) begin
+        _tmp_2 <= !myfifo_empty && myfifo_deq;
+      end 
+      if(_myfifo_cond_2_1) begin
+        myfifo_deq <= 0;
+      end 
+      _myfifo_cond_3_2 <= _myfifo_cond_3_1;
+      if(myfifo_enq && !myfifo_full && (myfifo_deq && !myfifo_empty)) begin
+        count_myfifo <= count_myfifo;
+      end else if(myfifo_enq && !myfifo_full) begin
+        count_myfifo <= count_myfifo + 1;
+      end else if(myfifo_deq && !myfifo_empty) begin
+        count_myfifo <= count_myfifo - 1;
+      end 
+      if((th_blink == 9) && !myfifo_full) begin
+        myfifo_wdata <= _th_blink_v_2;
+      end 
+      if((th_blink == 9) && !myfifo_full) begin
+        myfifo_enq <= 1;
+      end 
+      _myfifo_cond_0_1 <= 1;
+      if(th_consume == 5) begin
+        myfifo_deq <= 1;
+      end 
+      _myfifo_cond_1_1 <= th_consume == 5;
+      _myfifo_cond_2_1 <= 1;
+      _myfifo_cond_3_1 <= 1;
+    end
+  end
+
+  localparam th_blink_1 = 1;
+  localparam th_blink_2 = 2;
+  localparam th_blink_3 = 3;
+  localparam th_blink_4 = 4;
+  localparam th_blink_5 = 5;
+  localparam th_blink_6 = 6;
+  localparam th_blink_7 = 7;
+  localparam th_blink_8 = 8;
+  localparam th_blink_9 = 9;
+  localparam th_blink_10 = 10;
+  localparam th_blink_11 = 11;
+  localparam th_blink_12 = 12;
+  localparam th_blink_13 = 13;
+  localparam th_blink_14 = 14;
+  localparam th_blink_15 = 15;
+  localparam th_blink_16 = 16;
+  localparam th_blink_17 = 17;
+  localparam th_blink_18 = 18;
+  localparam th_blink_19 = 19;
+  localparam th_blink_20 = 20;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_blink <= th_blink_init;
+      _th_blink_size_0 <= 0;
+      _th_blink_i_1 <= 0;
+      _tmp_1 <= 0;
+      _th_blink_v_2 <= 0;
+      _th_blink_sum_10 <= 0;
+      _th_blink_tmp_11_12 <= 0;
+    end else begin
+      case(th_blink)
+        th_blink_init: begin
+          _th_blink_size_0 <= 16;
+          th_blink <= th_blink_1;
+        end
+        th_blink_1: begin
+          _th_blink_i_1 <= 0;
+          th_blink <= th_blink_2;
+        end
+        th_blink_2: begin
+          if(_th_blink_i_1 < _th_blink_size_0) begin
+            th_blink <= th_blink_3;
+          end else begin
+            th_blink <= th_blink_5;
+          end
+        end
+        th_blink_3: begin
+          th_blink <= th_blink_4;
+        end
+        th_blink_4: begin
+          _th_blink_i_1 <= _th_blink_i_1 + 1;
+          th_blink <= th_blink_2;
+        end
+        th_blink_5: begin
+          _th_blink_i_1 <= 0;
+          th_blink <= th_blink_6;
+        end
+        th_blink_6: begin
+          if(_th_blink_i_1 < _th_blink_size_0) begin
+            th_blink <= th_blink_7;
+          end else begin
+            th_blink <= th_blink_11;
+          end
+        end
+        th_blink_7: begin
+          if(_tmp_0) begin
+            _tmp_1 <= myram_0_rdata;
+          end 
+          if(_tmp_0) begin
+            th_blink <= th_blink_8;
+          end 
+        end
+        th_blink_8: begin
+          _th_blink_v_2 <= _tmp_1;
+          th_blink <= th_blink_9;
+        end
+        th_blink_9: begin
+          if(!myfifo_almost_full) begin
+            th_blink <= th_blink_10;
+          end 
+        end
+        th_blink_10: begin
+          _th_blink_i_1 <= _th_blink_i_1 + 1;
+          th_blink <= th_blink_6;
+        end
+        th_blink_11: begin
+          th_blink <= th_blink_12;
+        end
+        th_blink_12: begin
+          if(th_consume == 12) begin
+            th_blink <= th_blink_13;
+          end 
+        end
+        th_blink_13: begin
+          _th_blink_sum_10 <= _th_consume_tmp_8_9;
+          th_blink <= th_blink_14;
+        end
+        th_blink_14: begin
+          $display("sum = %d", _th_blink_sum_10);
+          th_blink <= th_blink_15;
+        end
+        th_blink_15: begin
+          if(_th_blink_sum_10 == 376) begin
+            th_blink <= th_blink_16;
+          end else begin
+            th_blink <= th_blink_18;
+          end
+        end
+        th_blink_16: begin
+          $display("# verify: PASSED");
+          th_blink <= th_blink_17;
+        end
+        th_blink_17: begin
+          th_blink <= th_blink_19;
+        end
+        th_blink_18: begin
+          $display("# verify: FAILED");
+          th_blink <= th_blink_19;
+        end
+        th_blink_19: begin
+          _th_blink_tmp_11_12 <= _th_blink_sum_10;
+          th_blink <= th_blink_20;
+        end
+      endcase
+    end
+  end
+
+  localparam th_consume_1 = 1;
+  localparam th_consume_2 = 2;
+  localparam th_consume_3 = 3;
+  localparam th_consume_4 = 4;
+  localparam th_consume_5 = 5;
+  localparam th_consume_6 = 6;
+  localparam th_consume_7 = 7;
+  localparam th_consume_8 = 8;
+  localparam th_consume_9 = 9;
+  localparam th_consume_10 = 10;
+  localparam th_consume_11 = 11;
+  localparam th_consume_12 = 12;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_consume <= th_consume_init;
+      _th_consume_called <= 0;
+      _th_consume_size_3 <= 0;
+      _th_consume_size_4 <= 0;
+      _th_consume_sum_5 <= 0;
+      _th_consume_i_6 <= 0;
+      _tmp_3 <= 0;
+      _th_consume_v_7 <= 0;
+      _th_consume_tmp_8_9 <= 0;
+    end else begin
+      case(th_consume)
+        th_consume_init: begin
+          if(th_blink == 11) begin
+            _th_consume_called <= 1;
+          end 
+          if(th_blink == 11) begin
+            _th_consume_size_3 <= _th_blink_size_0;
+          end 
+          if(th_blink == 11) begin
+            th_consume <= th_consume_1;
+          end 
+        end
+        th_consume_1: begin
+          _th_consume_size_4 <= _th_consume_size_3;
+          th_consume <= th_consume_2;
+        end
+        th_consume_2: begin
+          _th_consume_sum_5 <= 0;
+          th_consume <= th_consume_3;
+        end
+        th_consume_3: begin
+          _th_consume_i_6 <= 0;
+          th_consume <= th_consume_4;
+        end
+        th_consume_4: begin
+          if(_th_consume_i_6 < _th_consume_size_4) begin
+            th_consume <= th_consume_5;
+          end else begin
+            th_consume <= th_consume_11;
+          end
+        end
+        th_consume_5: begin
+          if(!myfifo_empty) begin
+            th_consume <= th_consume_6;
+          end 
+        end
+        th_consume_6: begin
+          th_consume <= th_consume_7;
+        end
+        th_consume_7: begin
+          if(_tmp_2) begin
+            _tmp_3 <= myfifo_rdata;
+          end 
+          if(_tmp_2) begin
+            th_consume <= th_consume_8;
+          end 
+        end
+        th_consume_8: begin
+          _th_consume_v_7 <= _tmp_3;
+          th_consume <= th_consume_9;
+        end
+        th_consume_9: begin
+          _th_consume_sum_5 <= _th_consume_sum_5 + _th_consume_v_7;
+          th_consume <= th_consume_10;
+        end
+        th_consume_10: begin
+          _th_consume_i_6 <= _th_consume_i_6 + 1;
+          th_consume <= th_consume_4;
+        end
+        th_consume_11: begin
+          _th_consume_tmp_8_9 <= _th_consume_sum_5;
+          th_consume <= th_consume_12;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module myram
+(
+  input CLK,
+  input [10-1:0] myram_0_addr,
+  output [32-1:0] myram_0_rdata,
+  input [32-1:0] myram_0_wdata,
+  input myram_0_wenable
+);
+
+  reg [10-1:0] myram_0_daddr;
+  reg [32-1:0] mem [0:1024-1];
+
+  always @(posedge CLK) begin
+    if(myram_0_wenable) begin
+      mem[myram_0_addr] <= myram_0_wdata;
+    end 
+    myram_0_daddr <= myram_0_addr;
+  end
+
+  assign myram_0_rdata = mem[myram_0_daddr];
+
+endmodule
+
+
+
+module myfifo
+(
+  input CLK,
+  input RST,
+  input myfifo_enq,
+  input [32-1:0] myfifo_wdata,
+  output myfifo_full,
+  output myfifo_almost_full,
+  input myfifo_deq,
+  output [32-1:0] myfifo_rdata,
+  output myfifo_empty,
+  output myfifo_almost_empty
+);
+
+  reg [32-1:0] mem [0:32-1];
+  reg [5-1:0] head;
+  reg [5-1:0] tail;
+  wire is_empty;
+  wire is_almost_empty;
+  wire is_full;
+  wire is_almost_full;
+  assign is_empty = head == tail;
+  assign is_almost_empty = head == (tail + 1 & 31);
+  assign is_full = (head + 1 & 31) == tail;
+  assign is_almost_full = (head + 2 & 31) == tail;
+  reg [32-1:0] rdata_reg;
+  assign myfifo_full = is_full;
+  assign myfifo_almost_full = is_almost_full || is_full;
+  assign myfifo_empty = is_empty;
+  assign myfifo_almost_empty = is_almost_empty || is_empty;
+  assign myfifo_rdata = rdata_reg;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      head <= 0;
+      rdata_reg <= 0;
+      tail <= 0;
+    end else begin
+      if(myfifo_enq && !is_full) begin
+        mem[head] <= myfifo_wdata;
+        head <= head + 1;
+      end 
+      if(myfifo_deq && !is_empty) begin
+        rdata_reg <= mem[tail];
+        tail <= tail + 1;
+      end 
+    end
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = thread_executor.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_execute():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 10)
+    myfifo = vthread.FIFO(m, 'myfifo', clk, rst, 32, 2)
+
+    def blink(size):
+        for i in range(size):
+            myram.write(i, i * 3 + 1)
+
+        th_consume.run(size)
+
+        for i in range(size):
+            v = myram.read(i)
+            myfifo.enq(v)
+
+        th_consume.join()
+        return th_consume.ret()
+
+    def consume(size):
+        sum = 0
+        for i in range(size):
+            v = myfifo.deq()
+            sum += v
+        return sum
+
+    th_blink = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    th_consume = vthread.Thread(m, 'th_consume', clk, rst, consume)
+
+    exe = Executor(th_blink)
+    rslt, cycles = exe.run(16)
+    assert(rslt == 376)
+    assert(cycles > 0)
+    assert(exe.get_ram(myram, 0, 4).tolist() == [1, 4, 7, 10])
+
+
+def test_dma():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myaxi = vthread.AXIM(m, 'myaxi', clk, rst, 32)
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 10)
+
+    strm = vthread.Stream(m, 'mystream', clk, rst)
+    a = strm.source('a')
+    strm.sink(a * 2 - 1, 'b')
+
+    def blink(size):
+        myaxi.dma_read(myram, 0, 1024, size)
+        strm.set_source('a', myram, 0, size)
+        strm.set_sink('b', myram, size, size)
+        strm.run()
+        strm.join()
+        myaxi.dma_write(myram, size, 2048, size)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    exe = Executor(th)
+    exe.set_memory(1024, range(8))
+    exe.run(8)
+    assert(exe.get_memory(2048, 8).tolist() == [-1, 1, 3, 5, 7, 9, 11, 13])
+
+
+def test_cycles():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink(size):
+        sum = 0
+        for i in range(size):
+            sum += i
+        return sum
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    rslt, cycles = th.execute(16)
+    assert(rslt == 120)
+    # 'sum = 0', the initialization, the 17 condition checks and the 16 updates
+    # of the for-loop, the 16 additions and the return
+    assert(cycles == 52)
+
+    # the update of the for-loop is merged into the addition
+    th_merged = vthread.Thread(m, 'th_merged', clk, rst, blink,
+                               merge_states=True)
+    rslt, merged_cycles = th_merged.execute(16)
+    assert(rslt == 120)
+    assert(merged_cycles == cycles - 17)
+
+    try:
+        Executor(th, cycles={'for': 3})
+    except ValueError as e:
+        assert(e.args[0] == "no such cycle entry 'for'")
+    else:
+        assert(False)
+
+    try:
+        Executor(th, max_cycles=10).run(16)
+    except ValueError as e:
+        assert(e.args[0] == "'th_blink' exceeds max_cycles 10")
+    else:
+        assert(False)
+
+
+def test_handshake_cycles():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 10)
+
+    def blink(size):
+        sum = 0
+        for i in range(size):
+            sum += myram.read(i)
+        return sum
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    code = m.to_verilog()
+
+    exe = Executor(th)
+    exe.set_ram(myram, range(16))
+    rslt, cycles = exe.run(16)
+    assert(rslt == 120)
+
+    # 1 more cycle for each read
+    exe = Executor(th, cycles={'ram_read': default_cycles['ram_read'] + 1})
+    exe.set_ram(myram, range(16))
+    rslt, slow_cycles = exe.run(16)
+    assert(slow_cycles == cycles + 16)
+
+    # the thread is compiled into a scratch module, not into the module
+    assert(m.to_verilog() == code)
+
+
+def test_deadlock():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myfifo = vthread.FIFO(m, 'myfifo', clk, rst, 32, 2)
+
+    def blink():
+        v = myfifo.deq()
+        return v
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    try:
+        th.execute()
+    except ValueError as e:
+        assert(e.args[0] == "deadlock: 'th_blink' waits forever")
+    else:
+        assert(False)
+
+
+def test_wrap():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 10)
+
+    def blink(a):
+        x = 0x7fffffff
+        x += 1
+        y, z = 0xff, a
+        for i in range(0x7f, 0x81):
+            pass
+        th_sub.run(x)
+        th_sub.join()
+        myram.write(0, x)
+        myram.write(1, y)
+        myram.write(2, z)
+        myram.write(3, i)
+        myram.write(4, th_sub.ret())
+
+    def sub(v):
+        w = v + 0x7f
+        return w
+
+    # the variables are the signed registers of datawidth
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink, datawidth=8)
+    th_sub = vthread.Thread(m, 'th_sub', clk, rst, sub, datawidth=32)
+
+    exe = Executor(th)
+    exe.run(0x1ff)
+    assert(exe.get_ram(myram, 0, 5).tolist() == [0, -1, -1, -128, 127])
+
+    th = vthread.Thread(m, 'th_blink32', clk, rst, blink)
+    exe = Executor(th)
+    exe.run(0x1ff)
+    assert(exe.get_ram(myram, 0, 5).tolist() ==
+           [-2 ** 31, 0xff, 0x1ff, 0x80, -2 ** 31 + 0x7f])
+
+
+def test_register():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    led = m.Reg('LED', 8, initval=0)
+
+    def blink():
+        led.value = 0x12c
+        return led + 1
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    exe = Executor(th)
+    rslt, cycles = exe.run()
+    assert(rslt == 0x2d)
+    assert(exe.get_variable(led) == 0x2c)
+
+    # the code for the hardware compiles in the same way
+    th.start()
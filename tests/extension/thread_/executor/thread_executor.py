@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+import veriloggen.thread as vthread
+
+
+def mkLed():
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    datawidth = 32
+    addrwidth = 10
+    myram = vthread.RAM(m, 'myram', clk, rst, datawidth, addrwidth)
+    myfifo = vthread.FIFO(m, 'myfifo', clk, rst, datawidth, 5)
+
+    def blink(size):
+        for i in range(size):
+            myram.write(i, i * 3 + 1)
+
+        for i in range(size):
+            v = myram.read(i)
+            myfifo.enq(v)
+
+        th_consume.run(size)
+
+        th_consume.join()
+        sum = th_consume.ret()
+        print('sum = %d' % sum)
+
+        if sum == 376:
+            print('# verify: PASSED')
+        else:
+            print('# verify: FAILED')
+
+        return sum
+
+    def consume(size):
+        sum = 0
+        for i in range(size):
+            v = myfifo.deq()
+            sum += v
+        return sum
+
+    th_blink = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    th_consume = vthread.Thread(m, 'th_consume', clk, rst, consume)
+    fsm = th_blink.start(16)
+
+    return m
+
+
+def mkTest():
+    m = Module('test')
+
+    # target instance
+    led = mkLed()
+
+    # copy paras and ports
+    params = m.copy_params(led)
+    ports = m.copy_sim_ports(led)
+
+    clk = ports['CLK']
+    rst = ports['RST']
+
+    uut = m.Instance(led, 'uut',
+                     params=m.connect_params(led),
+                     ports=m.connect_ports(led))
+
+    simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, m.make_reset(), period=100)
+
+    init.add(
+        Delay(10000),
+        Systask('finish'),
+    )
+
+    return m
+
+
+if __name__ == '__main__':
+    test = mkTest()
+    verilog = test.to_verilog('tmp.v')
+    print(verilog)
+
+    sim = simulation.Simulator(test)
+    rslt = sim.run()
+    print(rslt)
@@ -0,0 +1,339 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import thread_merge_states
+from veriloggen import *
+import veriloggen.thread as vthread
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #10000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST
+);
+
+  reg [10-1:0] myram_0_addr;
+  wire [32-1:0] myram_0_rdata;
+  reg [32-1:0] myram_0_wdata;
+  reg myram_0_wenable;
+
+  myram
+  inst_myram
+  (
+    .CLK(CLK),
+    .myram_0_addr(myram_0_addr),
+    .myram_0_rdata(myram_0_rdata),
+    .myram_0_wdata(myram_0_wdata),
+    .myram_0_wenable(myram_0_wenable)
+  );
+
+  reg [32-1:0] th_blink;
+  localparam th_blink_init = 0;
+  reg signed [32-1:0] _th_blink_times_0;
+  reg signed [32-1:0] _th_blink_a_1;
+  reg signed [32-1:0] _th_blink_b_2;
+  reg signed [32-1:0] _th_blink_c_3;
+  reg signed [32-1:0] _th_blink_i_4;
+  reg _myram_cond_0_1;
+  reg signed [32-1:0] _th_blink_sum_5;
+  reg _tmp_0;
+  reg _myram_cond_1_1;
+  reg _myram_cond_2_1;
+  reg _myram_cond_2_2;
+  reg signed [32-1:0] _tmp_1;
+  reg signed [32-1:0] _th_blink_rdata_6;
+  reg signed [32-1:0] _th_blink_x_7;
+  reg signed [32-1:0] _th_blink_y_8;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      myram_0_addr <= 0;
+      myram_0_wdata <= 0;
+      myram_0_wenable <= 0;
+      _myram_cond_0_1 <= 0;
+      _myram_cond_1_1 <= 0;
+      _tmp_0 <= 0;
+      _myram_cond_2_1 <= 0;
+      _myram_cond_2_2 <= 0;
+    end else begin
+      if(_myram_cond_2_2) begin
+        _tmp_0 <= 0;
+      end 
+      if(_myram_cond_0_1) begin
+        myram_0_wenable <= 0;
+      end 
+      if(_myram_cond_1_1) begin
+        _tmp_0 <= 1;
+      end 
+      _myram_cond_2_2 <= _myram_cond_2_1;
+      if(th_blink == 9) begin
+        myram_0_addr <= _th_blink_i_4;
+        myram_0_wdata <= _th_blink_c_3;
+        myram_0_wenable <= 1;
+      end 
+      _myram_cond_0_1 <= th_blink == 9;
+      if(th_blink == 14) begin
+        myram_0_addr <= _th_blink_i_4;
+      end 
+      _myram_cond_1_1 <= th_blink == 14;
+      _myram_cond_2_1 <= th_blink == 14;
+    end
+  end
+
+  localparam th_blink_1 = 1;
+  localparam th_blink_5 = 5;
+  localparam th_blink_6 = 6;
+  localparam th_blink_8 = 8;
+  localparam th_blink_9 = 9;
+  localparam th_blink_10 = 10;
+  localparam th_blink_11 = 11;
+  localparam th_blink_13 = 13;
+  localparam th_blink_14 = 14;
+  localparam th_blink_15 = 15;
+  localparam th_blink_16 = 16;
+  localparam th_blink_18 = 18;
+  localparam th_blink_21 = 21;
+  localparam th_blink_22 = 22;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_blink <= th_blink_init;
+      _th_blink_times_0 <= 0;
+      _th_blink_a_1 <= 0;
+      _th_blink_b_2 <= 0;
+      _th_blink_c_3 <= 0;
+      _th_blink_i_4 <= 0;
+      _th_blink_sum_5 <= 0;
+      _tmp_1 <= 0;
+      _th_blink_rdata_6 <= 0;
+      _th_blink_x_7 <= 0;
+      _th_blink_y_8 <= 0;
+    end else begin
+      case(th_blink)
+        th_blink_init: begin
+          _th_blink_times_0 <= 10;
+          th_blink <= th_blink_1;
+        end
+        th_blink_1: begin
+          _th_blink_a_1 <= 0;
+          _th_blink_b_2 <= 0;
+          _th_blink_c_3 <= 0;
+          _th_blink_i_4 <= 0;
+          th_blink <= th_blink_5;
+        end
+        th_blink_5: begin
+          if(_th_blink_i_4 < _th_blink_times_0) begin
+            th_blink <= th_blink_6;
+          end else begin
+            th_blink <= th_blink_11;
+          end
+        end
+        th_blink_6: begin
+          _th_blink_a_1 <= _th_blink_i_4;
+          _th_blink_b_2 <= _th_blink_i_4 + 1;
+          th_blink <= th_blink_8;
+        end
+        th_blink_8: begin
+          _th_blink_c_3 <= _th_blink_a_1 + _th_blink_b_2;
+          th_blink <= th_blink_9;
+        end
+        th_blink_9: begin
+          th_blink <= th_blink_10;
+        end
+        th_blink_10: begin
+          _th_blink_i_4 <= _th_blink_i_4 + 1;
+          th_blink <= th_blink_5;
+        end
+        th_blink_11: begin
+          _th_blink_sum_5 <= 0;
+          _th_blink_i_4 <= 0;
+          th_blink <= th_blink_13;
+        end
+        th_blink_13: begin
+          if(_th_blink_i_4 < _th_blink_times_0) begin
+            th_blink <= th_blink_14;
+          end else begin
+            th_blink <= th_blink_21;
+          end
+        end
+        th_blink_14: begin
+          if(_tmp_0) begin
+            _tmp_1 <= myram_0_rdata;
+          end 
+          if(_tmp_0) begin
+            th_blink <= th_blink_15;
+          end 
+        end
+        th_blink_15: begin
+          _th_blink_rdata_6 <= _tmp_1;
+          th_blink <= th_blink_16;
+        end
+        th_blink_16: begin
+          _th_blink_x_7 <= _th_blink_rdata_6 + 1;
+          _th_blink_y_8 <= _th_blink_i_4 << 1;
+          th_blink <= th_blink_18;
+        end
+        th_blink_18: begin
+          _th_blink_sum_5 <= _th_blink_sum_5 + (_th_blink_x_7 + _th_blink_y_8);
+          $display("rdata = %d", _th_blink_rdata_6);
+          _th_blink_i_4 <= _th_blink_i_4 + 1;
+          th_blink <= th_blink_13;
+        end
+        th_blink_21: begin
+          $display("sum = %d", _th_blink_sum_5);
+          th_blink <= th_blink_22;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module myram
+(
+  input CLK,
+  input [10-1:0] myram_0_addr,
+  output [32-1:0] myram_0_rdata,
+  input [32-1:0] myram_0_wdata,
+  input myram_0_wenable
+);
+
+  reg [10-1:0] myram_0_daddr;
+  reg [32-1:0] mem [0:1024-1];
+
+  always @(posedge CLK) begin
+    if(myram_0_wenable) begin
+      mem[myram_0_addr] <= myram_0_wdata;
+    end 
+    myram_0_daddr <= myram_0_addr;
+  end
+
+  assign myram_0_rdata = mem[myram_0_daddr];
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = thread_merge_states.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_stats():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink():
+        a = 1
+        b = 2
+        c = a + b
+        print('c = %d' % c)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink, merge_states=True)
+    fsm = th.start()
+
+    stats = th.get_stats()
+    assert(stats['num_states'] == 5)
+    assert(stats['num_merged_states'] == 1)
+    assert(stats['num_saved_cycles'] == 1)
+    # c depends on a and b, and the print depends on c
+    assert(list(stats['merged_states'].items()) == [(2, 1)])
+    assert(list(fsm.body.keys()) == [1, 3, 4])
+
+
+def test_no_merge():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink():
+        a = 1
+        b = 2
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start()
+
+    assert(len(th.get_stats()) == 0)
+    assert(list(fsm.body.keys()) == [1, 2])
+
+
+def test_intrinsic():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 10)
+
+    def blink():
+        a = 1
+        myram.write(0, a)
+        b = 2
+        c = 3
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink, merge_states=True)
+    fsm = th.start()
+
+    # the write is issued when the FSM is in the state of the call
+    stats = th.get_stats()
+    assert(list(stats['merged_states'].items()) == [(4, 3)])
@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+import veriloggen.thread as vthread
+
+
+def mkLed(merge_states=True):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    datawidth = 32
+    addrwidth = 10
+    myram = vthread.RAM(m, 'myram', clk, rst, datawidth, addrwidth)
+
+    def blink(times):
+        a = 0
+        b = 0
+        c = 0
+        for i in range(times):
+            a = i
+            b = i + 1
+            c = a + b
+            myram.write(i, c)
+
+        sum = 0
+        for i in range(times):
+            rdata = myram.read(i)
+            x = rdata + 1
+            y = i * 2
+            sum += x + y
+            print('rdata = %d' % rdata)
+
+        print('sum = %d' % sum)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink,
+                        merge_states=merge_states)
+    fsm = th.start(10)
+
+    return m
+
+
+def mkTest(merge_states=True):
+    m = Module('test')
+
+    # target instance
+    led = mkLed(merge_states)
+
+    # copy paras and ports
+    params = m.copy_params(led)
+    ports = m.copy_sim_ports(led)
+
+    clk = ports['CLK']
+    rst = ports['RST']
+
+    uut = m.Instance(led, 'uut',
+                     params=m.connect_params(led),
+                     ports=m.connect_ports(led))
+
+    simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, m.make_reset(), period=100)
+
+    init.add(
+        Delay(10000),
+        Systask('finish'),
+    )
+
+    return m
+
+
+if __name__ == '__main__':
+    test = mkTest()
+    verilog = test.to_verilog('tmp.v')
+    print(verilog)
+
+    sim = simulation.Simulator(test)
+    rslt = sim.run()
+    print(rslt)
@@ -0,0 +1,784 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import veriloggen
+import thread_mutex_arbiter
+from veriloggen import *
+import veriloggen.thread as vthread
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #10000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST
+);
+
+  reg _mymutex_lock_reg;
+  reg [32-1:0] _mymutex_lock_id;
+  reg [4-1:0] _th_myfunc_start;
+  reg [32-1:0] th_blink;
+  localparam th_blink_init = 0;
+  reg signed [32-1:0] _th_blink_tid_0;
+  reg [32-1:0] th_myfunc_0;
+  localparam th_myfunc_0_init = 0;
+  reg [32-1:0] th_myfunc_1;
+  localparam th_myfunc_1_init = 0;
+  reg [32-1:0] th_myfunc_2;
+  localparam th_myfunc_2_init = 0;
+  reg [32-1:0] th_myfunc_3;
+  localparam th_myfunc_3_init = 0;
+  reg _th_myfunc_0_called;
+  reg signed [32-1:0] _th_myfunc_0_tid_1;
+  reg signed [32-1:0] _th_myfunc_0_tid_2;
+  reg signed [32-1:0] _th_myfunc_0_i_3;
+  reg signed [32-1:0] _th_myfunc_0_j_4;
+  reg _th_myfunc_1_called;
+  reg signed [32-1:0] _th_myfunc_1_tid_5;
+  reg signed [32-1:0] _th_myfunc_1_tid_6;
+  reg signed [32-1:0] _th_myfunc_1_i_7;
+  reg signed [32-1:0] _th_myfunc_1_j_8;
+  reg _th_myfunc_2_called;
+  reg signed [32-1:0] _th_myfunc_2_tid_9;
+  reg signed [32-1:0] _th_myfunc_2_tid_10;
+  reg signed [32-1:0] _th_myfunc_2_i_11;
+  reg signed [32-1:0] _th_myfunc_2_j_12;
+  reg _th_myfunc_3_called;
+  reg signed [32-1:0] _th_myfunc_3_tid_13;
+  reg signed [32-1:0] _th_myfunc_3_tid_14;
+  reg signed [32-1:0] _th_myfunc_3_i_15;
+  reg signed [32-1:0] _th_myfunc_3_j_16;
+  reg __mymutex_lock_reg_1;
+  reg [32-1:0] _mymutex_wait_count_0;
+  reg [32-1:0] _mymutex_wait_count_1;
+  reg [32-1:0] _mymutex_wait_count_2;
+  reg [32-1:0] _mymutex_wait_count_3;
+  reg [32-1:0] _mymutex_last_id;
+  wire [32-1:0] _mymutex_grant_id;
+  assign _mymutex_grant_id = ((th_myfunc_0 == 4) && !_mymutex_lock_reg && (_mymutex_last_id < 0))? 0 : 
+                             ((th_myfunc_1 == 4) && !_mymutex_lock_reg && (_mymutex_last_id < 1))? 1 : 
+                             ((th_myfunc_2 == 4) && !_mymutex_lock_reg && (_mymutex_last_id < 2))? 2 : 
+                             ((th_myfunc_3 == 4) && !_mymutex_lock_reg && (_mymutex_last_id < 3))? 3 : 
+                             ((th_myfunc_0 == 4) && !_mymutex_lock_reg)? 0 : 
+                             ((th_myfunc_1 == 4) && !_mymutex_lock_reg)? 1 : 
+                             ((th_myfunc_2 == 4) && !_mymutex_lock_reg)? 2 : 
+                             ((th_myfunc_3 == 4) && !_mymutex_lock_reg)? 3 : 0;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      _mymutex_lock_reg <= 0;
+      __mymutex_lock_reg_1 <= 0;
+      _mymutex_wait_count_0 <= 0;
+      _mymutex_wait_count_1 <= 0;
+      _mymutex_wait_count_2 <= 0;
+      _mymutex_wait_count_3 <= 0;
+      _mymutex_lock_id <= 0;
+      _mymutex_last_id <= 0;
+    end else begin
+      if((th_myfunc_0 == 10) && (_mymutex_lock_id == 0)) begin
+        _mymutex_lock_reg <= 0;
+      end 
+      if((th_myfunc_1 == 10) && (_mymutex_lock_id == 1)) begin
+        _mymutex_lock_reg <= 0;
+      end 
+      if((th_myfunc_2 == 10) && (_mymutex_lock_id == 2)) begin
+        _mymutex_lock_reg <= 0;
+      end 
+      if((th_myfunc_3 == 10) && (_mymutex_lock_id == 3)) begin
+        _mymutex_lock_reg <= 0;
+      end 
+      __mymutex_lock_reg_1 <= _mymutex_lock_reg;
+      if((th_myfunc_0 == 4) && !(!_mymutex_lock_reg || (_mymutex_lock_id == 0)) || (th_myfunc_0 == 5) && !(_mymutex_lock_reg && (_mymutex_lock_id == 0))) begin
+        _mymutex_wait_count_0 <= _mymutex_wait_count_0 + 1;
+      end 
+      if(_mymutex_lock_reg && !__mymutex_lock_reg_1 && (_mymutex_lock_id == 0)) begin
+        _mymutex_wait_count_0 <= 0;
+      end 
+      if((th_myfunc_1 == 4) && !(!_mymutex_lock_reg || (_mymutex_lock_id == 1)) || (th_myfunc_1 == 5) && !(_mymutex_lock_reg && (_mymutex_lock_id == 1))) begin
+        _mymutex_wait_count_1 <= _mymutex_wait_count_1 + 1;
+      end 
+      if(_mymutex_lock_reg && !__mymutex_lock_reg_1 && (_mymutex_lock_id == 1)) begin
+        _mymutex_wait_count_1 <= 0;
+      end 
+      if((th_myfunc_2 == 4) && !(!_mymutex_lock_reg || (_mymutex_lock_id == 2)) || (th_myfunc_2 == 5) && !(_mymutex_lock_reg && (_mymutex_lock_id == 2))) begin
+        _mymutex_wait_count_2 <= _mymutex_wait_count_2 + 1;
+      end 
+      if(_mymutex_lock_reg && !__mymutex_lock_reg_1 && (_mymutex_lock_id == 2)) begin
+        _mymutex_wait_count_2 <= 0;
+      end 
+      if((th_myfunc_3 == 4) && !(!_mymutex_lock_reg || (_mymutex_lock_id == 3)) || (th_myfunc_3 == 5) && !(_mymutex_lock_reg && (_mymutex_lock_id == 3))) begin
+        _mymutex_wait_count_3 <= _mymutex_wait_count_3 + 1;
+      end 
+      if(_mymutex_lock_reg && !__mymutex_lock_reg_1 && (_mymutex_lock_id == 3)) begin
+        _mymutex_wait_count_3 <= 0;
+      end 
+      if((th_myfunc_0 == 4) && !_mymutex_lock_reg || (th_myfunc_1 == 4) && !_mymutex_lock_reg || (th_myfunc_2 == 4) && !_mymutex_lock_reg || (th_myfunc_3 == 4) && !_mymutex_lock_reg) begin
+        _mymutex_lock_reg <= 1;
+        _mymutex_lock_id <= _mymutex_grant_id;
+      end 
+      if((th_myfunc_0 == 4) && !_mymutex_lock_reg || (th_myfunc_1 == 4) && !_mymutex_lock_reg || (th_myfunc_2 == 4) && !_mymutex_lock_reg || (th_myfunc_3 == 4) && !_mymutex_lock_reg) begin
+        _mymutex_last_id <= _mymutex_grant_id;
+      end 
+      if(_mymutex_lock_reg && !__mymutex_lock_reg_1) begin
+        $display("(mymutex mutex) lock_id:%d, wait:%d", _mymutex_lock_id, ((_mymutex_lock_id == 0)? _mymutex_wait_count_0 : 
+        (_mymutex_lock_id == 1)? _mymutex_wait_count_1 : 
+        (_mymutex_lock_id == 2)? _mymutex_wait_count_2 : 
+        (_mymutex_lock_id == 3)? _mymutex_wait_count_3 : 0));
+      end 
+    end
+  end
+
+  localparam th_blink_1 = 1;
+  localparam th_blink_2 = 2;
+  localparam th_blink_3 = 3;
+  localparam th_blink_4 = 4;
+  localparam th_blink_5 = 5;
+  localparam th_blink_6 = 6;
+  localparam th_blink_7 = 7;
+  localparam th_blink_8 = 8;
+  localparam th_blink_9 = 9;
+  localparam th_blink_10 = 10;
+  localparam th_blink_11 = 11;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_blink <= th_blink_init;
+      _th_blink_tid_0 <= 0;
+      _th_myfunc_start[_th_blink_tid_0] <= (0 >> _th_blink_tid_0) & 1'd1;
+    end else begin
+      case(th_blink)
+        th_blink_init: begin
+          th_blink <= th_blink_1;
+        end
+        th_blink_1: begin
+          _th_blink_tid_0 <= 0;
+          th_blink <= th_blink_2;
+        end
+        th_blink_2: begin
+          if(_th_blink_tid_0 < 4) begin
+            th_blink <= th_blink_3;
+          end else begin
+            th_blink <= th_blink_7;
+          end
+        end
+        th_blink_3: begin
+          _th_myfunc_start[_th_blink_tid_0] <= 1;
+          th_blink <= th_blink_4;
+        end
+        th_blink_4: begin
+          th_blink <= th_blink_5;
+          th_blink <= th_blink_5;
+          th_blink <= th_blink_5;
+          th_blink <= th_blink_5;
+        end
+        th_blink_5: begin
+          _th_myfunc_start[_th_blink_tid_0] <= 0;
+          th_blink <= th_blink_6;
+        end
+        th_blink_6: begin
+          _th_blink_tid_0 <= _th_blink_tid_0 + 1;
+          th_blink <= th_blink_2;
+        end
+        th_blink_7: begin
+          _th_blink_tid_0 <= 0;
+          th_blink <= th_blink_8;
+        end
+        th_blink_8: begin
+          if(_th_blink_tid_0 < 4) begin
+            th_blink <= th_blink_9;
+          end else begin
+            th_blink <= th_blink_11;
+          end
+        end
+        th_blink_9: begin
+          if((_th_blink_tid_0 == 0)? th_myfunc_0 == 12 : 
+          (_th_blink_tid_0 == 1)? th_myfunc_1 == 12 : 
+          (_th_blink_tid_0 == 2)? th_myfunc_2 == 12 : 
+          (_th_blink_tid_0 == 3)? th_myfunc_3 == 12 : 0) begin
+            th_blink <= th_blink_10;
+          end 
+        end
+        th_blink_10: begin
+          _th_blink_tid_0 <= _th_blink_tid_0 + 1;
+          th_blink <= th_blink_8;
+        end
+      endcase
+    end
+  end
+
+  localparam th_myfunc_0_1 = 1;
+  localparam th_myfunc_0_2 = 2;
+  localparam th_myfunc_0_3 = 3;
+  localparam th_myfunc_0_4 = 4;
+  localparam th_myfunc_0_5 = 5;
+  localparam th_myfunc_0_6 = 6;
+  localparam th_myfunc_0_7 = 7;
+  localparam th_myfunc_0_8 = 8;
+  localparam th_myfunc_0_9 = 9;
+  localparam th_myfunc_0_10 = 10;
+  localparam th_myfunc_0_11 = 11;
+  localparam th_myfunc_0_12 = 12;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_myfunc_0 <= th_myfunc_0_init;
+      _th_myfunc_0_called <= 0;
+      _th_myfunc_0_tid_1 <= 0;
+      _th_myfunc_0_tid_2 <= 0;
+      _th_myfunc_0_i_3 <= 0;
+      _th_myfunc_0_j_4 <= 0;
+    end else begin
+      case(th_myfunc_0)
+        th_myfunc_0_init: begin
+          if(_th_myfunc_start[0] && (th_blink == 4)) begin
+            _th_myfunc_0_called <= 1;
+          end 
+          if(_th_myfunc_start[0] && (th_blink == 4)) begin
+            _th_myfunc_0_tid_1 <= _th_blink_tid_0;
+          end 
+          if((th_blink == 4) && _th_myfunc_start[0]) begin
+            th_myfunc_0 <= th_myfunc_0_1;
+          end 
+        end
+        th_myfunc_0_1: begin
+          _th_myfunc_0_tid_2 <= _th_myfunc_0_tid_1;
+          th_myfunc_0 <= th_myfunc_0_2;
+        end
+        th_myfunc_0_2: begin
+          _th_myfunc_0_i_3 <= 0;
+          th_myfunc_0 <= th_myfunc_0_3;
+        end
+        th_myfunc_0_3: begin
+          if(_th_myfunc_0_i_3 < 4) begin
+            th_myfunc_0 <= th_myfunc_0_4;
+          end else begin
+            th_myfunc_0 <= th_myfunc_0_12;
+          end
+        end
+        th_myfunc_0_4: begin
+          if(!_mymutex_lock_reg || (_mymutex_lock_id == 0)) begin
+            th_myfunc_0 <= th_myfunc_0_5;
+          end 
+        end
+        th_myfunc_0_5: begin
+          if(!(_mymutex_lock_reg && (_mymutex_lock_id == 0))) begin
+            th_myfunc_0 <= th_myfunc_0_4;
+          end 
+          if(_mymutex_lock_reg && (_mymutex_lock_id == 0)) begin
+            th_myfunc_0 <= th_myfunc_0_6;
+          end 
+        end
+        th_myfunc_0_6: begin
+          $display("Thread %d Lock", _th_myfunc_0_tid_2);
+          th_myfunc_0 <= th_myfunc_0_7;
+        end
+        th_myfunc_0_7: begin
+          _th_myfunc_0_j_4 <= 0;
+          th_myfunc_0 <= th_myfunc_0_8;
+        end
+        th_myfunc_0_8: begin
+          if(_th_myfunc_0_j_4 < 4) begin
+            th_myfunc_0 <= th_myfunc_0_9;
+          end else begin
+            th_myfunc_0 <= th_myfunc_0_10;
+          end
+        end
+        th_myfunc_0_9: begin
+          _th_myfunc_0_j_4 <= _th_myfunc_0_j_4 + 1;
+          th_myfunc_0 <= th_myfunc_0_8;
+        end
+        th_myfunc_0_10: begin
+          th_myfunc_0 <= th_myfunc_0_11;
+        end
+        th_myfunc_0_11: begin
+          _th_myfunc_0_i_3 <= _th_myfunc_0_i_3 + 1;
+          th_myfunc_0 <= th_myfunc_0_3;
+        end
+      endcase
+    end
+  end
+
+  localparam th_myfunc_1_1 = 1;
+  localparam th_myfunc_1_2 = 2;
+  localparam th_myfunc_1_3 = 3;
+  localparam th_myfunc_1_4 = 4;
+  localparam th_myfunc_1_5 = 5;
+  localparam th_myfunc_1_6 = 6;
+  localparam th_myfunc_1_7 = 7;
+  localparam th_myfunc_1_8 = 8;
+  localparam th_myfunc_1_9 = 9;
+  localparam th_myfunc_1_10 = 10;
+  localparam th_myfunc_1_11 = 11;
+  localparam th_myfunc_1_12 = 12;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_myfunc_1 <= th_myfunc_1_init;
+      _th_myfunc_1_called <= 0;
+      _th_myfunc_1_tid_5 <= 0;
+      _th_myfunc_1_tid_6 <= 0;
+      _th_myfunc_1_i_7 <= 0;
+      _th_myfunc_1_j_8 <= 0;
+    end else begin
+      case(th_myfunc_1)
+        th_myfunc_1_init: begin
+          if(_th_myfunc_start[1] && (th_blink == 4)) begin
+            _th_myfunc_1_called <= 1;
+          end 
+          if(_th_myfunc_start[1] && (th_blink == 4)) begin
+            _th_myfunc_1_tid_5 <= _th_blink_tid_0;
+          end 
+          if((th_blink == 4) && _th_myfunc_start[1]) begin
+            th_myfunc_1 <= th_myfunc_1_1;
+          end 
+        end
+        th_myfunc_1_1: begin
+          _th_myfunc_1_tid_6 <= _th_myfunc_1_tid_5;
+          th_myfunc_1 <= th_myfunc_1_2;
+        end
+        th_myfunc_1_2: begin
+          _th_myfunc_1_i_7 <= 0;
+          th_myfunc_1 <= th_myfunc_1_3;
+        end
+        th_myfunc_1_3: begin
+          if(_th_myfunc_1_i_7 < 4) begin
+            th_myfunc_1 <= th_myfunc_1_4;
+          end else begin
+            th_myfunc_1 <= th_myfunc_1_12;
+          end
+        end
+        th_myfunc_1_4: begin
+          if(!_mymutex_lock_reg || (_mymutex_lock_id == 1)) begin
+            th_myfunc_1 <= th_myfunc_1_5;
+          end 
+        end
+        th_myfunc_1_5: begin
+          if(!(_mymutex_lock_reg && (_mymutex_lock_id == 1))) begin
+            th_myfunc_1 <= th_myfunc_1_4;
+          end 
+          if(_mymutex_lock_reg && (_mymutex_lock_id == 1)) begin
+            th_myfunc_1 <= th_myfunc_1_6;
+          end 
+        end
+        th_myfunc_1_6: begin
+          $display("Thread %d Lock", _th_myfunc_1_tid_6);
+          th_myfunc_1 <= th_myfunc_1_7;
+        end
+        th_myfunc_1_7: begin
+          _th_myfunc_1_j_8 <= 0;
+          th_myfunc_1 <= th_myfunc_1_8;
+        end
+        th_myfunc_1_8: begin
+          if(_th_myfunc_1_j_8 < 4) begin
+            th_myfunc_1 <= th_myfunc_1_9;
+          end else begin
+            th_myfunc_1 <= th_myfunc_1_10;
+          end
+        end
+        th_myfunc_1_9: begin
+          _th_myfunc_1_j_8 <= _th_myfunc_1_j_8 + 1;
+          th_myfunc_1 <= th_myfunc_1_8;
+        end
+        th_myfunc_1_10: begin
+          th_myfunc_1 <= th_myfunc_1_11;
+        end
+        th_myfunc_1_11: begin
+          _th_myfunc_1_i_7 <= _th_myfunc_1_i_7 + 1;
+          th_myfunc_1 <= th_myfunc_1_3;
+        end
+      endcase
+    end
+  end
+
+  localparam th_myfunc_2_1 = 1;
+  localparam th_myfunc_2_2 = 2;
+  localparam th_myfunc_2_3 = 3;
+  localparam th_myfunc_2_4 = 4;
+  localparam th_myfunc_2_5 = 5;
+  localparam th_myfunc_2_6 = 6;
+  localparam th_myfunc_2_7 = 7;
+  localparam th_myfunc_2_8 = 8;
+  localparam th_myfunc_2_9 = 9;
+  localparam th_myfunc_2_10 = 10;
+  localparam th_myfunc_2_11 = 11;
+  localparam th_myfunc_2_12 = 12;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_myfunc_2 <= th_myfunc_2_init;
+      _th_myfunc_2_called <= 0;
+      _th_myfunc_2_tid_9 <= 0;
+      _th_myfunc_2_tid_10 <= 0;
+      _th_myfunc_2_i_11 <= 0;
+      _th_myfunc_2_j_12 <= 0;
+    end else begin
+      case(th_myfunc_2)
+        th_myfunc_2_init: begin
+          if(_th_myfunc_start[2] && (th_blink == 4)) begin
+            _th_myfunc_2_called <= 1;
+          end 
+          if(_th_myfunc_start[2] && (th_blink == 4)) begin
+            _th_myfunc_2_tid_9 <= _th_blink_tid_0;
+          end 
+          if((th_blink == 4) && _th_myfunc_start[2]) begin
+            th_myfunc_2 <= th_myfunc_2_1;
+          end 
+        end
+        th_myfunc_2_1: begin
+          _th_myfunc_2_tid_10 <= _th_myfunc_2_tid_9;
+          th_myfunc_2 <= th_myfunc_2_2;
+        end
+        th_myfunc_2_2: begin
+          _th_myfunc_2_i_11 <= 0;
+          th_myfunc_2 <= th_myfunc_2_3;
+        end
+        th_myfunc_2_3: begin
+          if(_th_myfunc_2_i_11 < 4) begin
+            th_myfunc_2 <= th_myfunc_2_4;
+          end else begin
+            th_myfunc_2 <= th_myfunc_2_12;
+          end
+        end
+        th_myfunc_2_4: begin
+          if(!_mymutex_lock_reg || (_mymutex_lock_id == 2)) begin
+            th_myfunc_2 <= th_myfunc_2_5;
+          end 
+        end
+        th_myfunc_2_5: begin
+          if(!(_mymutex_lock_reg && (_mymutex_lock_id == 2))) begin
+            th_myfunc_2 <= th_myfunc_2_4;
+          end 
+          if(_mymutex_lock_reg && (_mymutex_lock_id == 2)) begin
+            th_myfunc_2 <= th_myfunc_2_6;
+          end 
+        end
+        th_myfunc_2_6: begin
+          $display("Thread %d Lock", _th_myfunc_2_tid_10);
+          th_myfunc_2 <= th_myfunc_2_7;
+        end
+        th_myfunc_2_7: begin
+          _th_myfunc_2_j_12 <= 0;
+          th_myfunc_2 <= th_myfunc_2_8;
+        end
+        th_myfunc_2_8: begin
+          if(_th_myfunc_2_j_12 < 4) begin
+            th_myfunc_2 <= th_myfunc_2_9;
+          end else begin
+            th_myfunc_2 <= th_myfunc_2_10;
+          end
+        end
+        th_myfunc_2_9: begin
+          _th_myfunc_2_j_12 <= _th_myfunc_2_j_12 + 1;
+          th_myfunc_2 <= th_myfunc_2_8;
+        end
+        th_myfunc_2_10: begin
+          th_myfunc_2 <= th_myfunc_2_11;
+        end
+        th_myfunc_2_11: begin
+          _th_myfunc_2_i_11 <= _th_myfunc_2_i_11 + 1;
+          th_myfunc_2 <= th_myfunc_2_3;
+        end
+      endcase
+    end
+  end
+
+  localparam th_myfunc_3_1 = 1;
+  localparam th_myfunc_3_2 = 2;
+  localparam th_myfunc_3_3 = 3;
+  localparam th_myfunc_3_4 = 4;
+  localparam th_myfunc_3_5 = 5;
+  localparam th_myfunc_3_6 = 6;
+  localparam th_myfunc_3_7 = 7;
+  localparam th_myfunc_3_8 = 8;
+  localparam th_myfunc_3_9 = 9;
+  localparam th_myfunc_3_10 = 10;
+  localparam th_myfunc_3_11 = 11;
+  localparam th_myfunc_3_12 = 12;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_myfunc_3 <= th_myfunc_3_init;
+      _th_myfunc_3_called <= 0;
+      _th_myfunc_3_tid_13 <= 0;
+      _th_myfunc_3_tid_14 <= 0;
+      _th_myfunc_3_i_15 <= 0;
+      _th_myfunc_3_j_16 <= 0;
+    end else begin
+      case(th_myfunc_3)
+        th_myfunc_3_init: begin
+          if(_th_myfunc_start[3] && (th_blink == 4)) begin
+            _th_myfunc_3_called <= 1;
+          end 
+          if(_th_myfunc_start[3] && (th_blink == 4)) begin
+            _th_myfunc_3_tid_13 <= _th_blink_tid_0;
+          end 
+          if((th_blink == 4) && _th_myfunc_start[3]) begin
+            th_myfunc_3 <= th_myfunc_3_1;
+          end 
+        end
+        th_myfunc_3_1: begin
+          _th_myfunc_3_tid_14 <= _th_myfunc_3_tid_13;
+          th_myfunc_3 <= th_myfunc_3_2;
+        end
+        th_myfunc_3_2: begin
+          _th_myfunc_3_i_15 <= 0;
+          th_myfunc_3 <= th_myfunc_3_3;
+        end
+        th_myfunc_3_3: begin
+          if(_th_myfunc_3_i_15 < 4) begin
+            th_myfunc_3 <= th_myfunc_3_4;
+          end else begin
+            th_myfunc_3 <= th_myfunc_3_12;
+          end
+        end
+        th_myfunc_3_4: begin
+          if(!_mymutex_lock_reg || (_mymutex_lock_id == 3)) begin
+            th_myfunc_3 <= th_myfunc_3_5;
+          end 
+        end
+        th_myfunc_3_5: begin
+          if(!(_mymutex_lock_reg && (_mymutex_lock_id == 3))) begin
+            th_myfunc_3 <= th_myfunc_3_4;
+          end 
+          if(_mymutex_lock_reg && (_mymutex_lock_id == 3)) begin
+            th_myfunc_3 <= th_myfunc_3_6;
+          end 
+        end
+        th_myfunc_3_6: begin
+          $display("Thread %d Lock", _th_myfunc_3_tid_14);
+          th_myfunc_3 <= th_myfunc_3_7;
+        end
+        th_myfunc_3_7: begin
+          _th_myfunc_3_j_16 <= 0;
+          th_myfunc_3 <= th_myfunc_3_8;
+        end
+        th_myfunc_3_8: begin
+          if(_th_myfunc_3_j_16 < 4) begin
+            th_myfunc_3 <= th_myfunc_3_9;
+          end else begin
+            th_myfunc_3 <= th_myfunc_3_10;
+          end
+        end
+        th_myfunc_3_9: begin
+          _th_myfunc_3_j_16 <= _th_myfunc_3_j_16 + 1;
+          th_myfunc_3 <= th_myfunc_3_8;
+        end
+        th_myfunc_3_10: begin
+          th_myfunc_3 <= th_myfunc_3_11;
+        end
+        th_myfunc_3_11: begin
+          _th_myfunc_3_i_15 <= _th_myfunc_3_i_15 + 1;
+          th_myfunc_3 <= th_myfunc_3_3;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+"""
+def test():
+    veriloggen.reset()
+    test_module = thread_mutex_arbiter.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_age():
+    veriloggen.reset()
+    code = thread_mutex_arbiter.mkLed(arbiter='age').to_verilog()
+
+    assert('_mymutex_grant_id' in code)
+    assert('_mymutex_wait_count_3' in code)
+    assert('_mymutex_last_id' not in code)
+
+
+def test_fixed_priority():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    mymutex = vthread.Mutex(m, 'mymutex', clk, rst)
+
+    def blink():
+        mymutex.lock()
+        mymutex.unlock()
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    th.start()
+    code = m.to_verilog()
+
+    assert('_mymutex_grant_id' not in code)
+    assert('_mymutex_wait_count' not in code)
+
+
+def test_invalid_arbiter():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    try:
+        mymutex = vthread.Mutex(m, 'mymutex', clk, rst, arbiter='lottery')
+    except ValueError as e:
+        assert(e.args[0] ==
+               "arbiter must be one of 'round_robin', 'age' or None, not 'lottery'")
+    else:
+        assert(False)
+
+
+def test_ram_arbiter():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 4, arbiter='round_robin')
+
+    def blink():
+        myram.lock()
+        myram.write(0, 1)
+        myram.unlock()
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    th.start()
+    code = m.to_verilog()
+
+    assert(myram.mutex.arbiter == 'round_robin')
+    assert('_myram_mutex_grant_id' in code)
+
+
+def test_ram_contention(request):
+    veriloggen.reset()
+
+    simtype = request.config.getoption('--sim')
+
+    led = thread_mutex_arbiter.mkLedRAM()
+    rslt = thread_mutex_arbiter.run(filename=None, simtype=simtype, led=led,
+                                    outputfile=os.path.splitext(os.path.basename(__file__))[0] + '.out')
+
+    # the two threads take turns, and the read-modify-writes are not lost
+    locks = [line.split() for line in rslt.splitlines()
+             if line.startswith('Thread')]
+    assert(locks == [['Thread', str(i % 2), 'Lock', str(i)] for i in range(8)])
+
+
+def test_options():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    myfifo = vthread.FIFO(m, 'myfifo', clk, rst, 32, 2, arbiter='age')
+    myaxi = vthread.AXIM(m, 'myaxi', clk, rst, 32, stats=True)
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 4)
+
+    def blink():
+        myfifo.lock()
+        myfifo.unlock()
+        myaxi.lock()
+        myaxi.unlock()
+        myram.lock()
+        myram.unlock()
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    th.start()
+
+    # the options are given to each instance, not to the class
+    assert(myfifo.mutex.arbiter == 'age')
+    assert(not myfifo.mutex.stats)
+    assert(myaxi.mutex.arbiter is None)
+    assert(myaxi.mutex.stats)
+    assert(myram.mutex.arbiter is None)
+    assert(not myram.mutex.stats)
+
+    try:
+        vthread.RAM(m, 'myram2', clk, rst, 32, 4, arbiter='lottery')
+    except ValueError as e:
+        assert(e.args[0] == "arbiter must be one of 'round_robin', 'age' "
+               "or None, not 'lottery'")
+    else:
+        assert(False)
+
+
+def test_read_stats():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    mymutex = vthread.Mutex(m, 'mymutex', clk, rst, stats=True)
+
+    def blink():
+        mymutex.lock()
+        mymutex.unlock()
+
+    th_a = vthread.Thread(m, 'th_a', clk, rst, blink)
+    th_a.start()
+    th_b = vthread.Thread(m, 'th_b', clk, rst, blink)
+    th_b.start()
+
+    text = '\n'.join(['(mymutex mutex) lock_id:         0, wait:         0',
+                      '(mymutex mutex) lock_id:         1, wait:         7',
+                      'sum = 10',
+                      '(mymutex mutex) lock_id:         0, wait:         3'])
+    stats = mymutex.read_stats(text)
+
+    assert(list(stats.keys()) == ['th_a', 'th_b'])
+    assert(list(stats['th_a'].items()) ==
+           [('num_acquisitions', 2), ('wait_cycles', 3), ('max_wait_cycles', 3)])
+    assert(list(stats['th_b'].items()) ==
+           [('num_acquisitions', 1), ('wait_cycles', 7), ('max_wait_cycles', 7)])
@@ -0,0 +1,128 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+import veriloggen.thread as vthread
+
+
+def mkLed(numthreads=4, arbiter='round_robin'):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    mymutex = vthread.Mutex(m, 'mymutex', clk, rst,
+                            arbiter=arbiter, stats=True)
+
+    def myfunc(tid):
+        for i in range(4):
+            mymutex.lock()
+            print("Thread %d Lock" % tid)
+
+            for j in range(4):
+                pass  # sleep
+
+            mymutex.unlock()
+
+    def blink():
+        for tid in range(numthreads):
+            pool.run(tid, tid)
+
+        for tid in range(numthreads):
+            pool.join(tid)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    pool = vthread.ThreadPool(m, 'th_myfunc', clk, rst, myfunc, numthreads)
+    fsm = th.start()
+
+    return m
+
+
+def mkLedRAM(arbiter='round_robin'):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 4,
+                        arbiter=arbiter, stats=True)
+
+    def myfunc(tid):
+        for i in range(4):
+            myram.lock()
+            v = myram.read(0)
+            myram.write(0, v + 1)
+            print("Thread %d Lock %d" % (tid, v))
+            myram.unlock()
+
+    def blink():
+        for tid in range(2):
+            pool.run(tid, tid)
+
+        for tid in range(2):
+            pool.join(tid)
+
+        vthread.finish()
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    pool = vthread.ThreadPool(m, 'th_myfunc', clk, rst, myfunc, 2)
+    fsm = th.start()
+
+    return m
+
+
+def mkTest(led=None):
+    m = Module('test')
+
+    # target instance
+    if led is None:
+        led = mkLed()
+
+    # copy paras and ports
+    params = m.copy_params(led)
+    ports = m.copy_sim_ports(led)
+
+    clk = ports['CLK']
+    rst = ports['RST']
+
+    uut = m.Instance(led, 'uut',
+                     params=m.connect_params(led),
+                     ports=m.connect_ports(led))
+
+    simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, m.make_reset(), period=100)
+
+    init.add(
+        Delay(10000),
+        Systask('finish'),
+    )
+
+    return m
+
+
+def run(filename='tmp.v', simtype='iverilog', outputfile=None, led=None):
+
+    if outputfile is None:
+        outputfile = os.path.splitext(os.path.basename(__file__))[0] + '.out'
+
+    test = mkTest(led)
+
+    if filename is not None:
+        test.to_verilog(filename)
+
+    sim = simulation.Simulator(test, sim=simtype)
+    rslt = sim.run(outputfile=outputfile)
+    lines = rslt.splitlines()
+    if simtype == 'verilator' and lines[-1].startswith('-'):
+        rslt = '\n'.join(lines[:-1])
+    return rslt
+
+
+if __name__ == '__main__':
+    rslt = run(filename='tmp.v')
+    print(rslt)
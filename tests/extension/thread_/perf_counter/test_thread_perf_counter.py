@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import veriloggen
+import thread_perf_counter
+from veriloggen import *
+import veriloggen.thread as vthread
+
+
+def test(request):
+    veriloggen.reset()
+
+    simtype = request.config.getoption('--sim')
+
+    rslt = thread_perf_counter.run(filename=None, simtype=simtype,
+                                   outputfile=os.path.splitext(os.path.basename(__file__))[0] + '.out')
+
+    verify_rslt = rslt.splitlines()[-1]
+    assert(verify_rslt == '# verify: PASSED')
+
+
+def mkThreads(start=True):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    myaxi = vthread.AXIM(m, 'myaxi', clk, rst, 32)
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 10)
+    myfifo = vthread.FIFO(m, 'myfifo', clk, rst, 32, 4)
+
+    def blink():
+        myram.lock()
+        myaxi.dma_read(myram, 0, 1024, 16)
+        myram.unlock()
+        myfifo.enq(myfifo.deq())
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    if start:
+        th.start()
+
+    return m, th, myaxi
+
+
+def test_register_map():
+    veriloggen.reset()
+    m, th, myaxi = mkThreads()
+
+    perf = vthread.PerfCounter(m, 'perf', th.clk, th.rst,
+                               threads=[th], axims=[myaxi])
+
+    assert(list(th.fsm.stall_cond.keys()) ==
+           ['lock', 'dma_wait', 'fifo_empty', 'fifo_full'])
+    assert(list(perf.register_map.items()) ==
+           [('th_blink_busy', 0),
+            ('th_blink_lock', 4),
+            ('th_blink_dma_wait', 8),
+            ('th_blink_fifo_empty', 12),
+            ('th_blink_fifo_full', 16),
+            ('myaxi_read_beats', 20),
+            ('myaxi_write_beats', 24),
+            ('myaxi_read_outstanding', 28),
+            ('myaxi_write_outstanding', 32)])
+    assert(perf.length == 16)
+
+    code = perf.make_register_map()
+    env = {}
+    exec(code, env)
+    assert(env['register_map'] == dict(perf.register_map))
+
+    verilog = m.to_verilog()
+    assert('_perf_register_1 <= _perf_register_1 + 1;' in verilog)
+
+
+def test_not_started():
+    veriloggen.reset()
+    m, th, myaxi = mkThreads(start=False)
+
+    try:
+        perf = vthread.PerfCounter(m, 'perf', th.clk, th.rst, threads=[th])
+    except ValueError as e:
+        assert(e.args[0] == "thread 'th_blink' is not started")
+    else:
+        assert(False)
+
+
+def test_no_counter():
+    veriloggen.reset()
+    m, th, myaxi = mkThreads()
+
+    try:
+        perf = vthread.PerfCounter(m, 'perf', th.clk, th.rst)
+    except ValueError as e:
+        assert(e.args[0] == 'no counter is specified.')
+    else:
+        assert(False)
+
+
+def test_duplicated():
+    veriloggen.reset()
+    m, th, myaxi = mkThreads()
+
+    try:
+        perf = vthread.PerfCounter(m, 'perf', th.clk, th.rst,
+                                   axims=[myaxi, myaxi])
+    except ValueError as e:
+        assert(e.args[0] == "counter 'myaxi_read_beats' is already defined")
+    else:
+        assert(False)
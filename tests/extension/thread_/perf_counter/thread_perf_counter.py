@@ -0,0 +1,149 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+import veriloggen.thread as vthread
+import veriloggen.types.axi as axi
+
+
+def mkLed():
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    datawidth = 32
+    addrwidth = 10
+    myaxi = vthread.AXIM(m, 'myaxi', clk, rst, datawidth)
+    myram = vthread.RAM(m, 'myram', clk, rst, datawidth, addrwidth)
+    myfifo = vthread.FIFO(m, 'myfifo', clk, rst, datawidth, addrwidth=4)
+
+    def produce(size):
+        myram.lock()
+        for i in range(size):
+            myram.write(i, i + 100)
+        myram.unlock()
+
+        for i in range(size // 2):
+            myfifo.enq(i)
+
+    def consume(size):
+        # the producer takes the lock first
+        for i in range(8):
+            pass
+
+        myram.lock()
+        myaxi.dma_write(myram, 0, 1024, size)
+        myaxi.dma_read(myram, 0, 1024, size)
+        myram.unlock()
+
+        sum = 0
+        for i in range(size // 2):
+            sum += myfifo.deq()
+
+        print('sum = %d' % sum)
+
+    th_producer = vthread.Thread(m, 'th_producer', clk, rst, produce)
+    th_producer.start(16)
+
+    th_consumer = vthread.Thread(m, 'th_consumer', clk, rst, consume)
+    th_consumer.start(16)
+
+    perf = vthread.PerfCounter(m, 'perf', clk, rst,
+                               threads=[th_producer, th_consumer],
+                               axims=[myaxi])
+
+    return m
+
+
+def mkTest(memimg_name=None):
+    m = Module('test')
+
+    # target instance
+    led = mkLed()
+
+    # copy paras and ports
+    params = m.copy_params(led)
+    ports = m.copy_sim_ports(led)
+
+    clk = ports['CLK']
+    rst = ports['RST']
+
+    memory = axi.AxiMemoryModel(m, 'memory', clk, rst, memimg_name=memimg_name)
+    memory.connect(ports, 'myaxi')
+
+    # AXI-Slave controller
+    _perf = vthread.AXIMLite(m, '_perf', clk, rst, noio=True)
+    _perf.connect(ports, 'perf')
+
+    def ctrl():
+        for i in range(1000):
+            pass
+
+        # th_producer: busy, lock, fifo_full
+        # th_consumer: busy, lock, dma_wait, fifo_empty
+        # myaxi: read_beats, write_beats, read_outstanding, write_outstanding
+        for i in range(11):
+            v = _perf.read(i * 4)
+            print('counter[%d] = %d' % (i, v))
+
+        consumer_lock = _perf.read(16)
+        dma_wait = _perf.read(20)
+        read_beats = _perf.read(28)
+        write_beats = _perf.read(32)
+
+        if (consumer_lock > 0 and dma_wait > 0 and
+                read_beats == 16 and write_beats == 16):
+            print('# verify: PASSED')
+        else:
+            print('# verify: FAILED')
+
+        vthread.finish()
+
+    th = vthread.Thread(m, 'th_ctrl', clk, rst, ctrl)
+    fsm = th.start()
+
+    uut = m.Instance(led, 'uut',
+                     params=m.connect_params(led),
+                     ports=m.connect_ports(led))
+
+    #simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, m.make_reset(), period=100)
+
+    init.add(
+        Delay(1000000),
+        Systask('finish'),
+    )
+
+    return m
+
+
+def run(filename='tmp.v', simtype='iverilog', outputfile=None):
+
+    if outputfile is None:
+        outputfile = os.path.splitext(os.path.basename(__file__))[0] + '.out'
+
+    memimg_name = 'memimg_' + outputfile
+
+    test = mkTest(memimg_name=memimg_name)
+
+    if filename is not None:
+        test.to_verilog(filename)
+
+    sim = simulation.Simulator(test, sim=simtype)
+    rslt = sim.run(outputfile=outputfile)
+    lines = rslt.splitlines()
+    if simtype == 'verilator' and lines[-1].startswith('-'):
+        rslt = '\n'.join(lines[:-1])
+    return rslt
+
+
+if __name__ == '__main__':
+    rslt = run(filename='tmp.v')
+    print(rslt)
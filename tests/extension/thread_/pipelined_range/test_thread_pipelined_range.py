@@ -0,0 +1,635 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import thread_pipelined_range
+from veriloggen import *
+import veriloggen.thread as vthread
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #10000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST
+);
+
+  reg [10-1:0] ram_a_0_addr;
+  wire [32-1:0] ram_a_0_rdata;
+  reg [32-1:0] ram_a_0_wdata;
+  reg ram_a_0_wenable;
+
+  ram_a
+  inst_ram_a
+  (
+    .CLK(CLK),
+    .ram_a_0_addr(ram_a_0_addr),
+    .ram_a_0_rdata(ram_a_0_rdata),
+    .ram_a_0_wdata(ram_a_0_wdata),
+    .ram_a_0_wenable(ram_a_0_wenable)
+  );
+
+  reg [10-1:0] ram_b_0_addr;
+  wire [32-1:0] ram_b_0_rdata;
+  reg [32-1:0] ram_b_0_wdata;
+  reg ram_b_0_wenable;
+  reg [10-1:0] ram_b_1_addr;
+  wire [32-1:0] ram_b_1_rdata;
+  reg [32-1:0] ram_b_1_wdata;
+  reg ram_b_1_wenable;
+
+  ram_b
+  inst_ram_b
+  (
+    .CLK(CLK),
+    .ram_b_0_addr(ram_b_0_addr),
+    .ram_b_0_rdata(ram_b_0_rdata),
+    .ram_b_0_wdata(ram_b_0_wdata),
+    .ram_b_0_wenable(ram_b_0_wenable),
+    .ram_b_1_addr(ram_b_1_addr),
+    .ram_b_1_rdata(ram_b_1_rdata),
+    .ram_b_1_wdata(ram_b_1_wdata),
+    .ram_b_1_wenable(ram_b_1_wenable)
+  );
+
+  reg [32-1:0] th_blink;
+  localparam th_blink_init = 0;
+  reg signed [32-1:0] _th_blink_size_0;
+  reg signed [32-1:0] _th_blink_i_1;
+  wire _tmp_0;
+  assign _tmp_0 = (th_blink == 2) && (_th_blink_i_1 < _th_blink_size_0);
+  reg __tmp_0_1;
+  reg signed [32-1:0] _th_blink_a_2;
+  reg signed [32-1:0] __th_blink_i_1_1;
+  reg _ram_a_cond_0_1;
+  wire _tmp_1;
+  assign _tmp_1 = (th_blink == 5) && (_th_blink_i_1 < _th_blink_size_0);
+  reg __tmp_1_1;
+  reg __tmp_1_2;
+  reg __tmp_1_3;
+  reg __tmp_1_4;
+  reg _tmp_2;
+  reg _ram_a_cond_1_1;
+  reg _ram_a_cond_2_1;
+  reg _ram_a_cond_2_2;
+  reg signed [32-1:0] _th_blink_x_3;
+  reg signed [32-1:0] __th_blink_i_1_2;
+  reg signed [32-1:0] __th_blink_i_1_3;
+  reg signed [32-1:0] _th_blink_y_4;
+  reg signed [32-1:0] __th_blink_i_1_4;
+  reg _ram_b_cond_0_1;
+  reg signed [32-1:0] _th_blink_sum_5;
+  wire _tmp_3;
+  assign _tmp_3 = (th_blink == 9) && (_th_blink_i_1 < _th_blink_size_0);
+  reg __tmp_3_1;
+  reg __tmp_3_2;
+  reg __tmp_3_3;
+  reg _tmp_4;
+  reg _ram_b_cond_1_1;
+  reg _ram_b_cond_2_1;
+  reg _ram_b_cond_2_2;
+  reg signed [32-1:0] _th_blink_v_6;
+  reg signed [32-1:0] _th_blink_tmp_7_8;
+  wire _tmp_5;
+  assign _tmp_5 = (th_blink == 12) && ((_th_blink_tmp_7_8 == 0) && (_th_blink_i_1 < _th_blink_size_0));
+  reg __tmp_5_1;
+  reg __tmp_5_2;
+  reg __tmp_5_3;
+  reg _tmp_6;
+  reg _ram_b_cond_3_1;
+  reg _ram_b_cond_4_1;
+  reg _ram_b_cond_4_2;
+  reg signed [32-1:0] _th_blink_p_9;
+  reg _ram_b_cond_5_1;
+  reg _tmp_7;
+  reg _ram_b_cond_6_1;
+  reg _ram_b_cond_7_1;
+  reg _ram_b_cond_7_2;
+  reg signed [32-1:0] _tmp_8;
+  reg signed [32-1:0] _th_blink_rdata_10;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      ram_a_0_addr <= 0;
+      ram_a_0_wdata <= 0;
+      ram_a_0_wenable <= 0;
+      _ram_a_cond_0_1 <= 0;
+      _ram_a_cond_1_1 <= 0;
+      _tmp_2 <= 0;
+      _ram_a_cond_2_1 <= 0;
+      _ram_a_cond_2_2 <= 0;
+    end else begin
+      if(_ram_a_cond_2_2) begin
+        _tmp_2 <= 0;
+      end 
+      if(_ram_a_cond_0_1) begin
+        ram_a_0_wenable <= 0;
+      end 
+      if(_ram_a_cond_1_1) begin
+        _tmp_2 <= 1;
+      end 
+      _ram_a_cond_2_2 <= _ram_a_cond_2_1;
+      if(__tmp_0_1) begin
+        ram_a_0_addr <= __th_blink_i_1_1;
+        ram_a_0_wdata <= _th_blink_a_2 + 1;
+        ram_a_0_wenable <= 1;
+      end 
+      _ram_a_cond_0_1 <= __tmp_0_1;
+      if(_tmp_1) begin
+        ram_a_0_addr <= _th_blink_i_1;
+      end 
+      _ram_a_cond_1_1 <= _tmp_1;
+      _ram_a_cond_2_1 <= _tmp_1;
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      ram_b_1_addr <= 0;
+      ram_b_1_wdata <= 0;
+      ram_b_1_wenable <= 0;
+      _ram_b_cond_0_1 <= 0;
+      ram_b_0_addr <= 0;
+      _ram_b_cond_1_1 <= 0;
+      _tmp_4 <= 0;
+      _ram_b_cond_2_1 <= 0;
+      _ram_b_cond_2_2 <= 0;
+      _ram_b_cond_3_1 <= 0;
+      _tmp_6 <= 0;
+      _ram_b_cond_4_1 <= 0;
+      _ram_b_cond_4_2 <= 0;
+      _ram_b_cond_5_1 <= 0;
+      _ram_b_cond_6_1 <= 0;
+      _tmp_7 <= 0;
+      _ram_b_cond_7_1 <= 0;
+      _ram_b_cond_7_2 <= 0;
+    end else begin
+      if(_ram_b_cond_2_2) begin
+        _tmp_4 <= 0;
+      end 
+      if(_ram_b_cond_4_2) begin
+        _tmp_6 <= 0;
+      end 
+      if(_ram_b_cond_7_2) begin
+        _tmp_7 <= 0;
+      end 
+      if(_ram_b_cond_0_1) begin
+        ram_b_1_wenable <= 0;
+      end 
+      if(_ram_b_cond_1_1) begin
+        _tmp_4 <= 1;
+      end 
+      _ram_b_cond_2_2 <= _ram_b_cond_2_1;
+      if(_ram_b_cond_3_1) begin
+        _tmp_6 <= 1;
+      end 
+      _ram_b_cond_4_2 <= _ram_b_cond_4_1;
+      if(_ram_b_cond_5_1) begin
+        ram_b_1_wenable <= 0;
+      end 
+      if(_ram_b_cond_6_1) begin
+        _tmp_7 <= 1;
+      end 
+      _ram_b_cond_7_2 <= _ram_b_cond_7_1;
+      if(__tmp_1_4) begin
+        ram_b_1_addr <= __th_blink_i_1_4;
+        ram_b_1_wdata <= _th_blink_y_4;
+        ram_b_1_wenable <= 1;
+      end 
+      _ram_b_cond_0_1 <= __tmp_1_4;
+      if(_tmp_3) begin
+        ram_b_0_addr <= _th_blink_i_1;
+      end 
+      _ram_b_cond_1_1 <= _tmp_3;
+      _ram_b_cond_2_1 <= _tmp_3;
+      if(_tmp_5) begin
+        ram_b_0_addr <= _th_blink_i_1 - 1;
+      end 
+      _ram_b_cond_3_1 <= _tmp_5;
+      _ram_b_cond_4_1 <= _tmp_5;
+      if(__tmp_5_3) begin
+        ram_b_1_addr <= __th_blink_i_1_3;
+        ram_b_1_wdata <= _th_blink_p_9 + 1;
+        ram_b_1_wenable <= 1;
+      end 
+      _ram_b_cond_5_1 <= __tmp_5_3;
+      if(th_blink == 16) begin
+        ram_b_0_addr <= _th_blink_i_1;
+      end 
+      _ram_b_cond_6_1 <= th_blink == 16;
+      _ram_b_cond_7_1 <= th_blink == 16;
+    end
+  end
+
+  localparam th_blink_1 = 1;
+  localparam th_blink_2 = 2;
+  localparam th_blink_3 = 3;
+  localparam th_blink_4 = 4;
+  localparam th_blink_5 = 5;
+  localparam th_blink_6 = 6;
+  localparam th_blink_7 = 7;
+  localparam th_blink_8 = 8;
+  localparam th_blink_9 = 9;
+  localparam th_blink_10 = 10;
+  localparam th_blink_11 = 11;
+  localparam th_blink_12 = 12;
+  localparam th_blink_13 = 13;
+  localparam th_blink_14 = 14;
+  localparam th_blink_15 = 15;
+  localparam th_blink_16 = 16;
+  localparam th_blink_17 = 17;
+  localparam th_blink_18 = 18;
+  localparam th_blink_19 = 19;
+  localparam th_blink_20 = 20;
+  localparam th_blink_21 = 21;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_blink <= th_blink_init;
+      _th_blink_size_0 <= 0;
+      _th_blink_i_1 <= 0;
+      _th_blink_sum_5 <= 0;
+      _th_blink_tmp_7_8 <= 0;
+      _tmp_8 <= 0;
+      _th_blink_rdata_10 <= 0;
+      __tmp_0_1 <= 0;
+      _th_blink_a_2 <= 0;
+      __th_blink_i_1_1 <= 0;
+      __tmp_1_1 <= 0;
+      __tmp_1_2 <= 0;
+      __tmp_1_3 <= 0;
+      __tmp_1_4 <= 0;
+      _th_blink_x_3 <= 0;
+      __th_blink_i_1_2 <= 0;
+      __th_blink_i_1_3 <= 0;
+      _th_blink_y_4 <= 0;
+      __th_blink_i_1_4 <= 0;
+      __tmp_3_1 <= 0;
+      __tmp_3_2 <= 0;
+      __tmp_3_3 <= 0;
+      _th_blink_v_6 <= 0;
+      __tmp_5_1 <= 0;
+      __tmp_5_2 <= 0;
+      __tmp_5_3 <= 0;
+      _th_blink_p_9 <= 0;
+    end else begin
+      __tmp_0_1 <= _tmp_0;
+      if(_tmp_0) begin
+        _th_blink_a_2 <= _th_blink_i_1 * 3;
+      end 
+      __th_blink_i_1_1 <= _th_blink_i_1;
+      __tmp_1_1 <= _tmp_1;
+      __tmp_1_2 <= __tmp_1_1;
+      __tmp_1_3 <= __tmp_1_2;
+      __tmp_1_4 <= __tmp_1_3;
+      if(__tmp_1_2) begin
+        _th_blink_x_3 <= ram_a_0_rdata;
+      end 
+      __th_blink_i_1_2 <= __th_blink_i_1_1;
+      __th_blink_i_1_3 <= __th_blink_i_1_2;
+      if(__tmp_1_3) begin
+        _th_blink_y_4 <= (_th_blink_x_3 << 1) + __th_blink_i_1_3;
+      end 
+      __th_blink_i_1_4 <= __th_blink_i_1_3;
+      __tmp_3_1 <= _tmp_3;
+      __tmp_3_2 <= __tmp_3_1;
+      __tmp_3_3 <= __tmp_3_2;
+      if(__tmp_3_2) begin
+        _th_blink_v_6 <= ram_b_0_rdata;
+      end 
+      if(__tmp_3_3) begin
+        _th_blink_sum_5 <= _th_blink_sum_5 + _th_blink_v_6;
+      end 
+      __tmp_5_1 <= _tmp_5;
+      __tmp_5_2 <= __tmp_5_1;
+      __tmp_5_3 <= __tmp_5_2;
+      if(__tmp_5_2) begin
+        _th_blink_p_9 <= ram_b_0_rdata;
+      end 
+      case(th_blink)
+        th_blink_init: begin
+          _th_blink_size_0 <= 10;
+          th_blink <= th_blink_1;
+        end
+        th_blink_1: begin
+          _th_blink_i_1 <= 0;
+          th_blink <= th_blink_2;
+        end
+        th_blink_2: begin
+          if(_th_blink_i_1 < _th_blink_size_0) begin
+            _th_blink_i_1 <= _th_blink_i_1 + 1;
+          end 
+          if(!(_th_blink_i_1 < _th_blink_size_0)) begin
+            th_blink <= th_blink_3;
+          end 
+        end
+        th_blink_3: begin
+          if(!__tmp_0_1) begin
+            th_blink <= th_blink_4;
+          end 
+        end
+        th_blink_4: begin
+          _th_blink_i_1 <= 0;
+          th_blink <= th_blink_5;
+        end
+        th_blink_5: begin
+          if(_th_blink_i_1 < _th_blink_size_0) begin
+            _th_blink_i_1 <= _th_blink_i_1 + 1;
+          end 
+          if(!(_th_blink_i_1 < _th_blink_size_0)) begin
+            th_blink <= th_blink_6;
+          end 
+        end
+        th_blink_6: begin
+          if(!(__tmp_1_1 || __tmp_1_2 || __tmp_1_3 || __tmp_1_4)) begin
+            th_blink <= th_blink_7;
+          end 
+        end
+        th_blink_7: begin
+          _th_blink_sum_5 <= 0;
+          th_blink <= th_blink_8;
+        end
+        th_blink_8: begin
+          _th_blink_i_1 <= 0;
+          th_blink <= th_blink_9;
+        end
+        th_blink_9: begin
+          if(_th_blink_i_1 < _th_blink_size_0) begin
+            _th_blink_i_1 <= _th_blink_i_1 + 1;
+          end 
+          if(!(_th_blink_i_1 < _th_blink_size_0)) begin
+            th_blink <= th_blink_10;
+          end 
+        end
+        th_blink_10: begin
+          if(!(__tmp_3_1 || __tmp_3_2 || __tmp_3_3)) begin
+            th_blink <= th_blink_11;
+          end 
+        end
+        th_blink_11: begin
+          _th_blink_i_1 <= 1;
+          _th_blink_tmp_7_8 <= 0;
+          th_blink <= th_blink_12;
+        end
+        th_blink_12: begin
+          if((_th_blink_tmp_7_8 == 0) && (_th_blink_i_1 < _th_blink_size_0)) begin
+            _th_blink_i_1 <= _th_blink_i_1 + 1;
+          end 
+          _th_blink_tmp_7_8 <= (_th_blink_tmp_7_8 == 2)? 0 : _th_blink_tmp_7_8 + 1;
+          if(!(_th_blink_i_1 < _th_blink_size_0)) begin
+            th_blink <= th_blink_13;
+          end 
+        end
+        th_blink_13: begin
+          if(!(__tmp_5_1 || __tmp_5_2 || __tmp_5_3)) begin
+            th_blink <= th_blink_14;
+          end 
+        end
+        th_blink_14: begin
+          _th_blink_i_1 <= 0;
+          th_blink <= th_blink_15;
+        end
+        th_blink_15: begin
+          if(_th_blink_i_1 < _th_blink_size_0) begin
+            th_blink <= th_blink_16;
+          end else begin
+            th_blink <= th_blink_20;
+          end
+        end
+        th_blink_16: begin
+          if(_tmp_7) begin
+            _tmp_8 <= ram_b_0_rdata;
+          end 
+          if(_tmp_7) begin
+            th_blink <= th_blink_17;
+          end 
+        end
+        th_blink_17: begin
+          _th_blink_rdata_10 <= _tmp_8;
+          th_blink <= th_blink_18;
+        end
+        th_blink_18: begin
+          $display("rdata = %d", _th_blink_rdata_10);
+          th_blink <= th_blink_19;
+        end
+        th_blink_19: begin
+          _th_blink_i_1 <= _th_blink_i_1 + 1;
+          th_blink <= th_blink_15;
+        end
+        th_blink_20: begin
+          $display("sum = %d", _th_blink_sum_5);
+          th_blink <= th_blink_21;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module ram_a
+(
+  input CLK,
+  input [10-1:0] ram_a_0_addr,
+  output [32-1:0] ram_a_0_rdata,
+  input [32-1:0] ram_a_0_wdata,
+  input ram_a_0_wenable
+);
+
+  reg [10-1:0] ram_a_0_daddr;
+  reg [32-1:0] mem [0:1024-1];
+
+  always @(posedge CLK) begin
+    if(ram_a_0_wenable) begin
+      mem[ram_a_0_addr] <= ram_a_0_wdata;
+    end 
+    ram_a_0_daddr <= ram_a_0_addr;
+  end
+
+  assign ram_a_0_rdata = mem[ram_a_0_daddr];
+
+endmodule
+
+
+
+module ram_b
+(
+  input CLK,
+  input [10-1:0] ram_b_0_addr,
+  output [32-1:0] ram_b_0_rdata,
+  input [32-1:0] ram_b_0_wdata,
+  input ram_b_0_wenable,
+  input [10-1:0] ram_b_1_addr,
+  output [32-1:0] ram_b_1_rdata,
+  input [32-1:0] ram_b_1_wdata,
+  input ram_b_1_wenable
+);
+
+  reg [10-1:0] ram_b_0_daddr;
+  reg [10-1:0] ram_b_1_daddr;
+  reg [32-1:0] mem [0:1024-1];
+
+  always @(posedge CLK) begin
+    if(ram_b_0_wenable) begin
+      mem[ram_b_0_addr] <= ram_b_0_wdata;
+    end 
+    ram_b_0_daddr <= ram_b_0_addr;
+  end
+
+  assign ram_b_0_rdata = mem[ram_b_0_daddr];
+
+  always @(posedge CLK) begin
+    if(ram_b_1_wenable) begin
+      mem[ram_b_1_addr] <= ram_b_1_wdata;
+    end 
+    ram_b_1_daddr <= ram_b_1_addr;
+  end
+
+  assign ram_b_1_rdata = mem[ram_b_1_daddr];
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = thread_pipelined_range.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_stats():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    ram_a = vthread.RAM(m, 'ram_a', clk, rst, 32, 10)
+    ram_b = vthread.RAM(m, 'ram_b', clk, rst, 32, 10, numports=2)
+
+    def blink(size):
+        sum = 0
+        for i in vthread.pipelined_range(size):
+            x = ram_a.read(i)
+            y = x + i
+            sum += y
+            ram_b.write(i, y, port=1)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start(10)
+
+    stats = th.get_stats()['pipelined_loops'][0]
+    assert(stats['ii'] == 1)
+    # the read data is assigned 2 cycles after the request
+    assert(stats['stages'] == [0, 3, 4, 4])
+    assert(stats['num_stages'] == 5)
+
+
+def test_ii():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    ram_a = vthread.RAM(m, 'ram_a', clk, rst, 32, 10)
+    ram_b = vthread.RAM(m, 'ram_b', clk, rst, 32, 10, numports=2)
+
+    def blink(size):
+        # requested
+        for i in vthread.pipelined_range(size, ii=2):
+            ram_b.write(i, i)
+        # the write shares port 0 with the read of the next iteration
+        for i in vthread.pipelined_range(size):
+            x = ram_a.read(i)
+            ram_a.write(i, x + 1)
+        # the next read refers to the last write of ram_b
+        for i in vthread.pipelined_range(1, size):
+            p = ram_b.read(i - 1)
+            ram_b.write(i, p + 1, port=1)
+        # the next x refers to the last y
+        y = 0
+        for i in vthread.pipelined_range(size):
+            x = y + i
+            z = x * x
+            y = z + 1
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start(10)
+
+    stats = th.get_stats()['pipelined_loops']
+    assert([s['requested_ii'] for s in stats] == [2, 1, 1, 1])
+    assert([s['ii'] for s in stats] == [2, 4, 3, 3])
+
+
+def test_unsupported():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink(size):
+        x = 0
+        for i in vthread.pipelined_range(size):
+            if i > 0:
+                x = i
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    try:
+        fsm = th.start(10)
+    except TypeError as e:
+        assert(e.args[0] == "'If' is not supported in a pipelined loop")
+    else:
+        assert(False)
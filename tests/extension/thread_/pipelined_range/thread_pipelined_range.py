@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+import veriloggen.thread as vthread
+
+
+def mkLed():
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    datawidth = 32
+    addrwidth = 10
+    ram_a = vthread.RAM(m, 'ram_a', clk, rst, datawidth, addrwidth)
+    ram_b = vthread.RAM(m, 'ram_b', clk, rst, datawidth, addrwidth, numports=2)
+
+    def blink(size):
+        # a new iteration starts every cycle
+        for i in vthread.pipelined_range(size):
+            a = i * 3
+            ram_a.write(i, a + 1)
+
+        # read -> write on the other RAM
+        for i in vthread.pipelined_range(size):
+            x = ram_a.read(i)
+            y = x * 2 + i
+            ram_b.write(i, y, port=1)
+
+        # loop-carried variable
+        sum = 0
+        for i in vthread.pipelined_range(size):
+            v = ram_b.read(i)
+            sum += v
+
+        # loop-carried dependence through the RAM
+        for i in vthread.pipelined_range(1, size):
+            p = ram_b.read(i - 1)
+            ram_b.write(i, p + 1, port=1)
+
+        for i in range(size):
+            rdata = ram_b.read(i)
+            print('rdata = %d' % rdata)
+
+        print('sum = %d' % sum)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start(10)
+
+    return m
+
+
+def mkTest():
+    m = Module('test')
+
+    # target instance
+    led = mkLed()
+
+    # copy paras and ports
+    params = m.copy_params(led)
+    ports = m.copy_sim_ports(led)
+
+    clk = ports['CLK']
+    rst = ports['RST']
+
+    uut = m.Instance(led, 'uut',
+                     params=m.connect_params(led),
+                     ports=m.connect_ports(led))
+
+    simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, m.make_reset(), period=100)
+
+    init.add(
+        Delay(10000),
+        Systask('finish'),
+    )
+
+    return m
+
+
+if __name__ == '__main__':
+    test = mkTest()
+    verilog = test.to_verilog('tmp.v')
+    print(verilog)
+
+    sim = simulation.Simulator(test)
+    rslt = sim.run()
+    print(rslt)
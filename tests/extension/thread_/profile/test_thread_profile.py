@@ -0,0 +1,283 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import thread_profile
+import inspect
+from veriloggen import *
+import veriloggen.thread as vthread
+from veriloggen.thread.profile import format_profile
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #10000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST
+);
+
+  reg [32-1:0] th_blink;
+  localparam th_blink_init = 0;
+  reg [32-1:0] _d1_th_blink;
+  reg [32-1:0] _th_blink_profile_count;
+  reg signed [32-1:0] _th_blink_times_0;
+  reg signed [32-1:0] _th_blink_sum_1;
+  reg signed [32-1:0] _th_blink_i_2;
+  reg signed [32-1:0] _th_blink_n_3;
+  reg signed [32-1:0] _th_blink_i_4;
+  localparam th_blink_1 = 1;
+  localparam th_blink_2 = 2;
+  localparam th_blink_3 = 3;
+  localparam th_blink_4 = 4;
+  localparam th_blink_5 = 5;
+  localparam th_blink_6 = 6;
+  localparam th_blink_7 = 7;
+  localparam th_blink_8 = 8;
+  localparam th_blink_9 = 9;
+  localparam th_blink_10 = 10;
+  localparam th_blink_11 = 11;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_blink <= th_blink_init;
+      _d1_th_blink <= th_blink_init;
+      _th_blink_times_0 <= 0;
+      _th_blink_sum_1 <= 0;
+      _th_blink_i_2 <= 0;
+      _th_blink_n_3 <= 0;
+      _th_blink_i_4 <= 0;
+      _th_blink_profile_count <= 0;
+    end else begin
+      if(th_blink != _d1_th_blink) begin
+        $display("(th_blink profile) state:%d, cycles:%d", _d1_th_blink, _th_blink_profile_count);
+        _th_blink_profile_count <= 1;
+      end 
+      if(th_blink == _d1_th_blink) begin
+        _th_blink_profile_count <= _th_blink_profile_count + 1;
+      end 
+      _d1_th_blink <= th_blink;
+      case(th_blink)
+        th_blink_init: begin
+          _th_blink_times_0 <= 10;
+          th_blink <= th_blink_1;
+        end
+        th_blink_1: begin
+          _th_blink_sum_1 <= 0;
+          th_blink <= th_blink_2;
+        end
+        th_blink_2: begin
+          _th_blink_i_2 <= 0;
+          th_blink <= th_blink_3;
+        end
+        th_blink_3: begin
+          if(_th_blink_i_2 < _th_blink_times_0) begin
+            th_blink <= th_blink_4;
+          end else begin
+            th_blink <= th_blink_6;
+          end
+        end
+        th_blink_4: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + _th_blink_i_2;
+          th_blink <= th_blink_5;
+        end
+        th_blink_5: begin
+          _th_blink_i_2 <= _th_blink_i_2 + 1;
+          th_blink <= th_blink_3;
+        end
+        th_blink_6: begin
+          _th_blink_n_3 <= _th_blink_times_0;
+          th_blink <= th_blink_7;
+        end
+        th_blink_7: begin
+          _th_blink_i_4 <= 0;
+          th_blink <= th_blink_8;
+        end
+        th_blink_8: begin
+          if(_th_blink_i_4 < _th_blink_n_3) begin
+            th_blink <= th_blink_9;
+          end else begin
+            th_blink <= th_blink_10;
+          end
+        end
+        th_blink_9: begin
+          _th_blink_i_4 <= _th_blink_i_4 + 1;
+          th_blink <= th_blink_8;
+        end
+        th_blink_10: begin
+          $display("sum = %d", _th_blink_sum_1);
+          th_blink <= th_blink_11;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = thread_profile.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def mkThread(profile=True):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def wait(n):
+        for i in range(n):
+            pass
+
+    def blink(times):
+        sum = 0
+        for i in range(times):
+            sum += i
+        wait(times)
+        print('sum = %d' % sum)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink, profile=profile)
+    th.add_function(wait)
+    th.start(10)
+
+    return th, blink, wait
+
+
+def test_source_map():
+    veriloggen.reset()
+    th, blink, wait = mkThread()
+
+    filename = inspect.getsourcefile(blink)
+    line = blink.__code__.co_firstlineno
+    wait_line = wait.__code__.co_firstlineno
+
+    assert(list(th.source_map.items()) ==
+           [(1, (filename, line + 1, 'blink')),
+            (2, (filename, line + 2, 'blink')),
+            (3, (filename, line + 2, 'blink')),
+            (4, (filename, line + 3, 'blink')),
+            (5, (filename, line + 2, 'blink')),
+            (6, (filename, line + 4, 'blink')),
+            (7, (filename, wait_line + 1, 'wait')),
+            (8, (filename, wait_line + 1, 'wait')),
+            (9, (filename, wait_line + 1, 'wait')),
+            (10, (filename, line + 5, 'blink'))])
+
+
+def test_read_profile():
+    veriloggen.reset()
+    th, blink, wait = mkThread()
+
+    text = '\n'.join(['(th_blink profile) state:         0, cycles:         1',
+                      '(th_blink profile) state:         3, cycles:         2',
+                      'sum =          45',
+                      '(th_blink profile) state:         4, cycles:         3',
+                      '(th_blink profile) state:         5, cycles:         1',
+                      '(th_blink profile) state:         3, cycles:         2',
+                      '(other profile) state:         8, cycles:       100',
+                      '(th_blink profile) state:         8, cycles:         5'])
+
+    profile = th.read_profile(text)
+
+    filename = inspect.getsourcefile(blink)
+    line = blink.__code__.co_firstlineno
+    wait_line = wait.__code__.co_firstlineno
+
+    assert(profile['cycles'] == 14)
+    assert(list(profile['states'].items()) == [(8, 5), (3, 4), (4, 3), (0, 1), (5, 1)])
+    assert(list(profile['lines'].items()) ==
+           [((filename, line + 2), 5),
+            ((filename, wait_line + 1), 5),
+            ((filename, line + 3), 3),
+            ((None, None), 1)])
+    assert(list(profile['functions'].items()) ==
+           [('blink', 8), ('wait', 5), (None, 1)])
+
+    report = format_profile(profile)
+    assert(report.splitlines()[0] == 'total cycles: 14')
+    assert('%s:%d  sum += i' % (filename, line + 3) in report)
+
+
+def test_onehot():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink():
+        a = 1
+        b = 2
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink, profile=True,
+                        fsm_width=None, fsm_encoding='onehot')
+    th.start()
+
+    text = '\n'.join(['(th_blink profile) state:         1, cycles:         1',
+                      '(th_blink profile) state:         2, cycles:         3',
+                      '(th_blink profile) state:         4, cycles:         2'])
+    profile = th.read_profile(text)
+
+    assert(list(profile['states'].items()) == [(1, 3), (2, 2), (0, 1)])
+
+
+def test_no_profile():
+    veriloggen.reset()
+    th, blink, wait = mkThread(profile=False)
+    code = th.m.to_verilog()
+
+    assert(th.profile_count is None)
+    assert('profile' not in code)
@@ -0,0 +1,74 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import veriloggen
+import thread_stream_dump_binary
+
+
+def test(request):
+    veriloggen.reset()
+
+    simtype = request.config.getoption('--sim')
+
+    rslt = thread_stream_dump_binary.run(filename=None, simtype=simtype,
+                                         outputfile=os.path.splitext(os.path.basename(__file__))[0] + '.out')
+
+    verify_rslt = rslt.splitlines()[-1]
+    assert(verify_rslt == '# verify: PASSED')
+
+    from veriloggen.stream.dump import read_dump
+    dump = read_dump('mystream.dump')
+    os.remove('mystream.dump')
+
+    a = dump['(in) mystream_a_data']
+    b = dump['(in) mystream_b_data']
+    c = dump['(out) mystream_c_data']
+    assert(len(c['value']) == 32)
+    assert((c['value'] == a['value'] + b['value']).all())
+    assert((c['age'] == a['age']).all())
+    assert((c['step'] == a['step'] + c['stage']).all())
+
+    write = dump['(write) ram_c']
+    assert((write['addr'] == list(range(32))).all())
+    assert((write['value'] == c['value']).all())
+
+
+def test_header():
+    veriloggen.reset()
+    test_module = thread_stream_dump_binary.mkTest()
+    code = test_module.to_verilog()
+
+    assert('$fopen("mystream.dump", "wb")' in code)
+    assert('"veriloggen_dump 4\\n"' in code)
+    assert('"4 var _plus_data_2 1 32 0 1\\n"' in code)
+    assert('"8 write ram_c 2 32 0 0\\n"' in code)
+
+
+def test_read_dump():
+    import numpy as np
+    from veriloggen.stream.dump import read_dump
+
+    header = ('veriloggen_dump 5\n'
+              '0 var x 1 8 0 1\n'
+              '1 out y 2 40 4 1\n'
+              'end\n')
+    records = np.array([[0, 1, 0, 0xff, 0],
+                        [1, 3, 0, 0xfffffff0, 0xff],
+                        [0, 2, 1, 0x7f, 0],
+                        [1, 4, 1, 0x20, 0]], dtype='<u4')
+
+    with open('tmp.dump', 'wb') as f:
+        f.write(header.encode('ascii'))
+        f.write(records.tobytes())
+
+    dump = read_dump('tmp.dump')
+    real = read_dump('tmp.dump', raw=False)
+    os.remove('tmp.dump')
+
+    assert(list(dump.keys()) == ['x', '(out) y'])
+    assert(list(dump['x']['value']) == [-1, 127])
+    assert(list(dump['x']['step']) == [1, 2])
+    assert(list(dump['x']['age']) == [0, 1])
+    assert(list(dump['(out) y']['value']) == [-16, 32])
+    assert(list(real['(out) y']['value']) == [-1.0, 2.0])
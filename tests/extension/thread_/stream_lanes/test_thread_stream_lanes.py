@@ -0,0 +1,135 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import veriloggen
+import thread_stream_lanes
+
+from veriloggen import *
+import veriloggen.thread as vthread
+
+
+def test(request):
+    veriloggen.reset()
+
+    simtype = request.config.getoption('--sim')
+
+    rslt = thread_stream_lanes.run(filename=None, simtype=simtype,
+                                   outputfile=os.path.splitext(os.path.basename(__file__))[0] + '.out')
+
+    verify_rslt = rslt.splitlines()[-1]
+    assert(verify_rslt == '# verify: PASSED')
+
+
+def test_lanes():
+    veriloggen.reset()
+    m = Module('lanes')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    strm = vthread.Stream(m, 'strm', clk, rst, numlanes=4)
+    a = strm.source('a')
+    size = strm.constant('size')
+    c = a + 1
+    strm.sink(c, 'c')
+    sum = strm.ReduceAdd(a, size)
+    strm.sink(sum, 'sum')
+
+    assert(list(strm.sources.keys()) ==
+           ['a', 'a_lane1', 'a_lane2', 'a_lane3'])
+    assert(list(strm.sinks.keys()) ==
+           ['c', 'c_lane1', 'c_lane2', 'c_lane3', 'sum'])
+    assert(strm.lane_names['c'] == ['c', 'c_lane1', 'c_lane2', 'c_lane3'])
+    assert('sum' not in strm.lane_names)
+
+    lanes = strm.lanes.lanes[sum.object_id]
+    assert(len(lanes) == 4)
+    assert(all([lane.size is sum.size for lane in lanes]))
+    assert(all([lane.initval.value == 0 for lane in lanes]))
+    assert(lanes[1].right is strm.sources['a_lane1'])
+
+
+def test_size():
+    veriloggen.reset()
+    m = Module('lanes')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    strm = vthread.Stream(m, 'strm', clk, rst, numlanes=4)
+    a = strm.source('a')
+    sum = strm.ReduceAdd(a, 6)
+
+    try:
+        strm.sink(sum, 'sum')
+    except ValueError as e:
+        assert(e.args[0] == 'size 6 must be a multiple of numlanes 4.')
+        return
+
+    assert(False)
+
+
+def test_unsupported():
+    veriloggen.reset()
+    m = Module('lanes')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    strm = vthread.Stream(m, 'strm', clk, rst, numlanes=2)
+    a = strm.source('a')
+    c = a + a.prev(1)
+
+    try:
+        strm.sink(c, 'c')
+    except ValueError as e:
+        assert(e.args[0] == "'_Prev' cannot be replicated over lanes.")
+        return
+
+    assert(False)
+
+
+def mkSetSource(offset, size, stride):
+    veriloggen.reset()
+    m = Module('lanes')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    ram_a = vthread.MultibankRAM(m, 'ram_a', clk, rst, 32, 8, numbanks=4)
+    strm = vthread.Stream(m, 'strm', clk, rst, numlanes=4)
+    a = strm.source('a')
+    strm.sink(a + 1, 'c')
+
+    def comp():
+        strm.set_source('a', ram_a, offset, size, stride)
+
+    th = vthread.Thread(m, 'th_comp', clk, rst, comp)
+    th.start()
+
+
+def test_offset():
+    try:
+        mkSetSource(2, 8, 1)
+    except ValueError as e:
+        assert(e.args[0] == 'offset 2 must be a multiple of numlanes 4.')
+        return
+
+    assert(False)
+
+
+def test_source_size():
+    try:
+        mkSetSource(0, 6, 1)
+    except ValueError as e:
+        assert(e.args[0] == 'size 6 must be a multiple of numlanes 4.')
+        return
+
+    assert(False)
+
+
+def test_stride():
+    try:
+        mkSetSource(0, 8, 2)
+    except ValueError as e:
+        assert(e.args[0] == 'stride must be 1 with numlanes 4, not 2.')
+        return
+
+    assert(False)
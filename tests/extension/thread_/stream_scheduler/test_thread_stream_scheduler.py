@@ -0,0 +1,91 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import veriloggen
+import thread_stream_scheduler
+import veriloggen.stream as stream
+import veriloggen.stream.scheduler as scheduler
+from veriloggen.stream.dag import Graph, _resolve
+
+
+def run(request, scheduler, resources=None):
+    veriloggen.reset()
+
+    simtype = request.config.getoption('--sim')
+
+    outputfile = '_'.join([os.path.splitext(os.path.basename(__file__))[0],
+                           scheduler]) + '.out'
+
+    rslt = thread_stream_scheduler.run(filename=None, simtype=simtype,
+                                       outputfile=outputfile,
+                                       scheduler=scheduler, resources=resources)
+
+    verify_rslt = rslt.splitlines()[-1]
+    assert(verify_rslt == '# verify: PASSED')
+
+
+def test_alap(request):
+    run(request, 'alap')
+
+
+def test_list(request):
+    run(request, 'list')
+
+
+def test_list_resources(request):
+    run(request, 'list', {'Times': 1})
+
+
+def mkGraph(scheduler, resources=None):
+    a = stream.Variable('adata')
+    b = stream.Variable('bdata')
+    c = stream.Variable('cdata')
+
+    # the alias of 'a + 1' feeds an adder after the long multiplier path
+    s = a + 1
+    v = stream.Variable(s)
+    p = b.prev(1)
+    x = a * b
+    y = x * c
+    q = p * c
+    w = y + v
+    z = w + q
+    z.output('zdata')
+
+    st = stream.Stream(z, scheduler=scheduler, resources=resources)
+    st.to_module('main')
+    return st, s, p, w
+
+
+def check_stages(st):
+    # every input arrives at the stage of its consumer
+    graph = Graph(st.nodes)
+    for node in graph.order:
+        if node.start_stage is None:
+            continue
+        for var in scheduler._get_inputs(node):
+            var = _resolve(var)
+            if var.end_stage is not None:
+                assert(var.end_stage == node.start_stage)
+
+
+def test_alias_alap():
+    veriloggen.reset()
+    st, s, p, w = mkGraph('alap')
+    check_stages(st)
+
+    # the source of the alias is moved next to the adder
+    assert(s.start_stage > 0)
+    assert(s.end_stage == w.start_stage)
+    assert(p.start_stage == 0)
+
+
+def test_pinned_list():
+    veriloggen.reset()
+    st, s, p, w = mkGraph('list', {'Times': 1})
+    check_stages(st)
+
+    # the stateful operator keeps its ASAP stage
+    assert(p.start_stage == 0)
+    assert(st.get_stats()['max_issue']['Times'] == 1)
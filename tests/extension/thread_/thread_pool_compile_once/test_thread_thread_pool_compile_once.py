@@ -0,0 +1,609 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import veriloggen
+import thread_thread_pool_compile_once
+from veriloggen import *
+import veriloggen.thread as vthread
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #10000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST
+);
+
+  reg [4-1:0] _th_myfunc_start;
+  reg [32-1:0] th_blink;
+  localparam th_blink_init = 0;
+  reg signed [32-1:0] _th_blink_times_0;
+  reg signed [32-1:0] _th_blink_tid_1;
+  reg [32-1:0] th_myfunc_0;
+  localparam th_myfunc_0_init = 0;
+  reg [32-1:0] th_myfunc_1;
+  localparam th_myfunc_1_init = 0;
+  reg [32-1:0] th_myfunc_2;
+  localparam th_myfunc_2_init = 0;
+  reg [32-1:0] th_myfunc_3;
+  localparam th_myfunc_3_init = 0;
+  reg _th_myfunc_0_called;
+  reg signed [32-1:0] _th_myfunc_0_tid_2;
+  reg signed [32-1:0] _th_myfunc_0_tid_3;
+  reg signed [32-1:0] _th_myfunc_0_i_4;
+  reg signed [32-1:0] _th_myfunc_0_tmp_5_6;
+  reg _th_myfunc_1_called;
+  reg signed [32-1:0] _th_myfunc_1_tid_7;
+  reg signed [32-1:0] _th_myfunc_1_tid_3;
+  reg signed [32-1:0] _th_myfunc_1_i_4;
+  reg signed [32-1:0] _th_myfunc_1_tmp_5_6;
+  reg _th_myfunc_2_called;
+  reg signed [32-1:0] _th_myfunc_2_tid_8;
+  reg signed [32-1:0] _th_myfunc_2_tid_3;
+  reg signed [32-1:0] _th_myfunc_2_i_4;
+  reg signed [32-1:0] _th_myfunc_2_tmp_5_6;
+  reg _th_myfunc_3_called;
+  reg signed [32-1:0] _th_myfunc_3_tid_9;
+  reg signed [32-1:0] _th_myfunc_3_tid_3;
+  reg signed [32-1:0] _th_myfunc_3_i_4;
+  reg signed [32-1:0] _th_myfunc_3_tmp_5_6;
+  reg signed [32-1:0] _th_blink_sum_10;
+  localparam th_blink_1 = 1;
+  localparam th_blink_2 = 2;
+  localparam th_blink_3 = 3;
+  localparam th_blink_4 = 4;
+  localparam th_blink_5 = 5;
+  localparam th_blink_6 = 6;
+  localparam th_blink_7 = 7;
+  localparam th_blink_8 = 8;
+  localparam th_blink_9 = 9;
+  localparam th_blink_10 = 10;
+  localparam th_blink_11 = 11;
+  localparam th_blink_12 = 12;
+  localparam th_blink_13 = 13;
+  localparam th_blink_14 = 14;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_blink <= th_blink_init;
+      _th_blink_times_0 <= 0;
+      _th_blink_tid_1 <= 0;
+      _th_myfunc_start[_th_blink_tid_1] <= (0 >> _th_blink_tid_1) & 1'd1;
+      _th_blink_sum_10 <= 0;
+    end else begin
+      case(th_blink)
+        th_blink_init: begin
+          _th_blink_times_0 <= 20;
+          th_blink <= th_blink_1;
+        end
+        th_blink_1: begin
+          _th_blink_tid_1 <= 0;
+          th_blink <= th_blink_2;
+        end
+        th_blink_2: begin
+          if(_th_blink_tid_1 < 4) begin
+            th_blink <= th_blink_3;
+          end else begin
+            th_blink <= th_blink_7;
+          end
+        end
+        th_blink_3: begin
+          _th_myfunc_start[_th_blink_tid_1] <= 1;
+          th_blink <= th_blink_4;
+        end
+        th_blink_4: begin
+          th_blink <= th_blink_5;
+          th_blink <= th_blink_5;
+          th_blink <= th_blink_5;
+          th_blink <= th_blink_5;
+        end
+        th_blink_5: begin
+          _th_myfunc_start[_th_blink_tid_1] <= 0;
+          th_blink <= th_blink_6;
+        end
+        th_blink_6: begin
+          _th_blink_tid_1 <= _th_blink_tid_1 + 1;
+          th_blink <= th_blink_2;
+        end
+        th_blink_7: begin
+          _th_blink_sum_10 <= 0;
+          th_blink <= th_blink_8;
+        end
+        th_blink_8: begin
+          _th_blink_tid_1 <= 0;
+          th_blink <= th_blink_9;
+        end
+        th_blink_9: begin
+          if(_th_blink_tid_1 < 4) begin
+            th_blink <= th_blink_10;
+          end else begin
+            th_blink <= th_blink_13;
+          end
+        end
+        th_blink_10: begin
+          if((_th_blink_tid_1 == 0)? th_myfunc_0 == 7 : 
+          (_th_blink_tid_1 == 1)? th_myfunc_1 == 7 : 
+          (_th_blink_tid_1 == 2)? th_myfunc_2 == 7 : 
+          (_th_blink_tid_1 == 3)? th_myfunc_3 == 7 : 0) begin
+            th_blink <= th_blink_11;
+          end 
+        end
+        th_blink_11: begin
+          _th_blink_sum_10 <= _th_blink_sum_10 + ((_th_blink_tid_1 == 0)? _th_myfunc_0_tmp_5_6 : 
+                              (_th_blink_tid_1 == 1)? _th_myfunc_1_tmp_5_6 : 
+                              (_th_blink_tid_1 == 2)? _th_myfunc_2_tmp_5_6 : 
+                              (_th_blink_tid_1 == 3)? _th_myfunc_3_tmp_5_6 : 'hx);
+          th_blink <= th_blink_12;
+        end
+        th_blink_12: begin
+          _th_blink_tid_1 <= _th_blink_tid_1 + 1;
+          th_blink <= th_blink_9;
+        end
+        th_blink_13: begin
+          $display("sum = %d", _th_blink_sum_10);
+          th_blink <= th_blink_14;
+        end
+      endcase
+    end
+  end
+
+  localparam th_myfunc_0_1 = 1;
+  localparam th_myfunc_0_2 = 2;
+  localparam th_myfunc_0_3 = 3;
+  localparam th_myfunc_0_4 = 4;
+  localparam th_myfunc_0_5 = 5;
+  localparam th_myfunc_0_6 = 6;
+  localparam th_myfunc_0_7 = 7;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_myfunc_0 <= th_myfunc_0_init;
+      _th_myfunc_0_called <= 0;
+      _th_myfunc_0_tid_2 <= 0;
+      _th_myfunc_0_tid_3 <= 0;
+      _th_myfunc_0_i_4 <= 0;
+      _th_myfunc_0_tmp_5_6 <= 0;
+    end else begin
+      case(th_myfunc_0)
+        th_myfunc_0_init: begin
+          if(_th_myfunc_start[0] && (th_blink == 4)) begin
+            _th_myfunc_0_called <= 1;
+          end 
+          if(_th_myfunc_start[0] && (th_blink == 4)) begin
+            _th_myfunc_0_tid_2 <= _th_blink_tid_1;
+          end 
+          if((th_blink == 4) && _th_myfunc_start[0]) begin
+            th_myfunc_0 <= th_myfunc_0_1;
+          end 
+        end
+        th_myfunc_0_1: begin
+          _th_myfunc_0_tid_3 <= _th_myfunc_0_tid_2;
+          th_myfunc_0 <= th_myfunc_0_2;
+        end
+        th_myfunc_0_2: begin
+          $display("tid = %d", _th_myfunc_0_tid_3);
+          th_myfunc_0 <= th_myfunc_0_3;
+        end
+        th_myfunc_0_3: begin
+          _th_myfunc_0_i_4 <= 0;
+          th_myfunc_0 <= th_myfunc_0_4;
+        end
+        th_myfunc_0_4: begin
+          if(_th_myfunc_0_i_4 < 30 - _th_myfunc_0_tid_3) begin
+            th_myfunc_0 <= th_myfunc_0_5;
+          end else begin
+            th_myfunc_0 <= th_myfunc_0_6;
+          end
+        end
+        th_myfunc_0_5: begin
+          _th_myfunc_0_i_4 <= _th_myfunc_0_i_4 + 1;
+          th_myfunc_0 <= th_myfunc_0_4;
+        end
+        th_myfunc_0_6: begin
+          _th_myfunc_0_tmp_5_6 <= _th_myfunc_0_tid_3 + 100;
+          th_myfunc_0 <= th_myfunc_0_7;
+        end
+      endcase
+    end
+  end
+
+  localparam th_myfunc_1_1 = 1;
+  localparam th_myfunc_1_2 = 2;
+  localparam th_myfunc_1_3 = 3;
+  localparam th_myfunc_1_4 = 4;
+  localparam th_myfunc_1_5 = 5;
+  localparam th_myfunc_1_6 = 6;
+  localparam th_myfunc_1_7 = 7;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_myfunc_1 <= th_myfunc_1_init;
+      _th_myfunc_1_called <= 0;
+      _th_myfunc_1_tid_7 <= 0;
+      _th_myfunc_1_tid_3 <= 0;
+      _th_myfunc_1_i_4 <= 0;
+      _th_myfunc_1_tmp_5_6 <= 0;
+    end else begin
+      case(th_myfunc_1)
+        th_myfunc_1_init: begin
+          if(_th_myfunc_start[1] && (th_blink == 4)) begin
+            _th_myfunc_1_called <= 1;
+          end 
+          if(_th_myfunc_start[1] && (th_blink == 4)) begin
+            _th_myfunc_1_tid_7 <= _th_blink_tid_1;
+          end 
+          if((th_blink == 4) && _th_myfunc_start[1]) begin
+            th_myfunc_1 <= th_myfunc_1_1;
+          end 
+        end
+        th_myfunc_1_1: begin
+          _th_myfunc_1_tid_3 <= _th_myfunc_1_tid_7;
+          th_myfunc_1 <= th_myfunc_1_2;
+        end
+        th_myfunc_1_2: begin
+          $display("tid = %d", _th_myfunc_1_tid_3);
+          th_myfunc_1 <= th_myfunc_1_3;
+        end
+        th_myfunc_1_3: begin
+          _th_myfunc_1_i_4 <= 0;
+          th_myfunc_1 <= th_myfunc_1_4;
+        end
+        th_myfunc_1_4: begin
+          if(_th_myfunc_1_i_4 < 30 - _th_myfunc_1_tid_3) begin
+            th_myfunc_1 <= th_myfunc_1_5;
+          end else begin
+            th_myfunc_1 <= th_myfunc_1_6;
+          end
+        end
+        th_myfunc_1_5: begin
+          _th_myfunc_1_i_4 <= _th_myfunc_1_i_4 + 1;
+          th_myfunc_1 <= th_myfunc_1_4;
+        end
+        th_myfunc_1_6: begin
+          _th_myfunc_1_tmp_5_6 <= _th_myfunc_1_tid_3 + 100;
+          th_myfunc_1 <= th_myfunc_1_7;
+        end
+      endcase
+    end
+  end
+
+  localparam th_myfunc_2_1 = 1;
+  localparam th_myfunc_2_2 = 2;
+  localparam th_myfunc_2_3 = 3;
+  localparam th_myfunc_2_4 = 4;
+  localparam th_myfunc_2_5 = 5;
+  localparam th_myfunc_2_6 = 6;
+  localparam th_myfunc_2_7 = 7;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_myfunc_2 <= th_myfunc_2_init;
+      _th_myfunc_2_called <= 0;
+      _th_myfunc_2_tid_8 <= 0;
+      _th_myfunc_2_tid_3 <= 0;
+      _th_myfunc_2_i_4 <= 0;
+      _th_myfunc_2_tmp_5_6 <= 0;
+    end else begin
+      case(th_myfunc_2)
+        th_myfunc_2_init: begin
+          if(_th_myfunc_start[2] && (th_blink == 4)) begin
+            _th_myfunc_2_called <= 1;
+          end 
+          if(_th_myfunc_start[2] && (th_blink == 4)) begin
+            _th_myfunc_2_tid_8 <= _th_blink_tid_1;
+          end 
+          if((th_blink == 4) && _th_myfunc_start[2]) begin
+            th_myfunc_2 <= th_myfunc_2_1;
+          end 
+        end
+        th_myfunc_2_1: begin
+          _th_myfunc_2_tid_3 <= _th_myfunc_2_tid_8;
+          th_myfunc_2 <= th_myfunc_2_2;
+        end
+        th_myfunc_2_2: begin
+          $display("tid = %d", _th_myfunc_2_tid_3);
+          th_myfunc_2 <= th_myfunc_2_3;
+        end
+        th_myfunc_2_3: begin
+          _th_myfunc_2_i_4 <= 0;
+          th_myfunc_2 <= th_myfunc_2_4;
+        end
+        th_myfunc_2_4: begin
+          if(_th_myfunc_2_i_4 < 30 - _th_myfunc_2_tid_3) begin
+            th_myfunc_2 <= th_myfunc_2_5;
+          end else begin
+            th_myfunc_2 <= th_myfunc_2_6;
+          end
+        end
+        th_myfunc_2_5: begin
+          _th_myfunc_2_i_4 <= _th_myfunc_2_i_4 + 1;
+          th_myfunc_2 <= th_myfunc_2_4;
+        end
+        th_myfunc_2_6: begin
+          _th_myfunc_2_tmp_5_6 <= _th_myfunc_2_tid_3 + 100;
+          th_myfunc_2 <= th_myfunc_2_7;
+        end
+      endcase
+    end
+  end
+
+  localparam th_myfunc_3_1 = 1;
+  localparam th_myfunc_3_2 = 2;
+  localparam th_myfunc_3_3 = 3;
+  localparam th_myfunc_3_4 = 4;
+  localparam th_myfunc_3_5 = 5;
+  localparam th_myfunc_3_6 = 6;
+  localparam th_myfunc_3_7 = 7;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_myfunc_3 <= th_myfunc_3_init;
+      _th_myfunc_3_called <= 0;
+      _th_myfunc_3_tid_9 <= 0;
+      _th_myfunc_3_tid_3 <= 0;
+      _th_myfunc_3_i_4 <= 0;
+      _th_myfunc_3_tmp_5_6 <= 0;
+    end else begin
+      case(th_myfunc_3)
+        th_myfunc_3_init: begin
+          if(_th_myfunc_start[3] && (th_blink == 4)) begin
+            _th_myfunc_3_called <= 1;
+          end 
+          if(_th_myfunc_start[3] && (th_blink == 4)) begin
+            _th_myfunc_3_tid_9 <= _th_blink_tid_1;
+          end 
+          if((th_blink == 4) && _th_myfunc_start[3]) begin
+            th_myfunc_3 <= th_myfunc_3_1;
+          end 
+        end
+        th_myfunc_3_1: begin
+          _th_myfunc_3_tid_3 <= _th_myfunc_3_tid_9;
+          th_myfunc_3 <= th_myfunc_3_2;
+        end
+        th_myfunc_3_2: begin
+          $display("tid = %d", _th_myfunc_3_tid_3);
+          th_myfunc_3 <= th_myfunc_3_3;
+        end
+        th_myfunc_3_3: begin
+          _th_myfunc_3_i_4 <= 0;
+          th_myfunc_3 <= th_myfunc_3_4;
+        end
+        th_myfunc_3_4: begin
+          if(_th_myfunc_3_i_4 < 30 - _th_myfunc_3_tid_3) begin
+            th_myfunc_3 <= th_myfunc_3_5;
+          end else begin
+            th_myfunc_3 <= th_myfunc_3_6;
+          end
+        end
+        th_myfunc_3_5: begin
+          _th_myfunc_3_i_4 <= _th_myfunc_3_i_4 + 1;
+          th_myfunc_3 <= th_myfunc_3_4;
+        end
+        th_myfunc_3_6: begin
+          _th_myfunc_3_tmp_5_6 <= _th_myfunc_3_tid_3 + 100;
+          th_myfunc_3 <= th_myfunc_3_7;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = thread_thread_pool_compile_once.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_relocate():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def myfunc(tid):
+        for i in range(30 - tid):
+            pass
+        return tid + 100
+
+    def blink():
+        for tid in range(8):
+            pool.run(tid, tid)
+        for tid in range(8):
+            pool.join(tid)
+
+    pool = vthread.ThreadPool(m, 'th_myfunc', clk, rst, myfunc, 8,
+                              compile_once=True)
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    fsm = th.start()
+
+    # myfunc is compiled only for the first thread, and copied to the others
+    template = pool.threads[0]
+    for thread in pool.threads[1:]:
+        assert(thread.relocatable)
+        assert(len(thread.fsm.body) == len(template.fsm.body))
+        assert(thread.end_state == template.end_state)
+        names = [var.name.replace(template.name, thread.name)
+                 for var in template.local_vars]
+        assert([var.name for var in thread.local_vars] == names)
+
+    stats = pool.get_stats()
+    assert(stats['compiled_threads'] == 1)
+    assert(stats['relocated_threads'] == 7)
+
+
+def test_intrinsic():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    mutex = vthread.Mutex(m, 'mutex', clk, rst)
+
+    def myfunc(tid):
+        mutex.lock()
+        mutex.unlock()
+        return tid
+
+    def blink():
+        for tid in range(4):
+            pool.run(tid, tid)
+        for tid in range(4):
+            pool.join(tid)
+
+    pool = vthread.ThreadPool(m, 'th_myfunc', clk, rst, myfunc, 4,
+                              compile_once=True)
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    fsm = th.start()
+
+    # the lock ID of each thread is registered by calling lock() again
+    stats = pool.get_stats()
+    assert(stats['compiled_threads'] == 1)
+    assert(stats['relocated_threads'] == 3)
+    assert(list(mutex.id_map.keys()) == [thread.name for thread in pool.threads])
+
+    template = pool.threads[0]
+    for thread in pool.threads[1:]:
+        assert(thread.relocatable)
+        assert(thread.end_state == template.end_state)
+        assert(list(thread.fsm.stall_cond.keys()) == ['lock'])
+
+
+def test_ram():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    ram = vthread.RAM(m, 'ram', clk, rst, 32, 4)
+
+    def myfunc(tid):
+        v = ram.read(tid)
+        ram.write(tid, v + 1)
+        return v
+
+    def blink():
+        for tid in range(4):
+            pool.run(tid, tid)
+        for tid in range(4):
+            pool.join(tid)
+
+    pool = vthread.ThreadPool(m, 'th_myfunc', clk, rst, myfunc, 4,
+                              compile_once=True)
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    fsm = th.start()
+
+    stats = pool.get_stats()
+    assert(stats['compiled_threads'] == 1)
+    assert(stats['relocated_threads'] == 3)
+
+    # the RAM ports are driven by the states and the registers of each thread
+    code = m.to_verilog()
+    for thread in pool.threads:
+        assert(('%s == ' % thread.fsm.state.name) in code)
+        assert(thread.args_dict['tid'].name in code)
+        assert(thread.return_value.name in code)
+    assert(len(set([thread.return_value.name for thread in pool.threads])) == 4)
+
+
+def test_intrinsic_sim(request):
+    veriloggen.reset()
+
+    simtype = request.config.getoption('--sim')
+
+    led = thread_thread_pool_compile_once.mkLedIntrinsic()
+    rslt = thread_thread_pool_compile_once.run(filename=None, simtype=simtype, led=led,
+                                               outputfile=os.path.splitext(os.path.basename(__file__))[0] + '.out')
+
+    # the copied threads take the lock in turn, and no increment is lost
+    values = [line.replace(',', '').split() for line in rslt.splitlines()
+              if line.startswith('tid')]
+    assert(sorted([int(v[2]) for v in values]) == [0, 0, 1, 1, 2, 2, 3, 3])
+    assert([int(v[5]) for v in values] == list(range(8)))
+    assert(rslt.splitlines()[-1].split() == ['count', '=', '8'])
+
+
+def test_merge_states():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    mutex = vthread.Mutex(m, 'mutex', clk, rst)
+
+    def myfunc(tid):
+        mutex.lock()
+        mutex.unlock()
+        return tid
+
+    def blink():
+        for tid in range(4):
+            pool.run(tid, tid)
+
+    pool = vthread.ThreadPool(m, 'th_myfunc', clk, rst, myfunc, 4,
+                              compile_once=True, merge_states=True)
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    try:
+        fsm = th.start()
+    except ValueError as e:
+        assert(e.args[0] == "compile_once of 'th_myfunc' cannot copy the FSM: "
+               "an intrinsic method is called in merged states in 'th_myfunc_0'")
+    else:
+        assert(False)
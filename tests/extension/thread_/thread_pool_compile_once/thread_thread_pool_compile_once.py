@@ -0,0 +1,137 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+import veriloggen.thread as vthread
+
+
+def mkLed(numthreads=4):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink(times):
+        for tid in range(numthreads):
+            pool.run(tid, tid)
+
+        sum = 0
+        for tid in range(numthreads):
+            pool.join(tid)
+            sum += pool.ret(tid)
+
+        print('sum = %d' % sum)
+
+    def myfunc(tid):
+        print('tid = %d' % tid)
+        for i in range(30 - tid):
+            pass
+        return tid + 100
+
+    pool = vthread.ThreadPool(m, 'th_myfunc', clk, rst, myfunc, numthreads,
+                              compile_once=True)
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start(20)
+
+    return m
+
+
+def mkLedIntrinsic(numthreads=4):
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    mutex = vthread.Mutex(m, 'mutex', clk, rst)
+    myram = vthread.RAM(m, 'myram', clk, rst, 32, 4)
+
+    def blink():
+        myram.write(0, 0)
+
+        for tid in range(numthreads):
+            pool.run(tid, tid)
+
+        for tid in range(numthreads):
+            pool.join(tid)
+
+        count = myram.read(0)
+        print('count = %d' % count)
+
+        vthread.finish()
+
+    def myfunc(tid):
+        for i in range(2):
+            mutex.lock()
+            v = myram.read(0)
+            myram.write(0, v + 1)
+            print('tid = %d, v = %d' % (tid, v))
+            mutex.unlock()
+
+    pool = vthread.ThreadPool(m, 'th_myfunc', clk, rst, myfunc, numthreads,
+                              compile_once=True)
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start()
+
+    return m
+
+
+def mkTest(led=None):
+    m = Module('test')
+
+    # target instance
+    if led is None:
+        led = mkLed()
+
+    # copy paras and ports
+    params = m.copy_params(led)
+    ports = m.copy_sim_ports(led)
+
+    clk = ports['CLK']
+    rst = ports['RST']
+
+    uut = m.Instance(led, 'uut',
+                     params=m.connect_params(led),
+                     ports=m.connect_ports(led))
+
+    simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, m.make_reset(), period=100)
+
+    init.add(
+        Delay(10000),
+        Systask('finish'),
+    )
+
+    return m
+
+
+def run(filename='tmp.v', simtype='iverilog', outputfile=None, led=None):
+
+    if outputfile is None:
+        outputfile = os.path.splitext(os.path.basename(__file__))[0] + '.out'
+
+    test = mkTest(led)
+
+    if filename is not None:
+        test.to_verilog(filename)
+
+    sim = simulation.Simulator(test, sim=simtype)
+    rslt = sim.run(outputfile=outputfile)
+    lines = rslt.splitlines()
+    if simtype == 'verilator' and lines[-1].startswith('-'):
+        rslt = '\n'.join(lines[:-1])
+    return rslt
+
+
+if __name__ == '__main__':
+    test = mkTest()
+    verilog = test.to_verilog('tmp.v')
+    print(verilog)
+
+    sim = simulation.Simulator(test)
+    rslt = sim.run()
+    print(rslt)
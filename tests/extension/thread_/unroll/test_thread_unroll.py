@@ -0,0 +1,942 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import veriloggen
+import thread_unroll
+import re
+from veriloggen import *
+import veriloggen.thread as vthread
+
+expected_verilog = """
+module test
+(
+
+);
+
+  reg CLK;
+  reg RST;
+
+  blinkled
+  uut
+  (
+    .CLK(CLK),
+    .RST(RST)
+  );
+
+
+  initial begin
+    $dumpfile("uut.vcd");
+    $dumpvars(0, uut);
+  end
+
+
+  initial begin
+    CLK = 0;
+    forever begin
+      #5 CLK = !CLK;
+    end
+  end
+
+
+  initial begin
+    RST = 0;
+    #100;
+    RST = 1;
+    #100;
+    RST = 0;
+    #10000;
+    $finish;
+  end
+
+
+endmodule
+
+
+
+module blinkled
+(
+  input CLK,
+  input RST
+);
+
+  reg [10-1:0] myram_0_0_addr;
+  wire [32-1:0] myram_0_0_rdata;
+  reg [32-1:0] myram_0_0_wdata;
+  reg myram_0_0_wenable;
+
+  myram_0
+  inst_myram_0
+  (
+    .CLK(CLK),
+    .myram_0_0_addr(myram_0_0_addr),
+    .myram_0_0_rdata(myram_0_0_rdata),
+    .myram_0_0_wdata(myram_0_0_wdata),
+    .myram_0_0_wenable(myram_0_0_wenable)
+  );
+
+  reg [10-1:0] myram_1_0_addr;
+  wire [32-1:0] myram_1_0_rdata;
+  reg [32-1:0] myram_1_0_wdata;
+  reg myram_1_0_wenable;
+
+  myram_1
+  inst_myram_1
+  (
+    .CLK(CLK),
+    .myram_1_0_addr(myram_1_0_addr),
+    .myram_1_0_rdata(myram_1_0_rdata),
+    .myram_1_0_wdata(myram_1_0_wdata),
+    .myram_1_0_wenable(myram_1_0_wenable)
+  );
+
+  reg [10-1:0] myram_2_0_addr;
+  wire [32-1:0] myram_2_0_rdata;
+  reg [32-1:0] myram_2_0_wdata;
+  reg myram_2_0_wenable;
+
+  myram_2
+  inst_myram_2
+  (
+    .CLK(CLK),
+    .myram_2_0_addr(myram_2_0_addr),
+    .myram_2_0_rdata(myram_2_0_rdata),
+    .myram_2_0_wdata(myram_2_0_wdata),
+    .myram_2_0_wenable(myram_2_0_wenable)
+  );
+
+  reg [10-1:0] myram_3_0_addr;
+  wire [32-1:0] myram_3_0_rdata;
+  reg [32-1:0] myram_3_0_wdata;
+  reg myram_3_0_wenable;
+
+  myram_3
+  inst_myram_3
+  (
+    .CLK(CLK),
+    .myram_3_0_addr(myram_3_0_addr),
+    .myram_3_0_rdata(myram_3_0_rdata),
+    .myram_3_0_wdata(myram_3_0_wdata),
+    .myram_3_0_wenable(myram_3_0_wenable)
+  );
+
+  reg [32-1:0] th_blink;
+  localparam th_blink_init = 0;
+  reg signed [32-1:0] _th_blink_i_0;
+  reg _myram_0_cond_0_1;
+  reg _myram_1_cond_0_1;
+  reg _myram_2_cond_0_1;
+  reg _myram_3_cond_0_1;
+  reg signed [32-1:0] _th_blink_sum_1;
+  reg _tmp_0;
+  reg _myram_0_cond_1_1;
+  reg _myram_0_cond_2_1;
+  reg _myram_0_cond_2_2;
+  reg signed [32-1:0] _th_blink_x_unroll_0_2;
+  reg _tmp_1;
+  reg _myram_1_cond_1_1;
+  reg _myram_1_cond_2_1;
+  reg _myram_1_cond_2_2;
+  reg signed [32-1:0] _th_blink_x_unroll_1_3;
+  reg _tmp_2;
+  reg _myram_2_cond_1_1;
+  reg _myram_2_cond_2_1;
+  reg _myram_2_cond_2_2;
+  reg signed [32-1:0] _th_blink_x_unroll_2_4;
+  reg _tmp_3;
+  reg _myram_3_cond_1_1;
+  reg _myram_3_cond_2_1;
+  reg _myram_3_cond_2_2;
+  reg signed [32-1:0] _th_blink_x_5;
+  reg signed [32-1:0] _th_blink_y_unroll_0_6;
+  reg signed [32-1:0] _th_blink_y_unroll_1_7;
+  reg signed [32-1:0] _th_blink_y_unroll_2_8;
+  reg signed [32-1:0] _th_blink_y_9;
+  reg _tmp_4;
+  reg _myram_0_cond_3_1;
+  reg _myram_0_cond_4_1;
+  reg _myram_0_cond_4_2;
+  reg _tmp_5;
+  reg _myram_1_cond_3_1;
+  reg _myram_1_cond_4_1;
+  reg _myram_1_cond_4_2;
+  reg _tmp_6;
+  reg _myram_2_cond_3_1;
+  reg _myram_2_cond_4_1;
+  reg _myram_2_cond_4_2;
+  reg _tmp_7;
+  reg _myram_3_cond_3_1;
+  reg _myram_3_cond_4_1;
+  reg _myram_3_cond_4_2;
+  wire [2-1:0] _tmp_8;
+  assign _tmp_8 = _th_blink_i_0;
+  reg _tmp_9;
+  reg _myram_0_cond_5_1;
+  reg _myram_0_cond_6_1;
+  reg _myram_0_cond_6_2;
+  reg _tmp_10;
+  reg _myram_1_cond_5_1;
+  reg _myram_1_cond_6_1;
+  reg _myram_1_cond_6_2;
+  reg _tmp_11;
+  reg _myram_2_cond_5_1;
+  reg _myram_2_cond_6_1;
+  reg _myram_2_cond_6_2;
+  reg _tmp_12;
+  reg _myram_3_cond_5_1;
+  reg _myram_3_cond_6_1;
+  reg _myram_3_cond_6_2;
+  reg signed [32-1:0] _tmp_13;
+  reg signed [32-1:0] _th_blink_rdata_10;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      myram_0_0_addr <= 0;
+      myram_0_0_wdata <= 0;
+      myram_0_0_wenable <= 0;
+      _myram_0_cond_0_1 <= 0;
+      _myram_0_cond_1_1 <= 0;
+      _tmp_0 <= 0;
+      _myram_0_cond_2_1 <= 0;
+      _myram_0_cond_2_2 <= 0;
+      _myram_0_cond_3_1 <= 0;
+      _tmp_4 <= 0;
+      _myram_0_cond_4_1 <= 0;
+      _myram_0_cond_4_2 <= 0;
+      _myram_0_cond_5_1 <= 0;
+      _tmp_9 <= 0;
+      _myram_0_cond_6_1 <= 0;
+      _myram_0_cond_6_2 <= 0;
+    end else begin
+      if(_myram_0_cond_2_2) begin
+        _tmp_0 <= 0;
+      end 
+      if(_myram_0_cond_4_2) begin
+        _tmp_4 <= 0;
+      end 
+      if(_myram_0_cond_6_2) begin
+        _tmp_9 <= 0;
+      end 
+      if(_myram_0_cond_0_1) begin
+        myram_0_0_wenable <= 0;
+      end 
+      if(_myram_0_cond_1_1) begin
+        _tmp_0 <= 1;
+      end 
+      _myram_0_cond_2_2 <= _myram_0_cond_2_1;
+      if(_myram_0_cond_3_1) begin
+        _tmp_4 <= 1;
+      end 
+      _myram_0_cond_4_2 <= _myram_0_cond_4_1;
+      if(_myram_0_cond_5_1) begin
+        _tmp_9 <= 1;
+      end 
+      _myram_0_cond_6_2 <= _myram_0_cond_6_1;
+      if(th_blink == 3) begin
+        myram_0_0_addr <= _th_blink_i_0 + 0 >> 2;
+        myram_0_0_wdata <= (_th_blink_i_0 + 0 << 1) + 1;
+        myram_0_0_wenable <= 1;
+      end 
+      _myram_0_cond_0_1 <= th_blink == 3;
+      if(th_blink == 9) begin
+        myram_0_0_addr <= _th_blink_i_0 + 0 >> 2;
+      end 
+      _myram_0_cond_1_1 <= th_blink == 9;
+      _myram_0_cond_2_1 <= th_blink == 9;
+      if(th_blink == 16) begin
+        myram_0_0_addr <= 3;
+      end 
+      _myram_0_cond_3_1 <= th_blink == 16;
+      _myram_0_cond_4_1 <= th_blink == 16;
+      if(th_blink == 28) begin
+        myram_0_0_addr <= _th_blink_i_0 >> 2;
+      end 
+      _myram_0_cond_5_1 <= th_blink == 28;
+      _myram_0_cond_6_1 <= th_blink == 28;
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      myram_1_0_addr <= 0;
+      myram_1_0_wdata <= 0;
+      myram_1_0_wenable <= 0;
+      _myram_1_cond_0_1 <= 0;
+      _myram_1_cond_1_1 <= 0;
+      _tmp_1 <= 0;
+      _myram_1_cond_2_1 <= 0;
+      _myram_1_cond_2_2 <= 0;
+      _myram_1_cond_3_1 <= 0;
+      _tmp_5 <= 0;
+      _myram_1_cond_4_1 <= 0;
+      _myram_1_cond_4_2 <= 0;
+      _myram_1_cond_5_1 <= 0;
+      _tmp_10 <= 0;
+      _myram_1_cond_6_1 <= 0;
+      _myram_1_cond_6_2 <= 0;
+    end else begin
+      if(_myram_1_cond_2_2) begin
+        _tmp_1 <= 0;
+      end 
+      if(_myram_1_cond_4_2) begin
+        _tmp_5 <= 0;
+      end 
+      if(_myram_1_cond_6_2) begin
+        _tmp_10 <= 0;
+      end 
+      if(_myram_1_cond_0_1) begin
+        myram_1_0_wenable <= 0;
+      end 
+      if(_myram_1_cond_1_1) begin
+        _tmp_1 <= 1;
+      end 
+      _myram_1_cond_2_2 <= _myram_1_cond_2_1;
+      if(_myram_1_cond_3_1) begin
+        _tmp_5 <= 1;
+      end 
+      _myram_1_cond_4_2 <= _myram_1_cond_4_1;
+      if(_myram_1_cond_5_1) begin
+        _tmp_10 <= 1;
+      end 
+      _myram_1_cond_6_2 <= _myram_1_cond_6_1;
+      if(th_blink == 3) begin
+        myram_1_0_addr <= _th_blink_i_0 + 1 >> 2;
+        myram_1_0_wdata <= (_th_blink_i_0 + 1 << 1) + 1;
+        myram_1_0_wenable <= 1;
+      end 
+      _myram_1_cond_0_1 <= th_blink == 3;
+      if(th_blink == 9) begin
+        myram_1_0_addr <= _th_blink_i_0 + 1 >> 2;
+      end 
+      _myram_1_cond_1_1 <= th_blink == 9;
+      _myram_1_cond_2_1 <= th_blink == 9;
+      if(th_blink == 16) begin
+        myram_1_0_addr <= 3;
+      end 
+      _myram_1_cond_3_1 <= th_blink == 16;
+      _myram_1_cond_4_1 <= th_blink == 16;
+      if(th_blink == 28) begin
+        myram_1_0_addr <= _th_blink_i_0 >> 2;
+      end 
+      _myram_1_cond_5_1 <= th_blink == 28;
+      _myram_1_cond_6_1 <= th_blink == 28;
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      myram_2_0_addr <= 0;
+      myram_2_0_wdata <= 0;
+      myram_2_0_wenable <= 0;
+      _myram_2_cond_0_1 <= 0;
+      _myram_2_cond_1_1 <= 0;
+      _tmp_2 <= 0;
+      _myram_2_cond_2_1 <= 0;
+      _myram_2_cond_2_2 <= 0;
+      _myram_2_cond_3_1 <= 0;
+      _tmp_6 <= 0;
+      _myram_2_cond_4_1 <= 0;
+      _myram_2_cond_4_2 <= 0;
+      _myram_2_cond_5_1 <= 0;
+      _tmp_11 <= 0;
+      _myram_2_cond_6_1 <= 0;
+      _myram_2_cond_6_2 <= 0;
+    end else begin
+      if(_myram_2_cond_2_2) begin
+        _tmp_2 <= 0;
+      end 
+      if(_myram_2_cond_4_2) begin
+        _tmp_6 <= 0;
+      end 
+      if(_myram_2_cond_6_2) begin
+        _tmp_11 <= 0;
+      end 
+      if(_myram_2_cond_0_1) begin
+        myram_2_0_wenable <= 0;
+      end 
+      if(_myram_2_cond_1_1) begin
+        _tmp_2 <= 1;
+      end 
+      _myram_2_cond_2_2 <= _myram_2_cond_2_1;
+      if(_myram_2_cond_3_1) begin
+        _tmp_6 <= 1;
+      end 
+      _myram_2_cond_4_2 <= _myram_2_cond_4_1;
+      if(_myram_2_cond_5_1) begin
+        _tmp_11 <= 1;
+      end 
+      _myram_2_cond_6_2 <= _myram_2_cond_6_1;
+      if(th_blink == 3) begin
+        myram_2_0_addr <= _th_blink_i_0 + 2 >> 2;
+        myram_2_0_wdata <= (_th_blink_i_0 + 2 << 1) + 1;
+        myram_2_0_wenable <= 1;
+      end 
+      _myram_2_cond_0_1 <= th_blink == 3;
+      if(th_blink == 9) begin
+        myram_2_0_addr <= _th_blink_i_0 + 2 >> 2;
+      end 
+      _myram_2_cond_1_1 <= th_blink == 9;
+      _myram_2_cond_2_1 <= th_blink == 9;
+      if(th_blink == 20) begin
+        myram_2_0_addr <= 3;
+      end 
+      _myram_2_cond_3_1 <= th_blink == 20;
+      _myram_2_cond_4_1 <= th_blink == 20;
+      if(th_blink == 28) begin
+        myram_2_0_addr <= _th_blink_i_0 >> 2;
+      end 
+      _myram_2_cond_5_1 <= th_blink == 28;
+      _myram_2_cond_6_1 <= th_blink == 28;
+    end
+  end
+
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      myram_3_0_addr <= 0;
+      myram_3_0_wdata <= 0;
+      myram_3_0_wenable <= 0;
+      _myram_3_cond_0_1 <= 0;
+      _myram_3_cond_1_1 <= 0;
+      _tmp_3 <= 0;
+      _myram_3_cond_2_1 <= 0;
+      _myram_3_cond_2_2 <= 0;
+      _myram_3_cond_3_1 <= 0;
+      _tmp_7 <= 0;
+      _myram_3_cond_4_1 <= 0;
+      _myram_3_cond_4_2 <= 0;
+      _myram_3_cond_5_1 <= 0;
+      _tmp_12 <= 0;
+      _myram_3_cond_6_1 <= 0;
+      _myram_3_cond_6_2 <= 0;
+    end else begin
+      if(_myram_3_cond_2_2) begin
+        _tmp_3 <= 0;
+      end 
+      if(_myram_3_cond_4_2) begin
+        _tmp_7 <= 0;
+      end 
+      if(_myram_3_cond_6_2) begin
+        _tmp_12 <= 0;
+      end 
+      if(_myram_3_cond_0_1) begin
+        myram_3_0_wenable <= 0;
+      end 
+      if(_myram_3_cond_1_1) begin
+        _tmp_3 <= 1;
+      end 
+      _myram_3_cond_2_2 <= _myram_3_cond_2_1;
+      if(_myram_3_cond_3_1) begin
+        _tmp_7 <= 1;
+      end 
+      _myram_3_cond_4_2 <= _myram_3_cond_4_1;
+      if(_myram_3_cond_5_1) begin
+        _tmp_12 <= 1;
+      end 
+      _myram_3_cond_6_2 <= _myram_3_cond_6_1;
+      if(th_blink == 3) begin
+        myram_3_0_addr <= _th_blink_i_0 + 3 >> 2;
+        myram_3_0_wdata <= (_th_blink_i_0 + 3 << 1) + 1;
+        myram_3_0_wenable <= 1;
+      end 
+      _myram_3_cond_0_1 <= th_blink == 3;
+      if(th_blink == 9) begin
+        myram_3_0_addr <= _th_blink_i_0 + 3 >> 2;
+      end 
+      _myram_3_cond_1_1 <= th_blink == 9;
+      _myram_3_cond_2_1 <= th_blink == 9;
+      if(th_blink == 20) begin
+        myram_3_0_addr <= 3;
+      end 
+      _myram_3_cond_3_1 <= th_blink == 20;
+      _myram_3_cond_4_1 <= th_blink == 20;
+      if(th_blink == 28) begin
+        myram_3_0_addr <= _th_blink_i_0 >> 2;
+      end 
+      _myram_3_cond_5_1 <= th_blink == 28;
+      _myram_3_cond_6_1 <= th_blink == 28;
+    end
+  end
+
+  localparam th_blink_1 = 1;
+  localparam th_blink_2 = 2;
+  localparam th_blink_3 = 3;
+  localparam th_blink_4 = 4;
+  localparam th_blink_5 = 5;
+  localparam th_blink_6 = 6;
+  localparam th_blink_7 = 7;
+  localparam th_blink_8 = 8;
+  localparam th_blink_9 = 9;
+  localparam th_blink_10 = 10;
+  localparam th_blink_11 = 11;
+  localparam th_blink_12 = 12;
+  localparam th_blink_13 = 13;
+  localparam th_blink_14 = 14;
+  localparam th_blink_15 = 15;
+  localparam th_blink_16 = 16;
+  localparam th_blink_17 = 17;
+  localparam th_blink_18 = 18;
+  localparam th_blink_19 = 19;
+  localparam th_blink_20 = 20;
+  localparam th_blink_21 = 21;
+  localparam th_blink_22 = 22;
+  localparam th_blink_23 = 23;
+  localparam th_blink_24 = 24;
+  localparam th_blink_25 = 25;
+  localparam th_blink_26 = 26;
+  localparam th_blink_27 = 27;
+  localparam th_blink_28 = 28;
+  localparam th_blink_29 = 29;
+  localparam th_blink_30 = 30;
+  localparam th_blink_31 = 31;
+  localparam th_blink_32 = 32;
+  localparam th_blink_33 = 33;
+
+  always @(posedge CLK) begin
+    if(RST) begin
+      th_blink <= th_blink_init;
+      _th_blink_i_0 <= 0;
+      _th_blink_sum_1 <= 0;
+      _th_blink_x_unroll_0_2 <= 0;
+      _th_blink_x_unroll_1_3 <= 0;
+      _th_blink_x_unroll_2_4 <= 0;
+      _th_blink_x_5 <= 0;
+      _th_blink_y_unroll_0_6 <= 0;
+      _th_blink_y_unroll_1_7 <= 0;
+      _th_blink_y_unroll_2_8 <= 0;
+      _th_blink_y_9 <= 0;
+      _tmp_13 <= 0;
+      _th_blink_rdata_10 <= 0;
+    end else begin
+      case(th_blink)
+        th_blink_init: begin
+          th_blink <= th_blink_1;
+        end
+        th_blink_1: begin
+          _th_blink_i_0 <= 0;
+          th_blink <= th_blink_2;
+        end
+        th_blink_2: begin
+          if(_th_blink_i_0 < 16) begin
+            th_blink <= th_blink_3;
+          end else begin
+            th_blink <= th_blink_5;
+          end
+        end
+        th_blink_3: begin
+          th_blink <= th_blink_4;
+        end
+        th_blink_4: begin
+          _th_blink_i_0 <= _th_blink_i_0 + 4;
+          th_blink <= th_blink_2;
+        end
+        th_blink_5: begin
+          _th_blink_i_0 <= 15;
+          th_blink <= th_blink_6;
+        end
+        th_blink_6: begin
+          _th_blink_sum_1 <= 0;
+          th_blink <= th_blink_7;
+        end
+        th_blink_7: begin
+          _th_blink_i_0 <= 0;
+          th_blink <= th_blink_8;
+        end
+        th_blink_8: begin
+          if(_th_blink_i_0 < 12) begin
+            th_blink <= th_blink_9;
+          end else begin
+            th_blink <= th_blink_16;
+          end
+        end
+        th_blink_9: begin
+          if(_tmp_3) begin
+            _th_blink_x_unroll_0_2 <= myram_0_0_rdata;
+          end 
+          if(_tmp_3) begin
+            _th_blink_x_unroll_1_3 <= myram_1_0_rdata;
+          end 
+          if(_tmp_3) begin
+            _th_blink_x_unroll_2_4 <= myram_2_0_rdata;
+          end 
+          if(_tmp_3) begin
+            _th_blink_x_5 <= myram_3_0_rdata;
+          end 
+          if(_tmp_3) begin
+            th_blink <= th_blink_10;
+          end 
+        end
+        th_blink_10: begin
+          _th_blink_y_unroll_0_6 <= _th_blink_x_unroll_0_2 + (_th_blink_i_0 + 0);
+          _th_blink_y_unroll_1_7 <= _th_blink_x_unroll_1_3 + (_th_blink_i_0 + 1);
+          _th_blink_y_unroll_2_8 <= _th_blink_x_unroll_2_4 + (_th_blink_i_0 + 2);
+          _th_blink_y_9 <= _th_blink_x_5 + (_th_blink_i_0 + 3);
+          th_blink <= th_blink_11;
+        end
+        th_blink_11: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + _th_blink_y_unroll_0_6;
+          th_blink <= th_blink_12;
+        end
+        th_blink_12: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + _th_blink_y_unroll_1_7;
+          th_blink <= th_blink_13;
+        end
+        th_blink_13: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + _th_blink_y_unroll_2_8;
+          th_blink <= th_blink_14;
+        end
+        th_blink_14: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + _th_blink_y_9;
+          th_blink <= th_blink_15;
+        end
+        th_blink_15: begin
+          _th_blink_i_0 <= _th_blink_i_0 + 4;
+          th_blink <= th_blink_8;
+        end
+        th_blink_16: begin
+          _th_blink_i_0 <= 13;
+          if(_tmp_5) begin
+            _th_blink_x_unroll_0_2 <= myram_0_0_rdata;
+          end 
+          if(_tmp_5) begin
+            _th_blink_x_5 <= myram_1_0_rdata;
+          end 
+          if(_tmp_5) begin
+            th_blink <= th_blink_17;
+          end 
+        end
+        th_blink_17: begin
+          _th_blink_y_unroll_0_6 <= _th_blink_x_unroll_0_2 + 12;
+          _th_blink_y_9 <= _th_blink_x_5 + 13;
+          th_blink <= th_blink_18;
+        end
+        th_blink_18: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + _th_blink_y_unroll_0_6;
+          th_blink <= th_blink_19;
+        end
+        th_blink_19: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + _th_blink_y_9;
+          th_blink <= th_blink_20;
+        end
+        th_blink_20: begin
+          _th_blink_i_0 <= 15;
+          if(_tmp_7) begin
+            _th_blink_x_unroll_0_2 <= myram_2_0_rdata;
+          end 
+          if(_tmp_7) begin
+            _th_blink_x_5 <= myram_3_0_rdata;
+          end 
+          if(_tmp_7) begin
+            th_blink <= th_blink_21;
+          end 
+        end
+        th_blink_21: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + (_th_blink_x_unroll_0_2 + 14);
+          th_blink <= th_blink_22;
+        end
+        th_blink_22: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + (_th_blink_x_5 + 15);
+          th_blink <= th_blink_23;
+        end
+        th_blink_23: begin
+          _th_blink_i_0 <= 3;
+          _th_blink_sum_1 <= _th_blink_sum_1 + 1;
+          th_blink <= th_blink_24;
+        end
+        th_blink_24: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + 2;
+          th_blink <= th_blink_25;
+        end
+        th_blink_25: begin
+          _th_blink_sum_1 <= _th_blink_sum_1 + 3;
+          th_blink <= th_blink_26;
+        end
+        th_blink_26: begin
+          _th_blink_i_0 <= 0;
+          th_blink <= th_blink_27;
+        end
+        th_blink_27: begin
+          if(_th_blink_i_0 < 16) begin
+            th_blink <= th_blink_28;
+          end else begin
+            th_blink <= th_blink_32;
+          end
+        end
+        th_blink_28: begin
+          if(_tmp_9 && (_tmp_8 == 0)) begin
+            _tmp_13 <= myram_0_0_rdata;
+          end 
+          if(_tmp_10 && (_tmp_8 == 1)) begin
+            _tmp_13 <= myram_1_0_rdata;
+          end 
+          if(_tmp_11 && (_tmp_8 == 2)) begin
+            _tmp_13 <= myram_2_0_rdata;
+          end 
+          if(_tmp_12 && (_tmp_8 == 3)) begin
+            _tmp_13 <= myram_3_0_rdata;
+          end 
+          if(_tmp_9) begin
+            th_blink <= th_blink_29;
+          end 
+        end
+        th_blink_29: begin
+          _th_blink_rdata_10 <= _tmp_13;
+          th_blink <= th_blink_30;
+        end
+        th_blink_30: begin
+          $display("rdata = %d", _th_blink_rdata_10);
+          th_blink <= th_blink_31;
+        end
+        th_blink_31: begin
+          _th_blink_i_0 <= _th_blink_i_0 + 1;
+          th_blink <= th_blink_27;
+        end
+        th_blink_32: begin
+          $display("sum = %d", _th_blink_sum_1);
+          th_blink <= th_blink_33;
+        end
+      endcase
+    end
+  end
+
+
+endmodule
+
+
+
+module myram_0
+(
+  input CLK,
+  input [10-1:0] myram_0_0_addr,
+  output [32-1:0] myram_0_0_rdata,
+  input [32-1:0] myram_0_0_wdata,
+  input myram_0_0_wenable
+);
+
+  reg [10-1:0] myram_0_0_daddr;
+  reg [32-1:0] mem [0:1024-1];
+
+  always @(posedge CLK) begin
+    if(myram_0_0_wenable) begin
+      mem[myram_0_0_addr] <= myram_0_0_wdata;
+    end 
+    myram_0_0_daddr <= myram_0_0_addr;
+  end
+
+  assign myram_0_0_rdata = mem[myram_0_0_daddr];
+
+endmodule
+
+
+
+module myram_1
+(
+  input CLK,
+  input [10-1:0] myram_1_0_addr,
+  output [32-1:0] myram_1_0_rdata,
+  input [32-1:0] myram_1_0_wdata,
+  input myram_1_0_wenable
+);
+
+  reg [10-1:0] myram_1_0_daddr;
+  reg [32-1:0] mem [0:1024-1];
+
+  always @(posedge CLK) begin
+    if(myram_1_0_wenable) begin
+      mem[myram_1_0_addr] <= myram_1_0_wdata;
+    end 
+    myram_1_0_daddr <= myram_1_0_addr;
+  end
+
+  assign myram_1_0_rdata = mem[myram_1_0_daddr];
+
+endmodule
+
+
+
+module myram_2
+(
+  input CLK,
+  input [10-1:0] myram_2_0_addr,
+  output [32-1:0] myram_2_0_rdata,
+  input [32-1:0] myram_2_0_wdata,
+  input myram_2_0_wenable
+);
+
+  reg [10-1:0] myram_2_0_daddr;
+  reg [32-1:0] mem [0:1024-1];
+
+  always @(posedge CLK) begin
+    if(myram_2_0_wenable) begin
+      mem[myram_2_0_addr] <= myram_2_0_wdata;
+    end 
+    myram_2_0_daddr <= myram_2_0_addr;
+  end
+
+  assign myram_2_0_rdata = mem[myram_2_0_daddr];
+
+endmodule
+
+
+
+module myram_3
+(
+  input CLK,
+  input [10-1:0] myram_3_0_addr,
+  output [32-1:0] myram_3_0_rdata,
+  input [32-1:0] myram_3_0_wdata,
+  input myram_3_0_wenable
+);
+
+  reg [10-1:0] myram_3_0_daddr;
+  reg [32-1:0] mem [0:1024-1];
+
+  always @(posedge CLK) begin
+    if(myram_3_0_wenable) begin
+      mem[myram_3_0_addr] <= myram_3_0_wdata;
+    end 
+    myram_3_0_daddr <= myram_3_0_addr;
+  end
+
+  assign myram_3_0_rdata = mem[myram_3_0_daddr];
+
+endmodule
+"""
+
+
+def test():
+    veriloggen.reset()
+    test_module = thread_unroll.mkTest()
+    code = test_module.to_verilog()
+
+    from pyverilog.vparser.parser import VerilogParser
+    from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+    parser = VerilogParser()
+    expected_ast = parser.parse(expected_verilog)
+    codegen = ASTCodeGenerator()
+    expected_code = codegen.visit(expected_ast)
+
+    assert(expected_code == code)
+
+
+def test_stats():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myram = vthread.MultibankRAM(m, 'myram', clk, rst, 32, 10, numbanks=2)
+
+    def blink():
+        # 2 states of 2 writes
+        for i in vthread.unroll(range(8), factor=4):
+            myram.write(i, i)
+        # the banks of i * 2 are same
+        for i in vthread.unroll(range(8), factor=2):
+            myram.write(i * 2, i)
+        # the copies are executed one after another
+        a = 0
+        for i in vthread.unroll(range(4)):
+            if a < 2:
+                a += i
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start()
+
+    stats = th.get_stats()['unrolled_loops']
+    assert([s['num_copies'] for s in stats] == [4, 2, 4])
+    assert([s['interleaved'] for s in stats] == [True, True, False])
+    assert([s['num_parallel_states'] for s in stats] == [2, 0, 0])
+
+
+def test_constant_trip_count():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink(size):
+        a = 0
+        for i in vthread.unroll(range(size)):
+            a += i
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    try:
+        fsm = th.start(10)
+    except ValueError as e:
+        assert(e.args[0] == 'unrolled loop must have a constant trip count')
+    else:
+        assert(False)
+
+
+def test_loop_variable():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink():
+        for i in vthread.unroll(range(4)):
+            i = 0
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+
+    try:
+        fsm = th.start()
+    except ValueError as e:
+        assert(e.args[0] == "loop variable 'i' cannot be assigned in an unrolled loop")
+    else:
+        assert(False)
+
+
+def test_merge_states():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    myram = vthread.MultibankRAM(m, 'myram', clk, rst, 32, 10, numbanks=2)
+
+    def blink():
+        a = 10
+        for i in vthread.unroll(range(2)):
+            myram.write(i, i + a)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink, merge_states=True)
+    fsm = th.start()
+    code = m.to_verilog()
+
+    # the states of the banked RAM ports are not merged away
+    port_states = set(re.findall(r'th_blink == (\d+)', code))
+    states = set(re.findall(r'localparam th_blink_(\d+) =', code))
+    assert(port_states)
+    assert(port_states <= states)
+
+
+def test_last_value():
+    veriloggen.reset()
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    def blink():
+        a = 0
+        for i in vthread.unroll(range(0, 8, 2)):
+            a += i
+        for j in vthread.unroll(range(8), factor=4):
+            a += j
+        for k in vthread.unroll(range(10), factor=4):
+            a += k
+        for l in vthread.unroll((1, 5, 3)):
+            a += l
+        b = i + j + k + l
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start()
+    code = m.to_verilog()
+
+    # as in Python, the loop variables are the last iterated values
+    assert(re.search(r'_th_blink_i_\d+ <= 6;', code))
+    assert(re.search(r'_th_blink_j_\d+ <= 7;', code))
+    assert(re.search(r'_th_blink_k_\d+ <= 9;', code))
+    assert(re.search(r'_th_blink_l_\d+ <= 3;', code))
+    assert(not re.search(r'_th_blink_[ijkl]_\d+ <= (8|10);', code))
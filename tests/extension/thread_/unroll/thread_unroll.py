@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import os
+
+# the next line can be removed after installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+from veriloggen import *
+import veriloggen.thread as vthread
+
+
+def mkLed():
+    m = Module('blinkled')
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+
+    datawidth = 32
+    addrwidth = 10
+    numbanks = 4
+    size = 16
+    myram = vthread.MultibankRAM(m, 'myram', clk, rst, datawidth, addrwidth,
+                                 numbanks=numbanks)
+
+    def blink():
+        # 4 banks are written in a state
+        for i in vthread.unroll(range(size), factor=numbanks):
+            myram.write(i, i * 2 + 1)
+
+        # 4 banks are read in a state
+        sum = 0
+        for i in vthread.unroll(range(size - 2), factor=numbanks):
+            x = myram.read(i)
+            y = x + i
+            sum += y
+
+        # fully unrolled
+        for i in vthread.unroll(range(size - 2, size)):
+            x = myram.read(i)
+            sum += x + i
+
+        for i in vthread.unroll((1, 2, 3)):
+            sum += i
+
+        for i in range(size):
+            rdata = myram.read(i)
+            print('rdata = %d' % rdata)
+
+        print('sum = %d' % sum)
+
+    th = vthread.Thread(m, 'th_blink', clk, rst, blink)
+    fsm = th.start()
+
+    return m
+
+
+def mkTest():
+    m = Module('test')
+
+    # target instance
+    led = mkLed()
+
+    # copy paras and ports
+    params = m.copy_params(led)
+    ports = m.copy_sim_ports(led)
+
+    clk = ports['CLK']
+    rst = ports['RST']
+
+    uut = m.Instance(led, 'uut',
+                     params=m.connect_params(led),
+                     ports=m.connect_ports(led))
+
+    simulation.setup_waveform(m, uut)
+    simulation.setup_clock(m, clk, hperiod=5)
+    init = simulation.setup_reset(m, rst, m.make_reset(), period=100)
+
+    init.add(
+        Delay(10000),
+        Systask('finish'),
+    )
+
+    return m
+
+
+if __name__ == '__main__':
+    test = mkTest()
+    verilog = test.to_verilog('tmp.v')
+    print(verilog)
+
+    sim = simulation.Simulator(test)
+    rslt = sim.run()
+    print(rslt)
@@ -795,15 +795,22 @@ class Divide(_BinaryOperator):
     latency = 32 + 5
     variable_latency = 'get_latency'
 
+    def __init__(self, left, right, radix=2):
+        # quotient bits decided per pipeline stage: log2(radix)
+        div._get_radix_bits(radix)
+        self.radix = radix
+        _BinaryOperator.__init__(self, left, right)
+        self.latency = self.get_latency()
+
     def get_latency(self):
-        return self.bit_length() + 5
+        return div.get_latency(self.bit_length(), self.radix)
 
     def eval(self):
         left = self.left.eval()
         right = self.right.eval()
         if isinstance(left, int) and isinstance(right, int):
             return int(left / right)
-        return Divide(left, right)
+        return Divide(left, right, self.radix)
 
     def _implement(self, m, seq):
         if self.latency <= 5:
@@ -916,7 +923,13 @@ class Divide(_BinaryOperator):
         data_cond = _and_vars(valid_cond, all_valid)
         ready_cond = _and_vars(accept, all_valid)
 
-        inst = div.get_div()
+        if self.radix == 2:
+            inst = div.get_div()
+            params = [('W_D', width)]
+        else:
+            inst = div.get_div_radix(width, self.radix)
+            params = []
+
         clk = m._clock
         rst = m._reset
 
@@ -925,7 +938,6 @@ class Divide(_BinaryOperator):
         m.Assign(enable(data_cond))
         m.Assign(update(accept))  # NOT valid_cond
 
-        params = [('W_D', width)]
         ports = [('CLK', clk), ('RST', rst),
                  ('update', update), ('enable', enable), ('valid', ovalid),
                  ('in_a', abs_ldata), ('in_b', abs_rdata), ('rslt', abs_odata)]
@@ -943,8 +955,15 @@ class Mod(_BinaryOperator):
     latency = 32 + 5
     variable_latency = 'get_latency'
 
+    def __init__(self, left, right, radix=2):
+        # quotient bits decided per pipeline stage: log2(radix)
+        div._get_radix_bits(radix)
+        self.radix = radix
+        _BinaryOperator.__init__(self, left, right)
+        self.latency = self.get_latency()
+
     def get_latency(self):
-        return self.bit_length() + 5
+        return div.get_latency(self.bit_length(), self.radix)
 
     def eval(self):
         return self.left.eval() % self.right.eval()
@@ -1061,7 +1080,13 @@ class Mod(_BinaryOperator):
         data_cond = _and_vars(valid_cond, all_valid)
         ready_cond = _and_vars(accept, all_valid)
 
-        inst = div.get_div()
+        if self.radix == 2:
+            inst = div.get_div()
+            params = [('W_D', width)]
+        else:
+            inst = div.get_div_radix(width, self.radix)
+            params = []
+
         clk = m._clock
         rst = m._reset
 
@@ -1070,7 +1095,6 @@ class Mod(_BinaryOperator):
         m.Assign(enable(data_cond))
         m.Assign(update(accept))  # NOT valid_cond
 
-        params = [('W_D', width)]
         ports = [('CLK', clk), ('RST', rst),
                  ('update', update), ('enable', enable), ('valid', ovalid),
                  ('in_a', abs_ldata), ('in_b', abs_rdata), ('mod', abs_odata)]
@@ -1109,8 +1133,8 @@ def Mul(left, right):
     return Times(left, right)
 
 
-def Div(left, right):
-    return Divide(left, right)
+def Div(left, right, radix=2):
+    return Divide(left, right, radix)
 
 
 class LessThan(_BinaryOperator):
@@ -1899,13 +1923,16 @@ class CustomOp(_SpecialOperator):
 class LUT(_SpecialOperator):
     latency = 1
 
-    def __init__(self, address, patterns, width=32, point=0, signed=True):
+    def __init__(self, address, patterns, width=32, point=0, signed=True,
+                 memimg=None):
+        """ memimg: file name of the table loaded by $readmemh """
         _SpecialOperator.__init__(self, address)
         self.op = None
         self.width = width
         self.point = point
         self.signed = signed
         self.patterns = patterns
+        self.memimg = memimg
 
     def _set_attributes(self):
         pass
@@ -1951,8 +1978,9 @@ class LUT(_SpecialOperator):
 
         size = int(log(len(self.patterns), 2))
 
-        inst = rom.mkROMDefinition(self.name('LUT_ROM'), self.patterns,
-                                   size, width, sync=True, with_enable=True)
+        inst = rom.getROMDefinition(self.name('LUT_ROM'), self.patterns,
+                                    size, width, sync=True, with_enable=True,
+                                    memimg=self.memimg)
 
         address = m.Wire(self.name('lut_address'), width=size)
         address.assign(arg_data)
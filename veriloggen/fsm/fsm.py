@@ -30,24 +30,43 @@ def _tmp_name(prefix='_tmp_fsm'):
 
 
 def TmpFSM(m, clk, rst, width=32, initname='init',
-           nohook=False, as_module=False, prefix=None):
+           nohook=False, as_module=False, prefix=None, encoding='binary'):
     if prefix is None:
         prefix = '_tmp_fsm'
     name = _tmp_name(prefix)
-    return FSM(m, name, clk, rst, width, initname, nohook, as_module)
+    return FSM(m, name, clk, rst, width, initname, nohook, as_module,
+               encoding)
+
+
+encodings = ('binary', 'gray', 'onehot')
 
 
 class FSM(vtypes.VeriloggenNode):
-    """ Finite State Machine Generator """
+    """
+    Finite State Machine Generator
+
+    width: bit width of the state register
+           (None: the minimum width for the final number of states)
+    encoding: 'binary', 'gray' or 'onehot' state values.
+              A state of a one-hot FSM is decoded from a single bit.
+    """
 
     def __init__(self, m, name, clk, rst, width=32, initname='init',
-                 nohook=False, as_module=False):
+                 nohook=False, as_module=False, encoding='binary'):
+        if encoding not in encodings:
+            raise ValueError("encoding must be one of %s, not '%s'" %
+                             (', '.join(["'%s'" % e for e in encodings]),
+                              str(encoding)))
+
         self.m = m
         self.name = name
         self.clk = clk
         self.rst = rst
         self.width = width
+        self.encoding = encoding
         self.state_count = 0
+        # largest state index referred by at()
+        self.max_index = 0
         self.state = self.m.Reg(name, width)  # set initval later
 
         self.mark = collections.OrderedDict()  # key:index
@@ -64,6 +83,9 @@ class FSM(vtypes.VeriloggenNode):
         self.delayed_cond = collections.OrderedDict()  # key:name
         self.tmp_count = 0
 
+        # conditions of the cycles waiting for resources
+        self.stall_cond = collections.OrderedDict()  # key:kind
+
         self.dst_var = collections.OrderedDict()
         self.dst_visitor = SubstDstVisitor()
         self.reset_visitor = ResetVisitor()
@@ -296,18 +318,18 @@ class FSM(vtypes.VeriloggenNode):
     def current_condition(self):
         cond = self.next_kwargs['cond'] if 'cond' in self.next_kwargs else None
         if cond is not None:
-            cond = vtypes.AndList(self.state == self.state_count, cond)
+            cond = vtypes.AndList(self.at(self.state_count), cond)
         else:
-            cond = self.state == self.state_count
+            cond = self.at(self.state_count)
         return cond
 
     @property
     def last_condition(self):
         cond = self._make_cond(self.last_cond)
         if cond is not None:
-            cond = vtypes.AndList(self.state == self.state_count, cond)
+            cond = vtypes.AndList(self.at(self.state_count), cond)
         else:
-            cond = self.state == self.state_count
+            cond = self.at(self.state_count)
         return cond
 
     @property
@@ -316,7 +338,24 @@ class FSM(vtypes.VeriloggenNode):
 
     @property
     def here(self):
-        return self.state == self.current
+        return self.at(self.current)
+
+    def at(self, index):
+        """ condition that the FSM is in the state of index """
+        index = self._to_index(index)
+        self.max_index = max(self.max_index, index)
+
+        if self.encoding == 'onehot':
+            return self.state[index]
+
+        if self.encoding == 'gray':
+            return self.state == self._add_mark(index)
+
+        return self.state == index
+
+    def add_stall(self, kind, cond):
+        """ record that the current state waits for a resource while cond """
+        self.stall_cond.setdefault(kind, []).append(vtypes.Ands(self.here, cond))
 
     # -------------------------------------------------------------------------
     def implement(self):
@@ -604,6 +643,8 @@ class FSM(vtypes.VeriloggenNode):
         for index in indexes:
             self._add_mark(index)
 
+        self._encode_states()
+
         ret = []
         ret.extend(self.seq.make_code())
         ret.extend(self._get_delayed_substs())
@@ -612,12 +653,12 @@ class FSM(vtypes.VeriloggenNode):
                                  key=lambda x: x[0], reverse=True):
             body = tuple([self._get_delayed_when_statement(index, delay)
                           for index in sorted(dct.keys(), key=lambda x:x)])
-            case = vtypes.Case(self._get_delayed_state(delay))(*body)
+            case = vtypes.Case(self._case_comp(delay))(*body)
             ret.append(case)
 
         body = tuple([self._get_when_statement(index)
                       for index in sorted(indexes, key=lambda x:x)])
-        case = vtypes.Case(self.state)(*body)
+        case = vtypes.Case(self._case_comp())(*body)
 
         if len(case.statement) > 0:
             ret.append(case)
@@ -631,6 +672,8 @@ class FSM(vtypes.VeriloggenNode):
         for index in indexes:
             self._add_mark(index)
 
+        self._encode_states()
+
         ret = []
         ret.extend(self.seq.make_code())
         ret.extend(self._get_delayed_substs())
@@ -842,7 +885,7 @@ class FSM(vtypes.VeriloggenNode):
             index = self.state_count
         if name is None:
             name = self.name + '_' + str(index)
-        self.mark[index] = self.m.Localparam(name, index)
+        self.mark[index] = self.m.Localparam(name, self._encode(index))
 
     def _get_mark_index(self, s):
         for index, m in self.mark.items():
@@ -863,6 +906,65 @@ class FSM(vtypes.VeriloggenNode):
             index = self._get_mark_index(index)
         return index
 
+    # -------------------------------------------------------------------------
+    def _encode(self, index, width=None):
+        if self.encoding == 'gray':
+            value = index ^ (index >> 1)
+        elif self.encoding == 'onehot':
+            value = 1 << index
+        else:
+            return index
+
+        if width is None:
+            return value
+        return vtypes.Int(value, width, base=2)
+
+    def _encode_states(self):
+        """ decide the width of the state registers and the values of the marks """
+
+        if self.width is not None and self.encoding == 'binary':
+            return
+
+        for jumps in self.jump.values():
+            for dst, cond, else_dst in jumps:
+                self._add_mark(dst)
+                if else_dst is not None:
+                    self._add_mark(else_dst)
+
+        for dct in self.delayed_body.values():
+            for index in dct.keys():
+                self._add_mark(index)
+
+        num_states = max(list(self.mark.keys()) +
+                         [self.state_count, self.max_index]) + 1
+
+        if self.encoding == 'onehot':
+            width = num_states
+        else:
+            width = max((num_states - 1).bit_length(), 1)
+
+        if self.width is not None:
+            if self.width < width:
+                raise ValueError("FSM '%s' requires %d bits for %d states, not %d" %
+                                 (self.name, width, num_states, self.width))
+            width = self.width
+
+        self.state.width = width
+        for d in self.delayed_state.values():
+            d.width = width
+
+        if self.encoding == 'binary':
+            return
+
+        for index, mark in self.mark.items():
+            mark.value = self._encode(index, width)
+
+    def _case_comp(self, delay=0):
+        # a one-hot state is decoded by 'case (1'b1)' with the bits of the state
+        if self.encoding == 'onehot':
+            return vtypes.Int(1, 1)
+        return self._get_delayed_state(delay)
+
     # -------------------------------------------------------------------------
     def _add_delayed_state(self, value):
         if not isinstance(value, int):
@@ -879,7 +981,7 @@ class FSM(vtypes.VeriloggenNode):
             return self._get_delayed_state(value)
 
         for i in range(self.delay_amount + 1, value + 1):
-            d = self.m.Reg(''.join(['_d', str(i), '_', self.name]), self.width,
+            d = self.m.Reg(''.join(['_d', str(i), '_', self.name]), self.state.width,
                            initval=self._get_mark(0))
             self.delayed_state[i] = d
 
@@ -918,14 +1020,18 @@ class FSM(vtypes.VeriloggenNode):
         return value
 
     # -------------------------------------------------------------------------
-    def _cond_case(self, index):
+    def _cond_case(self, index, delay=0):
         if index not in self.mark:
             self._set_mark(index)
+        if self.encoding == 'onehot':
+            return self._get_delayed_state(delay)[index]
         return self._get_mark(index)
 
     def _cond_if(self, index):
         if index not in self.mark:
             self._set_mark(index)
+        if self.encoding == 'onehot':
+            return self.state[index]
         return (self.state == self._get_mark(index))
 
     def _delayed_cond_if(self, index, delay):
@@ -933,6 +1039,8 @@ class FSM(vtypes.VeriloggenNode):
             self._set_mark(index)
         if delay > 0 and delay not in self.delayed_state:
             self._add_delayed_state(delay)
+        if self.encoding == 'onehot':
+            return self._get_delayed_state(delay)[index]
         return (self._get_delayed_state(delay) == self._get_mark(index))
 
     def _get_when_statement(self, index):
@@ -946,7 +1054,7 @@ class FSM(vtypes.VeriloggenNode):
         return vtypes.When(self._cond_case(index))(*body)
 
     def _get_delayed_when_statement(self, index, delay):
-        return vtypes.When(self._cond_case(index))(*self.delayed_body[delay][index])
+        return vtypes.When(self._cond_case(index, delay))(*self.delayed_body[delay][index])
 
     def _get_if_statement(self, index):
         body = []
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 from __future__ import print_function
 import os
 import sys
+import math
 import collections
 
 import veriloggen.core.vtypes as vtypes
@@ -127,8 +128,14 @@ class Seq(vtypes.VeriloggenNode):
             self.dst_var[k] = v
 
     # -------------------------------------------------------------------------
-    def Prev(self, var, delay, initval=0, cond=None, prefix=None):
-        """ returns a value with the specified delay """
+    def Prev(self, var, delay, initval=0, cond=None, prefix=None, ram_threshold=None):
+        """
+        returns a value with the specified delay
+
+        ram_threshold: if delay >= ram_threshold, the value is delayed by
+                       a circular buffer on a RAM instead of a register chain.
+                       The RAM is not cleared by the reset.
+        """
         if not isinstance(delay, int):
             raise TypeError('delay must be int, not %s' % str(type(delay)))
 
@@ -141,6 +148,9 @@ class Seq(vtypes.VeriloggenNode):
         width = var.bit_length()
         signed = vtypes.get_signed(var)
 
+        if ram_threshold is not None and delay >= max(ram_threshold, 2):
+            return self._prev_ram(var, delay, initval, cond, prefix, width, signed)
+
         if not isinstance(var, vtypes._Variable):
             width = self.m.TmpLocalparam(width)
             w = self.m.TmpWire(width, signed=signed)
@@ -174,6 +184,62 @@ class Seq(vtypes.VeriloggenNode):
 
         return p
 
+    def _prev_ram(self, var, delay, initval, cond, prefix, width, signed):
+        """
+        delay line by a circular buffer:
+        the write pointer advances with cond, and the read address is
+        'delay' entries behind the next write pointer.
+        Until 'delay' entries are written after the reset, the output is
+        initval, as the register chain.
+        """
+
+        from veriloggen.types.ram import SyncRAM
+
+        if not isinstance(var, vtypes._Variable):
+            w = self.m.TmpWire(width, signed=signed)
+            w.assign(var)
+            var = w
+
+        cond = make_condition(cond)
+
+        name_prefix = prefix + var.name
+        if cond is None:
+            key = '_'.join([name_prefix, 'ram', str(delay)])
+            if key in self.prev_dict:
+                return self.prev_dict[key]
+        else:
+            key = '_'.join([name_prefix, 'ram', str(delay), str(self.m.get_tmp())])
+
+        addrwidth = int(math.ceil(math.log(delay, 2)))
+
+        ram = SyncRAM(self.m, key, self.clk, width, addrwidth, numports=2)
+
+        # the pointer and the counter are cleared by the reset of this Seq
+        wptr = self.m.Reg(key + '_wptr', addrwidth, initval=0)
+        self._add_statement([wptr(wptr + 1)], cond=cond)
+
+        count = self.m.Reg(key + '_count', delay.bit_length(), initval=0)
+        count_cond = count < delay
+        if cond is not None:
+            count_cond = vtypes.Ands(cond, count_cond)
+        self._add_statement([count(count + 1)], cond=count_cond)
+
+        next_wptr = wptr + 1 if cond is None else wptr + vtypes.Mux(cond, 1, 0)
+        raddr = self.m.Wire(key + '_raddr', addrwidth)
+        raddr.assign(next_wptr - delay)
+
+        wenable = cond if cond is not None else 1
+        ram.connect(0, wptr, var, wenable)
+        ram.connect(1, raddr, 0, 0)
+
+        p = self.m.Wire(key + '_data', width, signed=signed)
+        p.assign(vtypes.Mux(count == delay, ram.rdata(1), initval))
+
+        if cond is None:
+            self.prev_dict[key] = p
+
+        return p
+
     # -------------------------------------------------------------------------
     def If(self, *cond):
         self._clear_elif_cond()
@@ -1,21 +1,99 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+from collections import OrderedDict
+
+import veriloggen.core.vtypes as vtypes
+
+from . import stypes
+
 
 class Allocator(object):
+    """
+    Implement the scheduled nodes.
 
-    def __init__(self, **custom_methods):
+    initiation_interval: if greater than 1, operators of the same type
+                         in different stage slots (stage % interval)
+                         are bound to a shared functional unit
+    """
+
+    def __init__(self, initiation_interval=1, **custom_methods):
+        self.initiation_interval = initiation_interval
         self.custom_methods = custom_methods
 
-    def allocate(self, m, seq, nodes, valid_list, senable):
+        # list of the nodes bound to each shared unit
+        self.units = []
+        # object_id of node -> shared unit
+        self.shared = {}
+
+    def bind(self, nodes):
+        """ bind the operators to shared units by first-fit on the slots """
+
+        self.units = []
+        self.shared = {}
+
+        if self.initiation_interval <= 1:
+            return self.units
+
+        groups = OrderedDict()
+        for node in sorted(nodes, key=lambda x: (-1, x.object_id) if x.start_stage is None else
+                           (x.start_stage, x.object_id)):
+            if not self.is_shareable(node):
+                continue
+
+            units = groups.setdefault(_get_share_key(node), [])
+            slot = node.start_stage % self.initiation_interval
+
+            for unit in units:
+                if slot not in unit:
+                    unit[slot] = node
+                    break
+            else:
+                units.append(OrderedDict([(slot, node)]))
+
+        for units in groups.values():
+            for unit in units:
+                if len(unit) < 2:
+                    continue
+                nodes = list(unit.values())
+                self.units.append(nodes)
+                for node in nodes:
+                    self.shared[node.object_id] = nodes
+
+        return self.units
+
+    def is_shareable(self, node):
+        if node.__class__ not in _shared_types:
+            return False
+        if node.__class__.__name__ in self.custom_methods:
+            return False
+        return node.start_stage is not None
+
+    def get_stats(self):
+        ret = OrderedDict()
+        ret['initiation_interval'] = self.initiation_interval
+        ret['num_shared_units'] = len(self.units)
+        ret['num_shared_nodes'] = sum([len(unit) for unit in self.units])
+        return ret
+
+    def allocate(self, m, seq, nodes, valid_list, senable, phase=None):
         for node in sorted(nodes, key=lambda x: (-1, x.object_id) if x.start_stage is None else
                            (x.start_stage, x.object_id)):
 
+            if node.object_id in self.shared:
+                # driven by the shared unit after all the operands are implemented
+                node.sig_data = m.Wire(node.name('data'), node.bit_length(),
+                                       signed=node.get_signed())
+                continue
+
             index = node.start_stage if node.start_stage is not None else None
             svalid = (valid_list[index] if valid_list is not None and index is not None
                       else None)
             self.implement(m, seq, node, svalid, senable)
 
+        for unit in self.units:
+            self.implement_shared(m, seq, unit, senable, phase)
+
     def implement(self, m, seq, node, svalid, senable):
         if node.__class__.__name__ in self.custom_methods:
             self.custom_methods[node.__class__.__name__](node)
@@ -27,3 +105,84 @@ class Allocator(object):
 
         raise TypeError(
             "Not found implement() method for Type '%s'" % str(type(node)))
+
+    def implement_shared(self, m, seq, unit, senable, phase):
+        """
+        Implement a functional unit whose operands are selected by the phase.
+        A sample accepted at phase 0 reaches stage s at phase (s % interval),
+        so the node in that slot owns the unit in that cycle.
+        """
+
+        if phase is None:
+            raise ValueError('phase is required for shared units.')
+
+        operands = [_get_operands(node) for node in unit]
+
+        inputs = []
+        for i, var in enumerate(operands[0]):
+            width = max([ops[i].bit_length() for ops in operands])
+            inputs.append(_SharedInput(width, var.get_point(), var.get_signed()))
+
+        rep = unit[0]
+        if isinstance(rep, (stypes.Divide, stypes.Mod)):
+            shared = rep.__class__(*inputs, radix=rep.radix)
+        else:
+            shared = rep.__class__(*inputs)
+        shared.latency = rep.latency
+
+        for i, var in enumerate(inputs):
+            value = None
+            for node, ops in reversed(list(zip(unit, operands))):
+                data = _extend(ops[i].sig_data, ops[i].bit_length(),
+                               var.bit_length(), var.get_signed())
+                if value is None:
+                    value = data
+                    continue
+                slot = node.start_stage % self.initiation_interval
+                value = vtypes.Mux(phase == slot, data, value)
+
+            data = m.Wire(shared.name('in%d' % i), var.bit_length(),
+                          signed=var.get_signed())
+            data.assign(value)
+            var.sig_data = data
+
+        shared._implement(m, seq, None, senable)
+
+        for node in unit:
+            node.sig_data.assign(shared.sig_data)
+
+
+class _SharedInput(stypes._Numeric):
+    """ operand of a shared unit, selected from the operands of the nodes """
+
+    def __init__(self, width, point, signed):
+        stypes._Numeric.__init__(self)
+        self.width = width
+        self.point = point
+        self.signed = signed
+
+
+# operators that are bound to shared units
+_shared_types = (stypes.Times, stypes.Divide, stypes.Mod, stypes._MulAdd)
+
+
+def _get_operands(node):
+    if isinstance(node, stypes._SpecialOperator):
+        return node.args
+    return [node.left, node.right]
+
+
+def _get_share_key(node):
+    """ nodes with the same key produce the same result on a unit """
+    operands = tuple([(var.get_point(), var.get_signed())
+                      for var in _get_operands(node)])
+    return (node.__class__.__name__, node.latency, getattr(node, 'radix', None),
+            node.bit_length(), node.get_point(), node.get_signed(), operands)
+
+
+def _extend(value, width, new_width, signed):
+    if not signed or width >= new_width:
+        return value
+    if isinstance(value, vtypes.Int):
+        return vtypes.Int(value.value, width=new_width, signed=value.signed)
+    return vtypes.Cat(vtypes.Repeat(value[width - 1], new_width - width), value)
@@ -0,0 +1,239 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+from . import stypes
+
+
+class Graph(object):
+    """
+    Indexed DAG of stream nodes, built once per Stream.implement().
+
+    order: nodes in topological order (post-order from the root nodes)
+    index: object_id -> position in order
+    fanin: positions of the input nodes of each node
+    fanout: positions of the consumer nodes of each node
+    ports: port names of each input, e.g. {fanin position: ('right', )}
+    """
+
+    def __init__(self, nodes, sort=True):
+        self.order = []
+        self.index = {}
+        self.fanin = []
+        self.fanout = []
+        self.ports = []
+
+        roots = sorted(nodes, key=lambda x: x.object_id) if sort else nodes
+        self.roots = [_resolve(root) for root in roots]
+        self._build()
+
+    def _build(self):
+        NEW, ACTIVE, DONE = 0, 1, 2
+        state = {}
+        edges = {}
+
+        for root in self.roots:
+            if state.get(root.object_id) == DONE:
+                continue
+            stack = [(root, False)]
+            while stack:
+                node, expanded = stack.pop()
+                key = node.object_id
+
+                if expanded:
+                    state[key] = DONE
+                    self.index[key] = len(self.order)
+                    self.order.append(node)
+                    continue
+
+                s = state.get(key, NEW)
+                if s == DONE:
+                    continue
+                if s == ACTIVE:
+                    raise ValueError("Loop detected.")
+
+                state[key] = ACTIVE
+                stack.append((node, True))
+                node_edges = _get_edges(node)
+                edges[key] = node_edges
+                for var, port in reversed(node_edges):
+                    s = state.get(var.object_id, NEW)
+                    if s == ACTIVE:
+                        raise ValueError("Loop detected.")
+                    if s == NEW:
+                        stack.append((var, False))
+
+        for node in self.order:
+            fanin = []
+            ports = {}
+            for var, port in edges[node.object_id]:
+                pos = self.index[var.object_id]
+                if pos not in ports:
+                    fanin.append(pos)
+                    ports[pos] = ()
+                ports[pos] += (port, )
+            self.fanin.append(fanin)
+            self.ports.append(ports)
+            self.fanout.append([])
+
+        for pos, fanin in enumerate(self.fanin):
+            for i in fanin:
+                self.fanout[i].append(pos)
+
+    def __len__(self):
+        return len(self.order)
+
+    def get_fanin(self, node):
+        order = self.order
+        return [order[i] for i in self.fanin[self.index[node.object_id]]]
+
+    def get_fanout(self, node):
+        order = self.order
+        return [order[i] for i in self.fanout[self.index[node.object_id]]]
+
+    def get_order(self, skip_ports=()):
+        """ nodes in topological order, except the ones only used by skip_ports """
+        if not skip_ports:
+            return self.order
+        live = self._mark(self.roots, skip_ports)
+        return [node for pos, node in enumerate(self.order) if live[pos]]
+
+    def get_inputs(self):
+        """ input variables, as InputVisitor """
+        return set([node for node in self.order
+                    if isinstance(node, stypes._Variable)])
+
+    def get_outputs(self):
+        """ nodes with output, except the ones only used for reset, as OutputVisitor """
+        return set([node for node in self.get_order(skip_ports=('reset', ))
+                    if node._has_output()])
+
+    def subgraph(self, roots):
+        """ graph of the nodes reachable from roots, without traversing nodes again """
+        sub = Graph.__new__(Graph)
+        sub.order = []
+        sub.index = {}
+        sub.fanin = []
+        sub.fanout = []
+        sub.ports = []
+        sub.roots = [_resolve(root)
+                     for root in sorted(roots, key=lambda x: x.object_id)]
+
+        # post-order on the fan-in arrays
+        visited = [False] * len(self.order)
+        positions = []
+        for root in sub.roots:
+            stack = [(self.index[root.object_id], False)]
+            while stack:
+                pos, expanded = stack.pop()
+                if expanded:
+                    positions.append(pos)
+                    continue
+                if visited[pos]:
+                    continue
+                visited[pos] = True
+                stack.append((pos, True))
+                for i in reversed(self.fanin[pos]):
+                    if not visited[i]:
+                        stack.append((i, False))
+
+        remap = {}
+        for new, pos in enumerate(positions):
+            remap[pos] = new
+            node = self.order[pos]
+            sub.index[node.object_id] = new
+            sub.order.append(node)
+
+        for pos in positions:
+            sub.fanin.append([remap[i] for i in self.fanin[pos]])
+            sub.ports.append(dict([(remap[i], ports)
+                                   for i, ports in self.ports[pos].items()]))
+            sub.fanout.append([remap[i] for i in self.fanout[pos] if i in remap])
+
+        return sub
+
+    def _mark(self, roots, skip_ports=()):
+        live = [False] * len(self.order)
+        for root in roots:
+            live[self.index[root.object_id]] = True
+
+        for pos in range(len(self.order) - 1, -1, -1):
+            if not live[pos]:
+                continue
+            ports = self.ports[pos]
+            for i in self.fanin[pos]:
+                for port in ports[i]:
+                    if port not in skip_ports:
+                        live[i] = True
+                        break
+
+        return live
+
+
+def _resolve(node):
+    """ returns the source node of a variable alias """
+    while (isinstance(node, stypes._Variable) and
+           isinstance(node.input_data, stypes._Numeric)):
+        node = node.input_data
+    return node
+
+
+def _input_attrs(node, skip_ports=()):
+    """ attribute names of the input nodes, except the ports in skip_ports """
+
+    if isinstance(node, stypes.Substream):
+        attrs = ()
+    elif isinstance(node, stypes.RingBuffer):
+        attrs = ('right', 'enable', 'reset')
+    elif isinstance(node, (stypes._RingBufferOutput, stypes.Scratchpad)):
+        attrs = ('left', 'right', 'enable', 'reset')
+    elif isinstance(node, stypes._ScratchpadOutput):
+        attrs = ('left', 'right')
+    elif isinstance(node, stypes._Accumulator):
+        attrs = ('right', 'initval', 'enable', 'reset', 'size')
+    elif isinstance(node, stypes._BinaryOperator):
+        attrs = ('left', 'right')
+    elif isinstance(node, stypes._UnaryOperator):
+        attrs = ('right', )
+    elif isinstance(node, (stypes._SpecialOperator, stypes._Variable,
+                           stypes._Constant)):
+        attrs = ()
+    else:
+        raise TypeError("Type '%s' is not supported." % str(type(node)))
+
+    return tuple([attr for attr in attrs if attr not in skip_ports])
+
+
+def _get_inputs(node, skip_ports=()):
+    """ input nodes, as referred by node, in visiting order """
+
+    ret = [getattr(node, attr) for attr in _input_attrs(node, skip_ports)]
+    if isinstance(node, stypes._SpecialOperator) and 'args' not in skip_ports:
+        ret.extend(node.args)
+    return [var for var in ret if var is not None]
+
+
+def _apply_inputs(node, func, skip_ports=()):
+    """ replace each input var of node with func(var) """
+
+    for attr in _input_attrs(node, skip_ports):
+        var = getattr(node, attr)
+        if var is not None:
+            setattr(node, attr, func(var))
+    if isinstance(node, stypes._SpecialOperator) and 'args' not in skip_ports:
+        node.args = [func(var) for var in node.args]
+
+
+def _get_edges(node):
+    """ pairs of input node and port name, in visiting order """
+
+    ret = []
+    for attr in _input_attrs(node):
+        var = getattr(node, attr)
+        if var is not None:
+            ret.append((_resolve(var), attr))
+
+    if isinstance(node, stypes._SpecialOperator):
+        for var in node.args:
+            ret.append((_resolve(var), 'args'))
+
+    return ret
@@ -1,7 +1,9 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+import veriloggen.core.vtypes as vtypes
 import veriloggen.verilog.from_verilog as from_verilog
+from veriloggen.core.module import Module
 
 divider_code = """\
 module Divider #
@@ -161,3 +163,155 @@ def get_div():
         __m = from_verilog.read_verilog_module_str(divider_code)
         div = __m['Divider']
     return div
+
+
+def get_latency(width, radix=2):
+    """ latency of Divide/Mod: the registers around the divider,
+    the input stage, the stages of the quotient bits, and the output """
+
+    radix_bits = _get_radix_bits(radix)
+    return (width + radix_bits - 1) // radix_bits + 5
+
+
+def _get_radix_bits(radix):
+    if not isinstance(radix, int) or radix < 2 or radix & (radix - 1) != 0:
+        raise ValueError('radix must be a power of 2, not %s' % str(radix))
+    return radix.bit_length() - 1
+
+
+# key: (width, radix), value: divider definition
+div_radix = {}
+
+
+def get_div_radix(width, radix):
+    key = (width, radix)
+    if key not in div_radix:
+        div_radix[key] = mkDividerRadix(width, radix)
+    return div_radix[key]
+
+
+def mkDividerRadix(width, radix):
+    """
+    Divider of the same ports and algorithm as Divider,
+    which decides log2(radix) quotient bits by restoring steps in a stage
+    """
+
+    radix_bits = _get_radix_bits(radix)
+    num_stages = (width + radix_bits - 1) // radix_bits
+    num_steps = num_stages * radix_bits
+    xwidth = width + num_steps
+
+    m = Module('DividerRadix%d_%d' % (radix, width))
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    in_a = m.Input('in_a', width)
+    in_b = m.Input('in_b', width)
+    update = m.Input('update')
+    enable = m.Input('enable')
+    rslt = m.OutputReg('rslt', width)
+    mod = m.OutputReg('mod', width)
+    valid = m.OutputReg('valid')
+
+    abs_in_a = m.Wire('abs_in_a', width)
+    abs_in_a.assign(vtypes.Mux(in_a[width - 1], vtypes.Unot(in_a) + 1, in_a))
+    abs_in_b = m.Wire('abs_in_b', width)
+    abs_in_b.assign(vtypes.Mux(in_b[width - 1], vtypes.Unot(in_b) + 1, in_b))
+
+    def complement2(v):
+        return vtypes.Unot(v) + 1
+
+    stage_valid = None
+    a_positive = None
+    b_positive = None
+    dividend = None
+    divisor = None
+    stage_rslt = None
+
+    for d in range(num_stages + 1):
+        next_valid = m.Reg('stage_valid_%d' % d)
+        next_a_positive = m.Reg('in_a_positive_%d' % d)
+        next_b_positive = m.Reg('in_b_positive_%d' % d)
+        next_dividend = m.Reg('dividend_%d' % d, xwidth)
+        next_divisor = m.Reg('divisor_%d' % d, xwidth)
+        next_rslt = m.Reg('stage_rslt_%d' % d, num_steps)
+
+        if d == 0:
+            m.Always(vtypes.Posedge(clk))(
+                vtypes.If(rst)(
+                    next_valid(0),
+                    next_a_positive(0),
+                    next_b_positive(0)
+                ).Elif(update)(
+                    next_valid(enable),
+                    next_a_positive(in_a[width - 1] == 0),
+                    next_b_positive(in_b[width - 1] == 0)
+                )
+            )
+            m.Always(vtypes.Posedge(clk))(
+                vtypes.If(update)(
+                    next_dividend(abs_in_a),
+                    next_divisor(vtypes.Sll(abs_in_b, num_steps - 1)),
+                    next_rslt(0)
+                )
+            )
+
+        else:
+            # restoring steps of the previous stage
+            step_dividend = dividend
+            step_divisor = divisor
+            step_rslt = stage_rslt
+            for k in range(radix_bits):
+                sub_value = m.Wire('sub_value_%d_%d' % (d - 1, k), xwidth)
+                sub_value.assign(step_dividend - step_divisor)
+                is_large = vtypes.Not(sub_value[xwidth - 1])
+
+                new_dividend = m.Wire('step_dividend_%d_%d' % (d - 1, k), xwidth)
+                new_dividend.assign(vtypes.Mux(is_large, sub_value, step_dividend))
+                step_dividend = new_dividend
+                step_divisor = vtypes.Srl(step_divisor, 1)
+                step_rslt = vtypes.Cat(step_rslt, is_large)
+
+            m.Always(vtypes.Posedge(clk))(
+                vtypes.If(rst)(
+                    next_valid(0),
+                    next_a_positive(0),
+                    next_b_positive(0)
+                ).Elif(update)(
+                    next_valid(stage_valid),
+                    next_a_positive(a_positive),
+                    next_b_positive(b_positive)
+                )
+            )
+            m.Always(vtypes.Posedge(clk))(
+                vtypes.If(update)(
+                    next_dividend(step_dividend),
+                    next_divisor(step_divisor),
+                    next_rslt(step_rslt)
+                )
+            )
+
+        stage_valid = next_valid
+        a_positive = next_a_positive
+        b_positive = next_b_positive
+        dividend = next_dividend
+        divisor = next_divisor
+        stage_rslt = next_rslt
+
+    remainder = dividend[0:width]
+
+    m.Always(vtypes.Posedge(clk))(
+        vtypes.If(rst)(
+            valid(0)
+        ).Elif(update)(
+            valid(stage_valid)
+        )
+    )
+    m.Always(vtypes.Posedge(clk))(
+        vtypes.If(update)(
+            rslt(vtypes.Mux(a_positive == b_positive,
+                            stage_rslt, complement2(stage_rslt))),
+            mod(vtypes.Mux(a_positive, remainder, complement2(remainder)))
+        )
+    )
+
+    return m
@@ -0,0 +1,120 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+from collections import OrderedDict
+
+import numpy as np
+
+# values wider than this are decoded into Python integers (dtype=object)
+_max_int64_width = 63
+
+# kinds of the entries whose records have an address instead of the age
+_ram_kinds = ('read', 'write')
+
+
+def read_dump(filename, raw=True):
+    """
+    Load a binary dump of Stream (dump_format='binary') into NumPy arrays.
+
+    raw: if False, values are real numbers, converted with the fixed-point position
+    returns: OrderedDict of the variable name to an OrderedDict of the entry
+             information (kind, name, stage, width, point, signed)
+             and the arrays of the records (step, age or addr, value).
+             Stream variables are keyed by the signal names,
+             and the others by '(kind) name', e.g. '(in) xdata'.
+    """
+
+    with open(filename, 'rb') as f:
+        data = f.read()
+
+    entries, record_words, pos = _read_header(data)
+
+    body = data[pos:]
+    num_records = len(body) // (4 * record_words)
+    words = np.frombuffer(body, dtype='<u4', count=num_records * record_words)
+    words = words.reshape((num_records, record_words))
+
+    ret = OrderedDict()
+    for index, entry in enumerate(entries):
+        records = words[words[:, 0] == index]
+
+        info = OrderedDict(entry)
+        info['step'] = records[:, 1].astype(np.int64)
+        tag = 'addr' if entry['kind'] in _ram_kinds else 'age'
+        info[tag] = records[:, 2].astype(np.int64)
+
+        values = _to_int(records[:, 3:], entry['width'], entry['signed'])
+        if not raw and entry['point'] > 0:
+            values = values.astype(np.float64) / (2 ** entry['point'])
+        elif not raw and entry['point'] < 0:
+            values = values * (2 ** -entry['point'])
+        info['value'] = values
+
+        if entry['kind'] == 'var':
+            key = entry['name']
+        else:
+            key = '(%s) %s' % (entry['kind'], entry['name'])
+        ret[key] = info
+
+    return ret
+
+
+def _read_header(data):
+    entries = []
+    record_words = None
+    pos = 0
+
+    while True:
+        end = data.find(b'\n', pos)
+        if end < 0:
+            raise ValueError('No end of the dump header.')
+
+        line = data[pos:end].decode('ascii').split()
+        pos = end + 1
+
+        if record_words is None:
+            if len(line) != 2 or line[0] != 'veriloggen_dump':
+                raise ValueError('Not a binary dump of veriloggen.')
+            record_words = int(line[1])
+            continue
+
+        if line == ['end']:
+            return entries, record_words, pos
+
+        index, kind, name, stage, width, point, signed = line
+        if int(index) != len(entries):
+            raise ValueError("Illegal index '%s' in the dump header." % index)
+
+        entry = OrderedDict()
+        entry['kind'] = kind
+        entry['name'] = name
+        entry['stage'] = int(stage)
+        entry['width'] = int(width)
+        entry['point'] = int(point)
+        entry['signed'] = bool(int(signed))
+        entries.append(entry)
+
+
+def _to_int(words, width, signed):
+    """ compose the little-endian 32-bit words, and sign-extend the value """
+
+    num_words = (width + 31) // 32
+
+    if width <= _max_int64_width:
+        values = np.zeros(words.shape[0], dtype=np.int64)
+        for i in range(num_words):
+            values |= words[:, i].astype(np.int64) << (32 * i)
+        values &= (1 << width) - 1
+        if signed:
+            sign = values >= (1 << (width - 1))
+            values[sign] -= 1 << width
+        return values
+
+    values = np.zeros(words.shape[0], dtype=object)
+    for i in range(num_words):
+        values |= words[:, i].astype(object) << (32 * i)
+    values &= (1 << width) - 1
+    if signed:
+        sign = values >= (1 << (width - 1))
+        values[sign] -= 1 << width
+    return values
@@ -0,0 +1,770 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+from collections import OrderedDict
+from math import log, ceil
+
+import numpy as np
+
+import veriloggen.core.vtypes as vtypes
+
+from . import stypes
+from .dag import Graph
+
+# values wider than this are computed with Python integers (dtype=object)
+_max_int64_width = 62
+
+
+class Executor(object):
+    """
+    Bit-accurate reference model of a stream graph on NumPy arrays.
+
+    Each node is evaluated once, vectorized over the sequence of the input samples.
+    A value is the raw integer (fixed-point) representation of the hardware signal,
+    truncated and sign-extended as the generated pipeline does.
+    The stream is assumed to receive one sample per cycle without bubbles.
+    RingBuffer and Scratchpad require the stage numbers of Stream.implement().
+    The accumulators with a reset, with both a size and an enable, with
+    a run-time size, or with other operators than Plus and Minus are
+    evaluated sample by sample in Python (the slow path).
+    The writes to a Substream with a condition are not supported.
+
+    custom_methods: dict of operator class name to a function,
+                    which receives (executor, node) and returns the values
+    """
+
+    def __init__(self, strm, **custom_methods):
+        self.strm = strm
+        self.custom_methods = custom_methods
+
+        self.length = 0
+        self.inputs = {}
+        self.raw = True
+        self.nodes = OrderedDict()
+        self.values = OrderedDict()
+        self.substreams = {}
+
+    def run(self, inputs, length=None, raw=True):
+        """
+        inputs: dict of input name to a sequence (or a scalar) of the sample values
+        raw: if False, values are real numbers, converted with the fixed-point position
+        returns: OrderedDict of output name to the output values
+        """
+
+        self.length = _get_length(inputs, length)
+        self.inputs = inputs
+        self.raw = raw
+        self.nodes = OrderedDict()
+        self.values = OrderedDict()
+        self.substreams = {}
+
+        nodes = list(self.strm.nodes)
+        if self.strm.implemented and self.strm.last_output is not None:
+            outputs = self.strm.last_output
+            nodes.extend(outputs)
+        else:
+            outputs = Graph(nodes).get_outputs()
+
+        g = Graph(nodes)
+        for node in g.order:
+            self.nodes[node.object_id] = node
+            self.values[node.object_id] = self.eval(node)
+
+        ret = OrderedDict()
+        for node in sorted(outputs, key=lambda x: x.object_id):
+            name = str(node.output_data)
+            ret[name] = self.to_output(node, self.get_value(node))
+
+        return ret
+
+    def get_value(self, node):
+        return self.values[node.object_id]
+
+    def get_trace(self):
+        """ values of the implemented signals, keyed by the signal name as add_dump """
+        ret = OrderedDict()
+        for object_id, value in self.values.items():
+            node = self.nodes[object_id]
+            sig_data = getattr(node, 'sig_data', None)
+            if isinstance(sig_data, vtypes._Variable):
+                ret[sig_data.name] = value
+        return ret
+
+    def to_output(self, node, values):
+        if self.raw or node.get_point() <= 0:
+            return values
+        return values.astype(np.float64) / (2 ** node.get_point())
+
+    def eval(self, node):
+        name = node.__class__.__name__
+        if name in self.custom_methods:
+            return np.asarray(self.custom_methods[name](self, node))
+
+        for cls in node.__class__.__mro__:
+            method = getattr(self, 'eval_' + cls.__name__, None)
+            if method is not None:
+                return method(node)
+
+        raise TypeError("Type '%s' is not supported." % str(type(node)))
+
+    # -------------------------------------------------------------------------
+    def eval__Constant(self, node):
+        if not isinstance(node.value, int):
+            raise TypeError("Constant of type '%s' is not supported." %
+                            str(type(node.value)))
+        values = np.full(self.length, node.value,
+                         dtype=_dtype(node.bit_length()))
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    def eval__Variable(self, node):
+        name = _get_name(node.input_data)
+        if name in self.inputs:
+            values = self.inputs[name]
+        elif getattr(node, 'value', None) is not None:
+            values = node.value
+        elif isinstance(node.input_data, vtypes.Int):
+            values = node.input_data.value
+        elif isinstance(node.input_data, (int, bool)):
+            values = int(node.input_data)
+        else:
+            raise ValueError("No input values for '%s'" % name)
+
+        if not self.raw and node.get_point() != 0:
+            values = np.trunc(np.asarray(values, dtype=np.float64) *
+                              (2.0 ** node.get_point()))
+
+        values = np.asarray(values)
+        if values.ndim == 0:
+            values = np.full(self.length, values)
+        values = values.astype(_dtype(node.bit_length()))
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    def eval__BinaryOperator(self, node):
+        signed = node.left.get_signed() and node.right.get_signed()
+        left, right = self._adjust(node.left, node.right, signed)
+
+        func = _binary_funcs.get(node.__class__.__name__, None)
+        if func is None:
+            raise TypeError("Type '%s' is not supported." % str(type(node)))
+
+        return _wrap(func(left, right), node.bit_length(), node.get_signed())
+
+    def eval__BinaryShiftOperator(self, node):
+        width = max(node.left.bit_length(), node.bit_length())
+        shift = np.minimum(self._operand(node.right, False), width)
+        left = _fit(self._operand(node.left, node.left.get_signed()), 2 * width)
+
+        if isinstance(node, stypes.Sll):
+            values = left << shift
+        elif isinstance(node, stypes.Sra) and node.left.get_signed():
+            values = left >> shift
+        else:
+            values = _unsigned(left, node.left.bit_length()) >> shift
+
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    def eval__BinaryLogicalOperator(self, node):
+        signed = node.left.get_signed() and node.right.get_signed()
+        left = self._operand(node.left, signed)
+        right = self._operand(node.right, signed)
+
+        func = _binary_funcs.get(node.__class__.__name__, None)
+        if func is None:
+            raise TypeError("Type '%s' is not supported." % str(type(node)))
+
+        return _wrap(func(left, right), node.bit_length(), node.get_signed())
+
+    def eval_Times(self, node):
+        lwidth = node.left.bit_length()
+        rwidth = node.right.bit_length()
+        width = lwidth + rwidth
+        signed = node.get_signed()
+
+        # the multiplier extends each operand with its own sign
+        left = _fit(self._operand(node.left, node.left.get_signed()), width + 2)
+        right = _fit(self._operand(node.right, node.right.get_signed()), width + 2)
+        values = _wrap(left * right, width, signed)
+
+        shift_size = node.left.get_point() + node.right.get_point() - node.get_point()
+        if shift_size > 0:
+            values = values >> shift_size
+
+        return _wrap(values, node.bit_length(), signed)
+
+    def eval_Divide(self, node):
+        return self._divide(node)[0]
+
+    def eval_Mod(self, node):
+        return self._divide(node)[1]
+
+    def _divide(self, node):
+        width = node.bit_length()
+        signed = node.get_signed()
+        mask = _mask(width)
+
+        left, right = self._adjust(node.left, node.right, signed)
+        left = _fit(left, 2 * width) & mask
+        right = _fit(right, 2 * width) & mask
+
+        lmsb = (left >> (width - 1)) & 1
+        rmsb = (right >> (width - 1)) & 1
+        osign = lmsb ^ rmsb
+
+        if node.left.get_signed():
+            left = np.where(lmsb == 1, (-left) & mask, left)
+        if node.right.get_signed():
+            right = np.where(rmsb == 1, (-right) & mask, right)
+
+        quotient, remainder = _divider(left, right, width)
+
+        if signed:
+            quotient = np.where(osign == 1, (-quotient) & mask, quotient)
+            remainder = np.where(osign == 1, (-remainder) & mask, remainder)
+
+        return (_wrap(quotient, width, signed),
+                _wrap(remainder, width, signed))
+
+    def eval__UnaryOperator(self, node):
+        func = _unary_funcs.get(node.__class__.__name__, None)
+        if func is None:
+            raise TypeError("Type '%s' is not supported." % str(type(node)))
+
+        width = node.right.bit_length()
+        right = self._operand(node.right, node.right.get_signed())
+        return _wrap(func(right, width), node.bit_length(), node.get_signed())
+
+    def eval_Cast(self, node):
+        rpoint = node.right.get_point()
+        point = node.get_point()
+        right = self._operand(node.right, node.right.get_signed())
+
+        if rpoint > point:
+            right = right >> (rpoint - point)
+        elif rpoint < point:
+            right = _fit(right, node.right.bit_length() + point - rpoint) << (point - rpoint)
+
+        return _wrap(right, node.bit_length(), node.get_signed())
+
+    def eval_ReinterpretCast(self, node):
+        right = self._operand(node.right, node.right.get_signed())
+        return _wrap(right, node.bit_length(), node.get_signed())
+
+    def eval__Delay(self, node):
+        return self.get_value(node.right)
+
+    def eval__Prev(self, node):
+        right = self.get_value(node.right)
+        values = np.zeros_like(right)
+        values[1:] = right[:-1]
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    def eval__SpecialOperator(self, node):
+        if isinstance(node, stypes._PlusN):
+            signed = all([arg.get_signed() for arg in node.args])
+            width = max([arg.bit_length() for arg in node.args]) + len(node.args)
+            values = 0
+            for arg in node.args:
+                values = values + _fit(self._operand(arg, signed), width)
+            return _wrap(values, node.bit_length(), node.get_signed())
+
+        raise TypeError("Type '%s' is not supported." % str(type(node)))
+
+    def eval_Pointer(self, node):
+        width = node.var.bit_length()
+        var = self._operand(node.var, False)
+        pos = np.minimum(self._operand(node.pos, False), width)
+        return (var >> pos) & 1
+
+    def eval_Slice(self, node):
+        var = self._operand(node.var, False)
+        values = var >> node.lsb.eval()
+        return _wrap(values, node.bit_length(), False)
+
+    def eval_Cat(self, node):
+        values = np.zeros(self.length, dtype=_dtype(node.bit_length()))
+        for var in node.vars:
+            values = (values << var.bit_length()) | _fit(self._operand(var, False),
+                                                         node.bit_length())
+        return values
+
+    def eval_Repeat(self, node):
+        var = _fit(self._operand(node.var, False), node.bit_length())
+        values = np.zeros(self.length, dtype=_dtype(node.bit_length()))
+        for i in range(node.times.eval()):
+            values = (values << node.var.bit_length()) | var
+        return values
+
+    def eval_Cond(self, node):
+        # no fixed-point adjustment, as the generated '?:' operator
+        signed = node.true_value.get_signed() and node.false_value.get_signed()
+        condition = self.get_value(node.condition)
+        true_value = self._operand(node.true_value, signed)
+        false_value = self._operand(node.false_value, signed)
+        values = np.where(condition != 0, true_value, false_value)
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    def eval_LUT(self, node):
+        size = int(log(len(node.patterns), 2))
+        address = _unsigned(self.get_value(node.address), size)
+        patterns = np.array([int(p) for p in node.patterns] + [0],
+                            dtype=_dtype(node.bit_length()))
+        # out of range: the ROM keeps the previous value
+        valid = address < len(node.patterns)
+        values = _hold(patterns[np.where(valid, address, len(node.patterns))],
+                       valid, 0)
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    def eval_Complement2(self, node):
+        var = self._operand(node.var, node.var.get_signed())
+        return _wrap(-var, node.bit_length(), node.get_signed())
+
+    def eval_Abs(self, node):
+        var = self._operand(node.var, node.var.get_signed())
+        return _wrap(np.where(var < 0, -var, var), node.bit_length(), node.get_signed())
+
+    def eval_Sign(self, node):
+        var = self._operand(node.var, node.var.get_signed())
+        return (var < 0).astype(np.int64)
+
+    def eval__MulAdd(self, node):
+        width = max(node.a.bit_length() + node.b.bit_length(),
+                    node.c.bit_length()) + 2
+        a = _fit(self._operand(node.a, node.a.get_signed()), width)
+        b = _fit(self._operand(node.b, node.b.get_signed()), width)
+        c = _fit(self._operand(node.c, node.c.get_signed()), width)
+        return _wrap(a * b + c, node.bit_length(), node.get_signed())
+
+    def eval_Predicate(self, node):
+        data = self.get_value(node.args[0])
+        if len(node.args) < 2:
+            return data
+        when = self.get_value(node.args[1]) != 0
+        return _hold(data, when, 0)
+
+    def eval__Accumulator(self, node):
+        width = node.bit_length()
+        signed = node.get_signed()
+
+        # for Pulse
+        if not node.ops and node.size is not None:
+            width = 1
+
+        if node.enable is None:
+            vectorized = (node.size is None or
+                          isinstance(node.size, stypes._Constant))
+            vectorized &= node.ops in ((vtypes.Plus, ), (vtypes.Minus, )) or not node.ops
+        else:
+            vectorized = (node.size is None and
+                          node.ops in ((vtypes.Plus, ), (vtypes.Minus, )))
+
+        if vectorized and node.reset is None:
+            return self._reduce(node, width, signed)
+
+        return self._accumulate(node, width, signed)
+
+    def _reduce(self, node, width, signed):
+        """
+        vectorized ReduceAdd, ReduceSub and Pulse without reset,
+        with a constant size or with an enable
+        """
+
+        index = np.arange(self.length)
+        if node.size is not None:
+            size = node.size.eval()
+            count = index % size
+        else:
+            size = None
+            count = index
+
+        if not node.ops:
+            return (count >= size - 1).astype(np.int64)
+
+        sum_width = node.right.bit_length() + int(self.length).bit_length() + 1
+        right = _fit(self._operand(node.right, signed and node.right.get_signed()),
+                     sum_width)
+        if node.enable is not None:
+            right = np.where(self.get_value(node.enable) != 0, right, 0)
+        total = np.cumsum(right)
+        start = index - count
+        base = np.where(start > 0, total[np.maximum(start - 1, 0)], 0)
+        values = total - base
+
+        initval = node.initval.eval()
+        if node.ops == (vtypes.Minus, ):
+            values = initval - values
+        else:
+            values = initval + values
+
+        return _wrap(values, width, signed)
+
+    def _accumulate(self, node, width, signed):
+        """
+        cycle-by-cycle accumulator, same as the generated sequential logic.
+        This is the slow path of a Python loop over the samples, taken by
+        the accumulators with a reset, with a size and an enable, with
+        a run-time size, or with operators other than Plus and Minus.
+        """
+
+        context = signed and node.right.get_signed()
+        xs = self._operand(node.right, context).tolist()
+        enables = (self.get_value(node.enable).tolist()
+                   if node.enable is not None else None)
+        resets = (self.get_value(node.reset).tolist()
+                  if node.reset is not None else None)
+        sizes = (self._operand(node.size, False).tolist()
+                 if node.size is not None else None)
+        initval = _wrap_int(node.initval.eval(), width, signed)
+
+        data = initval
+        count = 0
+        ret = []
+
+        for i in range(self.length):
+            x = xs[i]
+            enable = enables is None or enables[i] != 0
+            reset = resets is not None and resets[i] != 0
+            size = sizes[i] if sizes is not None else None
+            count_zero = count == 0
+            next_count = count
+
+            value = self._apply_ops(node, data, x, count, size, width, signed)
+            reset_value = self._apply_ops(node, initval, x, count, size,
+                                          width, signed)
+
+            if enable:
+                data = value
+                if size is not None:
+                    next_count = 0 if count >= size - 1 else count + 1
+
+            if reset:
+                if enables is None:
+                    data = reset_value
+                    if size is not None:
+                        next_count = 0
+                        if count_zero:
+                            data = reset_value
+                else:
+                    data = initval
+                    if enable:
+                        data = reset_value
+                        if size is not None:
+                            next_count = 0
+                    if size is not None and enable and count_zero:
+                        data = reset_value
+
+            elif size is not None and enable and count_zero:
+                data = reset_value
+
+            count = next_count
+            ret.append(data)
+
+        return np.array(ret, dtype=_dtype(width))
+
+    def _apply_ops(self, node, value, x, count, size, width, signed):
+        # for Pulse
+        if not node.ops and size is not None:
+            return int(count >= size - 1)
+
+        for op in node.ops:
+            if not isinstance(op, type):
+                value = op(value, x)
+            elif op.__name__ in _binary_funcs and issubclass(op, vtypes._BinaryOperator):
+                value = _binary_funcs[op.__name__](value, x)
+            elif op.__name__ in _unary_funcs and issubclass(op, vtypes._UnaryOperator):
+                value = _unary_funcs[op.__name__](value, width)
+            else:
+                raise TypeError("Operator '%s' is not supported." % str(op))
+
+            if not isinstance(value, (int, bool, np.integer)):
+                raise TypeError("Operator '%s' returns unsupported object type '%s'."
+                                % (str(op), str(type(value))))
+
+        return _wrap_int(int(value), width, signed)
+
+    def eval_RingBuffer(self, node):
+        return self.get_value(node.right)
+
+    def eval__RingBufferOutput(self, node):
+        buf = node.buf
+        length = buf.length
+        addrwidth = _addrwidth(length)
+        distance = self._distance(buf, node)
+
+        data = self._operand(buf.right, buf.right.get_signed())
+        offset = self._operand(node.right, False)
+
+        enables = np.ones(self.length, dtype=bool)
+        if buf.enable is not None:
+            enables &= self.get_value(buf.enable) != 0
+        resets = np.zeros(self.length, dtype=bool)
+        if buf.reset is not None:
+            resets |= self.get_value(buf.reset) != 0
+
+        wenables = enables & ~resets
+        # the hold condition of the write address is the enable alone,
+        # if the buffer has no reset
+        if buf.reset is not None:
+            incs = wenables.astype(np.int64)
+        else:
+            incs = np.zeros(self.length, dtype=np.int64)
+        waddrs = (np.cumsum(incs) - incs) % length
+
+        raddrs = waddrs + offset
+        raddrs = np.where(raddrs >= length, raddrs - length, raddrs)
+        raddrs = raddrs & _mask(addrwidth)
+
+        values = self._read_memory(data, waddrs, wenables,
+                                   raddrs, distance)
+        values = _unsigned(values, buf.bit_length())
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    def eval_Scratchpad(self, node):
+        return self.get_value(node.left)
+
+    def eval__ScratchpadOutput(self, node):
+        sp = node.sp
+        addrwidth = _addrwidth(sp.length)
+        distance = self._distance(sp, node)
+
+        data = self._operand(sp.left, sp.left.get_signed())
+        waddrs = _unsigned(self._operand(sp.right, False), addrwidth)
+        raddrs = _unsigned(self._operand(node.right, False), addrwidth)
+
+        wenables = np.ones(self.length, dtype=bool)
+        if sp.enable is not None:
+            wenables &= self.get_value(sp.enable) != 0
+        if sp.reset is not None:
+            wenables &= self.get_value(sp.reset) == 0
+
+        values = self._read_memory(data, waddrs, wenables,
+                                   raddrs, distance)
+        values = _unsigned(values, sp.bit_length())
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    def _distance(self, mem, node):
+        if mem.start_stage is None or node.start_stage is None:
+            raise ValueError("'%s' requires the stage numbers: run Stream.implement() first."
+                             % node.__class__.__name__)
+        return node.start_stage - mem.start_stage
+
+    def _read_memory(self, data, waddrs, wenables, raddrs, distance):
+        """
+        synchronous RAM: a read sees the writes of the same and earlier cycles.
+        The read at cycle i returns the latest enabled write to the same address
+        at or before cycle i + distance, or 0 if the address is never written.
+        """
+
+        data = np.asarray(data)
+        waddrs = np.asarray(waddrs, dtype=np.int64)
+        raddrs = np.asarray(raddrs, dtype=np.int64)
+        index = np.arange(self.length, dtype=np.int64)
+
+        # the writes sorted by (address, cycle), keyed as a single integer
+        span = self.length + 1
+        windex = index[np.asarray(wenables, dtype=bool)]
+        wkeys = waddrs[windex] * span + windex + 1
+        order = np.argsort(wkeys, kind='stable')
+        wkeys = wkeys[order]
+        wdata = data[windex[order]]
+
+        # the latest write of the address, which is visible to each read
+        last = np.clip(index + distance, -1, self.length - 1)
+        rkeys = raddrs * span + last + 1
+        pos = np.searchsorted(wkeys, rkeys, side='right') - 1
+        safe_pos = np.maximum(pos, 0)
+        found = pos >= 0
+        if len(wkeys) > 0:
+            found &= wkeys[safe_pos] // span == raddrs
+        else:
+            wdata = np.zeros(1, dtype=data.dtype)
+
+        return np.where(found, wdata[safe_pos], 0).astype(object)
+
+    def eval_Substream(self, node):
+        for name, cond in node.conds.items():
+            if cond is not None:
+                raise NotImplementedError(
+                    "conditional write to '%s' of Substream is not supported." % name)
+
+        # the node itself carries no data (its signal is a constant 0):
+        # the values are read by _SubstreamOutput from the child executor
+        return np.zeros(self.length, dtype=np.int64)
+
+    def eval__SubstreamOutput(self, node):
+        sub = node.right
+        substrm = sub.substrm
+        if sub.object_id not in self.substreams:
+            inputs = {}
+            for arg, name in zip(sub.args, sub.conds.keys()):
+                inputs[name] = self.get_value(arg)
+            executor = type(self)(substrm, **self.custom_methods)
+            executor.run(inputs, self.length)
+            self.substreams[sub.object_id] = executor
+
+        values = self.substreams[sub.object_id].get_value(node.output_var)
+        return _wrap(values, node.bit_length(), node.get_signed())
+
+    # -------------------------------------------------------------------------
+    def _operand(self, node, signed):
+        """ values extended as an operand of a signed or unsigned expression """
+        values = self.get_value(node)
+        if signed:
+            return values
+        return _unsigned(values, node.bit_length())
+
+    def _adjust(self, left, right, signed):
+        """ align the fixed-point positions, as fixed.adjust() """
+        lpoint = left.get_point()
+        rpoint = right.get_point()
+        lvalues = self._operand(left, signed)
+        rvalues = self._operand(right, signed)
+        width = max(left.bit_length() - lpoint, right.bit_length() - rpoint)
+        width += max(lpoint, rpoint) + 2
+        lvalues = _fit(lvalues, width)
+        rvalues = _fit(rvalues, width)
+        if lpoint < rpoint:
+            lvalues = lvalues << (rpoint - lpoint)
+        if rpoint < lpoint:
+            rvalues = rvalues << (lpoint - rpoint)
+        return lvalues, rvalues
+
+
+def _get_name(data):
+    if isinstance(data, str):
+        return data
+    return getattr(data, 'name', str(data))
+
+
+def _get_length(inputs, length):
+    for values in inputs.values():
+        values = np.asarray(values)
+        if values.ndim == 0:
+            continue
+        if length is None:
+            length = len(values)
+        elif len(values) != length:
+            raise ValueError('All inputs must have the same length.')
+
+    if length is None:
+        raise ValueError("'length' is required for scalar inputs.")
+
+    return length
+
+
+def _addrwidth(length):
+    return int(ceil(log(length, 2)))
+
+
+def _mask(width):
+    return (1 << width) - 1
+
+
+def _dtype(width):
+    if width > _max_int64_width:
+        return object
+    return np.int64
+
+
+def _fit(values, width):
+    """ use Python integers if values can overflow int64 """
+    if width > _max_int64_width and values.dtype != object:
+        return values.astype(object)
+    return values
+
+
+def _unsigned(values, width):
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = values & _mask(width)
+        if width <= _max_int64_width:
+            return values.astype(np.int64)
+        return values
+    if width > _max_int64_width:
+        return values.astype(object) & _mask(width)
+    return values & _mask(width)
+
+
+def _wrap(values, width, signed):
+    """ truncate to width, and sign-extend if signed """
+    values = _unsigned(values, width)
+    if not signed or width == 0:
+        return values
+    msb = (values >> (width - 1)) & 1
+    return np.where(msb == 1, values - (1 << width), values)
+
+
+def _wrap_int(value, width, signed):
+    value &= _mask(width)
+    if signed and width > 0 and (value >> (width - 1)) & 1:
+        value -= 1 << width
+    return value
+
+
+def _hold(values, update, initval):
+    """ keep the last updated value, as a register with a write condition """
+    index = np.where(update, np.arange(len(values)), -1)
+    index = np.maximum.accumulate(index)
+    return np.where(index >= 0, values[np.maximum(index, 0)], initval)
+
+
+def _divider(dividend, divisor, width):
+    """ the restoring divider of div.py on unsigned values """
+    mask = _mask(width)
+    apos = ((dividend >> (width - 1)) & 1) == 0
+    bpos = ((divisor >> (width - 1)) & 1) == 0
+    a = np.where(apos, dividend, (-dividend) & mask)
+    b = np.where(bpos, divisor, (-divisor) & mask)
+
+    zero = b == 0
+    safe_b = np.where(zero, 1, b)
+    quotient = np.where(zero, mask, a // safe_b)
+    remainder = np.where(zero, a, a % safe_b)
+
+    quotient = np.where(apos == bpos, quotient, (-quotient) & mask)
+    remainder = np.where(apos, remainder, (-remainder) & mask)
+    return quotient & mask, remainder & mask
+
+
+def _parity(values, width):
+    ret = values & 0
+    for i in range(width):
+        ret = ret ^ ((values >> i) & 1)
+    return ret
+
+
+_binary_funcs = {
+    'Plus': lambda x, y: x + y,
+    'Minus': lambda x, y: x - y,
+    'Times': lambda x, y: x * y,
+    'LessThan': lambda x, y: _to_int(x < y),
+    'GreaterThan': lambda x, y: _to_int(x > y),
+    'LessEq': lambda x, y: _to_int(x <= y),
+    'GreaterEq': lambda x, y: _to_int(x >= y),
+    'Eq': lambda x, y: _to_int(x == y),
+    'NotEq': lambda x, y: _to_int(x != y),
+    'And': lambda x, y: x & y,
+    'Or': lambda x, y: x | y,
+    'Xor': lambda x, y: x ^ y,
+    'Xnor': lambda x, y: ~(x ^ y),
+    'Land': lambda x, y: _to_int((x != 0) & (y != 0)),
+    'Lor': lambda x, y: _to_int((x != 0) | (y != 0)),
+}
+
+_unary_funcs = {
+    'Uplus': lambda x, width: x,
+    'Uminus': lambda x, width: -x,
+    'Unot': lambda x, width: ~x,
+    'Ulnot': lambda x, width: _to_int(x == 0),
+    'Uand': lambda x, width: _to_int(_unsigned(x, width) == _mask(width)),
+    'Unand': lambda x, width: _to_int(_unsigned(x, width) != _mask(width)),
+    'Uor': lambda x, width: _to_int(x != 0),
+    'Unor': lambda x, width: _to_int(x == 0),
+    'Uxor': lambda x, width: _parity(_unsigned(x, width), width),
+    'Uxnor': lambda x, width: 1 - _parity(_unsigned(x, width), width),
+}
+
+
+def _to_int(cond):
+    if isinstance(cond, np.ndarray):
+        return cond.astype(np.int64)
+    return int(cond)
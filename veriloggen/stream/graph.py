@@ -3,12 +3,14 @@ from __future__ import print_function
 import os
 import sys
 import copy
-from collections import defaultdict
+import json
+from collections import defaultdict, OrderedDict
 
 import veriloggen.core.vtypes as vtypes
 
 from . import stypes
 from .visitor import _Visitor
+from .dag import Graph
 
 
 def draw_graph(vars, filename='out.png', prog='dot', rankdir='LR', approx=False):
@@ -16,6 +18,142 @@ def draw_graph(vars, filename='out.png', prog='dot', rankdir='LR', approx=False)
     gg.draw(vars, filename, prog)
 
 
+def export_graph(vars, filename=None, pipeline_depth=None):
+    ge = GraphExporter()
+    return ge.export(vars, filename, pipeline_depth)
+
+
+class GraphExporter(object):
+    """
+    Export a scheduled graph as a node-link dict, which is accepted by
+    networkx.node_link_graph(), without Pygraphviz.
+
+    Each node has its operator, width, point, stages, latency and fan-out,
+    and the graph has the summary statistics of the cost.
+    """
+
+    def __init__(self):
+        self.graph = None
+
+    def export(self, vars, filename=None, pipeline_depth=None):
+        self.graph = Graph(vars)
+
+        nodes = []
+        links = []
+        for pos, node in enumerate(self.graph.order):
+            nodes.append(self.get_node(node, len(self.graph.fanout[pos])))
+            for i in self.graph.fanin[pos]:
+                link = OrderedDict()
+                link['source'] = self.graph.order[i].object_id
+                link['target'] = node.object_id
+                link['ports'] = list(self.graph.ports[pos][i])
+                links.append(link)
+
+        ret = OrderedDict()
+        ret['directed'] = True
+        ret['multigraph'] = False
+        ret['graph'] = self.get_stats(pipeline_depth)
+        ret['nodes'] = nodes
+        ret['links'] = links
+
+        if filename is not None:
+            with open(filename, 'w') as f:
+                json.dump(ret, f)
+
+        return ret
+
+    def get_node(self, node, fanout):
+        ret = OrderedDict()
+        ret['id'] = node.object_id
+        ret['name'] = _get_name(node)
+        ret['operator'] = node.__class__.__name__
+        ret['width'] = _get_int(node.bit_length())
+        ret['point'] = _get_int(node.get_point())
+        ret['signed'] = bool(node.get_signed())
+        ret['start_stage'] = node.start_stage
+        ret['end_stage'] = node.end_stage
+        ret['latency'] = node.latency
+        ret['fanout'] = fanout
+        ret['output'] = (str(node.output_data) if node._has_output()
+                         else None)
+        return ret
+
+    def get_stats(self, pipeline_depth=None):
+        order = self.graph.order
+
+        if pipeline_depth is None:
+            pipeline_depth = 0
+            for node in order:
+                if node.end_stage is not None:
+                    pipeline_depth = max(pipeline_depth, node.end_stage)
+
+        # taps in a RAM delay line are not registers
+        ram_taps = set()
+        num_delays = 0
+        delay_bits = 0
+        delay_ram_bits = 0
+        for node in reversed(order):
+            if not isinstance(node, stypes._Delay):
+                continue
+            if node.object_id in ram_taps:
+                continue
+            width = _get_int(node.bit_length()) or 0
+            if node.ram_source is None:
+                num_delays += 1
+                delay_bits += width
+                continue
+            delay_ram_bits += width * node.ram_delay
+            tap = node.right
+            for i in range(node.ram_delay - 1):
+                ram_taps.add(tap.object_id)
+                tap = tap.right
+
+        num_multipliers = len([node for node in order
+                               if isinstance(node, (stypes.Times, stypes._MulAdd))])
+
+        ret = OrderedDict()
+        ret['num_nodes'] = len(order)
+        ret['num_links'] = sum([len(fanin) for fanin in self.graph.fanin])
+        ret['pipeline_depth'] = pipeline_depth
+        ret['num_delay_registers'] = num_delays
+        ret['delay_register_bits'] = delay_bits
+        ret['delay_ram_bits'] = delay_ram_bits
+        ret['num_multipliers'] = num_multipliers
+        ret['longest_zero_latency_chain'] = self.longest_zero_latency_chain()
+        return ret
+
+    def longest_zero_latency_chain(self):
+        """ max number of zero-latency operators on a path between registers """
+
+        chain = []
+        ret = 0
+        for pos, node in enumerate(self.graph.order):
+            if node.latency > 0 or isinstance(node, (stypes._Variable,
+                                                     stypes._Constant)):
+                chain.append(0)
+                continue
+            length = 1 + max([0] + [chain[i] for i in self.graph.fanin[pos]])
+            chain.append(length)
+            ret = max(ret, length)
+        return ret
+
+
+def _get_name(node):
+    if isinstance(node, stypes._Variable) and isinstance(node.input_data, str):
+        return node.input_data
+    if isinstance(node, stypes._Variable) and node.input_data is not None:
+        return str(node.input_data.name)
+    if isinstance(node, stypes._Constant):
+        return str(node.value)
+    return node.name('data')
+
+
+def _get_int(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value
+
+
 class GraphGenerator(_Visitor):
 
     def __init__(self, rankdir='LR', approx=False):
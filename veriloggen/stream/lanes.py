@@ -0,0 +1,167 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import copy
+from collections import OrderedDict
+
+import veriloggen.types.util as util
+
+from . import stypes
+from .dag import Graph, _resolve, _apply_inputs
+
+
+class LaneReplicator(object):
+    """
+    Replicate the datapath of a stream over numlanes lanes.
+
+    Each lane processes every numlanes-th sample, so that the operators
+    must not depend on the other samples: the accumulators are replicated
+    with the window size divided by numlanes, and their partial results
+    are combined across the lanes by reduce().
+    Variables not registered as lane inputs (constants, parameters)
+    are shared by all the lanes.
+    """
+
+    def __init__(self, numlanes):
+        if (not isinstance(numlanes, int) or numlanes < 1 or
+                2 ** util.log2(numlanes) != numlanes):
+            raise ValueError('numlanes must be a power of 2.')
+
+        self.numlanes = numlanes
+        self.shift = util.log2(numlanes)
+        # object_id -> nodes of the lanes, [lane 0 (the original), lane 1, ...]
+        self.lanes = OrderedDict()
+        # object_id of the original size -> size of a lane
+        self.sizes = {}
+
+    def add_input(self, var, lanes):
+        """ register the lane inputs which replace var in each lane """
+
+        if len(lanes) != self.numlanes:
+            raise ValueError('number of lanes mismatch: %d != %d' %
+                             (len(lanes), self.numlanes))
+        self.lanes[var.object_id] = list(lanes)
+
+    def replicate(self, node):
+        """ returns the nodes of the lanes which compute node """
+
+        root = _resolve(node)
+
+        for var in Graph([root]).order:
+            if var.object_id in self.lanes or var.object_id in self.sizes:
+                continue
+
+            if isinstance(var, (stypes._Variable, stypes._Constant)):
+                self.lanes[var.object_id] = [var] * self.numlanes
+                continue
+
+            if not _is_replicable(var):
+                raise ValueError("'%s' cannot be replicated over lanes." %
+                                 var.__class__.__name__)
+
+            if isinstance(var, stypes._Accumulator) and var.size is not None:
+                var.size = self.get_size(var.size)
+
+            lanes = [var]
+            for i in range(1, self.numlanes):
+                lanes.append(self.clone(var, i))
+
+            self.lanes[var.object_id] = lanes
+
+        lanes = self.lanes[root.object_id]
+        return [node] + lanes[1:]
+
+    def reduce(self, node):
+        """ returns the combination of the partial results of the lanes """
+
+        lanes = self.replicate(node)
+        acc = _resolve(node)
+
+        if isinstance(acc, stypes.Pulse):
+            # every lane counts the same number of samples
+            return node
+
+        if acc.__class__ is stypes.ReduceAdd:
+            op = stypes.Plus
+            identity = 0
+        elif acc.__class__ is stypes.ReduceMul:
+            op = stypes.Times
+            identity = 1
+        else:
+            raise ValueError("'%s' cannot be reduced across lanes." %
+                             acc.__class__.__name__)
+
+        # the initial value is accumulated only once, in lane 0
+        for lane in lanes[1:]:
+            lane.initval = stypes.Int(identity)
+
+        ret = stypes.op_tree(op, None, None, *lanes)
+        ret.width = acc.bit_length()
+        ret.point = acc.get_point()
+        ret.signed = acc.get_signed()
+        return ret
+
+    def get_size(self, size):
+        """ number of samples of a window in each lane """
+
+        size = _resolve(size)
+        if size.object_id in self.sizes:
+            return self.sizes[size.object_id]
+
+        if isinstance(size, stypes._Constant):
+            value = size.eval()
+            if value % self.numlanes != 0:
+                raise ValueError('size %d must be a multiple of numlanes %d.' %
+                                 (value, self.numlanes))
+            ret = stypes.Int(value // self.numlanes)
+        else:
+            ret = stypes.Srl(size, self.shift)
+
+        self.sizes[size.object_id] = ret
+        self.sizes[ret.object_id] = ret
+        return ret
+
+    def clone(self, node, lane):
+        ret = copy.copy(node)
+
+        ret.object_id = stypes._object_counter
+        stypes._object_counter += 1
+
+        ret.output_data = None
+        ret.output_sig_data = None
+        ret.output_node = None
+        ret.sig_data = None
+        ret.start_stage = None
+        ret.end_stage = None
+        ret.sink = []
+        ret.delayed_value = OrderedDict()
+        ret.previous_value = OrderedDict()
+
+        def get_lane(var):
+            var = self.get_lane(var, lane)
+            var._add_sink(ret)
+            return var
+
+        # the size of a lane is shared by all the lanes
+        _apply_inputs(ret, get_lane, ('size', ))
+
+        return ret
+
+    def get_lane(self, var, lane):
+        return self.lanes[_resolve(var).object_id][lane]
+
+
+# operators which refer to the other samples or to external states
+_unreplicable_types = (stypes._Prev, stypes.Counter,
+                       stypes.Substream, stypes._SubstreamOutput,
+                       stypes.RingBuffer, stypes._RingBufferOutput,
+                       stypes.Scratchpad, stypes._ScratchpadOutput,
+                       stypes.ToExtern, stypes.FromExtern,
+                       stypes.Predicate, stypes.ReadRAM, stypes.WriteRAM)
+
+
+def _is_replicable(node):
+    if isinstance(node, _unreplicable_types):
+        return False
+    return isinstance(node, (stypes._BinaryOperator, stypes._UnaryOperator,
+                             stypes._SpecialOperator))
@@ -0,0 +1,392 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+from collections import OrderedDict
+
+from . import stypes
+from .dag import Graph
+
+
+class RangeAnalyzer(object):
+    """
+    Propagate the value ranges of integer nodes from the sources,
+    and narrow the widths of the intermediate nodes to fit the ranges.
+
+    Ranges are seeded by the widths of variables, the values of constants,
+    set_range() of nodes, and the sizes of Counter and ReduceAdd.
+    Outputs, fixed-point nodes and nodes with keep_width() keep their widths.
+    """
+
+    def __init__(self):
+        self.graph = None
+        # object_id -> (min, max) of the value
+        self.ranges = {}
+        # name -> (original width, narrowed width)
+        self.narrowed = OrderedDict()
+
+    def analyze(self, nodes, graph=None):
+        if graph is None:
+            graph = Graph(nodes)
+
+        self.graph = graph
+
+        for node in graph.order:
+            if _is_fixed(node) or any([_is_fixed(var)
+                                       for var in graph.get_fanin(node)]):
+                rng = None
+            else:
+                rng = self.get_range(node)
+            self.ranges[node.object_id] = _clamp(rng, node)
+
+        return self.ranges
+
+    def narrow(self, nodes, graph=None):
+        self.analyze(nodes, graph)
+
+        for node in self.graph.order:
+            if not self.is_narrowable(node):
+                continue
+
+            width = _min_width(self.ranges[node.object_id], node.get_signed())
+            if width >= node.width:
+                continue
+
+            self.narrowed[node.name('data')] = (node.width, width)
+            node.width = width
+
+        return self.narrowed
+
+    def get_stats(self):
+        ret = OrderedDict()
+        ret['num_narrowed'] = len(self.narrowed)
+        ret['narrowed_bits'] = sum([old - new for old, new in self.narrowed.values()])
+        ret['narrowed'] = OrderedDict(self.narrowed)
+        return ret
+
+    def is_narrowable(self, node):
+        if not node.narrowable:
+            return False
+        if node.__class__ not in _narrowable_types:
+            return False
+        if node._has_output():
+            return False
+        if not isinstance(node.width, int) or _is_fixed(node):
+            return False
+        if self.ranges[node.object_id] is None:
+            return False
+
+        for c in self.graph.get_fanout(node):
+            if not self.is_safe_consumer(c, node):
+                return False
+
+        return True
+
+    def is_safe_consumer(self, node, var):
+        """ the consumer gets the same value from the narrower var """
+
+        if node.__class__ not in _value_types:
+            return False
+
+        # no difference between sign- and zero-extension
+        if self.ranges[var.object_id][0] >= 0:
+            return True
+
+        ports = self.graph.ports[self.graph.index[node.object_id]]
+        ports = ports[self.graph.index[var.object_id]]
+
+        if isinstance(node, (stypes.Land, stypes.Lor, stypes.Ulnot)):
+            return True
+
+        if isinstance(node, stypes._Accumulator):
+            for port in ports:
+                if port == 'right' and not node.get_signed():
+                    return False
+                if port in ('initval', 'size'):
+                    return False
+            return True
+
+        if isinstance(node, stypes._BinaryShiftOperator):
+            return ('right' not in ports and
+                    not isinstance(node, stypes.Srl))
+
+        # each operand is extended by its own signedness
+        if isinstance(node, (stypes.Times, stypes.Divide, stypes.Mod,
+                             stypes._MulAdd, stypes._Delay, stypes._Prev)):
+            return True
+
+        if isinstance(node, stypes.Cond):
+            if all([_resolve(arg) is not var for arg in node.args[1:]]):
+                return True
+            operands = node.args[1:]
+        else:
+            operands = self.graph.get_fanin(node)
+
+        # sign-extended only if all the operands are signed
+        return all([_is_signed_signal(operand) for operand in operands])
+
+    def get_range(self, node):
+        for cls in node.__class__.__mro__:
+            method = getattr(self, 'range_' + cls.__name__, None)
+            if method is not None:
+                return method(node)
+        return None
+
+    def get_input_range(self, var):
+        if var is None:
+            return None
+        return self.ranges.get(_resolve(var).object_id)
+
+    # -------------------------------------------------------------------------
+    def range__Variable(self, node):
+        if node.value_range is not None:
+            return node.value_range
+        if isinstance(node, stypes._ParameterVariable):
+            return None
+        return _full_range(node.bit_length(), node.get_signed())
+
+    def range_Int(self, node):
+        return (node.value, node.value)
+
+    def range__Delay(self, node):
+        return self.get_input_range(node.right)
+
+    def range__Prev(self, node):
+        return self.get_input_range(node.right)
+
+    def range_Uplus(self, node):
+        return self.get_input_range(node.right)
+
+    def range_Uminus(self, node):
+        r = self.get_input_range(node.right)
+        if r is None:
+            return None
+        return (-r[1], -r[0])
+
+    def range_Plus(self, node):
+        a = self.get_input_range(node.left)
+        b = self.get_input_range(node.right)
+        if a is None or b is None:
+            return None
+        return (a[0] + b[0], a[1] + b[1])
+
+    def range_Minus(self, node):
+        a = self.get_input_range(node.left)
+        b = self.get_input_range(node.right)
+        if a is None or b is None:
+            return None
+        return (a[0] - b[1], a[1] - b[0])
+
+    def range__PlusN(self, node):
+        ranges = [self.get_input_range(var) for var in node.args]
+        if any([r is None for r in ranges]):
+            return None
+        return (sum([r[0] for r in ranges]), sum([r[1] for r in ranges]))
+
+    def range_Times(self, node):
+        a = self.get_input_range(node.left)
+        b = self.get_input_range(node.right)
+        if a is None or b is None:
+            return None
+        return _mul_range(a, b)
+
+    def range__MulAdd(self, node):
+        a = self.get_input_range(node.a)
+        b = self.get_input_range(node.b)
+        c = self.get_input_range(node.c)
+        if a is None or b is None or c is None:
+            return None
+        p = _mul_range(a, b)
+        return (p[0] + c[0], p[1] + c[1])
+
+    def range_Divide(self, node):
+        a = self.get_input_range(node.left)
+        b = self.get_input_range(node.right)
+        if a is None or b is None or b[0] <= 0 <= b[1]:
+            return None
+        # truncated toward zero
+        if a[0] >= 0 and b[0] > 0:
+            return (0, a[1])
+        m = max(abs(a[0]), abs(a[1]))
+        return (-m, m)
+
+    def range_Mod(self, node):
+        a = self.get_input_range(node.left)
+        b = self.get_input_range(node.right)
+        if a is None or b is None or b[0] <= 0 <= b[1]:
+            return None
+        m = min(max(abs(a[0]), abs(a[1])), max(abs(b[0]), abs(b[1])) - 1)
+        if a[0] >= 0 and b[0] > 0:
+            return (0, m)
+        return (-m, m)
+
+    def range_Sll(self, node):
+        a = self.get_input_range(node.left)
+        if a is None or not isinstance(node.right, stypes.Int):
+            return None
+        return (a[0] << node.right.value, a[1] << node.right.value)
+
+    def range_Sra(self, node):
+        a = self.get_input_range(node.left)
+        if a is None or not isinstance(node.right, stypes.Int):
+            return None
+        return (a[0] >> node.right.value, a[1] >> node.right.value)
+
+    def range_Srl(self, node):
+        a = self.get_input_range(node.left)
+        if a is None or a[0] < 0:
+            return None
+        return self.range_Sra(node)
+
+    def range_And(self, node):
+        a = self.get_input_range(node.left)
+        b = self.get_input_range(node.right)
+        his = [r[1] for r in (a, b) if r is not None and r[0] >= 0]
+        if not his:
+            return None
+        return (0, min(his))
+
+    def range_Or(self, node):
+        a = self.get_input_range(node.left)
+        b = self.get_input_range(node.right)
+        if a is None or b is None or a[0] < 0 or b[0] < 0:
+            return None
+        return (0, 2 ** max(a[1], b[1]).bit_length() - 1)
+
+    def range_Xor(self, node):
+        return self.range_Or(node)
+
+    def range_Cond(self, node):
+        a = self.get_input_range(node.true_value)
+        b = self.get_input_range(node.false_value)
+        if a is None or b is None:
+            return None
+        return (min(a[0], b[0]), max(a[1], b[1]))
+
+    def range_LessThan(self, node):
+        return (0, 1)
+
+    def range_GreaterThan(self, node):
+        return (0, 1)
+
+    def range_LessEq(self, node):
+        return (0, 1)
+
+    def range_GreaterEq(self, node):
+        return (0, 1)
+
+    def range_Eq(self, node):
+        return (0, 1)
+
+    def range_NotEq(self, node):
+        return (0, 1)
+
+    def range_Land(self, node):
+        return (0, 1)
+
+    def range_Lor(self, node):
+        return (0, 1)
+
+    def range_Ulnot(self, node):
+        return (0, 1)
+
+    def range_ReduceAdd(self, node):
+        r = self.get_input_range(node.right)
+        size = _get_size(node)
+        if r is None or size is None or not isinstance(node.initval, stypes.Int):
+            return None
+        initval = node.initval.value
+        return (initval + size * min(r[0], 0), initval + size * max(r[1], 0))
+
+    def range_ReduceSub(self, node):
+        r = self.get_input_range(node.right)
+        size = _get_size(node)
+        if r is None or size is None or not isinstance(node.initval, stypes.Int):
+            return None
+        initval = node.initval.value
+        return (initval - size * max(r[1], 0), initval - size * min(r[0], 0))
+
+    def range_Counter(self, node):
+        size = _get_size(node)
+        if (size is None or not isinstance(node.step, int) or
+                not isinstance(node.initval, stypes.Int)):
+            return None
+        # the initial value is (initval - step), and it wraps after 'size' counts
+        first = node.initval.value
+        last = first + size * node.step
+        return (min(first, last), max(first, last))
+
+
+# nodes whose widths can be narrowed
+_narrowable_types = (stypes.Plus, stypes.Minus, stypes.Times,
+                     stypes.Uminus, stypes.Sll, stypes.Sra, stypes.Srl,
+                     stypes.And, stypes.Or, stypes.Xor, stypes.Cond,
+                     stypes._PlusN, stypes._MulAdd,
+                     stypes.ReduceAdd, stypes.ReduceSub, stypes.Counter)
+
+# nodes whose results depend only on the values of the inputs
+_value_types = (stypes.Plus, stypes.Minus, stypes.Times,
+                stypes.Divide, stypes.Mod, stypes._MulAdd, stypes._PlusN,
+                stypes.Uplus, stypes.Uminus, stypes.Sll, stypes.Sra, stypes.Srl,
+                stypes.LessThan, stypes.GreaterThan, stypes.LessEq, stypes.GreaterEq,
+                stypes.Eq, stypes.NotEq, stypes.Land, stypes.Lor, stypes.Ulnot,
+                stypes.And, stypes.Or, stypes.Xor, stypes.Cond,
+                stypes._Delay, stypes._Prev,
+                stypes.ReduceAdd, stypes.ReduceSub, stypes.Counter)
+
+
+def _resolve(node):
+    while (isinstance(node, stypes._Variable) and
+           isinstance(node.input_data, stypes._Numeric)):
+        node = node.input_data
+    return node
+
+
+def _is_fixed(node):
+    point = node.get_point()
+    return point is not None and point != 0
+
+
+def _is_signed_signal(var):
+    """ the Verilog signal of var is declared as signed """
+    if not var.get_signed():
+        return False
+    if isinstance(var, stypes._Variable):
+        return isinstance(var.input_data, str)
+    return True
+
+
+def _get_size(node):
+    if not isinstance(node.size, stypes.Int) or node.size.value <= 0:
+        return None
+    return node.size.value
+
+
+def _full_range(width, signed):
+    if not isinstance(width, int) or width <= 0:
+        return None
+    if signed:
+        return (-2 ** (width - 1), 2 ** (width - 1) - 1)
+    return (0, 2 ** width - 1)
+
+
+def _clamp(rng, node):
+    """ values out of the width of the node are wrapped around """
+    full = _full_range(node.bit_length(), node.get_signed())
+    if rng is None or full is None:
+        return full
+    if rng[0] < full[0] or rng[1] > full[1]:
+        return full
+    return rng
+
+
+def _mul_range(a, b):
+    values = [x * y for x in a for y in b]
+    return (min(values), max(values))
+
+
+def _min_width(rng, signed):
+    lo, hi = rng
+    if signed:
+        neg = (-lo - 1).bit_length() if lo < 0 else 0
+        return max(neg, max(hi, 0).bit_length()) + 1
+    return max(hi.bit_length(), 1)
@@ -0,0 +1,274 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import heapq
+from collections import OrderedDict
+
+from . import stypes
+from .dag import Graph, _resolve, _get_edges
+
+
+class Reassociator(object):
+    """
+    Rebuild chains of an associative operator as balanced trees.
+
+    A chain is a tree of the same operator (Plus, Times, And, Or, Xor,
+    or Max/Min written as Mux(x > y, x, y)/Mux(x < y, x, y)),
+    whose inner nodes have no other consumer.
+    The operands are combined in the order of their estimated arrival stages,
+    so that late operands are combined close to the root.
+
+    The inner nodes must have the same width, point and signedness as the root,
+    and the operands must have the same point, so that every operand is
+    aligned and extended as in the original chain.
+    """
+
+    def __init__(self):
+        self.graph = None
+        # object_id -> estimated stage where the value is available
+        self.arrival = {}
+        # name of the root -> (original depth, new depth)
+        self.reassociated = OrderedDict()
+        self.num_rebuilt_nodes = 0
+
+    def reassociate(self, nodes, graph=None):
+        if graph is None:
+            graph = Graph(nodes)
+
+        self.graph = graph
+        self.arrival = {}
+
+        for node in graph.order:
+            if self.is_root(node):
+                self.rebuild(node)
+            if node.object_id not in self.arrival:
+                self.arrival[node.object_id] = self.get_arrival(node)
+
+        return self.reassociated
+
+    def get_stats(self):
+        ret = OrderedDict()
+        ret['num_reassociated'] = len(self.reassociated)
+        ret['num_rebuilt_nodes'] = self.num_rebuilt_nodes
+        ret['reassociated'] = OrderedDict(self.reassociated)
+        return ret
+
+    def is_chain_node(self, node):
+        kind = _get_kind(node)
+        if kind is None:
+            return False
+        if kind in ('Max', 'Min'):
+            comp = _resolve(node.condition)
+            fanout = self.graph.get_fanout(comp)
+            return len(fanout) == 1 and fanout[0] is node
+        return True
+
+    def is_root(self, node):
+        if not self.is_chain_node(node):
+            return False
+
+        for c in self.graph.get_fanout(node):
+            if self.is_inner(node, c):
+                return False
+
+        return True
+
+    def is_inner(self, node, parent):
+        """ node is merged into the chain of parent """
+
+        if not self.is_chain_node(node) or not self.is_chain_node(parent):
+            return False
+        if _get_kind(node) != _get_kind(parent):
+            return False
+        if node._has_output():
+            return False
+        if (_get_latency(node) != _get_latency(parent) or
+                _get_attrs(node) != _get_attrs(parent)):
+            return False
+
+        # consumed only once, by parent and its comparator
+        consumers = (parent, ) + _get_internals(parent)
+        fanout = self.graph.get_fanout(node)
+        if len(fanout) != len(consumers):
+            return False
+
+        index = self.graph.index
+        for c in fanout:
+            if all([c is not p for p in consumers]):
+                return False
+            ports = self.graph.ports[index[c.object_id]]
+            if len(ports[index[node.object_id]]) != 1:
+                return False
+
+        return True
+
+    def collect(self, node, depth=1):
+        """ pairs of an operand of the chain and its depth from the root """
+
+        ret = []
+        for var in _get_operands(node):
+            var = _resolve(var)
+            if self.is_inner(var, node):
+                ret.extend(self.collect(var, depth + 1))
+            else:
+                ret.append((var, depth))
+        return ret
+
+    def rebuild(self, root):
+        operands = self.collect(root)
+        if len(operands) < 3:
+            return
+
+        attrs = _get_attrs(root)
+        for var, depth in operands:
+            if not _is_aligned(var, attrs, _get_kind(root)):
+                return
+
+        latency = _get_latency(root)
+        old_arrival = max([self.arrival[var.object_id] + latency * depth
+                           for var, depth in operands])
+        old_depth = max([depth for var, depth in operands])
+
+        # combine the two earliest operands repeatedly
+        queue = []
+        for i, (var, depth) in enumerate(operands):
+            heapq.heappush(queue, (self.arrival[var.object_id], i, 0))
+
+        merges = []
+        count = len(operands)
+        while len(queue) > 1:
+            a_arrival, a, a_depth = heapq.heappop(queue)
+            b_arrival, b, b_depth = heapq.heappop(queue)
+            merges.append((a, b))
+            heapq.heappush(queue, (max(a_arrival, b_arrival) + latency, count,
+                                   max(a_depth, b_depth) + 1))
+            count += 1
+
+        new_arrival, i, new_depth = queue[0]
+        if new_arrival >= old_arrival:
+            return
+
+        values = [var for var, depth in operands]
+        for a, b in merges[:-1]:
+            node = _make_node(root, values[a], values[b])
+            values.append(node)
+            self.arrival[node.object_id] = (max(self.arrival[values[a].object_id],
+                                                self.arrival[values[b].object_id]) +
+                                            latency)
+
+        # the root object is kept, since it is referred by the consumers
+        a, b = merges[-1]
+        _set_operands(root, values[a], values[b])
+        self.arrival[root.object_id] = new_arrival
+
+        self.reassociated[root.name('data')] = (old_depth, new_depth)
+        self.num_rebuilt_nodes += len(merges) - 1
+
+    def get_arrival(self, node):
+        ret = 0
+        for var, port in _get_edges(node):
+            ret = max(ret, self.arrival.get(var.object_id, 0))
+        return ret + node.latency
+
+
+# operators rebuilt as balanced trees, besides Max and Min
+_associative_types = (stypes.Plus, stypes.Times,
+                      stypes.And, stypes.Or, stypes.Xor)
+
+
+def _get_kind(node):
+    if node.__class__ in _associative_types:
+        return node.__class__.__name__
+
+    if node.__class__ is not stypes.Cond:
+        return None
+
+    comp = _resolve(node.condition)
+    if comp.__class__ is stypes.GreaterThan:
+        kind = 'Max'
+    elif comp.__class__ is stypes.LessThan:
+        kind = 'Min'
+    else:
+        return None
+
+    if comp._has_output():
+        return None
+
+    if (_resolve(comp.left) is not _resolve(node.true_value) or
+            _resolve(comp.right) is not _resolve(node.false_value)):
+        return None
+
+    return kind
+
+
+def _get_attrs(node):
+    return (node.bit_length(), node.get_point(), node.get_signed())
+
+
+def _get_latency(node):
+    """ latency of an operator of the chain """
+    if _get_kind(node) in ('Max', 'Min'):
+        return _resolve(node.condition).latency + node.latency
+    return node.latency
+
+
+def _get_internals(node):
+    if _get_kind(node) in ('Max', 'Min'):
+        return (_resolve(node.condition), )
+    return ()
+
+
+def _get_operands(node):
+    if _get_kind(node) in ('Max', 'Min'):
+        return (node.true_value, node.false_value)
+    return (node.left, node.right)
+
+
+def _is_aligned(var, attrs, kind):
+    """ var is aligned and extended in the same way at any position of the tree """
+
+    width, point, signed = attrs
+
+    if kind in ('Max', 'Min'):
+        # the comparison depends on the operands
+        return _get_attrs(var) == attrs
+
+    if kind == 'Times' and point != 0:
+        # each product is rounded at the point
+        return False
+
+    if var.get_point() != point:
+        return False
+
+    return var.get_signed() == signed or var.bit_length() == width
+
+
+def _make_node(root, a, b):
+    width, point, signed = _get_attrs(root)
+
+    if _get_kind(root) in ('Max', 'Min'):
+        comp = _resolve(root.condition)
+        new_comp = comp.__class__(a, b)
+        new_comp.latency = comp.latency
+        node = stypes.Cond(new_comp, a, b)
+    else:
+        node = root.__class__(a, b)
+
+    node.latency = root.latency
+    node.width = width
+    node.point = point
+    node.signed = signed
+    return node
+
+
+def _set_operands(root, a, b):
+    if _get_kind(root) in ('Max', 'Min'):
+        comp = _resolve(root.condition)
+        comp.left = a
+        comp.right = b
+        root.args[1] = a
+        root.args[2] = b
+        return
+
+    root.left = a
+    root.right = b
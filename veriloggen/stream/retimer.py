@@ -0,0 +1,183 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+from collections import OrderedDict
+
+from . import stypes
+from .dag import Graph
+
+# estimated combinational delay of each operator class
+# (arbitrary unit: a value of 1.0 is a 32-bit adder)
+default_delay_model = {
+    'Plus': 1.0,
+    'Minus': 1.0,
+    'Uminus': 1.0,
+    'Uplus': 0.0,
+    'LessThan': 1.0,
+    'GreaterThan': 1.0,
+    'LessEq': 1.0,
+    'GreaterEq': 1.0,
+    'Eq': 0.5,
+    'NotEq': 0.5,
+    'Sll': 1.0,
+    'Srl': 1.0,
+    'Sra': 1.0,
+    'And': 0.25,
+    'Or': 0.25,
+    'Xor': 0.25,
+    'Xnor': 0.25,
+    'Land': 0.25,
+    'Lor': 0.25,
+    'Unot': 0.25,
+    'Ulnot': 0.25,
+    'Uand': 0.5,
+    'Unand': 0.5,
+    'Uor': 0.5,
+    'Unor': 0.5,
+    'Uxor': 0.5,
+    'Uxnor': 0.5,
+    'Cond': 0.5,
+    'Complement2': 1.0,
+    'Abs': 1.5,
+    'Sign': 0.0,
+    'Pointer': 0.0,
+    'Slice': 0.0,
+    'Cat': 0.0,
+    'Repeat': 0.0,
+    'Cast': 0.0,
+    'ReinterpretCast': 0.0,
+    '_Delay': 0.0,
+    '_Prev': 0.0,
+    '_PlusN': 2.0,
+    'Times': 0.5,
+    'Divide': 1.0,
+    'Mod': 1.0,
+    '_MulAdd': 0.5,
+    'LUT': 0.5,
+}
+
+# operators whose _implement() handles any latency
+_generic_implements = (stypes._BinaryOperator._implement,
+                       stypes._UnaryOperator._implement,
+                       stypes._SpecialOperator._implement,
+                       stypes._BinaryShiftOperator._implement,
+                       stypes._BinaryLogicalOperator._implement,
+                       stypes._SubstreamOutput._implement)
+
+
+class Retimer(object):
+    """
+    Insert pipeline registers into chains of zero-latency operators,
+    so that no stage exceeds the target clock period.
+
+    delay_model: dict of operator class name to delay (a value or a function
+                 that receives the node), merged into default_delay_model
+    """
+
+    def __init__(self, target_period, delay_model=None, default_delay=1.0):
+        self.target_period = target_period
+        self.delay_model = dict(default_delay_model)
+        if delay_model is not None:
+            self.delay_model.update(delay_model)
+        self.default_delay = default_delay
+
+        self.graph = None
+        self.arrival = {}
+        self.retimed = []
+        self.critical_path_before = None
+        self.critical_path_after = None
+
+    def retime(self, nodes, graph=None):
+        if graph is None:
+            graph = Graph(nodes)
+
+        self.graph = graph
+        order = graph.order
+
+        self.critical_path_before = self.critical_path(order)
+
+        self.arrival = {}
+        for node in order:
+            self.arrival[node.object_id] = 0
+
+        for node in order:
+            for var in self.get_inputs(node):
+                if self.arrival[var.object_id] + self.delay(node) > self.target_period:
+                    self.cut(var)
+            self.update_arrival(node)
+
+        self.critical_path_after = self.critical_path(order)
+
+    def get_stats(self):
+        ret = OrderedDict()
+        ret['target_period'] = self.target_period
+        ret['critical_path_before'] = self.critical_path_before
+        ret['critical_path_after'] = self.critical_path_after
+        ret['num_retimed'] = len(self.retimed)
+        return ret
+
+    def cut(self, node):
+        """ register the output of node, or of its zero-latency inputs """
+
+        if self.arrival[node.object_id] == 0:
+            return
+
+        if _is_retimable(node):
+            node.latency = 1
+            self.retimed.append(node)
+            self.arrival[node.object_id] = 0
+            return
+
+        for var in self.get_inputs(node):
+            self.cut(var)
+
+        self.update_arrival(node)
+
+    def update_arrival(self, node):
+        if node.latency > 0:
+            self.arrival[node.object_id] = 0
+            return
+
+        self.arrival[node.object_id] = self.input_arrival(node) + self.delay(node)
+
+    def input_arrival(self, node):
+        ret = 0
+        for var in self.get_inputs(node):
+            ret = max(ret, self.arrival[var.object_id])
+        return ret
+
+    def critical_path(self, order):
+        """ estimated longest combinational path between registers """
+
+        arrival = {}
+        ret = 0
+        for node in order:
+            in_arrival = 0
+            for var in self.get_inputs(node):
+                in_arrival = max(in_arrival, arrival[var.object_id])
+            path = in_arrival + self.delay(node)
+            ret = max(ret, path)
+            arrival[node.object_id] = 0 if node.latency > 0 else path
+        return ret
+
+    def get_inputs(self, node):
+        return self.graph.get_fanin(node)
+
+    def delay(self, node):
+        if isinstance(node, (stypes._Variable, stypes._Constant)):
+            return 0
+
+        name = node.__class__.__name__
+        if name not in self.delay_model:
+            return self.default_delay
+
+        delay = self.delay_model[name]
+        if callable(delay):
+            return delay(node)
+        return delay
+
+
+def _is_retimable(node):
+    if node.latency != 0:
+        return False
+    return getattr(node.__class__, '_implement', None) in _generic_implements
@@ -1,12 +1,24 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+from collections import OrderedDict
+
 from . import stypes
 from .visitor import _Visitor
+from .dag import Graph, _resolve, _get_inputs, _apply_inputs
 
 
 class _Scheduler(_Visitor):
 
+    def __init__(self):
+        _Visitor.__init__(self)
+        # object_id of source node -> shared delay line (list of _Delay taps)
+        self.delay_lines = OrderedDict()
+        self.num_shared_delays = 0
+        self.shared_delay_bits = 0
+        self.num_delay_rams = 0
+        self.delay_ram_bits = 0
+
     def max_stage(self, *vars):
         return stypes._max(*vars)
 
@@ -15,14 +27,67 @@ class _Scheduler(_Visitor):
             return 0
         return stage + node.latency
 
-    def schedule(self, nodes):
+    def schedule(self, nodes, graph=None):
         raise NotImplementedError()
 
+    def get_stats(self):
+        """ delay register usage of the scheduled graph """
+        num_delays = 0
+        delay_bits = 0
+        for taps in self.delay_lines.values():
+            num_delays += len(taps)
+            delay_bits += sum([_get_width(tap) for tap in taps])
+
+        ret = OrderedDict()
+        ret['num_delay_lines'] = len(self.delay_lines)
+        ret['num_delays'] = num_delays
+        ret['delay_bits'] = delay_bits
+        ret['num_shared_delays'] = self.num_shared_delays
+        ret['shared_delay_bits'] = self.shared_delay_bits
+        ret['num_delay_rams'] = self.num_delay_rams
+        ret['delay_ram_bits'] = self.delay_ram_bits
+        return ret
+
+    def map_delay_rams(self, nodes, outputs, threshold):
+        """
+        Replace each run of delay taps, which ends at a tap read by another node,
+        with a RAM delay line, if the run is 'threshold' cycles or longer.
+        Returns the taps that are no longer implemented.
+        """
+
+        used = set([node.object_id for node in outputs])
+        for node in nodes:
+            if isinstance(node, stypes._Delay):
+                continue
+            for var in _get_inputs(node, _unscheduled_ports):
+                used.add(var.object_id)
+
+        ret = []
+        for taps in self.delay_lines.values():
+            run = []
+            for tap in sorted(taps, key=lambda x: x.start_stage):
+                run.append(tap)
+                if tap.object_id not in used:
+                    continue
+                if len(run) >= threshold:
+                    tap._set_ram_source(run[0].right, len(run))
+                    ret.extend(run[:-1])
+                    self.num_delay_rams += 1
+                    self.delay_ram_bits += _get_width(tap) * len(run)
+                run = []
+
+        return ret
+
 
 class ASAPScheduler(_Scheduler):
     """ Determine the scheduled cycle and insert delay variables to fill the gap """
 
-    def schedule(self, nodes):
+    def schedule(self, nodes, graph=None):
+        if graph is not None:
+            # visit in topological order, so that the recursion never goes deep
+            for node in graph.get_order(_unscheduled_ports):
+                self.visit(node)
+
         for node in sorted(nodes, key=lambda x: x.object_id):
             self.visit(node)
 
@@ -45,25 +110,46 @@ class ASAPScheduler(_Scheduler):
         return ret
 
     def fill_gap(self, node, end_stage):
+        """
+        Delay a node until end_stage.
+        Each source node owns a single delay line, whose taps are
+        shared by all consumers at different stages.
+        """
+
         if end_stage is None:
             return node
-        if node.end_stage is None:
+
+        # a variable alias has its own object_id and no stage of its own,
+        # so the gap and the delay line are determined by its source
+        src = _resolve(node)
+
+        if src.end_stage is None:
             return node
-        if node.end_stage == end_stage:
+        if src.end_stage == end_stage:
             return node
-        if node.end_stage > end_stage:
+        if src.end_stage > end_stage:
             raise ValueError("Illegal stage number: node.end_stage (%d) > end_stage (%d)" %
-                             node.end_stage, end_stage)
+                             (src.end_stage, end_stage))
+
+        node = src
 
         if isinstance(node, stypes._Delay) and node._get_parent_value() is not None:
             node = node._get_parent_value()
 
+        if node.object_id not in self.delay_lines:
+            self.delay_lines[node.object_id] = []
+
+        taps = self.delay_lines[node.object_id]
+
         prev = node
         cur_end_stage = prev.end_stage
 
         for i in range(cur_end_stage, end_stage):
             r = node._get_delayed_value(i + 1)
             if r is not None:
+                # reuse the existing tap instead of a new register
+                self.num_shared_delays += 1
+                self.shared_delay_bits += _get_width(r)
                 prev = r
                 cur_end_stage += 1
                 continue
@@ -72,6 +158,7 @@ class ASAPScheduler(_Scheduler):
             r._set_end_stage(cur_end_stage + 1)
             node._add_delayed_value(i + 1, r)
             r._set_parent_value(node)
+            taps.append(r)
             prev = r
             cur_end_stage += 1
 
@@ -215,3 +302,329 @@ class ASAPScheduler(_Scheduler):
 
     def visit__Constant(self, node):
         return None
+
+
+class _GraphScheduler(ASAPScheduler):
+    """
+    Base of the schedulers that rearrange the ASAP schedule.
+    Stages are determined on the whole graph at first,
+    and then delay variables are inserted to fill the gap.
+    """
+
+    def __init__(self):
+        ASAPScheduler.__init__(self)
+        self.filling = False
+
+    def schedule(self, nodes, graph=None):
+        if graph is None:
+            graph = Graph(nodes)
+
+        # ASAP stages without delay variables
+        for node in graph.get_order(_unscheduled_ports):
+            self.visit(node)
+
+        max_stage = 0
+        for node in nodes:
+            max_stage = stypes._max(max_stage, node.end_stage)
+
+        self.assign_stages(graph, max_stage)
+
+        self.filling = True
+        for node in graph.order:
+            if node.start_stage is None:
+                continue
+            _apply_inputs(node, lambda var: self.fill_gap(var, node.start_stage),
+                          _unscheduled_ports)
+
+    def assign_stages(self, graph, max_stage):
+        raise NotImplementedError()
+
+    def fill_gap(self, node, end_stage):
+        if not self.filling:
+            return node
+        return ASAPScheduler.fill_gap(self, node, end_stage)
+
+    def latest_stage(self, node, graph, max_stage):
+        latest = max_stage - node.latency
+        for c in graph.get_fanout(node):
+            latest = min(latest, c.start_stage - node.latency)
+        return latest
+
+    def earliest_stage(self, node, graph):
+        ends = [var.end_stage for var in graph.get_fanin(node)]
+        earliest = stypes._max(*ends)
+        if earliest is None:
+            return 0
+        return earliest
+
+
+class ALAPScheduler(_GraphScheduler):
+    """ Move operators as late as possible to shorten the delay lines """
+
+    def assign_stages(self, graph, max_stage):
+        for node in reversed(graph.order):
+            if not _is_movable(node):
+                continue
+            latest = self.latest_stage(node, graph, max_stage)
+            if latest > node.start_stage:
+                node._set_start_stage(latest)
+                node._set_end_stage(latest + node.latency)
+
+
+class ListScheduler(_GraphScheduler):
+    """
+    List scheduler with optional resource constraints,
+    followed by a delay register minimization.
+
+    resources: maximum number of operators issued in the same stage
+               for each operator class name, e.g. {'Times': 2, 'Divide': 1}.
+               The stateful operators (_pinned_types) keep their ASAP stages
+               and are not counted.
+    initiation_interval: if greater than 1, a modulo schedule is made:
+               the resources are counted by the stage modulo the interval,
+               so that each resource can be shared by the operators
+               issued in different slots
+    """
+
+    def __init__(self, resources=None, max_iter=8, initiation_interval=1):
+        _GraphScheduler.__init__(self)
+        self.resources = resources if resources is not None else {}
+        self.max_iter = max_iter
+        self.initiation_interval = initiation_interval
+        self.usage = {}
+
+    def assign_stages(self, graph, max_stage):
+        if self.resources:
+            max_stage = self.list_schedule(graph)
+        self.minimize_delays(graph, max_stage)
+
+    def get_stats(self):
+        ret = _GraphScheduler.get_stats(self)
+        max_issue = OrderedDict()
+        for (slot, name), count in sorted(self.usage.items()):
+            max_issue[name] = max(max_issue.get(name, 0), count)
+        ret['max_issue'] = max_issue
+        return ret
+
+    def list_schedule(self, graph):
+        """ resource-constrained list scheduling with longest path priority """
+
+        order = graph.order
+
+        if self.initiation_interval > 1:
+            self.check_capacity(order)
+
+        heights = {}
+        for node in reversed(order):
+            h = 0
+            for c in graph.get_fanout(node):
+                h = max(h, heights[c.object_id])
+            heights[node.object_id] = h + node.latency
+
+        # number of unscheduled inputs
+        num_waits = OrderedDict()
+        for pos, node in enumerate(order):
+            num_waits[node.object_id] = len(graph.fanin[pos])
+
+        candidates = [node for node in order if num_waits[node.object_id] == 0]
+        num_scheduled = 0
+
+        max_stage = 0
+        stage = 0
+        while num_scheduled < len(order):
+            progress = True
+            while progress:
+                progress = False
+                ready = [node for node in candidates
+                         if node.start_stage is None or
+                         isinstance(node, _pinned_types) or
+                         self.earliest_stage(node, graph) <= stage]
+                ready.sort(key=lambda x: (-heights[x.object_id], x.object_id))
+                for node in ready:
+                    if isinstance(node, _pinned_types):
+                        self.pin(node, graph)
+                    elif node.start_stage is not None:
+                        # constants and parameters have no stage
+                        if not self.issue(node, stage):
+                            continue
+                        node._set_start_stage(stage)
+                        node._set_end_stage(stage + node.latency)
+                    if node.end_stage is not None:
+                        max_stage = max(max_stage, node.end_stage)
+                    # stypes overrides '==', so compare the identity
+                    candidates = [c for c in candidates if c is not node]
+                    num_scheduled += 1
+                    progress = True
+                    for c in graph.get_fanout(node):
+                        num_waits[c.object_id] -= 1
+                        if num_waits[c.object_id] == 0:
+                            candidates.append(c)
+            stage += 1
+
+        return max_stage
+
+    def pin(self, node, graph):
+        """
+        a stateful operator keeps its ASAP stage and uses no resource;
+        it is delayed only if an input is issued later than in ASAP
+        """
+
+        if node.start_stage is None:
+            return
+        earliest = self.earliest_stage(node, graph)
+        if earliest > node.start_stage:
+            node._set_start_stage(earliest)
+            node._set_end_stage(earliest + node.latency)
+
+    def check_capacity(self, order):
+        """ a modulo schedule has only (resources * interval) slots """
+
+        counts = OrderedDict()
+        for node in order:
+            if node.start_stage is None:
+                continue
+            name = node.__class__.__name__
+            counts[name] = counts.get(name, 0) + 1
+
+        for name, count in counts.items():
+            if name not in self.resources:
+                continue
+            capacity = self.resources[name] * self.initiation_interval
+            if count > capacity:
+                raise ValueError(
+                    "%d '%s' operators exceed %d slots for initiation_interval %d" %
+                    (count, name, capacity, self.initiation_interval))
+
+    def minimize_delays(self, graph, max_stage):
+        """ move operators within their slack to reduce the delay register bits """
+
+        for i in range(self.max_iter):
+            changed = False
+            for node in reversed(graph.order):
+                if not _is_movable(node):
+                    continue
+                if self.move(node, graph, max_stage):
+                    changed = True
+            if not changed:
+                break
+
+    def move(self, node, graph, max_stage):
+        earliest = self.earliest_stage(node, graph)
+        latest = self.latest_stage(node, graph, max_stage)
+        cur = node.start_stage
+        inputs = [var for var in graph.get_fanin(node)
+                  if var.end_stage is not None]
+
+        def cost(stage):
+            c = _get_width(node) * max(self.last_use(node, graph, max_stage) -
+                                       (stage + node.latency), 0)
+            for var in inputs:
+                last = stage
+                for u in graph.get_fanout(var):
+                    if u.object_id != node.object_id:
+                        last = max(last, u.start_stage)
+                if var._has_output():
+                    last = max_stage
+                c += _get_width(var) * max(last - var.end_stage, 0)
+            return c
+
+        best = cur
+        best_cost = cost(cur)
+        for stage in range(earliest, latest + 1):
+            if stage == cur:
+                continue
+            if not self.available(node, stage):
+                continue
+            c = cost(stage)
+            if c < best_cost:
+                best = stage
+                best_cost = c
+
+        if best == cur:
+            return False
+
+        self.release(node, cur)
+        self.issue(node, best)
+        node._set_start_stage(best)
+        node._set_end_stage(best + node.latency)
+        return True
+
+    def last_use(self, node, graph, max_stage):
+        last = 0
+        for c in graph.get_fanout(node):
+            last = max(last, c.start_stage)
+        if node._has_output():
+            last = max_stage
+        return last
+
+    def slot(self, stage):
+        if self.initiation_interval <= 1:
+            return stage
+        return stage % self.initiation_interval
+
+    def available(self, node, stage):
+        name = node.__class__.__name__
+        if name not in self.resources:
+            return True
+        slot = self.slot(stage)
+        return self.usage.get((slot, name), 0) < self.resources[name]
+
+    def issue(self, node, stage):
+        if not self.available(node, stage):
+            return False
+        name = node.__class__.__name__
+        if name in self.resources:
+            slot = self.slot(stage)
+            self.usage[(slot, name)] = self.usage.get((slot, name), 0) + 1
+        return True
+
+    def release(self, node, stage):
+        name = node.__class__.__name__
+        if name in self.resources:
+            self.usage[(self.slot(stage), name)] -= 1
+
+
+def make_scheduler(scheduler='asap', resources=None, initiation_interval=1):
+    if isinstance(scheduler, _Scheduler):
+        return scheduler
+
+    if scheduler is None or scheduler == 'asap':
+        if resources:
+            return ListScheduler(resources,
+                                 initiation_interval=initiation_interval)
+        return ASAPScheduler()
+
+    if scheduler == 'alap':
+        return ALAPScheduler()
+
+    if scheduler == 'list':
+        return ListScheduler(resources,
+                             initiation_interval=initiation_interval)
+
+    raise ValueError("Unknown scheduler '%s'" % str(scheduler))
+
+
+# the size of an accumulator is not scheduled
+_unscheduled_ports = ('size', )
+
+# stateful operators keep their ASAP stages
+_pinned_types = (stypes._Variable, stypes._Constant,
+                 stypes._Prev, stypes._Delay,
+                 stypes.Substream, stypes._SubstreamOutput,
+                 stypes.RingBuffer, stypes._RingBufferOutput,
+                 stypes.Scratchpad, stypes._ScratchpadOutput,
+                 stypes.ToExtern, stypes.FromExtern,
+                 stypes.Predicate, stypes.ReadRAM, stypes.WriteRAM)
+
+
+def _is_movable(node):
+    if isinstance(node, _pinned_types):
+        return False
+    return node.start_stage is not None
+
+
+def _get_width(node):
+    width = node.bit_length()
+    if not isinstance(width, int):
+        return 0
+    return width
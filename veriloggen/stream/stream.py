@@ -12,12 +12,15 @@ import veriloggen.core.vtypes as vtypes
 from veriloggen.core.module import Module
 from veriloggen.seq.seq import Seq
 
-from . import visitor
 from . import stypes
 from . import mul
 from . import scheduler
+from . import retimer
+from . import ranges
+from . import reassoc
 from . import allocator
 from . import graph
+from . import dag
 
 
 # ID counter for 'Stream'
@@ -57,6 +60,7 @@ class Stream(object):
         self.max_stage = 0
         self.last_input = None
         self.last_output = None
+        self.last_stats = None
 
         self.module = opts['module'] if 'module' in opts else None
         self.clock = opts['clock'] if 'clock' in opts else None
@@ -71,6 +75,42 @@ class Stream(object):
         self.dump = opts['dump'] if 'dump' in opts else False
         self.dump_base = opts['dump_base'] if 'dump_base' in opts else 10
         self.dump_mode = opts['dump_mode'] if 'dump_mode' in opts else 'all'
+        # 'text': a $display per variable, 'binary': packed records by $fwrite
+        self.dump_format = opts['dump_format'] if 'dump_format' in opts else 'text'
+        if self.dump_format not in ('text', 'binary'):
+            raise ValueError("dump_format must be 'text' or 'binary'.")
+        # file of the binary records, '<name>.dump' by default
+        self.dump_file = opts['dump_file'] if 'dump_file' in opts else None
+
+        # 'asap', 'alap', 'list' or a scheduler object
+        self.scheduler = opts['scheduler'] if 'scheduler' in opts else 'asap'
+        # max number of operators issued in the same stage, e.g. {'Times': 2}
+        self.resources = opts['resources'] if 'resources' in opts else None
+
+        # retiming against a target clock period
+        self.target_period = (opts['target_period'] if 'target_period' in opts
+                              else None)
+        self.delay_model = opts['delay_model'] if 'delay_model' in opts else None
+
+        # delay lines of this number of cycles or longer are mapped to RAMs
+        self.delay_ram_threshold = (opts['delay_ram_threshold']
+                                    if 'delay_ram_threshold' in opts else None)
+
+        # chains of associative operators are rebuilt as balanced trees
+        self.reassociate = (opts['reassociate']
+                            if 'reassociate' in opts else False)
+
+        # intermediate widths are narrowed by the value ranges
+        self.narrow_widths = (opts['narrow_widths']
+                              if 'narrow_widths' in opts else False)
+
+        # a new input is accepted once every this number of cycles,
+        # and the arithmetic units are shared by a modulo schedule
+        self.initiation_interval = (opts['initiation_interval']
+                                    if 'initiation_interval' in opts else 1)
+        if self.initiation_interval < 1:
+            raise ValueError('initiation_interval must be greater than 0.')
+        self.phase = None
 
         self.seq = None
         self.has_control = False
@@ -100,6 +140,12 @@ class Stream(object):
             self.dump_mask = dump_mask
             self.dump_step = dump_step
 
+            # binary dump: file descriptor, header and records
+            self.dump_fd = None
+            self.dump_header = None
+            self.dump_entries = []
+            self.dump_records = []
+
             if self.seq:
                 self.seq.add_reset(self.dump_enable)
                 self.seq.add_reset(self.dump_mask)
@@ -179,23 +225,44 @@ class Stream(object):
 
         stream_nodes = self.nodes
 
-        input_visitor = visitor.InputVisitor()
-        input_vars = set()
-        for node in sorted(stream_nodes, key=lambda x: x.object_id):
-            input_vars.update(input_visitor.visit(node))
-
-        output_visitor = visitor.OutputVisitor()
-        output_vars = set()
-        for node in sorted(stream_nodes, key=lambda x: x.object_id):
-            output_vars.update(output_visitor.visit(node))
+        # the graph is traversed only once, and shared by all the phases
+        g = dag.Graph(stream_nodes)
+        input_vars = g.get_inputs()
+        output_vars = g.get_outputs()
 
         # add input ports
         for input_var in sorted(input_vars, key=lambda x: x.object_id):
             input_var._implement_input(m, seq, aswire)
 
+        # nodes used by the outputs
+        g = g.subgraph(output_vars)
+
+        # rebuild associative chains
+        if self.reassociate:
+            rsc = reassoc.Reassociator()
+            if rsc.reassociate(output_vars, g):
+                g = dag.Graph(output_vars)
+        else:
+            rsc = None
+
+        # narrow the widths
+        if self.narrow_widths:
+            rng = ranges.RangeAnalyzer()
+            rng.narrow(output_vars, g)
+        else:
+            rng = None
+
+        # retime
+        if self.target_period is not None:
+            rtm = retimer.Retimer(self.target_period, self.delay_model)
+            rtm.retime(output_vars, g)
+        else:
+            rtm = None
+
         # schedule
-        sched = scheduler.ASAPScheduler()
-        sched.schedule(output_vars)
+        sched = scheduler.make_scheduler(self.scheduler, self.resources,
+                                         self.initiation_interval)
+        sched.schedule(output_vars, g)
 
         # balance output stage depth
         max_stage = 0
@@ -205,11 +272,35 @@ class Stream(object):
 
         output_vars = sched.balance_output(output_vars, max_stage)
 
-        # get all vars
-        all_visitor = visitor.AllVisitor()
-        all_vars = set()
-        for output_var in sorted(output_vars, key=lambda x: x.object_id):
-            all_vars.update(all_visitor.visit(output_var))
+        # long delay lines to RAMs
+        if self.delay_ram_threshold is not None:
+            ram_taps = sched.map_delay_rams(g.order, output_vars,
+                                            self.delay_ram_threshold)
+        else:
+            ram_taps = ()
+        ram_tap_ids = set([tap.object_id for tap in ram_taps])
+
+        # get all vars: the graph nodes and the inserted delay variables
+        all_vars = set(g.order)
+        for taps in sched.delay_lines.values():
+            all_vars.update([tap for tap in taps
+                             if tap.object_id not in ram_tap_ids])
+
+        # bind operators to shared units
+        alloc = allocator.Allocator(self.initiation_interval)
+        alloc.bind(all_vars)
+
+        stats = OrderedDict()
+        stats['pipeline_depth'] = max_stage
+        stats.update(sched.get_stats())
+        if rsc is not None:
+            stats.update(rsc.get_stats())
+        if rng is not None:
+            stats.update(rng.get_stats())
+        if rtm is not None:
+            stats.update(rtm.get_stats())
+        if self.initiation_interval > 1:
+            stats.update(alloc.get_stats())
 
         # control (valid and ready)
         if not self.has_control:
@@ -218,8 +309,8 @@ class Stream(object):
         self.implement_control(seq)
 
         # allocate (implement signals)
-        alloc = allocator.Allocator()
-        alloc.allocate(m, seq, all_vars, self.valid_list, self.senable)
+        alloc.allocate(m, seq, all_vars, self.valid_list, self.senable,
+                       self.phase)
 
         # set default module information
         for var in sorted(all_vars, key=lambda x: x.object_id):
@@ -238,6 +329,7 @@ class Stream(object):
         # save schedule result
         self.last_input = input_vars
         self.last_output = output_vars
+        self.last_stats = stats
 
         if self.dump:
             self.add_dump(m, seq, input_vars, output_vars, all_vars)
@@ -265,6 +357,10 @@ class Stream(object):
                 return obj.__class__.__name__
             raise TypeError()
 
+        if self.dump_format == 'binary':
+            self.add_binary_dump(seq, input_vars, output_vars, all_vars, get_name)
+            return
+
         longest_name_len = 0
         for input_var in sorted(input_vars, key=lambda x: x.object_id):
             if not (self.dump_mode == 'all' or
@@ -523,6 +619,116 @@ class Stream(object):
                 vtypes.Display(fmt, self.dump_step, stage, age, sig_data)
             )
 
+    def add_binary_dump(self, seq, input_vars, output_vars, all_vars, get_name):
+        """
+        Each dumped value is written as a record of 32-bit words:
+        (index, step, age or address, value, padding),
+        where index refers to the header entry of the variable.
+        """
+
+        for input_var in sorted(input_vars, key=lambda x: x.object_id):
+            if not self._is_dumped(input_var, ('all', 'stream', 'input', 'inout')):
+                continue
+
+            name = get_name(input_var.sig_data)
+            stage = input_var.end_stage if input_var.end_stage is not None else 0
+            self._add_stage_dump(seq, 'in', name, stage, input_var,
+                                 input_var.sig_data)
+
+        for var in sorted(all_vars, key=lambda x: (-1, x.object_id)
+                          if x.end_stage is None else
+                          (x.end_stage, x.object_id)):
+            if not self._is_dumped(var, ('all', 'stream')):
+                continue
+
+            name = get_name(var.sig_data)
+            stage = var.end_stage if var.end_stage is not None else 0
+            self._add_stage_dump(seq, 'var', name, stage, var, var.sig_data)
+
+        for output_var in sorted(output_vars, key=lambda x: x.object_id):
+            if not self._is_dumped(output_var, ('all', 'stream', 'output', 'inout')):
+                continue
+
+            name = get_name(output_var.output_sig_data)
+            stage = output_var.end_stage if output_var.end_stage is not None else 0
+            self._add_stage_dump(seq, 'out', name, stage, output_var,
+                                 output_var.output_sig_data)
+
+    def _is_dumped(self, var, modes):
+        return (self.dump_mode in modes or
+                (self.dump_mode == 'selective' and
+                 hasattr(var, 'dump') and var.dump))
+
+    def _add_stage_dump(self, seq, kind, name, stage, var, sig_data):
+        enable = seq.Prev(self.dump_enable, stage)
+        age = seq.Prev(self.dump_step, stage) - 1
+
+        width = sig_data.bit_length()
+        if width is None or width <= 0:
+            width = 1
+
+        self._add_binary_dump(seq, (enable, vtypes.Not(self.dump_mask)),
+                              kind, name, stage, width, var.point, var.get_signed(),
+                              self.dump_step, age, sig_data)
+
+    def _add_binary_dump(self, seq, cond, kind, name, stage, width, point, signed,
+                         step, age, data):
+        if self.dump_fd is None:
+            self.dump_fd = self.module.Integer('_stream_dump_fd_%d' % self.object_id)
+            self.dump_header = self.module.Initial()
+
+        index = len(self.dump_entries)
+        self.dump_entries.append((kind, name, stage, width, point, signed))
+
+        words = int(math.ceil(width / 32.0))
+        task = vtypes.SystemTask('fwrite', self.dump_fd, '', index, step, age, data)
+        self.dump_records.append((task, words))
+
+        seq.If(*cond)(
+            vtypes.SingleStatement(task)
+        )
+
+        self._update_binary_dump()
+
+    def _update_binary_dump(self):
+        """ pad all the records to the same size, and rewrite the header """
+
+        value_words = max([words for task, words in self.dump_records])
+        record_words = 3 + value_words
+
+        for task, words in self.dump_records:
+            args = task.args[2:6] + tuple([vtypes.Int(0, 32)
+                                            for _ in range(value_words - words)])
+            task.args = (self.dump_fd, '%u' * len(args)) + args
+
+        filename = (self.dump_file if self.dump_file is not None else
+                    '%s.dump' % self.name)
+
+        statement = [
+            self.dump_fd(vtypes.SystemTask('fopen', filename, 'wb'), blk=True),
+            vtypes.Systask('fwrite', self.dump_fd,
+                           'veriloggen_dump %d\\n' % record_words)]
+
+        for index, entry in enumerate(self.dump_entries):
+            kind, name, stage, width, point, signed = entry
+            statement.append(
+                vtypes.Systask('fwrite', self.dump_fd,
+                               '%d %s %s %d %d %d %d\\n' %
+                               (index, kind, name, stage, width, point, int(signed))))
+
+        statement.append(vtypes.Systask('fwrite', self.dump_fd, 'end\\n'))
+        self.dump_header.statement = tuple(statement)
+
+    def read_dump(self, filename=None, raw=True):
+        """ records of the binary dump as NumPy arrays """
+        from .dump import read_dump
+
+        if filename is None:
+            filename = (self.dump_file if self.dump_file is not None else
+                        '%s.dump' % self.name)
+
+        return read_dump(filename, raw)
+
     # -------------------------------------------------------------------------
     def add_control(self, aswire=True):
         if self.ivalid is not None and isinstance(self.ivalid, str):
@@ -552,6 +758,10 @@ class Stream(object):
     def implement_control(self, seq):
         self.valid_list = None
 
+        if self.initiation_interval > 1:
+            self._implement_modulo_control(seq)
+            return
+
         if self.ivalid is None and self.oready is None:
             if self.ovalid is not None:
                 self.ovalid.assign(1)
@@ -577,12 +787,46 @@ class Stream(object):
         self._make_valid_chain(seq, self.senable)
         self.iready.assign(self.senable)
 
-    def _make_valid_chain(self, seq, cond=None):
+    def _implement_modulo_control(self, seq):
+        """
+        A phase counter runs modulo the initiation interval,
+        and a new input is accepted only at phase 0.
+        """
+
+        if self.ivalid is None:
+            raise ValueError("'ivalid' is required for initiation_interval > 1.")
+
+        if self.oready is None:
+            self.senable = None
+        else:
+            cond = vtypes.OrList(vtypes.Not(self.ovalid), self.oready)
+            self.senable = self.module.TmpWire()
+            self.senable.assign(cond)
+
+        width = max(int(math.ceil(math.log(self.initiation_interval, 2))), 1)
+        self.phase = self.module.Reg('_stream_phase_%d' % self.object_id,
+                                     width, initval=0)
+        seq(self.phase(vtypes.Mux(self.phase == self.initiation_interval - 1,
+                                  0, self.phase + 1)), cond=self.senable)
+
+        accept = vtypes.AndList(self.ivalid, self.phase == 0)
+        self._make_valid_chain(seq, self.senable, accept)
+
+        if self.iready is not None:
+            if self.senable is None:
+                self.iready.assign(self.phase == 0)
+            else:
+                self.iready.assign(vtypes.AndList(self.senable, self.phase == 0))
+
+    def _make_valid_chain(self, seq, cond=None, ivalid=None):
+        if ivalid is None:
+            ivalid = self.ivalid
+
         self.valid_list = []
-        self.valid_list.append(self.ivalid)
+        self.valid_list.append(ivalid)
 
         name = self.ivalid.name
-        prev = self.ivalid
+        prev = ivalid
 
         for i in range(self.max_stage):
             v = self.module.Reg("_{}_{}".format(name, i), initval=0)
@@ -601,6 +845,14 @@ class Stream(object):
         graph.draw_graph(self.last_output, filename=filename, prog=prog,
                          rankdir=rankdir, approx=approx)
 
+    def export_graph(self, filename=None):
+        """ scheduled graph as a node-link dict, written to a JSON file if filename is given """
+        if self.last_output is None:
+            self.implement()
+
+        return graph.export_graph(self.last_output, filename=filename,
+                                  pipeline_depth=self.max_stage)
+
     def enable_draw_graph(self, filename='out.png', prog='dot', rankdir='LR', approx=False):
         self.module.add_hook(self.draw_graph,
                              kwargs={'filename': filename, 'prog': prog,
@@ -631,6 +883,20 @@ class Stream(object):
 
         return ret
 
+    def get_stats(self):
+        """ scheduling statistics of the last implementation """
+        if self.last_stats is None:
+            return OrderedDict()
+
+        return OrderedDict(self.last_stats)
+
+    def execute(self, inputs, length=None, raw=True, **custom_methods):
+        """ bit-accurate reference values of the outputs by NumPy """
+        from .executor import Executor
+
+        exe = Executor(self, **custom_methods)
+        return exe.run(inputs, length, raw)
+
     # -------------------------------------------------------------------------
     def pipeline_depth(self):
         return self.max_stage
@@ -124,6 +124,10 @@ class _Numeric(_Node):
         # stage numbers NOT incremented
         self.previous_value = OrderedDict()
 
+        # for the width narrowing
+        self.value_range = None
+        self.narrowable = True
+
     def output(self, data):
         if self.output_data is not None:
             raise ValueError('output_data is already assigned.')
@@ -173,6 +177,19 @@ class _Numeric(_Node):
 
         return data
 
+    def set_range(self, min_value, max_value):
+        """ range of the (raw integer) values for the width narrowing """
+        if min_value > max_value:
+            raise ValueError("min_value (%d) > max_value (%d)" %
+                             (min_value, max_value))
+        self.value_range = (min_value, max_value)
+        return self
+
+    def keep_width(self):
+        """ exclude this node from the width narrowing """
+        self.narrowable = False
+        return self
+
     def get_signed(self):
         return self.signed
 
@@ -645,15 +662,22 @@ class Divide(_BinaryOperator):
     latency = 32 + 5
     variable_latency = 'get_latency'
 
+    def __init__(self, left, right, radix=2):
+        # quotient bits decided per pipeline stage: log2(radix)
+        div._get_radix_bits(radix)
+        self.radix = radix
+        _BinaryOperator.__init__(self, left, right)
+        self.latency = self.get_latency()
+
     def get_latency(self):
-        return self.bit_length() + 5
+        return div.get_latency(self.bit_length(), self.radix)
 
     def eval(self):
         left = self.left.eval()
         right = self.right.eval()
         if isinstance(left, int) and isinstance(right, int):
             return int(left / right)
-        return Divide(left, right)
+        return Divide(left, right, self.radix)
 
     def _implement(self, m, seq, svalid=None, senable=None):
         if self.latency <= 5:
@@ -719,7 +743,13 @@ class Divide(_BinaryOperator):
             s = ns
         m.Assign(osign(s))
 
-        inst = div.get_div()
+        if self.radix == 2:
+            inst = div.get_div()
+            params = [('W_D', width)]
+        else:
+            inst = div.get_div_radix(width, self.radix)
+            params = []
+
         clk = m._clock
         rst = m._reset
 
@@ -730,7 +760,6 @@ class Divide(_BinaryOperator):
         else:
             m.Assign(update(vtypes.Int(1, 1)))
 
-        params = [('W_D', width)]
         ports = [('CLK', clk), ('RST', rst), ('update', update), ('enable', vtypes.Int(1, 1)),
                  ('in_a', abs_ldata), ('in_b', abs_rdata), ('rslt', abs_odata)]
 
@@ -741,8 +770,15 @@ class Mod(_BinaryOperator):
     latency = 32 + 5
     variable_latency = 'get_latency'
 
+    def __init__(self, left, right, radix=2):
+        # quotient bits decided per pipeline stage: log2(radix)
+        div._get_radix_bits(radix)
+        self.radix = radix
+        _BinaryOperator.__init__(self, left, right)
+        self.latency = self.get_latency()
+
     def get_latency(self):
-        return self.bit_length() + 5
+        return div.get_latency(self.bit_length(), self.radix)
 
     def eval(self):
         return self.left.eval() % self.right.eval()
@@ -811,7 +847,13 @@ class Mod(_BinaryOperator):
             s = ns
         m.Assign(osign(s))
 
-        inst = div.get_div()
+        if self.radix == 2:
+            inst = div.get_div()
+            params = [('W_D', width)]
+        else:
+            inst = div.get_div_radix(width, self.radix)
+            params = []
+
         clk = m._clock
         rst = m._reset
 
@@ -822,7 +864,6 @@ class Mod(_BinaryOperator):
         else:
             m.Assign(update(vtypes.Int(1, 1)))
 
-        params = [('W_D', width)]
         ports = [('CLK', clk), ('RST', rst), ('update', update), ('enable', vtypes.Int(1, 1)),
                  ('in_a', abs_ldata), ('in_b', abs_rdata), ('mod', abs_odata)]
 
@@ -854,8 +895,8 @@ def Mul(left, right):
     return Times(left, right)
 
 
-def Div(left, right):
-    return Divide(left, right)
+def Div(left, right, radix=2):
+    return Divide(left, right, radix)
 
 
 class LessThan(_BinaryOperator):
@@ -1754,13 +1795,16 @@ class CustomOp(_SpecialOperator):
 class LUT(_SpecialOperator):
     latency = 1
 
-    def __init__(self, address, patterns, width=32, point=0, signed=True):
+    def __init__(self, address, patterns, width=32, point=0, signed=True,
+                 memimg=None):
+        """ memimg: file name of the table loaded by $readmemh """
         _SpecialOperator.__init__(self, address)
         self.op = None
         self.width = width
         self.point = point
         self.signed = signed
         self.patterns = patterns
+        self.memimg = memimg
         self.graph_label = 'LUT'
 
     def _set_attributes(self):
@@ -1791,8 +1835,9 @@ class LUT(_SpecialOperator):
         data = m.Wire(self.name('data'), width, signed=signed)
         self.sig_data = data
 
-        inst = rom.mkROMDefinition(self.name('LUT_ROM'), self.patterns,
-                                   size, width, sync=True, with_enable=True)
+        inst = rom.getROMDefinition(self.name('LUT_ROM'), self.patterns,
+                                    size, width, sync=True, with_enable=True,
+                                    memimg=self.memimg)
         clk = m._clock
         if senable is not None:
             enable = senable
@@ -1887,6 +1932,9 @@ class _Delay(_UnaryOperator):
         _UnaryOperator.__init__(self, right)
         # parent value for delayed_value and previous_value
         self.parent_value = None
+        # source and number of cycles of a RAM delay line ending at this tap
+        self.ram_source = None
+        self.ram_delay = 0
 
         self.graph_label = 'Delay'
         self.graph_shape = 'box'
@@ -1899,6 +1947,10 @@ class _Delay(_UnaryOperator):
     def _get_parent_value(self):
         return self.parent_value
 
+    def _set_ram_source(self, source, delay):
+        self.ram_source = source
+        self.ram_delay = delay
+
     def eval(self):
         return self
 
@@ -1909,6 +1961,13 @@ class _Delay(_UnaryOperator):
 
         width = self.bit_length()
         signed = self.get_signed()
+
+        if self.ram_source is not None:
+            rdata = self.ram_source.sig_data
+            self.sig_data = seq.Prev(rdata, self.ram_delay, cond=senable,
+                                     ram_threshold=self.ram_delay)
+            return
+
         rdata = self.right.sig_data
 
         data = m.Reg(self.name('data'), width, initval=0, signed=signed)
@@ -2618,6 +2677,7 @@ class Counter(_Accumulator):
 
         _Accumulator.__init__(self, control, size, initval,
                               enable, reset, width, signed)
+        self.step = step
         self.graph_label = 'Counter'
 
 
@@ -4,6 +4,9 @@ from __future__ import print_function
 from .thread import reset, embed_thread, Thread, TmpThread
 from .pool import ThreadPool, to_thread_pool
 from .stream import Stream, TmpStream
+from .pipeline import pipelined_range
+from .unroll import unroll
+from .perf import PerfCounter
 
 from .ttypes import __intrinsics__ as __ttypes_intrinsics__
 from .ttypes import *
@@ -42,7 +42,8 @@ class AXIM(axi.AxiMaster, _MutexFunction):
                  noio=False,
                  enable_async=False, use_global_base_addr=False,
                  num_cmd_delay=0, num_data_delay=0,
-                 op_sel_width=8, fsm_as_module=False):
+                 op_sel_width=8, fsm_as_module=False,
+                 arbiter=None, stats=False):
 
         axi.AxiMaster.__init__(self, m, name, clk, rst, datawidth, addrwidth,
                                waddr_id_width, wdata_id_width, wresp_id_width,
@@ -63,7 +64,8 @@ class AXIM(axi.AxiMaster, _MutexFunction):
         self.op_sel_width = op_sel_width
         self.fsm_as_module = fsm_as_module
 
-        self.mutex = None
+        # arbiter and stats of the Mutex of lock()
+        self._set_mutex_options(arbiter, stats)
 
         self.read_start = self.m.Reg('_'.join(['', self.name, 'read_start']),
                                      initval=0)
@@ -241,14 +243,18 @@ class AXIM(axi.AxiMaster, _MutexFunction):
 
     def dma_wait_read(self, fsm):
 
+        fsm.add_stall('dma_wait', vtypes.Not(self.read_idle))
         fsm.If(self.read_idle).goto_next()
 
     def dma_wait_write(self, fsm):
 
+        fsm.add_stall('dma_wait', vtypes.Not(self.write_idle))
         fsm.If(self.write_idle).goto_next()
 
     def dma_wait(self, fsm):
 
+        fsm.add_stall('dma_wait', vtypes.Not(
+            vtypes.Ands(self.read_idle, self.write_idle)))
         fsm.If(self.read_idle, self.write_idle).goto_next()
 
     def set_global_base_addr(self, fsm, addr):
@@ -1553,7 +1559,8 @@ class AXIMLite(axi.AxiLiteMaster, _MutexFunction):
                  waddr_prot_mode=axi.AxPROT_NONCOHERENT, raddr_prot_mode=axi.AxPROT_NONCOHERENT,
                  noio=False,
                  use_global_base_addr=False,
-                 fsm_as_module=False):
+                 fsm_as_module=False,
+                 arbiter=None, stats=False):
 
         axi.AxiLiteMaster.__init__(self, m, name, clk, rst, datawidth, addrwidth,
                                    waddr_cache_mode, raddr_cache_mode,
@@ -1563,7 +1570,8 @@ class AXIMLite(axi.AxiLiteMaster, _MutexFunction):
         self.use_global_base_addr = use_global_base_addr
         self.fsm_as_module = fsm_as_module
 
-        self.mutex = None
+        # arbiter and stats of the Mutex of lock()
+        self._set_mutex_options(arbiter, stats)
 
     def read(self, fsm, global_addr):
         if self.use_global_base_addr:
@@ -1737,7 +1745,7 @@ class AXISRegister(AXIS):
         ack, last = self.push_read_data(rdata, counter, cond=fsm)
 
         # flag reset
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         for i, r in enumerate(self.register):
             self.seq.If(state_cond, ack, flag, maskaddr == i)(
                 self.register[i](resetval),
@@ -1756,7 +1764,7 @@ class AXISRegister(AXIS):
 
         data, mask, valid, last = self.pull_write_data(counter, cond=fsm)
 
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         for i, r in enumerate(self.register):
             self.seq.If(state_cond, valid, maskaddr == i)(
                 self.register[i](data)
@@ -1778,7 +1786,7 @@ class AXISRegister(AXIS):
         return rval
 
     def write(self, fsm, addr, value):
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         for i, r in enumerate(self.register):
             self.seq.If(state_cond, addr == i)(
                 self.register[i](value),
@@ -1787,7 +1795,7 @@ class AXISRegister(AXIS):
         fsm.goto_next()
 
     def write_flag(self, fsm, addr, value, resetvalue=0):
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         for i, r in enumerate(self.register):
             self.seq.If(state_cond, addr == i)(
                 self.register[i](value),
@@ -1828,7 +1836,7 @@ class AXISRegister(AXIS):
         else:
             wait_cond = (rval != value)
 
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
 
         # flag reset
         for i, r in enumerate(self.register):
@@ -1913,7 +1921,7 @@ class AXISLiteRegister(AXISLite):
         ack = self.push_read_data(rdata, cond=fsm)
 
         # flag reset
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         for i, r in enumerate(self.register):
             self.seq.If(state_cond, ack, flag, maskaddr == i)(
                 self.register[i](resetval),
@@ -1929,7 +1937,7 @@ class AXISLiteRegister(AXISLite):
 
         data, mask, valid = self.pull_write_data(cond=fsm)
 
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         for i, r in enumerate(self.register):
             self.seq.If(state_cond, valid, maskaddr == i)(
                 self.register[i](data)
@@ -1948,7 +1956,7 @@ class AXISLiteRegister(AXISLite):
         return rval
 
     def write(self, fsm, addr, value):
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         for i, r in enumerate(self.register):
             self.seq.If(state_cond, addr == i)(
                 self.register[i](value),
@@ -1957,7 +1965,7 @@ class AXISLiteRegister(AXISLite):
         fsm.goto_next()
 
     def write_flag(self, fsm, addr, value, resetvalue=0):
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         for i, r in enumerate(self.register):
             self.seq.If(state_cond, addr == i)(
                 self.register[i](value),
@@ -1998,7 +2006,7 @@ class AXISLiteRegister(AXISLite):
         else:
             wait_cond = (rval != value)
 
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
 
         # flag reset
         for i, r in enumerate(self.register):
@@ -14,6 +14,8 @@ from veriloggen.optimizer import try_optimize as optimize
 from .scope import ScopeName, ScopeFrameList, ScopeFrame
 from .operator import getVeriloggenOp, getMethodName, applyMethod
 from .fixed import FixedConst
+from .pipeline import pipelined_range, LoopPipeliner
+from .unroll import unroll, LoopUnroller, UnrolledValue
 
 numerical_types = vtypes.numerical_types
 
@@ -28,6 +30,91 @@ def _tmp_name(prefix='_tmp_thread'):
     return ret
 
 
+def _get_sizes(m, fsm):
+    """ numbers of the items of the module and the FSM, to tell the added ones """
+
+    ret = OrderedDict()
+    ret['items'] = len(m.items)
+    ret['hook'] = len(m.hook)
+    ret['seq'] = (len(fsm.seq.body) + len(fsm.seq.prev_dict) +
+                  sum([len(body) for body in fsm.seq.delayed_body.values()]))
+
+    for index, statements in fsm.body.items():
+        ret[('body', index)] = len(statements)
+    for index, jumps in fsm.jump.items():
+        ret[('jump', index)] = len(jumps)
+    for delay, body in fsm.delayed_body.items():
+        for index, statements in body.items():
+            ret[('delayed', delay, index)] = len(statements)
+
+    return ret
+
+
+class _IntrinsicCall(object):
+    """ an intrinsic call, which is replayed to copy the FSM to another thread """
+
+    def __init__(self, func, args, kwargs, state, tmp_count, before, after, ret):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.state = state
+        self.tmp_count = tmp_count
+        # sizes of the module and the FSM before and after the call
+        self.before = before
+        self.after = after
+        self.ret = ret
+
+
+# parsed once per code object, and shared since the compiler does not modify them
+# key: code object, value: AST of the function definition
+_function_asts = {}
+# key: tuple of code objects, value: function table
+_function_tables = {}
+
+
+def get_function_ast(func):
+    """ AST of the definition of func """
+
+    code = _get_code(func)
+    if code is None:
+        return _parse_function(func)
+
+    if code not in _function_asts:
+        _function_asts[code] = _parse_function(func)
+
+    return _function_asts[code]
+
+
+def _parse_function(func):
+    lines, lineno = inspect.getsourcelines(func)
+    tree = ast.parse(textwrap.dedent(''.join(lines))).body[0]
+    # line numbers in the source file, for the source map of the states
+    ast.increment_lineno(tree, lineno - 1)
+    tree.filename = inspect.getsourcefile(func)
+    return tree
+
+
+def get_functions(funcs):
+    """ function table of the definitions of funcs """
+
+    key = tuple([_get_code(func) for func in funcs])
+    if None in key or key not in _function_tables:
+        functionvisitor = FunctionVisitor()
+        for func in funcs:
+            functionvisitor.visit(get_function_ast(func))
+        functions = functionvisitor.getFunctions()
+        if None in key:
+            return functions
+        _function_tables[key] = functions
+
+    return OrderedDict(_function_tables[key])
+
+
+def _get_code(func):
+    func = getattr(func, '__func__', func)
+    return getattr(func, '__code__', None)
+
+
 class FunctionVisitor(ast.NodeVisitor):
 
     def __init__(self):
@@ -64,10 +151,43 @@ class CompileVisitor(ast.NodeVisitor):
 
         self.scope = ScopeFrameList()
         self.loop_info = OrderedDict()
+        # intrinsics may modify objects other than the FSM of this thread,
+        # and may refer to the states where they are called
+        self.num_intrinsic_calls = 0
+        self.intrinsic_states = set()
+        # _IntrinsicCall of each call, which are recorded if not None
+        self.intrinsic_calls = None
+        self.pipelined_loops = []
+        self.unrolled_loops = []
+
+        # state index -> (filename, lineno, function name) of the statement
+        self.source_map = OrderedDict()
+        self.function_stack = []
 
         for func in functions.values():
             self.scope.addFunction(func)
 
+    # -------------------------------------------------------------------------
+    def visit(self, node):
+        if not isinstance(node, ast.stmt):
+            return ast.NodeVisitor.visit(self, node)
+
+        begin = self.getFsmCount()
+        ret = ast.NodeVisitor.visit(self, node)
+        self._add_source(node, begin)
+        return ret
+
+    def _add_source(self, node, begin):
+        """ the states added by a statement, except by the inner statements """
+
+        if not self.function_stack or not hasattr(node, 'lineno'):
+            return
+
+        filename, name = self.function_stack[-1]
+        for index in range(begin, self.getFsmCount()):
+            if index not in self.source_map:
+                self.source_map[index] = (filename, node.lineno, name)
+
     # -------------------------------------------------------------------------
     def visit_Import(self, node):
         raise TypeError("{} is not supported.".format(type(node)))
@@ -253,6 +373,13 @@ class CompileVisitor(ast.NodeVisitor):
                 node.iter.func.id == 'range'):
             return self._for_range(node)
 
+        if isinstance(node.iter, ast.Call):
+            directive = self._get_loop_directive(node.iter.func)
+            if directive is pipelined_range:
+                return self._for_pipelined_range(node)
+            if directive is unroll:
+                return self._for_unroll(node)
+
         if isinstance(node.iter, (ast.Name, ast.Tuple, ast.List)):
             return self._for_list(node)
 
@@ -340,6 +467,149 @@ class CompileVisitor(ast.NodeVisitor):
 
         self.setFsmLoop(check_count, body_end_count, iter_node, step_node)
 
+    def _get_loop_directive(self, node):
+        if not isinstance(node, (ast.Name, ast.Attribute)):
+            return None
+        try:
+            func = self.visit(node)
+        except (NameError, AttributeError):
+            return None
+        if func is pipelined_range or func is unroll:
+            return func
+        return None
+
+    def _for_pipelined_range(self, node):
+        if len(node.iter.args) == 0:
+            raise ValueError('not enough arguments')
+
+        ii = 1
+        for key in node.iter.keywords:
+            if key.arg != 'ii':
+                raise TypeError("pipelined_range() got an unexpected keyword argument '%s'" %
+                                key.arg)
+            ii = vtypes.to_int(self.visit(key.value))
+
+        begin_node = (vtypes.Int(0)
+                      if len(node.iter.args) == 1
+                      else self.visit(node.iter.args[0]))
+
+        end_node = (self.visit(node.iter.args[0])
+                    if len(node.iter.args) == 1
+                    else self.visit(node.iter.args[1]))
+
+        step_node = (vtypes.Int(1)
+                     if len(node.iter.args) < 3
+                     else self.visit(node.iter.args[2]))
+
+        iter_name = self.visit(node.target)
+        if not isinstance(iter_name, str):
+            raise TypeError('loop variable of a pipelined loop must be a name')
+
+        iter_node = self.getVariable(iter_name, store=True)
+        cond_node = vtypes.LessThan(iter_node, end_node)
+        update_node = vtypes.Plus(iter_node, step_node)
+
+        pipeliner = LoopPipeliner(self, iter_name, node.body, ii)
+
+        self.pushScope()
+        loop_count, drain_count = pipeliner.make_fsm(begin_node, iter_node,
+                                                     cond_node, update_node)
+        self.popScope()
+
+        # the stages refer to the states of the loop
+        self.intrinsic_states.update([loop_count, drain_count])
+        self.pipelined_loops.append(pipeliner)
+
+    def _for_unroll(self, node):
+        if len(node.iter.args) != 1:
+            raise TypeError('unroll() takes exactly one positional argument')
+
+        factor = None
+        for key in node.iter.keywords:
+            if key.arg != 'factor':
+                raise TypeError("unroll() got an unexpected keyword argument '%s'" %
+                                key.arg)
+            if not (isinstance(key.value, ast.Constant) and key.value.value is None):
+                factor = vtypes.to_int(self.visit(key.value))
+                if factor < 1:
+                    raise ValueError('factor must be a positive int or None.')
+
+        iterable = node.iter.args[0]
+        iter_name = self.visit(node.target)
+        if not isinstance(iter_name, str):
+            raise TypeError('loop variable of an unrolled loop must be a name')
+
+        iter_node = self.getVariable(iter_name, store=True)
+        unroller = LoopUnroller(self, iter_name, node.body)
+        self.unrolled_loops.append(unroller)
+
+        if (isinstance(iterable, ast.Call) and
+            isinstance(iterable.func, ast.Name) and
+                iterable.func.id == 'range'):
+            try:
+                args = [vtypes.to_int(self.visit(arg)) for arg in iterable.args]
+            except TypeError:
+                raise ValueError('unrolled loop must have a constant trip count')
+            values = list(range(*args))
+            begin = args[0] if len(args) > 1 else 0
+            step = args[2] if len(args) > 2 else 1
+
+        else:
+            if factor is not None:
+                raise ValueError('factor is supported only for range()')
+            values = list(self.visit(iterable))
+
+        if factor is None or factor >= len(values):
+            num_main = 0
+        else:
+            num_main = len(values) // factor * factor
+
+        # partially unrolled loop
+        if num_main > 0:
+            if step <= 0:
+                raise ValueError('step of a partially unrolled loop must be positive')
+
+            main_step = step * factor
+            main_end = begin + num_main * step
+            copies = [ast.BinOp(left=ast.Name(id=iter_name, ctx=ast.Load()),
+                                op=ast.Add(), right=UnrolledValue(i * step))
+                      for i in range(factor)]
+
+            iter_values = (begin, main_step, num_main // factor)
+            node_body = unroller.unroll(copies, iter_values)
+
+            cond_node = vtypes.LessThan(iter_node, main_end)
+            update_node = vtypes.Plus(iter_node, main_step)
+
+            self._for_range_fsm(vtypes.Int(begin), vtypes.Int(main_end),
+                                vtypes.Int(main_step), iter_node, cond_node,
+                                update_node, node_body)
+
+        # as in Python, the loop variable refers to the last value after the loop
+        if values:
+            self.setBind(iter_node, values[-1])
+
+        # fully unrolled iterations
+        rest = values[num_main:]
+        if not rest:
+            if values:
+                self.setFsm()
+                self.incFsmCount()
+            return
+
+        self.pushScope()
+
+        for statement in unroller.unroll([UnrolledValue(v) for v in rest]):
+            self.visit(statement)
+
+        self.popScope()
+
+    def visit_UnrolledValue(self, node):
+        return node.value
+
+    def visit_UnrolledGroup(self, node):
+        return node.unroller.compile_group(node)
+
     def _for_list(self, node):
         target_name = self.visit(node.target)
         target = self.getVariable(target_name, store=True)
@@ -615,7 +885,9 @@ class CompileVisitor(ast.NodeVisitor):
         return ret
 
     def _visit_next_function(self, node):
+        self.function_stack.append((getattr(node, 'filename', None), node.name))
         self.generic_visit(node)
+        self.function_stack.pop()
         retvar = self.getReturnVariable()
         if retvar is not None:
             return retvar
@@ -633,7 +905,7 @@ class CompileVisitor(ast.NodeVisitor):
 
         func = self.intrinsic_functions[name]
 
-        return func(*args, **kwargs)
+        return self._call_intrinsic(func, args, kwargs)
 
     def _call_Attribute(self, node):
         value = self.visit(node.func.value)
@@ -664,7 +936,7 @@ class CompileVisitor(ast.NodeVisitor):
                 for thread in value.threads:
                     thread.start_frame = self.start_frame
 
-            return method(*args, **kwargs)
+            return self._call_intrinsic(method, args, kwargs)
 
         # stack a new scope frame
         self.pushScope(ftype='call')
@@ -676,8 +948,7 @@ class CompileVisitor(ast.NodeVisitor):
         self.setFsm()
         self.incFsmCount()
 
-        text = textwrap.dedent(inspect.getsource(method))
-        tree = ast.parse(text).body[0]
+        tree = get_function_ast(method)
 
         # visit the function definition
         ret = self._visit_next_function(tree)
@@ -699,6 +970,28 @@ class CompileVisitor(ast.NodeVisitor):
 
         return ret
 
+    def _call_intrinsic(self, func, args, kwargs):
+        begin = self.fsm.current
+        if self.intrinsic_calls is not None:
+            tmp_count = self.fsm.tmp_count
+            before = _get_sizes(self.m, self.fsm)
+
+        ret = func(*args, **kwargs)
+        end = self.fsm.current
+
+        if self.intrinsic_calls is not None:
+            after = _get_sizes(self.m, self.fsm)
+            self.intrinsic_calls.append(
+                _IntrinsicCall(func, args, kwargs, begin, tmp_count,
+                               before, after, ret))
+
+        # the state where the compilation resumes is not referred by the intrinsic
+        self.num_intrinsic_calls += 1
+        self.intrinsic_states.add(begin)
+        self.intrinsic_states.update(range(begin, end))
+
+        return ret
+
     def _is_intrinsic_method(self, value, method):
         intrinsics = getattr(value, '__intrinsics__', ())
         return (method.__name__ in intrinsics)
@@ -1073,9 +1366,7 @@ class CompileVisitor(ast.NodeVisitor):
         if name in local_objects:
             func = local_objects[name]
             if inspect.isfunction(func):
-                text = textwrap.dedent(inspect.getsource(func))
-                tree = ast.parse(text).body[0]
-                return tree
+                return get_function_ast(func)
 
         raise NameError("function '%s' is not defined" % name)
 
@@ -0,0 +1,1737 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import ast
+import functools
+import inspect
+import re
+import sys
+import textwrap
+import threading
+import types
+from collections import ChainMap, OrderedDict, deque
+
+import numpy as np
+
+import veriloggen.core.vtypes as vtypes
+import veriloggen.types.fixed as fxd
+from veriloggen.core.module import Module
+from veriloggen.fsm.fsm import FSM
+from veriloggen.stream.executor import Executor as StreamExecutor
+
+from . import compiler
+from . import fixed
+from . import ttypes
+from . import util
+from .thread import Thread
+from .pool import ThreadPool
+from .ram import RAM, MultibankRAM
+from .fifo import FIFO
+from .axi import AXIM, AXIMLite, AXISRegister, AXISLiteRegister
+from .stream import Stream
+
+# cycles of the handshakes of the intrinsics, which are spent in addition to
+# the states where the intrinsics are called
+default_cycles = OrderedDict([
+    # wait for the read data
+    ('ram_read', 2),
+    ('fifo_deq', 2),
+    # acquisition of a lock or a barrier
+    ('lock', 1),
+    # address and data handshakes of a single access of an AXI master
+    ('axi_access', 1),
+    # setup of a DMA transfer
+    ('dma', 3),
+    # start-up of a stream until its pipeline is filled with the first data
+    ('stream', 10),
+    # latency of a request to the global memory (AxiMemoryModel by default)
+    ('memory_latency', 20),
+])
+
+
+class Executor(object):
+    """
+    Functional model of a thread in Python.
+
+    The target function of the thread is executed as a Python function,
+    where the intrinsic objects (RAM, FIFO, Mutex, Barrier, AXIM, Stream,
+    Thread and so on) are replaced with software models.
+    RAMs hold NumPy arrays, and AXI masters share a byte-addressed
+    little-endian NumPy memory.
+    Threads started by the program run as coroutines, which switch with
+    each other when they wait for a lock, a barrier, a FIFO or a thread.
+
+    Values are Python integers. A value stored into a local variable or an
+    argument is wrapped to the signed datawidth of the thread, as the register
+    of the variable in the hardware, and a value stored into a RAM, a FIFO or
+    the memory is wrapped to the width of the word. Intermediate values of
+    an expression are not truncated.
+    A stream is evaluated at once by the NumPy executor of stream graphs,
+    when Stream.run() is called.
+
+    The cycle count is estimated from the FSM mapping: each thread is
+    compiled once into a scratch module, where the intrinsic methods of the
+    objects are replaced with a state, and an executed source line costs the
+    states of the statement after the merging and the scheduling of the
+    states. The handshakes of the intrinsics add the fixed costs of
+    default_cycles. So a program which the compiler rejects is not executed.
+    Parallel threads advance their own counts, and a thread which waits for
+    another one continues from the count at which the wait is released.
+
+    cycles: dict to override the entries of default_cycles
+    max_cycles: an error is raised when a thread exceeds the cycle count
+    """
+
+    def __init__(self, thread, memory_size=2 ** 20, cycles=None,
+                 max_cycles=None):
+        if not isinstance(thread, Thread):
+            raise TypeError("Thread is required, not '%s'" % str(type(thread)))
+
+        self.thread = thread
+        self.memory = np.zeros(memory_size, dtype=np.uint8)
+        self.cycles = OrderedDict(default_cycles)
+        if cycles is not None:
+            for key, value in cycles.items():
+                if key not in self.cycles:
+                    raise ValueError("no such cycle entry '%s'" % key)
+                self.cycles[key] = value
+        self.max_cycles = max_cycles
+
+        self.models = OrderedDict()
+        self.objects = {}
+        # code object -> source file of the code
+        self.codes = {}
+        # id of thread -> cycles of each (filename, lineno) of the thread
+        self.lines = {}
+        self.modules = set()
+
+        self.tasks = []
+        self.current = None
+        self.condition = threading.Condition()
+        self.terminated = False
+        self.error = None
+        self.finished = False
+
+    def run(self, *args, **kwargs):
+        """
+        execute the target function of the thread
+        returns: (return value, approximate cycle count)
+        """
+
+        targ = self.thread.targ
+        self._add_module(targ)
+        for func in self.thread.function_lib.values():
+            self._add_module(func)
+
+        func = self.model_of(targ)
+        glbs = getattr(func, '__globals__', None)
+        if glbs is not None:
+            for name, f in self.thread.function_lib.items():
+                if name not in glbs:
+                    glbs[name] = self.model_of(f)
+            for name, f in self.thread.intrinsic_functions.items():
+                glbs[name] = _unsupported_function(name)
+
+        self.tasks = []
+        self.terminated = False
+        self.error = None
+        self.finished = False
+
+        lines = self._get_lines(self.thread, args, kwargs)
+        main = self._spawn(self.thread.name, func, args, kwargs, 0,
+                           self.thread.datawidth, lines)
+
+        with self.condition:
+            self.current = main
+            self.condition.notify_all()
+            while self.current is not None and self.error is None:
+                self.condition.wait()
+
+            if self.error is None and not self.finished and not main.done:
+                self.error = ValueError(
+                    "deadlock: '%s' waits forever" % main.name)
+
+            self.terminated = True
+            self.condition.notify_all()
+
+        for task in self.tasks:
+            task.pythread.join()
+
+        if self.error is not None:
+            raise self.error
+
+        return main.result, main.time
+
+    # -------------------------------------------------------------------------
+    def set_ram(self, ram, values, offset=0):
+        """ store values into a RAM from the address offset """
+        model = self.model_of(ram)
+        for i, value in enumerate(values):
+            model.set(offset + i, int(value))
+
+    def get_ram(self, ram, offset=0, size=None):
+        """ values of a RAM as a NumPy array of the signed values """
+        model = self.model_of(ram)
+        if size is None:
+            size = model.length - offset
+        return np.array([model.get(offset + i) for i in range(size)])
+
+    def set_memory(self, addr, values, datawidth=32):
+        """ store values into the global memory from the byte address """
+        wordsize = datawidth // 8
+        for i, value in enumerate(values):
+            self._write_memory(addr + i * wordsize, int(value), datawidth)
+
+    def get_memory(self, addr, size, datawidth=32):
+        """ values of the global memory as a NumPy array of the signed values """
+        wordsize = datawidth // 8
+        return np.array([self._read_memory(addr + i * wordsize, datawidth)
+                         for i in range(size)])
+
+    def set_register(self, axi, addr, value):
+        """ write a register of AXISRegister or AXISLiteRegister as the host """
+        self.model_of(axi).registers[addr] = int(value)
+
+    def get_register(self, axi, addr):
+        """ read a register of AXISRegister or AXISLiteRegister as the host """
+        return self.model_of(axi).registers[addr]
+
+    def get_variable(self, var):
+        """ value of a variable which is written by value attribute """
+        return self.model_of(var).value
+
+    # -------------------------------------------------------------------------
+    def model_of(self, obj):
+        """ object which is used in place of obj in the Python execution """
+
+        key = id(obj)
+        if key in self.models:
+            return self.models[key]
+
+        if obj is ttypes.verilog:
+            return _VerilogModel()
+
+        if isinstance(obj, (type, int, float, str, bool)) or obj is None:
+            return obj
+
+        model = self._make_model(obj)
+        if model is not obj:
+            self.models[key] = model
+            # keep the object alive for its id
+            self.objects[key] = obj
+        return model
+
+    def _make_model(self, obj):
+        if isinstance(obj, types.FunctionType):
+            return self._function(obj)
+
+        if isinstance(obj, types.MethodType):
+            if isinstance(obj.__func__, types.FunctionType) and self._is_user(obj.__func__):
+                return types.MethodType(self.model_of(obj.__func__),
+                                        _ObjectModel(self, obj.__self__))
+            return obj
+
+        if isinstance(obj, types.ModuleType):
+            if hasattr(obj, '__intrinsics__'):
+                return _ModuleModel(self, obj)
+            return obj
+
+        if type(obj) in (list, tuple):
+            values = [self.model_of(v) for v in obj]
+            if all([v is o for v, o in zip(values, obj)]):
+                return obj
+            return type(obj)(values)
+
+        for cls, model_cls in _model_classes:
+            if isinstance(obj, cls):
+                return model_cls(self, obj)
+
+        if isinstance(obj, vtypes._Variable):
+            return _VariableModel(self, obj)
+
+        if hasattr(obj, '__intrinsics__'):
+            return _Model(self, obj)
+
+        return obj
+
+    def _add_module(self, func):
+        if isinstance(func, types.MethodType):
+            func = func.__func__
+        self.modules.add(getattr(func, '__module__', None))
+
+    def _is_user(self, func):
+        return func.__module__ in self.modules
+
+    def _function(self, func):
+        if func in _function_models:
+            return functools.partial(_function_models[func], self)
+        if not self._is_user(func):
+            return func
+
+        glbs = self._globals(func.__globals__)
+
+        closure = None
+        if func.__closure__ is not None:
+            closure = tuple([_make_cell() for _ in func.__closure__])
+
+        code = _wrap_stores(func)
+        if code is None:
+            code = func.__code__
+        else:
+            glbs[_store_name] = self._store
+
+        if func.__closure__ is not None:
+            cells = dict(zip(func.__code__.co_freevars, closure))
+            closure = tuple([cells[name] for name in code.co_freevars])
+
+        new_func = types.FunctionType(code, glbs, func.__name__,
+                                      None, closure)
+        self.models[id(func)] = new_func
+        self.objects[id(func)] = func
+
+        if func.__closure__ is not None:
+            for cell, orig in zip(closure, func.__closure__):
+                try:
+                    value = orig.cell_contents
+                except ValueError:
+                    continue
+                cell.cell_contents = self.model_of(value)
+
+        if func.__defaults__ is not None:
+            new_func.__defaults__ = tuple([self.model_of(v)
+                                           for v in func.__defaults__])
+        if func.__kwdefaults__ is not None:
+            new_func.__kwdefaults__ = dict([(k, self.model_of(v))
+                                            for k, v in func.__kwdefaults__.items()])
+
+        self._add_code(func, code)
+        return new_func
+
+    def _globals(self, glbs):
+        key = id(glbs)
+        if key in self.models:
+            return self.models[key]
+
+        new_glbs = {}
+        self.models[key] = new_glbs
+        self.objects[key] = glbs
+
+        for name, value in glbs.items():
+            if name.startswith('__'):
+                new_glbs[name] = value
+            else:
+                new_glbs[name] = self.model_of(value)
+
+        return new_glbs
+
+    def _add_code(self, func, code):
+        if code in self.codes:
+            return
+
+        try:
+            self.codes[code] = inspect.getsourcefile(func)
+        except TypeError:
+            self.codes[code] = None
+
+    def _get_lines(self, thread, args, kwargs):
+        """ cycles of the source lines, by the compilation once for each thread """
+
+        key = id(thread)
+        if key in self.lines:
+            return self.lines[key]
+
+        args = [self._object_of(arg) for arg in args]
+        kwargs = OrderedDict([(k, self._object_of(v)) for k, v in kwargs.items()])
+        self.lines[key] = _compile_lines(thread, args, kwargs)
+        # keep the thread alive for its id
+        self.objects[key] = thread
+        return self.lines[key]
+
+    def _object_of(self, value):
+        """ original object of a model """
+
+        for key, model in self.models.items():
+            if model is value:
+                return self.objects[key]
+        return value
+
+    # -------------------------------------------------------------------------
+    def _spawn(self, name, func, args, kwargs, time, datawidth, lines):
+        task = _Task(self, name, func, args, kwargs, time, datawidth, lines)
+        self.tasks.append(task)
+        task.pythread.start()
+        return task
+
+    def _trace(self, frame, event, arg):
+        if event != 'call' or frame.f_code not in self.codes:
+            return None
+        return self._trace_line
+
+    def _trace_line(self, frame, event, arg):
+        if event == 'line':
+            key = (self.codes[frame.f_code], frame.f_lineno)
+            self._add_cycles(self.current.lines.get(key, 0))
+        return self._trace_line
+
+    def _add_cycles(self, cycles):
+        task = self.current
+        task.time += cycles
+        if self.max_cycles is not None and task.time > self.max_cycles:
+            raise ValueError("'%s' exceeds max_cycles %d" %
+                             (task.name, self.max_cycles))
+
+    def _store(self, value):
+        """ value of the register of a variable """
+
+        if isinstance(value, _VariableModel):
+            value = value.value
+        if isinstance(value, (int, np.integer)):
+            return _signed(value, self.current.datawidth)
+        return value
+
+    def _wait(self, cond):
+        """ switch to the other threads until cond() becomes true """
+
+        if cond():
+            return
+
+        task = self.current
+        task.cond = cond
+        with self.condition:
+            self._switch(task)
+        task.cond = None
+
+    def _yield(self):
+        """ let the other threads run for polling """
+
+        task = self.current
+        with self.condition:
+            self._switch(task)
+
+    def _switch(self, task):
+        num = len(self.tasks)
+        pos = self.tasks.index(task)
+        for i in range(1, num + 1):
+            t = self.tasks[(pos + i) % num]
+            if not t.done and (t.cond is None or t.cond()):
+                self.current = t
+                break
+        else:
+            self.current = None
+
+        self.condition.notify_all()
+
+        while self.current is not task:
+            if self.terminated:
+                raise _Terminate()
+            self.condition.wait()
+
+    def _read_memory(self, addr, datawidth, signed=True):
+        wordsize = datawidth // 8
+        self._check_memory(addr + wordsize)
+        value = int.from_bytes(self.memory[addr:addr + wordsize].tobytes(),
+                               'little')
+        if signed:
+            return _signed(value, datawidth)
+        return value
+
+    def _write_memory(self, addr, value, datawidth):
+        wordsize = datawidth // 8
+        self._check_memory(addr + wordsize)
+        value = value & _mask(datawidth)
+        self.memory[addr:addr + wordsize] = np.frombuffer(
+            value.to_bytes(wordsize, 'little'), dtype=np.uint8)
+
+    def _check_memory(self, size):
+        if size > len(self.memory):
+            memory = np.zeros(max(size, len(self.memory) * 2), dtype=np.uint8)
+            memory[:len(self.memory)] = self.memory
+            self.memory = memory
+
+
+class _Task(object):
+
+    def __init__(self, executor, name, func, args, kwargs, time, datawidth,
+                 lines):
+        self.executor = executor
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.time = time
+        self.datawidth = datawidth
+        # (filename, lineno) -> cycles
+        self.lines = lines
+        self.done = False
+        self.result = None
+        self.cond = None
+        self.pythread = threading.Thread(target=self.main)
+        self.pythread.daemon = True
+
+    def main(self):
+        exe = self.executor
+
+        with exe.condition:
+            while exe.current is not self and not exe.terminated:
+                exe.condition.wait()
+            if exe.terminated:
+                return
+
+        sys.settrace(exe._trace)
+        try:
+            self.result = self.func(*self.args, **self.kwargs)
+        except _Terminate:
+            return
+        except _Finish:
+            exe.finished = True
+        except BaseException as e:
+            exe.error = e
+        finally:
+            sys.settrace(None)
+
+        with exe.condition:
+            self.done = True
+            if exe.finished or exe.error is not None:
+                exe.current = None
+                exe.condition.notify_all()
+                return
+            try:
+                exe._switch(self)
+            except _Terminate:
+                pass
+
+
+class _Terminate(Exception):
+    pass
+
+
+class _Finish(Exception):
+    pass
+
+
+# -----------------------------------------------------------------------------
+class _Model(object):
+    """ software model of an intrinsic object """
+
+    def __init__(self, executor, obj):
+        self._executor = executor
+        self._obj = obj
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        if attr in getattr(self._obj, '__intrinsics__', ()):
+            raise TypeError("'%s.%s' is not supported by the executor" %
+                            (self._obj.__class__.__name__, attr))
+        return getattr(self._obj, attr)
+
+    def _add_cycles(self, key):
+        self._executor._add_cycles(self._executor.cycles[key])
+
+
+class _ObjectModel(object):
+    """ object whose attributes are replaced with the models """
+
+    def __init__(self, executor, obj):
+        object.__setattr__(self, '_executor', executor)
+        object.__setattr__(self, '_obj', obj)
+
+    def __getattr__(self, attr):
+        return self._executor.model_of(getattr(self._obj, attr))
+
+
+class _ModuleModel(object):
+    """ module whose intrinsic functions are replaced with the models """
+
+    def __init__(self, executor, module):
+        self._executor = executor
+        self._module = module
+
+    def __getattr__(self, attr):
+        value = getattr(self._module, attr)
+        if (attr in self._module.__intrinsics__ and
+                not (isinstance(value, types.FunctionType) and
+                     value in _function_models)):
+            return _unsupported_function(attr)
+        return self._executor.model_of(value)
+
+
+class _VariableModel(object):
+    """ register which holds the value written by the thread """
+
+    def __init__(self, executor, obj):
+        self._obj = obj
+        self.value = _initval(obj)
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        width = self._obj.width if self._obj.width is not None else 1
+        if isinstance(width, int) and isinstance(value, (int, np.integer)):
+            if self._obj.signed:
+                value = _signed(value, width)
+            else:
+                value = int(value) & _mask(width)
+        self._value = value
+
+    def __int__(self):
+        return int(self.value)
+
+    def __index__(self):
+        return int(self.value)
+
+    def __bool__(self):
+        return bool(self.value)
+
+    __nonzero__ = __bool__
+
+    def __str__(self):
+        return str(self.value)
+
+
+def _add_variable_operator(name):
+    def method(self, *args):
+        return getattr(int(self.value), name)(*args)
+    setattr(_VariableModel, name, method)
+
+
+for _name in ('__add__', '__radd__', '__sub__', '__rsub__', '__mul__', '__rmul__',
+              '__floordiv__', '__rfloordiv__', '__truediv__', '__rtruediv__',
+              '__mod__', '__rmod__', '__pow__', '__rpow__',
+              '__lshift__', '__rlshift__', '__rshift__', '__rrshift__',
+              '__and__', '__rand__', '__or__', '__ror__', '__xor__', '__rxor__',
+              '__neg__', '__pos__', '__invert__', '__abs__',
+              '__lt__', '__le__', '__gt__', '__ge__', '__eq__', '__ne__'):
+    _add_variable_operator(_name)
+
+
+class _VerilogModel(object):
+    """ verilog operator intrinsics on the Python integers """
+
+    def __getattr__(self, attr):
+        if attr not in _verilog_operators:
+            raise TypeError("'verilog.%s' is not supported by the executor" % attr)
+        return _verilog_operators[attr]
+
+
+def _divide(left, right):
+    # rounded toward zero as Verilog
+    if (left < 0) != (right < 0):
+        return -(abs(left) // abs(right))
+    return abs(left) // abs(right)
+
+
+_verilog_operators = {
+    'Plus': lambda left, right: left + right,
+    'Minus': lambda left, right: left - right,
+    'Times': lambda left, right: left * right,
+    'Divide': _divide,
+    'Mod': lambda left, right: left - _divide(left, right) * right,
+    'Power': lambda left, right: left ** right,
+    'Sll': lambda left, right: left << right,
+    'Srl': lambda left, right: left >> right,
+    'Sla': lambda left, right: left << right,
+    'Sra': lambda left, right: left >> right,
+    'LessThan': lambda left, right: int(left < right),
+    'GreaterThan': lambda left, right: int(left > right),
+    'LessEq': lambda left, right: int(left <= right),
+    'GreaterEq': lambda left, right: int(left >= right),
+    'Eq': lambda left, right: int(left == right),
+    'NotEq': lambda left, right: int(left != right),
+    'Eql': lambda left, right: int(left == right),
+    'NotEql': lambda left, right: int(left != right),
+    'And': lambda left, right: left & right,
+    'Or': lambda left, right: left | right,
+    'Xor': lambda left, right: left ^ right,
+    'Xnor': lambda left, right: ~(left ^ right),
+    'Land': lambda left, right: int(bool(left) and bool(right)),
+    'Lor': lambda left, right: int(bool(left) or bool(right)),
+    'Uplus': lambda right: right,
+    'Uminus': lambda right: -right,
+    'Ulnot': lambda right: int(not right),
+    'Unot': lambda right: ~right,
+    'Not': lambda right: int(not right),
+    'Ands': lambda *args: int(all(args)),
+    'Ors': lambda *args: int(any(args)),
+    'Cond': lambda condition, true_value, false_value: (
+        true_value if condition else false_value),
+    'Mux': lambda condition, true_value, false_value: (
+        true_value if condition else false_value),
+}
+
+
+class _MutexModel(_Model):
+
+    def __init__(self, executor, obj):
+        _Model.__init__(self, executor, obj)
+        self._owner = None
+        self._release_time = 0
+
+    def lock(self):
+        exe = self._executor
+        task = exe.current
+        exe._wait(lambda: self._owner is None or self._owner is task)
+        self._owner = task
+        task.time = max(task.time, self._release_time)
+        self._add_cycles('lock')
+        return 1
+
+    def try_lock(self):
+        exe = self._executor
+        task = exe.current
+        exe._yield()
+        if self._owner is not None and self._owner is not task:
+            return 0
+        self._owner = task
+        task.time = max(task.time, self._release_time)
+        return 1
+
+    def unlock(self):
+        task = self._executor.current
+        if self._owner is task:
+            self._owner = None
+            self._release_time = task.time
+        return 0
+
+    def acquire(self, blocking=True):
+        if blocking:
+            return self.lock()
+        return self.try_lock()
+
+    def release(self):
+        return self.unlock()
+
+
+class _BarrierModel(_Model):
+
+    def __init__(self, executor, obj):
+        _Model.__init__(self, executor, obj)
+        self._count = 0
+        self._generation = 0
+        self._arrival_time = 0
+        self._release_times = {}
+
+    def wait(self):
+        exe = self._executor
+        task = exe.current
+        generation = self._generation
+
+        self._count += 1
+        self._arrival_time = max(self._arrival_time, task.time)
+
+        if self._count == self._obj.numparties:
+            self._release_times[generation] = self._arrival_time
+            self._count = 0
+            self._arrival_time = 0
+            self._generation += 1
+        else:
+            exe._wait(lambda: self._generation != generation)
+
+        task.time = max(task.time, self._release_times[generation])
+        self._add_cycles('lock')
+        return 0
+
+
+class _RAMModel(_MutexModel):
+
+    def __init__(self, executor, obj):
+        _MutexModel.__init__(self, executor, obj)
+        self.datawidth = obj.datawidth
+        self.length = 2 ** obj.addrwidth
+        self.data = [0] * self.length
+
+    def read(self, addr, port=0, raw=False):
+        self._add_cycles('ram_read')
+        return self.get(addr)
+
+    def write(self, addr, wdata, port=0, cond=None, raw=False):
+        if cond is not None and not cond:
+            return 0
+        self.set(addr, wdata)
+        return 0
+
+    def get(self, addr):
+        return _signed(self.get_word(addr), self.datawidth)
+
+    def set(self, addr, value):
+        self.set_word(addr, value)
+
+    def get_word(self, addr):
+        return self.data[int(addr) % self.length]
+
+    def set_word(self, addr, value):
+        self.data[int(addr) % self.length] = int(value) & _mask(self.datawidth)
+
+
+class _MultibankRAMModel(_MutexModel):
+
+    def __init__(self, executor, obj):
+        _MutexModel.__init__(self, executor, obj)
+        self.banks = [executor.model_of(ram) for ram in obj.rams]
+        self.numbanks = obj.numbanks
+        self.shift = obj.shift
+        self.datawidth = obj.datawidth
+        self.length = self.banks[0].length * self.numbanks
+
+    def read(self, addr, port=0):
+        bank, addr = self._split(addr)
+        return self.banks[bank].read(addr, port)
+
+    def write(self, addr, wdata, port=0, cond=None):
+        bank, addr = self._split(addr)
+        return self.banks[bank].write(addr, wdata, port, cond)
+
+    def read_bank(self, bank, addr, port=0):
+        return self.banks[bank].read(addr, port)
+
+    def write_bank(self, bank, addr, wdata, port=0, cond=None):
+        return self.banks[bank].write(addr, wdata, port, cond)
+
+    def dma_read_bank(self, bank, bus, local_addr, global_addr, size,
+                      local_stride=1, port=0):
+        return self._executor.model_of(bus).dma_read(
+            self._obj.rams[bank], local_addr, global_addr, size, local_stride)
+
+    def dma_write_bank(self, bank, bus, local_addr, global_addr, size,
+                       local_stride=1, port=0):
+        return self._executor.model_of(bus).dma_write(
+            self._obj.rams[bank], local_addr, global_addr, size, local_stride)
+
+    def get(self, addr):
+        bank, addr = self._split(addr)
+        return self.banks[bank].get(addr)
+
+    def set(self, addr, value):
+        bank, addr = self._split(addr)
+        self.banks[bank].set(addr, value)
+
+    def get_word(self, addr):
+        value = 0
+        for i, bank in enumerate(self.banks):
+            value |= bank.get_word(addr) << (i * bank.datawidth)
+        return value
+
+    def set_word(self, addr, value):
+        for i, bank in enumerate(self.banks):
+            bank.set_word(addr, value >> (i * bank.datawidth))
+
+    def _split(self, addr):
+        addr = int(addr)
+        return addr & (self.numbanks - 1), addr >> self.shift
+
+
+class _FIFOModel(_MutexModel):
+
+    def __init__(self, executor, obj):
+        _MutexModel.__init__(self, executor, obj)
+        # the FIFO holds one entry less than the size of the memory
+        self.depth = 2 ** obj.addrwidth - 1
+        # (value, cycle count when the value is available)
+        self.queue = deque()
+        self.deq_time = 0
+
+    def enq(self, wdata, raw=False):
+        exe = self._executor
+        task = exe.current
+        if len(self.queue) >= self.depth:
+            exe._wait(lambda: len(self.queue) < self.depth)
+            task.time = max(task.time, self.deq_time)
+        self.queue.append((_signed(int(wdata), self._obj.datawidth),
+                           task.time + 1))
+        return 0
+
+    def deq(self, raw=False):
+        exe = self._executor
+        task = exe.current
+        exe._wait(lambda: len(self.queue) > 0)
+        value, time = self.queue.popleft()
+        task.time = max(task.time, time)
+        self._add_cycles('fifo_deq')
+        self.deq_time = task.time
+        return value
+
+    def try_enq(self, wdata, raw=False):
+        self._executor._yield()
+        if len(self.queue) >= self.depth:
+            return 0
+        self.enq(wdata)
+        return 1
+
+    def try_deq(self, raw=False):
+        self._executor._yield()
+        if not self.queue:
+            return 0, 0
+        return self.deq(), 1
+
+    def is_empty(self):
+        self._executor._yield()
+        return int(len(self.queue) == 0)
+
+    def is_almost_empty(self):
+        self._executor._yield()
+        return int(len(self.queue) <= 1)
+
+    def is_full(self):
+        self._executor._yield()
+        return int(len(self.queue) >= self.depth)
+
+    def is_almost_full(self):
+        self._executor._yield()
+        return int(len(self.queue) >= self.depth - 1)
+
+
+class _SharedModel(_MutexModel):
+
+    def __init__(self, executor, obj):
+        _MutexModel.__init__(self, executor, obj)
+        self.value = _initval(obj._value)
+
+    def read(self):
+        return self.value
+
+    def write(self, value, *part):
+        if part:
+            raise TypeError("partial write of Shared is not supported by the executor")
+        self.value = value
+        return 0
+
+
+class _AXIMModel(_MutexModel):
+
+    def __init__(self, executor, obj):
+        _MutexModel.__init__(self, executor, obj)
+        self.global_base_addr = 0
+        self.read_time = 0
+        self.write_time = 0
+
+    def read(self, global_addr):
+        exe = self._executor
+        self._add_cycles('axi_access')
+        self._add_cycles('memory_latency')
+        return exe._read_memory(self._addr(global_addr), self._obj.datawidth)
+
+    def write(self, global_addr, value):
+        exe = self._executor
+        self._add_cycles('axi_access')
+        exe._write_memory(self._addr(global_addr), int(value),
+                          self._obj.datawidth)
+
+    def dma_read(self, ram, local_addr, global_addr, size,
+                 local_stride=1, port=0, ram_method=None):
+        self.dma_read_async(ram, local_addr, global_addr, size, local_stride)
+        return self.dma_wait_read()
+
+    def dma_read_async(self, ram, local_addr, global_addr, size,
+                       local_stride=1, port=0, ram_method=None):
+        exe = self._executor
+        model = exe.model_of(ram)
+        global_addr = self._addr(global_addr)
+        wordsize = model.datawidth // 8
+
+        for i in range(size):
+            value = exe._read_memory(global_addr + i * wordsize,
+                                     model.datawidth, signed=False)
+            model.set_word(local_addr + i * local_stride, value)
+
+        self.read_time = self._transfer(size, model)
+        return 0
+
+    def dma_write(self, ram, local_addr, global_addr, size,
+                  local_stride=1, port=0, ram_method=None):
+        self.dma_write_async(ram, local_addr, global_addr, size, local_stride)
+        return self.dma_wait_write()
+
+    def dma_write_async(self, ram, local_addr, global_addr, size,
+                        local_stride=1, port=0, ram_method=None):
+        exe = self._executor
+        model = exe.model_of(ram)
+        global_addr = self._addr(global_addr)
+        wordsize = model.datawidth // 8
+
+        for i in range(size):
+            value = model.get_word(local_addr + i * local_stride)
+            exe._write_memory(global_addr + i * wordsize, value,
+                              model.datawidth)
+
+        self.write_time = self._transfer(size, model)
+        return 0
+
+    def dma_wait_read(self):
+        task = self._executor.current
+        task.time = max(task.time, self.read_time)
+        return 0
+
+    def dma_wait_write(self):
+        task = self._executor.current
+        task.time = max(task.time, self.write_time)
+        return 0
+
+    def dma_wait(self):
+        task = self._executor.current
+        task.time = max(task.time, self.read_time, self.write_time)
+        return 0
+
+    def set_global_base_addr(self, addr):
+        if not getattr(self._obj, 'use_global_base_addr', False):
+            raise ValueError("global_base_addr is disabled.")
+        self.global_base_addr = addr
+        return 0
+
+    def _addr(self, global_addr):
+        if getattr(self._obj, 'use_global_base_addr', False):
+            return self.global_base_addr + global_addr
+        return global_addr
+
+    def _transfer(self, size, model):
+        """ cycle count when the transfer is completed """
+
+        exe = self._executor
+        task = exe.current
+        self._add_cycles('dma')
+        num_words = -(-size * model.datawidth // self._obj.datawidth)
+        return task.time + exe.cycles['memory_latency'] + num_words
+
+
+class _RegisterModel(_MutexModel):
+
+    def __init__(self, executor, obj):
+        _MutexModel.__init__(self, executor, obj)
+        self.registers = [0] * len(obj.register)
+
+    def read(self, addr):
+        return self.registers[addr]
+
+    def write(self, addr, value):
+        self.registers[addr] = int(value) & _mask(self._obj.datawidth)
+        return 0
+
+    def write_flag(self, addr, value, resetvalue=0):
+        return self.write(addr, value)
+
+    def wait(self, addr, value, polarity=True):
+        self._executor._wait(
+            lambda: (self.registers[addr] == value) == bool(polarity))
+        return 0
+
+    def wait_flag(self, addr, value, resetvalue=0, polarity=True):
+        self.wait(addr, value, polarity)
+        self.registers[addr] = resetvalue
+        return 0
+
+
+class _StreamModel(_Model):
+
+    def __init__(self, executor, obj):
+        _Model.__init__(self, executor, obj)
+        # name -> (RAM model, addresses) or value of set_source_empty
+        self.sources = OrderedDict()
+        # name -> (RAM model, addresses), size of set_sink_immediate or None
+        self.sinks = OrderedDict()
+        self.constants = OrderedDict()
+        self.immediates = OrderedDict()
+        self.end_time = 0
+
+    def set_source(self, name, ram, offset, size, stride=1, port=0):
+        self.set_source_pattern(name, ram, offset, ((size, stride),), port)
+
+    def set_source_pattern(self, name, ram, offset, pattern, port=0):
+        name = self._check(name, self._obj.sources)
+        self.sources[name] = (self._executor.model_of(ram),
+                              _pattern_addrs(offset, pattern))
+
+    def set_source_multidim(self, name, ram, offset, shape, order=None, port=0):
+        if order is None:
+            order = list(reversed(range(len(shape))))
+        pattern = self._obj._to_pattern(shape, order)
+        self.set_source_pattern(name, ram, offset, pattern, port)
+
+    def set_source_empty(self, name, value=0):
+        name = self._check(name, self._obj.sources)
+        self.sources[name] = value
+
+    def set_sink(self, name, ram, offset, size, stride=1, port=0):
+        self.set_sink_pattern(name, ram, offset, ((size, stride),), port)
+
+    def set_sink_pattern(self, name, ram, offset, pattern, port=0):
+        name = self._check(name, self._obj.sinks)
+        self.sinks[name] = (self._executor.model_of(ram),
+                            _pattern_addrs(offset, pattern))
+
+    def set_sink_multidim(self, name, ram, offset, shape, order=None, port=0):
+        if order is None:
+            order = list(reversed(range(len(shape))))
+        pattern = self._obj._to_pattern(shape, order)
+        self.set_sink_pattern(name, ram, offset, pattern, port)
+
+    def set_sink_immediate(self, name, size):
+        name = self._check(name, self._obj.sinks)
+        self.sinks[name] = size
+
+    def set_sink_empty(self, name):
+        name = self._check(name, self._obj.sinks)
+        self.sinks[name] = None
+
+    def set_constant(self, name, value, raw=False):
+        name = self._check(name, self._obj.constants)
+        point = self._obj.constants[name].get_point()
+        if not raw and point > 0:
+            value = int(value * (2 ** point))
+        self.constants[name] = value
+
+    def read_sink(self, name):
+        name = self._check(name, self._obj.sinks)
+        return self.immediates[name]
+
+    def run(self):
+        exe = self._executor
+        obj = self._obj
+        task = exe.current
+
+        inputs = OrderedDict()
+        length = 0
+        for name, source in self.sources.items():
+            key = _get_name(obj.sources[name].input_data)
+            if isinstance(source, tuple):
+                ram, addrs = source
+                inputs[key] = [ram.get(addr) for addr in addrs]
+                length = max(length, len(addrs))
+            else:
+                inputs[key] = source
+
+        for name, value in self.constants.items():
+            inputs[_get_name(obj.constants[name].input_data)] = value
+
+        if not self.sources:
+            for sink in self.sinks.values():
+                if isinstance(sink, tuple):
+                    length = max(length, len(sink[1]))
+                elif sink is not None:
+                    length = max(length, sink)
+
+        for name, source in self.sources.items():
+            if isinstance(source, tuple) and len(inputs[_get_name(
+                    obj.sources[name].input_data)]) < length:
+                key = _get_name(obj.sources[name].input_data)
+                inputs[key] = inputs[key] + [0] * (length - len(inputs[key]))
+
+        if length == 0:
+            self.end_time = task.time
+            return 0
+
+        rslt = _StreamExecutor(obj).run(inputs, length)
+
+        for name, sink in self.sinks.items():
+            if sink is None:
+                continue
+
+            values = rslt[obj._dataname(name)].tolist()
+            if name in obj.sink_when_map:
+                when = obj.sink_when_map[name]
+                when_name = [k for k, v in obj.sinks.items() if v is when][0]
+                when_values = rslt[obj._dataname(when_name)].tolist()
+                values = [v for v, w in zip(values, when_values) if w]
+
+            if isinstance(sink, tuple):
+                ram, addrs = sink
+                for addr, value in zip(addrs, values):
+                    ram.set(addr, value)
+            else:
+                values = values[:sink]
+                if values:
+                    self.immediates[name] = values[-1]
+
+        depth = getattr(obj, 'max_stage', None) or 0
+        self.end_time = task.time + exe.cycles['stream'] + length + depth
+        return 0
+
+    def join(self):
+        task = self._executor.current
+        task.time = max(task.time, self.end_time)
+        return 0
+
+    def done(self):
+        task = self._executor.current
+        return int(task.time >= self.end_time)
+
+    def source_join(self):
+        return self.join()
+
+    def source_done(self):
+        return self.done()
+
+    def sink_join(self):
+        return self.join()
+
+    def sink_done(self):
+        return self.done()
+
+    def source_join_and_run(self):
+        self.join()
+        return self.run()
+
+    def enable_dump(self):
+        return 0
+
+    def disable_dump(self):
+        return 0
+
+    def _check(self, name, variables):
+        if isinstance(name, int):
+            name = self._obj.var_id_name_map[name]
+        if name not in variables:
+            raise NameError("No such stream '%s'" % name)
+        if name in self._obj.lane_names:
+            raise TypeError("stream lanes are not supported by the executor")
+        return name
+
+
+class _StreamExecutor(StreamExecutor):
+    """ the reduction variables are not reset while the stream runs """
+
+    def run(self, inputs, length=None, raw=True):
+        var = getattr(self.strm, 'reduce_reset_var', None)
+        if var is not None:
+            inputs = dict(inputs)
+            inputs[_get_name(var.input_data)] = 0
+        return StreamExecutor.run(self, inputs, length, raw)
+
+
+class _ThreadModel(_Model):
+
+    def __init__(self, executor, obj):
+        _Model.__init__(self, executor, obj)
+        self.task = None
+
+    def run(self, *args, **kwargs):
+        exe = self._executor
+        if self.task is not None and not self.task.done:
+            raise ValueError("'%s' is already running" % self._obj.name)
+        exe._add_module(self._obj.targ)
+        func = exe.model_of(self._obj.targ)
+        lines = exe._get_lines(self._obj, args, kwargs)
+        self.task = exe._spawn(self._obj.name, func, args, kwargs,
+                               exe.current.time + 1, self._obj.datawidth,
+                               lines)
+        return 0
+
+    def join(self):
+        exe = self._executor
+        task = self._started()
+        exe._wait(lambda: task.done)
+        exe.current.time = max(exe.current.time, task.time)
+        return 0
+
+    def done(self):
+        task = self._started()
+        self._executor._yield()
+        return int(task.done)
+
+    def ret(self):
+        return self._started().result
+
+    def _started(self):
+        if self.task is None:
+            raise ValueError('not started')
+        return self.task
+
+
+class _ThreadPoolModel(_Model):
+
+    def run(self, tid, *args, **kwargs):
+        return self._thread(tid).run(*args, **kwargs)
+
+    def join(self, tid):
+        return self._thread(tid).join()
+
+    def done(self, tid):
+        return self._thread(tid).done()
+
+    def ret(self, tid):
+        return self._thread(tid).ret()
+
+    def _thread(self, tid):
+        return self._executor.model_of(self._obj.threads[tid])
+
+
+# the first matching class is used
+_model_classes = (
+    (Thread, _ThreadModel),
+    (ThreadPool, _ThreadPoolModel),
+    (MultibankRAM, _MultibankRAMModel),
+    (RAM, _RAMModel),
+    (FIFO, _FIFOModel),
+    (AXISRegister, _RegisterModel),
+    (AXISLiteRegister, _RegisterModel),
+    (AXIM, _AXIMModel),
+    (AXIMLite, _AXIMModel),
+    (Stream, _StreamModel),
+    (ttypes.Mutex, _MutexModel),
+    (ttypes.Barrier, _BarrierModel),
+    (ttypes.Shared, _SharedModel),
+)
+
+
+# -----------------------------------------------------------------------------
+def _compile_lines(thread, args, kwargs):
+    """
+    cycles of each (filename, lineno) of a thread program, which are the states
+    of the statement in the compilation into a scratch module
+    """
+
+    counts = (compiler._tmp_count, fxd._tmp_count)
+
+    m = Module('_'.join(['', thread.name, 'executor']))
+    clk = m.Input('CLK')
+    rst = m.Input('RST')
+    th = Thread(m, thread.name, clk, rst, thread.targ,
+                datawidth=thread.datawidth, point=thread.point,
+                tid=thread.tid, merge_states=thread.merge_states,
+                auto_parallel=thread.auto_parallel)
+    th.function_lib = thread.function_lib
+    th.fsm = FSM(m, th.name, clk, rst)
+    th.start_state = th.fsm.current
+
+    intrinsic_functions = OrderedDict(
+        [(name, _stub_method(name)) for name in thread.intrinsic_functions])
+    cvisitor = _LineVisitor(m, th.name, clk, rst, th.fsm,
+                            th._get_functions(), intrinsic_functions,
+                            thread.intrinsic_methods, _Frame(thread),
+                            datawidth=th.datawidth, point=th.point)
+
+    try:
+        tree = compiler.get_function_ast(th.targ)
+
+        # stack a new scope frame
+        cvisitor.pushScope(ftype='call')
+
+        # args and kwargs -> scope variable (pass by reference)
+        args_code = []
+        for arg, arginfo in zip(args, tree.args.args):
+            cvisitor.scope.addVariable(arginfo.arg, _stub(arg))
+            args_code.append(arginfo.arg)
+
+        for key, val in sorted(kwargs.items(), key=lambda x: x[0]):
+            cvisitor.scope.addVariable(key, _stub(val))
+            args_code.append('{}={}'.format(key, key))
+
+        call_code = ''.join([th.targ.__name__, '(', ', '.join(args_code), ')'])
+        cvisitor.visit(ast.parse(call_code).body[0].value)
+        cvisitor.popScope()
+
+        if th.merge_states or th.auto_parallel:
+            th._merge_states(cvisitor)
+
+    finally:
+        compiler._tmp_count, fxd._tmp_count = counts
+        # the variables outside the scratch module are not driven
+        for var in cvisitor.bound_vars:
+            if getattr(var, '_fsm', None) is th.fsm:
+                del var._fsm
+
+    # states which remain after the merging
+    indexes = set(th.fsm.body.keys())
+    indexes.update(set(th.fsm.jump.keys()))
+
+    # the line of a for-loop is executed once more than the iterations,
+    # so that the initialization is counted in place of the last update
+    indexes.difference_update(cvisitor.for_inits)
+
+    num_states = OrderedDict()
+    for index, (filename, lineno, name) in cvisitor.source_map.items():
+        if index in indexes:
+            key = (filename, lineno)
+            num_states[key] = num_states.get(key, 0) + 1
+
+    ret = OrderedDict()
+    for key, num_copies in cvisitor.num_copies.items():
+        ret[key] = num_states.get(key, 0) // num_copies
+
+    return ret
+
+
+class _LineVisitor(compiler.CompileVisitor):
+    """ compiler which counts the copies of each statement """
+
+    def __init__(self, *args, **kwargs):
+        compiler.CompileVisitor.__init__(self, *args, **kwargs)
+        # (filename, lineno) -> number of the compiled copies
+        self.num_copies = OrderedDict()
+        # initialization states of the for-loops
+        self.for_inits = set()
+        # variables to which the FSM is bound by the compilation
+        self.bound_vars = []
+
+    def _add_source(self, node, begin):
+        compiler.CompileVisitor._add_source(self, node, begin)
+
+        if not self.function_stack or not hasattr(node, 'lineno'):
+            return
+
+        key = (self.function_stack[-1][0], node.lineno)
+        self.num_copies[key] = self.num_copies.get(key, 0) + 1
+        if isinstance(node, ast.For):
+            self.for_inits.add(begin)
+
+    def setBind(self, var, value, cond=None):
+        if var is not None and not hasattr(var, '_fsm'):
+            self.bound_vars.append(var)
+        compiler.CompileVisitor.setBind(self, var, value, cond)
+
+    def _assign(self, left, right):
+        # the return value of a stub is unpacked into any number of values
+        if isinstance(right, _StubValue) and isinstance(left, (tuple, list)):
+            for dst in left:
+                compiler.CompileVisitor._assign(self, dst, right)
+            return
+
+        compiler.CompileVisitor._assign(self, left, right)
+
+
+class _Frame(object):
+    """ objects which the compiler refers to, as the frame of Thread.start() """
+
+    def __init__(self, thread):
+        if thread.start_frame is not None:
+            self.f_locals = _Namespace(thread.start_frame.f_locals)
+            self.f_globals = _Namespace(thread.start_frame.f_globals)
+            return
+
+        # the frame is not known until the thread is started,
+        # so that the free variables of the functions are used in place of it
+        local_objects = OrderedDict()
+        _add_closure(local_objects, thread.targ)
+        for func in thread.function_lib.values():
+            _add_closure(local_objects, func)
+
+        global_objects = thread.targ.__globals__
+        self.f_locals = _Namespace(ChainMap(local_objects, global_objects))
+        self.f_globals = _Namespace(global_objects)
+
+
+class _Namespace(object):
+    """ objects whose intrinsic methods are replaced with the stubs """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.stubs = {}
+
+    def __contains__(self, name):
+        return name in self.objects
+
+    def __getitem__(self, name):
+        if name not in self.stubs:
+            self.stubs[name] = _stub(self.objects[name])
+        return self.stubs[name]
+
+
+def _add_closure(objects, func, visited=None):
+    """ free variables of func and of the functions in them """
+
+    if visited is None:
+        visited = set()
+
+    func = getattr(func, '__func__', func)
+    if not isinstance(func, types.FunctionType) or func in visited:
+        return
+    visited.add(func)
+
+    if func.__closure__ is None:
+        return
+
+    for name, cell in zip(func.__code__.co_freevars, func.__closure__):
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            continue
+        if name not in objects:
+            objects[name] = value
+        _add_closure(objects, value, visited)
+
+
+def _stub(obj):
+    if type(obj) in (list, tuple):
+        return type(obj)([_stub(v) for v in obj])
+    if isinstance(obj, type) or not hasattr(obj, '__intrinsics__'):
+        return obj
+    return _StubObject(obj)
+
+
+class _StubObject(object):
+    """ object whose intrinsic methods make a state instead of the hardware """
+
+    def __init__(self, obj):
+        self._obj = obj
+        self.__intrinsics__ = tuple(obj.__intrinsics__)
+
+    def __getattr__(self, attr):
+        value = getattr(self._obj, attr)
+        if attr in self.__intrinsics__ and value not in _compiled_intrinsics:
+            return _stub_method(attr)
+        return _stub(value)
+
+
+class _StubValue(vtypes.Reg):
+    """ return value of a stub """
+    pass
+
+
+def _stub_method(name):
+    def method(fsm, *args, **kwargs):
+        fsm.goto_next()
+        return _StubValue(32, signed=True, name=compiler._tmp_name('_stub'))
+
+    method.__name__ = name
+    return method
+
+
+# intrinsics which make nothing but the statements of the thread
+_compiled_intrinsics = set(
+    [getattr(ttypes, name) for name in ttypes.__intrinsics__
+     if name != 'intrinsic'] +
+    [getattr(fixed, name) for name in fixed.__intrinsics__])
+
+
+# -----------------------------------------------------------------------------
+def _display(exe, *args):
+    if not args:
+        print()
+        return
+    print(_format(args[0], args[1:]))
+
+
+def _write(exe, *args):
+    if args:
+        print(_format(args[0], args[1:]), end='')
+
+
+def _format(fmt, args):
+    if not isinstance(fmt, str):
+        return ' '.join([str(a) for a in (fmt,) + tuple(args)])
+
+    args = list(args)
+    ret = []
+    pos = 0
+    for m in re.finditer(r'%(\d*)([dDhHxXbBoOsScC%])', fmt):
+        ret.append(fmt[pos:m.start()])
+        pos = m.end()
+        width, conv = m.group(1), m.group(2).lower()
+        if conv == '%':
+            ret.append('%')
+            continue
+        value = args.pop(0)
+        if conv == 'd':
+            s = str(value)
+        elif conv in ('h', 'x'):
+            s = format(value, 'x')
+        elif conv == 'b':
+            s = format(value, 'b')
+        elif conv == 'o':
+            s = format(value, 'o')
+        elif conv == 'c':
+            s = chr(value)
+        else:
+            s = str(value)
+        ret.append(s.rjust(int(width)) if width else s)
+    ret.append(fmt[pos:])
+    return ''.join(ret)
+
+
+def _finish(exe):
+    raise _Finish()
+
+
+def _signed_value(exe, value):
+    return value
+
+
+def _copy(exe, src_ram, dst_ram, src_addr, dst_addr, size,
+          src_stride=1, dst_stride=1, src_port=0, dst_port=0):
+    src_pattern = ((size, src_stride),)
+    dst_pattern = ((size, dst_stride),)
+    return _copy_pattern(exe, src_ram, dst_ram, src_addr, dst_addr,
+                         src_pattern, dst_pattern)
+
+
+def _copy_pattern(exe, src_ram, dst_ram, src_addr, dst_addr,
+                  src_pattern, dst_pattern, src_port=0, dst_port=0):
+    src = exe.model_of(src_ram)
+    dst = exe.model_of(dst_ram)
+    src_addrs = _pattern_addrs(src_addr, src_pattern)
+    dst_addrs = _pattern_addrs(dst_addr, dst_pattern)
+    values = [src.get(addr) for addr in src_addrs]
+    for addr, value in zip(dst_addrs, values):
+        dst.set(addr, value)
+    exe._add_cycles(exe.cycles['stream'] + len(src_addrs))
+    return 0
+
+
+_function_models = {
+    ttypes.display: _display,
+    ttypes.write: _write,
+    ttypes.finish: _finish,
+    ttypes.signed: _signed_value,
+    util.copy: _copy,
+    util.copy_pattern: _copy_pattern,
+}
+
+
+def _unsupported_function(name):
+    def func(*args, **kwargs):
+        raise TypeError("'%s' is not supported by the executor" % name)
+    return func
+
+
+# name of Executor._store in the globals of the executed functions
+_store_name = '__vthread_store__'
+
+
+class _StoreWrapper(ast.NodeTransformer):
+    """ passes the values stored into the variables to _store_name """
+
+    def visit_FunctionDef(self, node):
+        self.generic_visit(node)
+        args = node.args.args + getattr(node.args, 'kwonlyargs', [])
+        body = node.body
+        pos = 1 if _is_docstring(body[0]) else 0
+        if pos < len(body):
+            stores = [self._store(arg.arg, body[pos]) for arg in args]
+            node.body = body[:pos] + stores + body[pos:]
+        return node
+
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        if all([isinstance(target, ast.Name) for target in node.targets]):
+            node.value = self._call(node.value)
+            return node
+        return [node] + self._stores(node.targets, node)
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        return [node] + self._stores([node.target], node)
+
+    def visit_AnnAssign(self, node):
+        self.generic_visit(node)
+        if node.value is None:
+            return node
+        return [node] + self._stores([node.target], node)
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        node.body = self._stores([node.target], node) + node.body
+        return node
+
+    def _stores(self, targets, node):
+        names = []
+        for target in targets:
+            names.extend([n.id for n in ast.walk(target)
+                          if isinstance(n, ast.Name) and
+                          isinstance(n.ctx, ast.Store)])
+        return [self._store(name, node) for name in names]
+
+    def _store(self, name, node):
+        store = ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())],
+                           value=self._call(ast.Name(id=name, ctx=ast.Load())))
+        for n in ast.walk(store):
+            ast.copy_location(n, node)
+        return store
+
+    def _call(self, value):
+        call = ast.Call(func=ast.Name(id=_store_name, ctx=ast.Load()),
+                        args=[value], keywords=[])
+        for n in ast.walk(call):
+            if not hasattr(n, 'lineno'):
+                ast.copy_location(n, value)
+        return call
+
+
+def _is_docstring(node):
+    return (isinstance(node, ast.Expr) and
+            isinstance(node.value, ast.Constant) and
+            isinstance(node.value.value, str))
+
+
+def _wrap_stores(func):
+    """
+    code of func whose stores into the variables pass through _store_name,
+    or None if the source code is not available
+    """
+
+    code = func.__code__
+    try:
+        text = textwrap.dedent(inspect.getsource(func))
+        tree = ast.parse(text)
+    except (OSError, TypeError, SyntaxError):
+        return None
+
+    if (len(tree.body) != 1 or not isinstance(tree.body[0], ast.FunctionDef) or
+            tree.body[0].name != func.__name__):
+        return None
+
+    node = tree.body[0]
+    node.decorator_list = []
+
+    # the free variables of func are the arguments of an enclosing function
+    outer = ast.parse('def _outer(%s):\n    pass\n' %
+                      ', '.join(code.co_freevars))
+    outer.body[0].body = [node]
+    ast.increment_lineno(outer, code.co_firstlineno - 1)
+    outer = ast.fix_missing_locations(_StoreWrapper().visit(outer))
+    # the enclosing function itself is not wrapped
+    outer.body[0].body = outer.body[0].body[len(code.co_freevars):]
+
+    module_code = compile(outer, code.co_filename, 'exec')
+    outer_code = [c for c in module_code.co_consts
+                  if isinstance(c, types.CodeType)][0]
+    for c in outer_code.co_consts:
+        if isinstance(c, types.CodeType) and c.co_name == func.__name__:
+            if set(c.co_freevars) != set(code.co_freevars):
+                return None
+            return c
+    return None
+
+
+def _make_cell():
+    if False:
+        value = None
+    return (lambda: value).__closure__[0]
+
+
+def _pattern_addrs(offset, pattern):
+    if not isinstance(pattern[0], (tuple, list)):
+        pattern = (pattern,)
+
+    addrs = [offset]
+    for size, stride in pattern:
+        addrs = [addr + i * stride for i in range(size) for addr in addrs]
+    return addrs
+
+
+def _get_name(data):
+    if isinstance(data, str):
+        return data
+    return getattr(data, 'name', str(data))
+
+
+def _initval(obj):
+    initval = getattr(obj, 'initval', None)
+    if isinstance(initval, vtypes.Int):
+        initval = initval.value
+    if isinstance(initval, int):
+        return initval
+    if isinstance(obj, int):
+        return obj
+    return 0
+
+
+def _mask(width):
+    return (1 << width) - 1
+
+
+def _signed(value, width):
+    value = int(value) & _mask(width)
+    if value >> (width - 1):
+        return value - (1 << width)
+    return value
@@ -15,7 +15,8 @@ class FIFO(_MutexFunction):
                       'is_empty', 'is_almost_empty',
                       'is_full', 'is_almost_full') + _MutexFunction.__intrinsics__
 
-    def __init__(self, m, name, clk, rst, datawidth=32, addrwidth=4):
+    def __init__(self, m, name, clk, rst, datawidth=32, addrwidth=4,
+                 arbiter=None, stats=False):
 
         self.m = m
         self.name = name
@@ -55,7 +56,8 @@ class FIFO(_MutexFunction):
         self._enq_disabled = False
         self._deq_disabled = False
 
-        self.mutex = None
+        # arbiter and stats of the Mutex of lock()
+        self._set_mutex_options(arbiter, stats)
 
     def disable_enq(self):
         self.seq(
@@ -175,17 +177,19 @@ class FIFO(_MutexFunction):
         return (self._count + num < self._max_size)
 
     def enq(self, fsm, wdata):
-        cond = fsm.state == fsm.current
+        cond = fsm.here
 
         ack, ready = self.enq_rtl(wdata, cond=cond)
+        fsm.add_stall('fifo_full', vtypes.Not(ready))
         fsm.If(ready).goto_next()
 
         return 0
 
     def deq(self, fsm):
-        cond = fsm.state == fsm.current
+        cond = fsm.here
 
         rdata, rvalid = self.deq_rtl(cond=cond)
+        fsm.add_stall('fifo_empty', self.empty)
         fsm.If(vtypes.Not(self.empty)).goto_next()
         fsm.goto_next()
 
@@ -199,7 +203,7 @@ class FIFO(_MutexFunction):
         return rdata_reg
 
     def try_enq(self, fsm, wdata):
-        cond = fsm.state == fsm.current
+        cond = fsm.here
 
         ack, ready = self.enq_rtl(wdata, cond=cond)
         fsm.goto_next()
@@ -213,7 +217,7 @@ class FIFO(_MutexFunction):
         return ack_reg
 
     def try_deq(self, fsm):
-        cond = fsm.state == fsm.current
+        cond = fsm.here
 
         rdata, rvalid = self.deq_rtl(cond=cond)
         fsm.goto_next()
@@ -250,10 +254,11 @@ class FIFO(_MutexFunction):
 class FixedFIFO(FIFO):
 
     def __init__(self, m, name, clk, rst,
-                 datawidth=32, addrwidth=4, point=0):
+                 datawidth=32, addrwidth=4, point=0,
+                 arbiter=None, stats=False):
 
         FIFO.__init__(self, m, name, clk, rst,
-                      datawidth, addrwidth)
+                      datawidth, addrwidth, arbiter, stats)
 
         self.point = point
 
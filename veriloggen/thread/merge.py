@@ -0,0 +1,329 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+from collections import OrderedDict
+
+import veriloggen.core.vtypes as vtypes
+from veriloggen.seq.subst_visitor import SubstDstVisitor, SubstSrcVisitor
+
+
+class StateMerger(object):
+    """
+    Merge straight-line states of a thread FSM.
+
+    A state t is merged into its predecessor s, when s unconditionally goes to t,
+    s is the only predecessor of t, and the statements and the jump conditions
+    of t read no variable written in s.
+    The statements of t are executed in the same cycle as s,
+    so that each merged state saves a cycle on every pass through it.
+
+    Protected states (the entry, the exit and the states observed by intrinsics)
+    are never merged, and the other states keep their indexes.
+    """
+
+    def __init__(self, fsm, protected=(), barriers=()):
+        self.fsm = fsm
+        self.protected = set(protected)
+        self.barriers = set(barriers)
+        # merged state -> state which it is merged into
+        self.merged = OrderedDict()
+        self.num_states = 0
+
+    def merge(self, begin=0):
+        fsm = self.fsm
+        indexes = self.get_indexes(begin)
+        self.num_states = len(indexes)
+
+        preds = self.get_predecessors()
+
+        # variables updated by every transition of the FSM
+        state_names = set([fsm.state.name])
+        state_names.update([s.name for s in fsm.delayed_state.values()])
+
+        for s in indexes:
+            if s in self.merged or not self.is_mergeable(s):
+                continue
+
+            writes = None
+
+            while True:
+                t = self.get_next(s)
+                if (t is None or t in self.protected or t < begin or
+                        len(preds.get(t, ())) != 1 or not self.is_mergeable(t)):
+                    break
+
+                if writes is None:
+                    writes = get_writes(fsm.body[s])
+                    writes.update(state_names)
+
+                try:
+                    reads = get_reads(fsm.body[t])
+                    for dst, cond, else_dst in fsm.jump[t]:
+                        reads.update(get_reads([cond]))
+                except TypeError:
+                    break
+
+                if reads & writes:
+                    break
+
+                writes.update(get_writes(fsm.body[t]))
+
+                fsm.body[s].extend(fsm.body.pop(t, []))
+                fsm.jump[s] = fsm.jump.pop(t, [])
+
+                for dst, cond, else_dst in fsm.jump[s]:
+                    for d in (dst, else_dst):
+                        if d is not None:
+                            preds[d] = [s if p == t else p for p in preds[d]]
+
+                self.merged[t] = s
+
+        return self.merged
+
+    def get_stats(self):
+        ret = OrderedDict()
+        ret['num_states'] = self.num_states
+        ret['num_merged_states'] = len(self.merged)
+        # each merged state saves a cycle whenever the thread passes through it
+        ret['num_saved_cycles'] = len(self.merged)
+        ret['merged_states'] = OrderedDict(self.merged)
+        return ret
+
+    def get_indexes(self, begin):
+        indexes = set(self.fsm.body.keys())
+        indexes.update(self.fsm.jump.keys())
+        return sorted([index for index in indexes if index >= begin])
+
+    def get_predecessors(self):
+        preds = {}
+        for src, jumps in self.fsm.jump.items():
+            for dst, cond, else_dst in jumps:
+                for d in (dst, else_dst):
+                    if d is not None:
+                        preds.setdefault(d, []).append(src)
+        return preds
+
+    def get_next(self, index):
+        jumps = self.fsm.jump.get(index, [])
+        if len(jumps) != 1:
+            return None
+
+        dst, cond, else_dst = jumps[0]
+        if cond is not None or else_dst is not None or dst == index:
+            return None
+
+        return dst
+
+    def is_mergeable(self, index):
+        if index in self.protected or index in self.barriers:
+            return False
+
+        for delay, body in self.fsm.delayed_body.items():
+            if index in body:
+                return False
+
+        for statement in self.fsm.body.get(index, []):
+            if not _is_mergeable_statement(statement):
+                return False
+
+        return True
+
+
+def _is_mergeable_statement(statement):
+    if isinstance(statement, vtypes.Subst):
+        return not statement.blk
+    if isinstance(statement, vtypes.If):
+        for s in statement.true_statement:
+            if not _is_mergeable_statement(s):
+                return False
+        if statement.false_statement is not None:
+            for s in statement.false_statement:
+                if not _is_mergeable_statement(s):
+                    return False
+        return True
+    if isinstance(statement, vtypes.SingleStatement):
+        return isinstance(statement.statement, vtypes.SystemTask)
+    return False
+
+
+def get_writes(statements):
+    """ names of the variables written by statements """
+
+    visitor = SubstSrcVisitor()
+    for dst in SubstDstVisitor().visit(list(statements)):
+        visitor.visit(dst)
+    return set(visitor.srcs.keys())
+
+
+def get_reads(statements):
+    """ names of the variables read by statements """
+
+    visitor = _ReadVisitor()
+    visitor.visit(list(statements))
+    return set(visitor.srcs.keys())
+
+
+class _ReadVisitor(SubstSrcVisitor):
+
+    def visit_Subst(self, node):
+        # indexes of the destination are also read
+        if not isinstance(node.left, vtypes._Variable):
+            self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_EmbeddedCode(self, node):
+        raise TypeError('EmbeddedCode cannot be analyzed.')
+
+
+class StateScheduler(StateMerger):
+    """
+    Schedule the straight-line states of a thread FSM in parallel.
+
+    A basic block is a chain of states, each of which unconditionally goes to
+    the next one that has no other predecessor. The statements of a state are
+    moved to the earliest state of the block after the states that they
+    depend on: a state which reads or writes a variable written by an earlier
+    state is placed after it, and a state which writes a variable read by an
+    earlier state is placed with or after it.
+    The jump conditions of the last state stay in the last state.
+
+    Intrinsic calls (RAM and FIFO accesses, thread control, and so on)
+    occupy barrier states, which end the basic blocks.
+    """
+
+    def __init__(self, fsm, protected=(), barriers=()):
+        StateMerger.__init__(self, fsm, protected, barriers)
+        # first state of a block -> (number of states, number of scheduled states)
+        self.blocks = OrderedDict()
+
+    def merge(self, begin=0):
+        fsm = self.fsm
+        indexes = self.get_indexes(begin)
+        self.num_states = len(indexes)
+
+        preds = self.get_predecessors()
+
+        state_names = set([fsm.state.name])
+        state_names.update([s.name for s in fsm.delayed_state.values()])
+
+        accesses = {}
+        for index in indexes:
+            if not self.is_mergeable(index):
+                continue
+            try:
+                reads = get_reads(fsm.body[index])
+                for dst, cond, else_dst in fsm.jump[index]:
+                    reads.update(get_reads([cond]))
+            except TypeError:
+                continue
+            # the index of a state may change
+            if reads & state_names:
+                continue
+            accesses[index] = (reads, get_writes(fsm.body[index]),
+                               _has_system_task(fsm.body[index]))
+
+        def is_continued(index):
+            p = preds.get(index, ())
+            return (len(p) == 1 and p[0] in accesses and p[0] >= begin and
+                    self.get_next(p[0]) == index)
+
+        visited = set()
+
+        for s in indexes:
+            if s not in accesses or s in visited or is_continued(s):
+                continue
+
+            block = [s]
+            t = self.get_next(s)
+            while (t is not None and t in accesses and t not in block and
+                   is_continued(t)):
+                block.append(t)
+                t = self.get_next(t)
+
+            visited.update(block)
+
+            self.schedule(block, accesses)
+
+        return self.merged
+
+    def schedule(self, block, accesses):
+        fsm = self.fsm
+
+        slots = []
+        for i, index in enumerate(block):
+            reads, writes, systask = accesses[index]
+            slot = 0
+            for j, prev in enumerate(block[:i]):
+                prev_reads, prev_writes, prev_systask = accesses[prev]
+                if (reads | writes) & prev_writes:
+                    slot = max(slot, slots[j] + 1)
+                elif writes & prev_reads:
+                    slot = max(slot, slots[j])
+                elif systask and prev_systask:
+                    # keep the order of the outputs
+                    slot = max(slot, slots[j])
+            slots.append(slot)
+
+        # the jump conditions of the last state read the values of the block
+        last = block[-1]
+        jump_reads = set()
+        for dst, cond, else_dst in fsm.jump[last]:
+            jump_reads.update(get_reads([cond]))
+
+        last_slot = max(slots)
+        for j, prev in enumerate(block[:-1]):
+            if jump_reads & accesses[prev][1]:
+                last_slot = max(last_slot, slots[j] + 1)
+
+        # the conditions read the values before the last state is executed
+        if jump_reads & accesses[last][1]:
+            slots[-1] = last_slot
+
+        num_slots = last_slot + 1
+        self.blocks[block[0]] = (len(block), num_slots)
+
+        if num_slots == len(block):
+            return
+
+        bodies = [[] for _ in range(num_slots)]
+        for index, slot in zip(block, slots):
+            bodies[slot].extend(fsm.body.pop(index, []))
+            if index != block[slot]:
+                self.merged[index] = block[slot]
+
+        jumps = fsm.jump[last]
+        for index in block:
+            fsm.jump.pop(index, None)
+
+        for slot, index in enumerate(block[:num_slots]):
+            if bodies[slot]:
+                fsm.body[index] = bodies[slot]
+            if slot < num_slots - 1:
+                fsm.jump[index] = [(block[slot + 1], None, None)]
+            else:
+                fsm.jump[index] = jumps
+
+    def get_stats(self):
+        ret = OrderedDict()
+        ret['num_states'] = self.num_states
+        num_merged = sum([n - m for n, m in self.blocks.values()])
+        ret['num_merged_states'] = num_merged
+        ret['num_saved_cycles'] = num_merged
+        ret['merged_states'] = OrderedDict(self.merged)
+        ret['blocks'] = OrderedDict(
+            [(index, OrderedDict([('num_states', n), ('num_scheduled_states', m)]))
+             for index, (n, m) in self.blocks.items()])
+        return ret
+
+
+def _has_system_task(statements):
+    for statement in statements:
+        if isinstance(statement, vtypes.If):
+            if _has_system_task(statement.true_statement):
+                return True
+            if (statement.false_statement is not None and
+                    _has_system_task(statement.false_statement)):
+                return True
+        if isinstance(statement, vtypes.SingleStatement):
+            return True
+    return False
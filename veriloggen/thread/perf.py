@@ -0,0 +1,121 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+from collections import OrderedDict
+
+import veriloggen.core.vtypes as vtypes
+import veriloggen.types.util as util
+
+from .axi import AXISLiteRegister
+
+
+class PerfCounter(AXISLiteRegister):
+    """
+    Free-running performance counters on an AXI-Lite register block.
+
+    threads: Thread objects, counting the busy cycles and the cycles
+             waiting on Mutex.lock, full/empty FIFOs and dma_wait
+    streams: Stream objects, counting the active cycles and the cycles
+             draining the pipeline after the sources finished
+    axims: AXIM objects, counting the read/write beats and the cycles
+           with an outstanding DMA transfer
+
+    The counters must be created after the threads are started.
+    Each counter is a register of the block, which can be preset
+    by a write from the bus.
+    """
+
+    def __init__(self, m, name, clk, rst, threads=(), streams=(), axims=(),
+                 datawidth=32, addrwidth=32, noio=False, fsm_as_module=False):
+
+        # counter name -> condition to count up
+        self.counters = OrderedDict()
+
+        for thread in threads:
+            self._add_counters(_get_thread_counters(thread))
+
+        for strm in streams:
+            self._add_counters(_get_stream_counters(strm))
+
+        for axim in axims:
+            self._add_counters(_get_axim_counters(axim))
+
+        if not self.counters:
+            raise ValueError('no counter is specified.')
+
+        length = 2 ** max(util.log2(len(self.counters)), 1)
+
+        AXISLiteRegister.__init__(self, m, name, clk, rst, datawidth, addrwidth,
+                                  noio, length, fsm_as_module)
+
+        # counter name -> byte address
+        self.register_map = OrderedDict(
+            [(key, i * (self.datawidth // 8))
+             for i, key in enumerate(self.counters.keys())])
+
+    def _add_counters(self, counters):
+        for key, cond in counters:
+            if key in self.counters:
+                raise ValueError("counter '%s' is already defined" % key)
+            self.counters[key] = cond
+
+    def _set_register_lite_fsm(self):
+        # the writes from the bus, which are added later, take priority
+        for register, cond in zip(self.register, self.counters.values()):
+            self.seq.If(cond)(
+                register.inc()
+            )
+
+        AXISLiteRegister._set_register_lite_fsm(self)
+
+    def make_register_map(self, filename=None):
+        """ Python code of the register map (counter name -> byte address) """
+
+        lines = []
+        lines.append('# byte addresses of the %d-bit performance counters of %s' %
+                     (self.datawidth, self.name))
+        lines.append('register_map = {')
+        for key, addr in self.register_map.items():
+            lines.append("    '%s': %d," % (key, addr))
+        lines.append('}')
+        code = '\n'.join(lines) + '\n'
+
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(code)
+
+        return code
+
+
+def _get_thread_counters(thread):
+    if thread.end_state is None:
+        raise ValueError("thread '%s' is not started" % thread.name)
+
+    fsm = thread.fsm
+    busy = vtypes.Not(fsm.at(thread.end_state))
+    if thread.is_child:
+        busy = vtypes.Ands(vtypes.Not(fsm.at(thread.start_state)), busy)
+
+    ret = [('_'.join([thread.name, 'busy']), busy)]
+    for kind, conds in fsm.stall_cond.items():
+        ret.append(('_'.join([thread.name, kind]), vtypes.Ors(*conds)))
+
+    return ret
+
+
+def _get_stream_counters(strm):
+    active = vtypes.Ors(strm.source_busy, strm.sink_busy)
+    drain = vtypes.Ands(vtypes.Not(strm.source_busy), strm.sink_busy)
+
+    return [('_'.join([strm.name, 'active']), active),
+            ('_'.join([strm.name, 'drain']), drain)]
+
+
+def _get_axim_counters(axim):
+    read_beats = vtypes.Ands(axim.rdata.rvalid, axim.rdata.rready)
+    write_beats = vtypes.Ands(axim.wdata.wvalid, axim.wdata.wready)
+
+    return [('_'.join([axim.name, 'read_beats']), read_beats),
+            ('_'.join([axim.name, 'write_beats']), write_beats),
+            ('_'.join([axim.name, 'read_outstanding']), vtypes.Not(axim.read_idle)),
+            ('_'.join([axim.name, 'write_outstanding']), vtypes.Not(axim.write_idle))]
@@ -0,0 +1,403 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import ast
+from collections import OrderedDict
+
+import veriloggen.core.vtypes as vtypes
+import veriloggen.types.fixed as fxd
+from veriloggen.optimizer import try_optimize as optimize
+
+from .ram import RAM, FixedRAM, MultibankRAM
+
+# cycles from a read request to the read data of a RAM
+read_latency = 2
+
+
+def pipelined_range(*args, **kwargs):
+    """
+    range() which marks a for-loop of a thread to be pipelined.
+
+    ii: initiation interval, cycles between the starts of the iterations.
+    In Python, the loop is executed as an ordinary range() loop.
+    """
+
+    ii = kwargs.pop('ii', 1)
+    if kwargs:
+        raise TypeError("pipelined_range() got an unexpected keyword argument '%s'" %
+                        list(kwargs.keys())[0])
+    if not isinstance(ii, int) or ii < 1:
+        raise ValueError('ii must be a positive int.')
+
+    return range(*args)
+
+
+class LoopPipeliner(object):
+    """
+    Software pipelining of a for-loop of a thread.
+
+    The body of the loop is split into stages, so that a new iteration
+    starts every ii cycles while the former iterations are in flight.
+    The stages are scheduled as soon as possible under the data dependences,
+    the read latency and the ports of the RAMs. The initiation interval is
+    raised from the requested one until the RAM ports are not overbooked and
+    each iteration observes the variables and the RAM contents
+    updated by the previous iteration.
+
+    The body must be a straight-line sequence of the following statements:
+      x = expression
+      x += expression
+      x = ram.read(addr, port=0)
+      ram.write(addr, wdata, port=0)
+    where each variable is assigned at most once.
+    """
+
+    def __init__(self, cvisitor, iter_name, body, ii=1):
+        if not isinstance(ii, int) or ii < 1:
+            raise ValueError('ii must be a positive int.')
+
+        self.cvisitor = cvisitor
+        self.iter_name = iter_name
+        self.requested_ii = ii
+        self.ii = ii
+        self.num_stages = 0
+        self.ops = [self.make_operation(statement) for statement in body]
+
+        # variable name -> index of the operation which assigns it
+        self.defs = OrderedDict()
+        for index, op in enumerate(self.ops):
+            if op.dst is None:
+                continue
+            if op.dst == iter_name:
+                raise ValueError("loop variable '%s' cannot be assigned "
+                                 "in a pipelined loop" % iter_name)
+            if op.dst in self.defs:
+                raise ValueError("variable '%s' is assigned more than once "
+                                 "in a pipelined loop" % op.dst)
+            self.defs[op.dst] = index
+
+    def make_operation(self, node):
+        if isinstance(node, ast.Assign):
+            if len(node.targets) != 1 or not isinstance(node.targets[0], ast.Name):
+                raise TypeError('only an assignment to a variable is supported '
+                                'in a pipelined loop')
+            dst = node.targets[0].id
+            ram, method, args = self.get_ram_access(node.value)
+            if ram is None:
+                return _Operation(dst, node.value)
+            if method != 'read':
+                raise TypeError("'%s' of a RAM cannot be assigned "
+                                "in a pipelined loop" % method)
+            return _Operation(dst, None, ram, args['port'], (args['addr'],))
+
+        if isinstance(node, ast.AugAssign):
+            if not isinstance(node.target, ast.Name):
+                raise TypeError('only an assignment to a variable is supported '
+                                'in a pipelined loop')
+            dst = node.target.id
+            value = ast.BinOp(left=ast.Name(id=dst, ctx=ast.Load()),
+                              op=node.op, right=node.value)
+            ram, method, args = self.get_ram_access(node.value)
+            if ram is not None:
+                raise TypeError("'%s' of a RAM cannot be assigned "
+                                "in a pipelined loop" % method)
+            return _Operation(dst, value)
+
+        if isinstance(node, ast.Expr):
+            ram, method, args = self.get_ram_access(node.value)
+            if ram is not None and method == 'write':
+                return _Operation(None, None, ram, args['port'],
+                                  (args['addr'], args['wdata']))
+
+        raise TypeError("'%s' is not supported in a pipelined loop" %
+                        node.__class__.__name__)
+
+    def get_ram_access(self, node):
+        """ returns a RAM, the method name and the arguments of a RAM access """
+
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and
+                node.func.attr in ('read', 'write')):
+            ram = self.cvisitor.visit(node.func.value)
+            if isinstance(ram, (RAM, MultibankRAM)):
+                return ((ram, node.func.attr) +
+                        (self.get_ram_args(ram, node),))
+
+        for n in ast.walk(node):
+            if isinstance(n, ast.Call):
+                raise TypeError('function call is not supported in a pipelined loop')
+
+        return None, None, None
+
+    def get_ram_args(self, ram, node):
+        if isinstance(ram, FixedRAM):
+            raise TypeError("'%s' is not supported in a pipelined loop" %
+                            ram.__class__.__name__)
+
+        names = (('addr', 'port') if node.func.attr == 'read' else
+                 ('addr', 'wdata', 'port'))
+
+        if len(node.args) > len(names):
+            raise TypeError('too many arguments of %s()' % node.func.attr)
+
+        args = OrderedDict(zip(names, node.args))
+        for key in node.keywords:
+            if key.arg not in names or key.arg in args:
+                raise TypeError("unsupported argument '%s' of %s() "
+                                "in a pipelined loop" % (key.arg, node.func.attr))
+            args[key.arg] = key.value
+
+        for name in names[:-1]:
+            if name not in args:
+                raise TypeError("%s() missing argument '%s'" %
+                                (node.func.attr, name))
+            for n in ast.walk(args[name]):
+                if isinstance(n, ast.Call):
+                    raise TypeError('function call is not supported '
+                                    'in a pipelined loop')
+
+        port = self.cvisitor.visit(args['port']) if 'port' in args else 0
+        args['port'] = vtypes.to_int(port)
+        return args
+
+    # -------------------------------------------------------------------------
+    def schedule(self):
+        ii = max(self.requested_ii, self.get_resource_ii())
+
+        while True:
+            self.schedule_stages(ii)
+            recurrence_ii = self.get_recurrence_ii()
+            if recurrence_ii <= ii:
+                break
+            ii = recurrence_ii
+
+        self.ii = ii
+        self.num_stages = max([op.get_last_stage() for op in self.ops] + [0]) + 1
+
+    def get_resource_ii(self):
+        """ number of the accesses to the busiest RAM port """
+
+        count = {}
+        for op in self.ops:
+            if op.ram is not None:
+                key = (id(op.ram), op.port)
+                count[key] = count.get(key, 0) + 1
+        return max(list(count.values()) + [1])
+
+    def schedule_stages(self, ii):
+        # variable name -> stage where the current value is assigned
+        def_stages = {}
+        # variable name -> last stage where the previous value is read
+        use_stages = {}
+        # (RAM, port, stage modulo ii) -> operation
+        reservations = {}
+        accesses = []
+
+        for index, op in enumerate(self.ops):
+            stage = 0
+
+            for name in op.reads:
+                if name in def_stages:
+                    stage = max(stage, def_stages[name] + 1)
+
+            if op.dst is not None and op.dst in use_stages:
+                # the previous value must not be overwritten before it is read
+                stage = max(stage, use_stages[op.dst] - op.latency)
+
+            if op.ram is not None:
+                for prev in accesses:
+                    distance = _get_distance(prev, op)
+                    if distance is not None:
+                        stage = max(stage, prev.stage + distance)
+
+                while (id(op.ram), op.port, stage % ii) in reservations:
+                    stage += 1
+
+                reservations[(id(op.ram), op.port, stage % ii)] = op
+                accesses.append(op)
+
+            op.stage = stage
+            if op.dst is not None:
+                def_stages[op.dst] = op.get_last_stage()
+
+            for name in op.reads:
+                if name in self.defs and self.defs[name] >= index:
+                    use_stages[name] = max(use_stages.get(name, 0), stage)
+
+    def get_recurrence_ii(self):
+        """ initiation interval which the next iteration observes the updates of """
+
+        ii = 1
+
+        # a variable read before its assignment refers to the previous iteration
+        for index, op in enumerate(self.ops):
+            for name in op.reads:
+                if name in self.defs and self.defs[name] >= index:
+                    d = self.ops[self.defs[name]].get_last_stage()
+                    ii = max(ii, d - op.stage + 1)
+
+        # a RAM access of the next iteration follows the accesses of this one
+        accesses = [op for op in self.ops if op.ram is not None]
+        for a in accesses:
+            for b in accesses:
+                distance = _get_distance(a, b)
+                if distance is not None:
+                    ii = max(ii, a.stage + distance - b.stage)
+
+        return ii
+
+    # -------------------------------------------------------------------------
+    def make_fsm(self, begin_node, iter_node, cond_node, update_node):
+        cvisitor = self.cvisitor
+        fsm = cvisitor.fsm
+        m = cvisitor.m
+
+        self.schedule()
+
+        counter = cvisitor.getTmpVariable() if self.ii > 1 else None
+
+        # initialize
+        cvisitor.setBind(iter_node, begin_node)
+        if counter is not None:
+            cvisitor.setBind(counter, 0)
+        cvisitor.setFsm()
+        cvisitor.incFsmCount()
+
+        # a new iteration starts every ii cycles
+        loop_count = cvisitor.getFsmCount()
+        start_cond = (cond_node if counter is None else
+                      vtypes.Ands(counter == 0, cond_node))
+
+        start = m.TmpWire()
+        start.assign(vtypes.Ands(fsm.at(loop_count), start_cond))
+
+        cvisitor.setBind(iter_node, update_node, start_cond)
+        if counter is not None:
+            cvisitor.setBind(counter, vtypes.Mux(counter == self.ii - 1,
+                                                 0, counter + 1))
+        cvisitor.incFsmCount()
+
+        # wait for the iterations in flight
+        drain_count = cvisitor.getFsmCount()
+        valids = [fsm.seq.Prev(start, stage)
+                  for stage in range(self.num_stages)]
+
+        self.make_stages(valids, iter_node)
+
+        cvisitor.setFsm(loop_count, drain_count, vtypes.Not(cond_node))
+        drain_cond = (vtypes.Not(vtypes.Ors(*valids[1:]))
+                      if len(valids) > 1 else None)
+        cvisitor.setFsm(drain_count, drain_count + 1, drain_cond)
+        cvisitor.incFsmCount()
+
+        return loop_count, drain_count
+
+    def make_stages(self, valids, iter_node):
+        cvisitor = self.cvisitor
+        seq = cvisitor.fsm.seq
+
+        # variable name -> (variable, stage where it is assigned)
+        sources = OrderedDict()
+        sources[self.iter_name] = (iter_node, -1)
+
+        for index, op in enumerate(self.ops):
+            rename_dict = OrderedDict()
+            for name in op.reads:
+                if name not in sources:
+                    # loop-invariant or loop-carried
+                    continue
+                var, def_stage = sources[name]
+                delay = op.stage - def_stage - 1
+                if delay > 0:
+                    rename_dict[var.name] = seq.Prev(var, delay)
+
+            args = [self.visit(arg, rename_dict) for arg in op.args]
+            valid = valids[op.stage]
+
+            if op.ram is not None and op.dst is None:
+                addr, wdata = args
+                op.ram.write_rtl(addr, wdata, op.port, cond=valid)
+                continue
+
+            if op.ram is not None:
+                addr, = args
+                value, _ = op.ram.read_rtl(addr, op.port, cond=valid)
+                var = cvisitor.getVariable(op.dst, store=True)
+            else:
+                value = self.visit(op.value, rename_dict)
+                _type = cvisitor._variable_type(value)
+                var = cvisitor.getVariable(op.dst, store=True, _type=_type)
+
+            self.set_bind(var, value, valids[op.get_last_stage()])
+            sources[op.dst] = (var, op.get_last_stage())
+
+    def visit(self, node, rename_dict):
+        from .thread import _RelocateVisitor
+
+        value = self.cvisitor.visit(node)
+        if rename_dict and isinstance(value, vtypes.VeriloggenNode):
+            value = _RelocateVisitor(rename_dict).visit(value)
+        return value
+
+    def set_bind(self, var, value, cond):
+        fsm = self.cvisitor.fsm
+
+        if not isinstance(var, fxd._FixedVariable) and isinstance(value, fxd._FixedBase):
+            raise ValueError("type mismatch of destination and source: '%s' and '%s'" %
+                             (str(type(var)), str(type(value))))
+
+        if hasattr(var, '_fsm') and id(var._fsm) != id(fsm):
+            raise ValueError("variable '%s' has multiple drivers" % str(var))
+
+        if not hasattr(var, '_fsm'):
+            var._fsm = fsm
+
+        fsm.seq.If(cond)(
+            var.write(optimize(value))
+        )
+
+    def get_stats(self):
+        ret = OrderedDict()
+        ret['requested_ii'] = self.requested_ii
+        ret['ii'] = self.ii
+        ret['num_stages'] = self.num_stages
+        ret['stages'] = [op.stage for op in self.ops]
+        return ret
+
+
+class _Operation(object):
+
+    def __init__(self, dst, value, ram=None, port=None, args=()):
+        self.dst = dst
+        self.value = value
+        self.ram = ram
+        self.port = port
+        self.args = args
+        self.latency = read_latency if ram is not None and dst is not None else 0
+        self.stage = 0
+
+        self.reads = []
+        for node in ((value, ) if value is not None else ()) + tuple(args):
+            for n in ast.walk(node):
+                if (isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load) and
+                        n.id not in self.reads):
+                    self.reads.append(n.id)
+
+    def get_last_stage(self):
+        """ stage where the destination variable is assigned """
+        return self.stage + self.latency
+
+    def is_write(self):
+        return self.ram is not None and self.dst is None
+
+
+def _get_distance(prev, op):
+    """ minimum stages from a RAM access to a following access of the same RAM """
+
+    if prev.ram is not op.ram:
+        return None
+    if prev.is_write() and not op.is_write():
+        # a write takes effect on a read requested in the same cycle
+        return 0
+    if prev.is_write() or op.is_write():
+        return 1
+    return None
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 from __future__ import print_function
 import os
 import sys
+from collections import OrderedDict
 
 import veriloggen.core.vtypes as vtypes
 from veriloggen.fsm.fsm import FSM
@@ -24,7 +25,9 @@ class ThreadPool(vtypes.VeriloggenNode):
 
     def __init__(self, m=None, name=None, clk=None, rst=None,
                  targ=None, numthreads=None, datawidth=32,
-                 threads=None, fsm_as_module=False):
+                 threads=None, fsm_as_module=False, compile_once=False,
+                 merge_states=False, auto_parallel=False,
+                 fsm_width=32, fsm_encoding='binary', profile=False):
 
         if threads is not None:
             if not isinstance(threads, (tuple, list)):
@@ -47,18 +50,37 @@ class ThreadPool(vtypes.VeriloggenNode):
             self.numthreads = numthreads
             self.threads = [Thread(m, '_'.join([name, str(i)]), clk, rst, targ,
                                    datawidth=datawidth, tid=i,
-                                   fsm_as_module=fsm_as_module)
+                                   fsm_as_module=fsm_as_module,
+                                   merge_states=merge_states,
+                                   auto_parallel=auto_parallel,
+                                   fsm_width=fsm_width,
+                                   fsm_encoding=fsm_encoding,
+                                   profile=profile)
                             for i in range(numthreads)]
 
         else:
             raise ValueError('threads or other options must be specified.')
 
+        self.name = name
+
+        # compile targ only once, and copy the FSM to the other threads
+        self.compile_once = compile_once
+        self.num_compiled = 0
+        self.num_relocated = 0
+
         self.start = self.m.Reg(
             '_'.join(['', name, 'start']), self.numthreads, initval=0)
 
     def start(self, tid, *args, **kwargs):
         return self.threads[tid].start(*args, **kwargs)
 
+    def get_stats(self):
+        """ numbers of the compiled and the copied threads of compile_once """
+        ret = OrderedDict()
+        ret['compiled_threads'] = self.num_compiled
+        ret['relocated_threads'] = self.num_relocated
+        return ret
+
     def extend(self, tid, fsm, *args, **kwargs):
         return self.threads[tid].extend(fsm, *args, **kwargs)
 
@@ -78,7 +100,9 @@ class ThreadPool(vtypes.VeriloggenNode):
 
             if thread.fsm is None:
                 thread.fsm = FSM(thread.m, thread.name, thread.clk, thread.rst,
-                                 as_module=thread.fsm_as_module)
+                                 width=thread.fsm_width,
+                                 as_module=thread.fsm_as_module,
+                                 encoding=thread.fsm_encoding)
 
             thread.is_child = True
 
@@ -88,13 +112,34 @@ class ThreadPool(vtypes.VeriloggenNode):
                 thread.start_state = thread.fsm.current
 
         fsm_start = fsm.current
+        template = None
 
         for thread in self.threads:
             start_cond = self.start[thread.tid]
 
             fsm._set_index(fsm_start)
 
-            thread._synthesize_run_fsm(fsm, args, kwargs, cond=start_cond)
+            if template is not None and not _is_same_thread(thread, template):
+                template = None
+
+            already_synthesized = thread.end_state is not None
+
+            thread._synthesize_run_fsm(fsm, args, kwargs, cond=start_cond,
+                                       template=template)
+
+            if not already_synthesized:
+                if template is not None:
+                    self.num_relocated += 1
+                else:
+                    self.num_compiled += 1
+
+            if self.compile_once and template is None and thread.relocatable:
+                template = thread
+
+            if self.compile_once and thread.relocation_issue is not None:
+                raise ValueError("compile_once of '%s' cannot copy the FSM: "
+                                 "%s in '%s'" %
+                                 (self.name, thread.relocation_issue, thread.name))
 
             if thread.end_state is None:
                 thread.end_state = thread.fsm.current
@@ -113,7 +158,7 @@ class ThreadPool(vtypes.VeriloggenNode):
         for thread in self.threads:
             if thread.end_state is None:
                 raise ValueError('thread %d not started' % thread.tid)
-            end_flag = (thread.fsm.state == thread.end_state)
+            end_flag = thread.fsm.at(thread.end_state)
             patterns.append(((tid == thread.tid), end_flag))
 
         patterns.append((None, 0))
@@ -129,7 +174,7 @@ class ThreadPool(vtypes.VeriloggenNode):
         for thread in self.threads:
             if thread.end_state is None:
                 raise ValueError('thread %d not started' % thread.tid)
-            end_flag = (thread.fsm.state == thread.end_state)
+            end_flag = thread.fsm.at(thread.end_state)
             patterns.append(((tid == thread.tid), end_flag))
 
         patterns.append((None, 0))
@@ -146,7 +191,7 @@ class ThreadPool(vtypes.VeriloggenNode):
 
         for thread in self.threads:
             reset_flag = vtypes.Land(
-                (fsm.state == fsm.current), (tid == thread.tid))
+                fsm.here, (tid == thread.tid))
 
             thread.fsm._set_index(thread.end_state)
 
@@ -174,3 +219,15 @@ class ThreadPool(vtypes.VeriloggenNode):
         ret = vtypes.PatternMux(*patterns)
 
         return ret
+
+
+def _is_same_thread(thread, template):
+    return (thread.targ is template.targ and
+            thread.datawidth == template.datawidth and
+            thread.point == template.point and
+            thread.merge_states == template.merge_states and
+            thread.auto_parallel == template.auto_parallel and
+            thread.fsm_width == template.fsm_width and
+            thread.fsm_encoding == template.fsm_encoding and
+            list(thread.function_lib.items()) ==
+            list(template.function_lib.items()))
@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import re
+import linecache
+from collections import OrderedDict
+
+
+def read_profile(thread, text):
+    """
+    Accumulate the state trace of Thread (profile=True) into cycle counts.
+
+    text: simulation output which includes the trace lines of thread
+    returns: OrderedDict of 'cycles' (total number of the traced cycles),
+             'states' (state index -> cycles),
+             'lines' ((filename, lineno) -> cycles) and
+             'functions' (function name -> cycles).
+             The entries are sorted in descending order of the cycles.
+             The states which are not compiled from the source code,
+             such as the argument binding, are counted as (None, None) and None.
+    """
+
+    pattern = re.compile(r'\(%s profile\) state:\s*(\d+), cycles:\s*(\d+)' %
+                         re.escape(thread.name))
+
+    states = OrderedDict()
+    for line in text.splitlines():
+        match = pattern.search(line)
+        if match is None:
+            continue
+
+        index = _decode(thread.fsm, int(match.group(1)))
+        cycles = int(match.group(2))
+        states[index] = states.get(index, 0) + cycles
+
+    lines = OrderedDict()
+    functions = OrderedDict()
+    for index, cycles in states.items():
+        filename, lineno, name = thread.source_map.get(index, (None, None, None))
+        lines[(filename, lineno)] = lines.get((filename, lineno), 0) + cycles
+        functions[name] = functions.get(name, 0) + cycles
+
+    ret = OrderedDict()
+    ret['cycles'] = sum(states.values())
+    ret['states'] = _sort(states)
+    ret['lines'] = _sort(lines)
+    ret['functions'] = _sort(functions)
+    return ret
+
+
+def format_profile(profile, num_lines=None):
+    """ text report of the cycles per source line and per function """
+
+    total = max(profile['cycles'], 1)
+    ret = []
+    ret.append('total cycles: %d' % profile['cycles'])
+
+    ret.append('')
+    ret.append('%10s %7s  %s' % ('cycles', 'ratio', 'function'))
+    for name, cycles in profile['functions'].items():
+        ret.append('%10d %6.2f%%  %s' % (cycles, 100.0 * cycles / total,
+                                        name if name is not None else '-'))
+
+    ret.append('')
+    ret.append('%10s %7s  %s' % ('cycles', 'ratio', 'line'))
+    items = list(profile['lines'].items())
+    if num_lines is not None:
+        items = items[:num_lines]
+    for (filename, lineno), cycles in items:
+        if filename is None:
+            ret.append('%10d %6.2f%%  -' % (cycles, 100.0 * cycles / total))
+            continue
+        source = linecache.getline(filename, lineno).strip()
+        ret.append('%10d %6.2f%%  %s:%d  %s' % (cycles, 100.0 * cycles / total,
+                                               filename, lineno, source))
+
+    return '\n'.join(ret)
+
+
+def _decode(fsm, value):
+    if fsm.encoding == 'gray':
+        index = value
+        while value:
+            value >>= 1
+            index ^= value
+        return index
+
+    if fsm.encoding == 'onehot':
+        return value.bit_length() - 1
+
+    return value
+
+
+def _sort(counts):
+    return OrderedDict(sorted(counts.items(), key=lambda x: -x[1]))
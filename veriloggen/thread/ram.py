@@ -25,7 +25,8 @@ class RAM(_MutexFunction):
     def __init__(self, m, name, clk, rst,
                  datawidth=32, addrwidth=10, numports=1,
                  initvals=None, nocheck_initvals=False,
-                 ram_style=None, nodataflow=False, external_ports=None):
+                 ram_style=None, nodataflow=False, external_ports=None,
+                 arbiter=None, stats=False):
 
         self.m = m
         self.name = name
@@ -70,7 +71,8 @@ class RAM(_MutexFunction):
         self._write_disabled = [False for i in range(numports)]
         self._port_disabled = [False for i in range(numports)]
 
-        self.mutex = None
+        # arbiter and stats of the Mutex of lock()
+        self._set_mutex_options(arbiter, stats)
 
     def __getitem__(self, index):
         return self.interfaces[index]
@@ -156,7 +158,7 @@ class RAM(_MutexFunction):
         """ intrinsic read operation using a shared Seq object """
 
         port = vtypes.to_int(port)
-        cond = fsm.state == fsm.current
+        cond = fsm.here
 
         rdata, rvalid = self.read_rtl(addr, port, cond)
         rdata_reg = self.m.TmpReg(self.datawidth, initval=0, signed=True)
@@ -174,9 +176,9 @@ class RAM(_MutexFunction):
         port = vtypes.to_int(port)
 
         if cond is None:
-            cond = fsm.state == fsm.current
+            cond = fsm.here
         else:
-            cond = vtypes.Ands(cond, fsm.state == fsm.current)
+            cond = vtypes.Ands(cond, fsm.here)
 
         self.write_rtl(addr, wdata, port, cond)
         fsm.goto_next()
@@ -1083,14 +1085,16 @@ class FixedRAM(RAM):
     def __init__(self, m, name, clk, rst,
                  datawidth=32, addrwidth=10, numports=1, point=0,
                  initvals=None, nocheck_initvals=False, noconvert_initvals=False,
-                 ram_style=None, nodataflow=False, external_ports=None):
+                 ram_style=None, nodataflow=False, external_ports=None,
+                 arbiter=None, stats=False):
 
         if initvals is not None and not noconvert_initvals:
             initvals = [fxd.to_fixed(initval, point) for initval in initvals]
 
         RAM.__init__(self, m, name, clk, rst,
                      datawidth, addrwidth, numports,
-                     initvals, nocheck_initvals, ram_style, nodataflow, external_ports)
+                     initvals, nocheck_initvals, ram_style, nodataflow, external_ports,
+                     arbiter, stats)
 
         self.point = point
 
@@ -1305,7 +1309,7 @@ class MultibankRAM(object):
             raise ValueError('numbanks must be power-of-2')
 
         port = vtypes.to_int(port)
-        cond = fsm.state == fsm.current
+        cond = fsm.here
 
         rdata_list = []
         rvalid_list = []
@@ -1352,9 +1356,9 @@ class MultibankRAM(object):
             raise ValueError('numbanks must be power-of-2')
 
         if cond is None:
-            cond = fsm.state == fsm.current
+            cond = fsm.here
         else:
-            cond = vtypes.Ands(cond, fsm.state == fsm.current)
+            cond = vtypes.Ands(cond, fsm.here)
 
         bank = self.m.TmpWire(self.shift)
         bank.assign(addr)
@@ -1370,7 +1374,7 @@ class MultibankRAM(object):
 
     def read_bank(self, fsm, bank, addr, port=0):
         port = vtypes.to_int(port)
-        cond = fsm.state == fsm.current
+        cond = fsm.here
 
         rdata_list = []
         rvalid_list = []
@@ -1392,9 +1396,9 @@ class MultibankRAM(object):
 
     def write_bank(self, fsm, bank, addr, wdata, port=0, cond=None):
         if cond is None:
-            cond = fsm.state == fsm.current
+            cond = fsm.here
         else:
-            cond = vtypes.Ands(cond, fsm.state == fsm.current)
+            cond = vtypes.Ands(cond, fsm.here)
 
         for i, ram in enumerate(self.rams):
             bank_cond = vtypes.Ands(cond, bank == i)
@@ -15,9 +15,13 @@ from veriloggen.fsm.fsm import FSM
 from veriloggen.seq.seq import Seq
 from veriloggen.stream.stream import Stream as BaseStream
 from veriloggen.stream.stypes import Substream as BaseSubstream
+from veriloggen.stream.stypes import _Accumulator
+from veriloggen.stream.dag import _resolve
+from veriloggen.stream.lanes import LaneReplicator
 
 from . import compiler
 from . import thread
+from .ram import MultibankRAM
 
 mode_width = 3
 mode_idle = vtypes.Int(0, mode_width, base=2)
@@ -56,11 +60,19 @@ class Stream(BaseStream):
                  datawidth=32, addrwidth=32,
                  max_pattern_length=4, max_multipattern_length=2,
                  ram_sel_width=8, fsm_as_module=False,
-                 dump=False, dump_base=10, dump_mode='all'):
+                 dump=False, dump_base=10, dump_mode='all',
+                 dump_format='text', dump_file=None,
+                 scheduler='asap', resources=None, delay_ram_threshold=None,
+                 reassociate=False, narrow_widths=False, numlanes=1):
 
         BaseStream.__init__(self, module=m, clock=clk, reset=rst,
                             no_hook=True,
-                            dump=dump, dump_base=dump_base, dump_mode=dump_mode)
+                            dump=dump, dump_base=dump_base, dump_mode=dump_mode,
+                            dump_format=dump_format, dump_file=dump_file,
+                            scheduler=scheduler, resources=resources,
+                            delay_ram_threshold=delay_ram_threshold,
+                            reassociate=reassociate,
+                            narrow_widths=narrow_widths)
 
         self.name = name
         self.datawidth = datawidth
@@ -118,14 +130,33 @@ class Stream(BaseStream):
 
         self.fsm_id_count = 0
 
+        # SIMD lanes: each lane processes every numlanes-th sample
+        self.numlanes = numlanes
+        self.lanes = LaneReplicator(numlanes)
+        # key: name of a source or sink, value: names of the lanes
+        self.lane_names = OrderedDict()
+
     def source(self, name=None, datawidth=None, point=0, signed=True):
         if self.stream_synthesized:
             raise ValueError(
                 'cannot modify the stream because already synthesized')
 
-        _id = self.var_id_count
         if name is None:
-            name = 'source_%d' % _id
+            name = 'source_%d' % self.var_id_count
+
+        var = self._add_source(name, datawidth, point, signed)
+
+        if self.numlanes > 1:
+            names = [self._lane_name(name, i) for i in range(self.numlanes)]
+            lanes = [var] + [self._add_source(lane_name, datawidth, point, signed)
+                             for lane_name in names[1:]]
+            self.lanes.add_input(var, lanes)
+            self.lane_names[name] = names
+
+        return var
+
+    def _add_source(self, name, datawidth=None, point=0, signed=True):
+        _id = self.var_id_count
 
         if name in self.var_name_map:
             raise ValueError("'%s' is already defined in stream '%s'" %
@@ -218,9 +249,65 @@ class Stream(BaseStream):
             raise ValueError(
                 'cannot modify the stream because already synthesized')
 
-        _id = self.var_id_count
         if name is None:
-            name = 'sink_%d' % _id
+            name = 'sink_%d' % self.var_id_count
+
+        if self.numlanes > 1:
+            self._add_lane_sink(data, name, when, when_name)
+            return
+
+        self._add_sink(data, name)
+
+        if when is not None:
+            self.sink(when, when_name)
+            self.sink_when_map[name] = when
+
+    def _add_lane_sink(self, data, name, when=None, when_name=None):
+        # an accumulator is combined across the lanes into a single sink
+        if isinstance(_resolve(data), _Accumulator):
+            data = self.lanes.reduce(data)
+            if when is not None:
+                if isinstance(_resolve(when), _Accumulator):
+                    when = self.lanes.reduce(when)
+                else:
+                    when = self.lanes.replicate(when)[0]
+
+            self._add_sink(data, name)
+
+            if when is not None:
+                if when_name is None:
+                    when_name = 'sink_%d' % self.var_id_count
+                self._add_sink(when, when_name)
+                self.sink_when_map[name] = when
+
+            return
+
+        data_lanes = self.lanes.replicate(data)
+        names = [self._lane_name(name, i) for i in range(self.numlanes)]
+
+        for lane_name, lane in zip(names, data_lanes):
+            self._add_sink(lane, lane_name)
+
+        self.lane_names[name] = names
+
+        if when is None:
+            return
+
+        if when_name is None:
+            when_name = 'sink_%d' % self.var_id_count
+
+        when_lanes = self.lanes.replicate(when)
+        when_names = [self._lane_name(when_name, i)
+                      for i in range(self.numlanes)]
+
+        for lane_name, when_lane_name, when_lane in zip(names, when_names, when_lanes):
+            self._add_sink(when_lane, when_lane_name)
+            self.sink_when_map[lane_name] = when_lane
+
+        self.lane_names[when_name] = when_names
+
+    def _add_sink(self, data, name):
+        _id = self.var_id_count
 
         if name in self.var_name_map:
             raise ValueError("'%s' is already defined in stream '%s'" %
@@ -293,10 +380,6 @@ class Stream(BaseStream):
             data.sink_ram_wenable(0)
         )
 
-        if when is not None:
-            self.sink(when, when_name)
-            self.sink_when_map[name] = when
-
     def constant(self, name=None, datawidth=None, point=0, signed=True):
         if self.stream_synthesized:
             raise ValueError(
@@ -407,7 +490,11 @@ class Stream(BaseStream):
         return var
 
     def set_source(self, fsm, name, ram, offset, size, stride=1, port=0):
-        """ intrinsic method to assign RAM property to a source stream """
+        """
+        intrinsic method to assign RAM property to a source stream.
+        With numlanes > 1, ram is a MultibankRAM of numlanes banks,
+        offset and size are multiples of numlanes, and stride is 1.
+        """
 
         if not self.stream_synthesized:
             self._implement_stream()
@@ -429,17 +516,19 @@ class Stream(BaseStream):
             raise NameError("No such stream '%s'" % name)
 
         set_cond = self._set_flag(fsm)
+        port = vtypes.to_int(port)
 
-        self.seq.If(set_cond)(
-            var.source_mode(mode_normal),
-            var.source_offset(offset),
-            var.source_size(size),
-            var.source_stride(stride)
-        )
+        for var, name, ram, offset, size in self._get_lanes(var, name, ram,
+                                                            offset, size, stride):
+            self.seq.If(set_cond)(
+                var.source_mode(mode_normal),
+                var.source_offset(offset),
+                var.source_size(size),
+                var.source_stride(stride)
+            )
 
-        port = vtypes.to_int(port)
-        self._setup_source_ram(ram, var, port, set_cond)
-        self._synthesize_set_source(var, name)
+            self._setup_source_ram(ram, var, port, set_cond)
+            self._synthesize_set_source(var, name)
 
         fsm.goto_next()
 
@@ -465,6 +554,8 @@ class Stream(BaseStream):
         if name not in self.sources:
             raise NameError("No such stream '%s'" % name)
 
+        self._check_no_lanes(name)
+
         if not isinstance(pattern, (tuple, list)):
             raise TypeError('pattern must be list or tuple.')
 
@@ -538,6 +629,8 @@ class Stream(BaseStream):
         if name not in self.sources:
             raise NameError("No such stream '%s'" % name)
 
+        self._check_no_lanes(name)
+
         if not isinstance(patterns, (tuple, list)):
             raise TypeError('patterns must be list or tuple.')
 
@@ -629,6 +722,8 @@ class Stream(BaseStream):
         if name not in self.sources:
             raise NameError("No such stream '%s'" % name)
 
+        self._check_no_lanes(name)
+
         set_cond = self._set_flag(fsm)
 
         self.seq.If(set_cond)(
@@ -656,7 +751,13 @@ class Stream(BaseStream):
         fsm.goto_next()
 
     def set_sink(self, fsm, name, ram, offset, size, stride=1, port=0):
-        """ intrinsic method to assign RAM property to a sink stream """
+        """
+        intrinsic method to assign RAM property to a sink stream.
+        With numlanes > 1, ram is a MultibankRAM of numlanes banks,
+        offset and size are multiples of numlanes, and stride is 1.
+        A reduced accumulator is a single sink without lanes: it takes
+        any RAM, and size is the number of the outputs.
+        """
 
         if not self.stream_synthesized:
             self._implement_stream()
@@ -679,19 +780,22 @@ class Stream(BaseStream):
 
         set_cond = self._set_flag(fsm)
         start_delay = self._write_delay() - 1
+        lanes = self._get_lanes(var, name, ram, offset, size, stride)
 
-        self.seq.If(set_cond).Delay(start_delay).EagerVal()(
-            var.sink_mode(mode_normal),
-            var.sink_offset(offset),
-            var.sink_size(size),
-            var.sink_stride(stride)
-        )
+        for var, name, ram, offset, size in lanes:
+            self.seq.If(set_cond).Delay(start_delay).EagerVal()(
+                var.sink_mode(mode_normal),
+                var.sink_offset(offset),
+                var.sink_size(size),
+                var.sink_stride(stride)
+            )
 
         set_cond = self.seq.Prev(set_cond, start_delay)
-
         port = vtypes.to_int(port)
-        self._setup_sink_ram(ram, var, port, set_cond)
-        self._synthesize_set_sink(var, name)
+
+        for var, name, ram, offset, size in lanes:
+            self._setup_sink_ram(ram, var, port, set_cond)
+            self._synthesize_set_sink(var, name)
 
         fsm.goto_next()
 
@@ -717,6 +821,8 @@ class Stream(BaseStream):
         if name not in self.sinks:
             raise NameError("No such stream '%s'" % name)
 
+        self._check_no_lanes(name)
+
         if not isinstance(pattern, (tuple, list)):
             raise TypeError('pattern must be list or tuple.')
 
@@ -793,6 +899,8 @@ class Stream(BaseStream):
         if name not in self.sinks:
             raise NameError("No such stream '%s'" % name)
 
+        self._check_no_lanes(name)
+
         if not isinstance(patterns, (tuple, list)):
             raise TypeError('patterns must be list or tuple.')
 
@@ -888,6 +996,8 @@ class Stream(BaseStream):
         if name not in self.sinks:
             raise NameError("No such stream '%s'" % name)
 
+        self._check_no_lanes(name)
+
         set_cond = self._set_flag(fsm)
         start_delay = self._write_delay() - 1
 
@@ -929,6 +1039,8 @@ class Stream(BaseStream):
         if name not in self.sinks:
             raise NameError("No such stream '%s'" % name)
 
+        self._check_no_lanes(name)
+
         set_cond = self._set_flag(fsm)
         start_delay = self._write_delay() - 1
         set_cond = self.seq.Prev(set_cond, start_delay)
@@ -1058,6 +1170,8 @@ class Stream(BaseStream):
         if name not in self.sinks:
             raise NameError("No such stream '%s'" % name)
 
+        self._check_no_lanes(name)
+
         fsm.goto_next()
 
         return var.sink_ram_wdata
@@ -1431,6 +1545,14 @@ class Stream(BaseStream):
             dump_ram_step.inc()
         )
 
+        if self.dump_format == 'binary':
+            # the address is recorded in place of the age
+            point = ram.point if hasattr(ram, 'point') else 0
+            self._add_binary_dump(self.seq, (enable, vtypes.Not(self.dump_mask)),
+                                  'read', name, 0, ram.datawidth, point, False,
+                                  dump_ram_step, addr, read_data)
+            return
+
         self.seq.If(enable, vtypes.Not(self.dump_mask))(
             vtypes.Display(fmt, dump_ram_step, age, addr, data)
         )
@@ -1879,6 +2001,15 @@ class Stream(BaseStream):
         else:
             data = var.sink_ram_wdata
 
+        if self.dump_format == 'binary':
+            # the age of the written sample is recorded as the step
+            point = ram.point if hasattr(ram, 'point') else 0
+            self._add_binary_dump(self.seq, (enable, vtypes.Not(self.dump_mask)),
+                                  'write', name, pipeline_depth + 1,
+                                  ram.datawidth, point, False,
+                                  age, addr, var.sink_ram_wdata)
+            return
+
         self.seq.If(enable, vtypes.Not(self.dump_mask))(
             vtypes.Display(fmt, self.dump_step, age, addr, data)
         )
@@ -2349,6 +2480,14 @@ class Stream(BaseStream):
             dump_ram_step.inc()
         )
 
+        if self.dump_format == 'binary':
+            # the address is recorded in place of the age
+            point = ram.point if hasattr(ram, 'point') else 0
+            self._add_binary_dump(self.seq, (enable, vtypes.Not(self.dump_mask)),
+                                  'read', name, 0, ram.datawidth, point, False,
+                                  dump_ram_step, addr, read_data)
+            return
+
         self.seq.If(enable, vtypes.Not(self.dump_mask))(
             vtypes.Display(fmt, dump_ram_step, age, addr, data)
         )
@@ -2447,6 +2586,15 @@ class Stream(BaseStream):
         else:
             data = var.write_data
 
+        if self.dump_format == 'binary':
+            # the age of the written sample is recorded as the step
+            point = ram.point if hasattr(ram, 'point') else 0
+            self._add_binary_dump(self.seq, (enable, vtypes.Not(self.dump_mask)),
+                                  'write', name, pipeline_depth + 1,
+                                  ram.datawidth, point, False,
+                                  age, addr, var.write_data)
+            return
+
         self.seq.If(enable, vtypes.Not(self.dump_mask))(
             vtypes.Display(fmt, self.dump_step, age, addr, data)
         )
@@ -2485,6 +2633,55 @@ class Stream(BaseStream):
             pattern.append((size, stride))
         return tuple(pattern)
 
+    def _get_lanes(self, var, name, ram, offset, size, stride):
+        """
+        (var, name, ram, offset, size) of each lane.
+        The banks of the MultibankRAM interleave on the low address bits,
+        so offset and size must be multiples of numlanes and stride must be 1.
+        The values determined at run time are not checked.
+        """
+
+        if name not in self.lane_names:
+            return [(var, name, ram, offset, size)]
+
+        if not isinstance(ram, MultibankRAM) or ram.numbanks != self.numlanes:
+            raise ValueError("'%s' requires a MultibankRAM with %d banks." %
+                             (name, self.numlanes))
+
+        if isinstance(offset, int) and offset % self.numlanes != 0:
+            raise ValueError('offset %d must be a multiple of numlanes %d.' %
+                             (offset, self.numlanes))
+        if isinstance(size, int) and size % self.numlanes != 0:
+            raise ValueError('size %d must be a multiple of numlanes %d.' %
+                             (size, self.numlanes))
+        if isinstance(stride, int) and stride != 1:
+            raise ValueError('stride must be 1 with numlanes %d, not %d.' %
+                             (self.numlanes, stride))
+
+        # sample i of a lane is the element (offset + i * numlanes + lane)
+        shift = self.lanes.shift
+        if isinstance(offset, int):
+            offset = offset >> shift
+        else:
+            offset = vtypes.Srl(offset, shift)
+        if isinstance(size, int):
+            size = size >> shift
+        else:
+            size = vtypes.Srl(size, shift)
+
+        return [(self.var_name_map[lane_name], lane_name, lane_ram, offset, size)
+                for lane_name, lane_ram in zip(self.lane_names[name], ram.rams)]
+
+    def _check_no_lanes(self, name):
+        if name in self.lane_names:
+            raise ValueError("'%s' has %d lanes, which supports only "
+                             "set_source and set_sink." % (name, self.numlanes))
+
+    def _lane_name(self, name, lane):
+        if lane == 0:
+            return name
+        return '%s_lane%d' % (name, lane)
+
     def _prefix(self, name):
         return '%s_%s' % (self.name, name)
 
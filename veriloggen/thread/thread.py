@@ -2,14 +2,16 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 import ast
+import copy
 import inspect
-import textwrap
 from collections import OrderedDict
 
 import veriloggen.core.vtypes as vtypes
 from veriloggen.fsm.fsm import FSM
+from veriloggen.seq.subst_visitor import SubstSrcVisitor, SrcRenameVisitor
 
 from . import compiler
+from .merge import StateMerger, StateScheduler
 
 
 def reset():
@@ -17,9 +19,13 @@ def reset():
 
 
 def TmpThread(m, clk, rst, targ, datawidth=32, tid=None,
-              fsm_as_module=False):
+              fsm_as_module=False, merge_states=False, auto_parallel=False,
+              fsm_width=32, fsm_encoding='binary', profile=False):
     name = compiler._tmp_name()
-    return Thread(m, name, clk, rst, targ, datawidth, tid, fsm_as_module)
+    return Thread(m, name, clk, rst, targ, datawidth, tid=tid,
+                  fsm_as_module=fsm_as_module, merge_states=merge_states,
+                  auto_parallel=auto_parallel, fsm_width=fsm_width,
+                  fsm_encoding=fsm_encoding, profile=profile)
 
 
 def embed_thread(fsm, func, *args, **kwargs):
@@ -34,7 +40,9 @@ class Thread(vtypes.VeriloggenNode):
     __intrinsics__ = ('run', 'join', 'done', 'reset', 'ret')
 
     def __init__(self, m, name, clk, rst, targ,
-                 datawidth=32, point=16, tid=None, fsm_as_module=False):
+                 datawidth=32, point=16, tid=None, fsm_as_module=False,
+                 merge_states=False, auto_parallel=False,
+                 fsm_width=32, fsm_encoding='binary', profile=False):
 
         self.m = m
         self.name = name
@@ -45,6 +53,21 @@ class Thread(vtypes.VeriloggenNode):
         self.point = point
         self.tid = tid
         self.fsm_as_module = fsm_as_module
+        # width (None: minimum) and encoding of the state register
+        self.fsm_width = fsm_width
+        self.fsm_encoding = fsm_encoding
+        # merge straight-line states after the compilation
+        self.merge_states = merge_states
+        # schedule independent straight-line states in parallel
+        self.auto_parallel = auto_parallel
+        self.state_merger = None
+        self.pipelined_loops = []
+        self.unrolled_loops = []
+        # trace the state transitions with the cycles spent in each state
+        self.profile = profile
+        self.profile_count = None
+        # state index -> (filename, lineno, function name) of the source code
+        self.source_map = OrderedDict()
 
         self.function_lib = OrderedDict()
         self.intrinsic_functions = OrderedDict()
@@ -61,6 +84,14 @@ class Thread(vtypes.VeriloggenNode):
         self.vararg_set = False
         self.called = None
 
+        # variables created by the compilation of targ,
+        # and whether the FSM can be copied to another thread of targ
+        self.local_vars = []
+        self.intrinsic_calls = []
+        self.relocatable = False
+        # why the FSM cannot be copied
+        self.relocation_issue = None
+
     def start(self, *args, **kwargs):
         """ build up a new FSM based on the arguments """
 
@@ -74,7 +105,8 @@ class Thread(vtypes.VeriloggenNode):
         self.start_frame = frame.f_back
 
         self.fsm = FSM(self.m, self.name, self.clk, self.rst,
-                       as_module=self.fsm_as_module)
+                       width=self.fsm_width, as_module=self.fsm_as_module,
+                       encoding=self.fsm_encoding)
 
         self.start_state = self.fsm.current
         self._synthesize_start_fsm(args, kwargs)
@@ -110,7 +142,8 @@ class Thread(vtypes.VeriloggenNode):
 
         if self.fsm is None:
             self.fsm = FSM(self.m, self.name, self.clk, self.rst,
-                           as_module=self.fsm_as_module)
+                           width=self.fsm_width, as_module=self.fsm_as_module,
+                           encoding=self.fsm_encoding)
 
         self.is_child = True
 
@@ -124,7 +157,7 @@ class Thread(vtypes.VeriloggenNode):
         if self.end_state is None:
             self.end_state = self.fsm.current
 
-        start_flag = (self.fsm.state == self.start_state)
+        start_flag = self.fsm.at(self.start_state)
 
         return start_flag
 
@@ -134,7 +167,7 @@ class Thread(vtypes.VeriloggenNode):
         if self.end_state is None:
             raise ValueError('not started')
 
-        end_flag = (self.fsm.state == self.end_state)
+        end_flag = self.fsm.at(self.end_state)
         fsm.If(end_flag).goto_next()
 
         return 0
@@ -145,7 +178,7 @@ class Thread(vtypes.VeriloggenNode):
         if self.end_state is None:
             raise ValueError('not started')
 
-        end_flag = (self.fsm.state == self.end_state)
+        end_flag = self.fsm.at(self.end_state)
 
         return end_flag
 
@@ -155,7 +188,7 @@ class Thread(vtypes.VeriloggenNode):
         if self.end_state is None:
             raise ValueError('not started')
 
-        reset_flag = (fsm.state == fsm.current)
+        reset_flag = fsm.here
         self.fsm._set_index(self.end_state)
 
         if self.called is not None:
@@ -174,6 +207,39 @@ class Thread(vtypes.VeriloggenNode):
 
         return self.return_value
 
+    def get_stats(self):
+        """ statistics of the state merging, the pipelined and unrolled loops """
+        if self.state_merger is None:
+            ret = OrderedDict()
+        else:
+            ret = self.state_merger.get_stats()
+
+        if self.pipelined_loops:
+            ret['pipelined_loops'] = [pipeliner.get_stats()
+                                      for pipeliner in self.pipelined_loops]
+
+        if self.unrolled_loops:
+            ret['unrolled_loops'] = [unroller.get_stats()
+                                     for unroller in self.unrolled_loops]
+
+        return ret
+
+    def execute(self, *args, **kwargs):
+        """
+        functional execution of the target function in Python
+        returns: (return value, approximate cycle count, see Executor)
+        """
+        from .executor import Executor
+
+        exe = Executor(self)
+        return exe.run(*args, **kwargs)
+
+    def read_profile(self, text):
+        """ cycles per state, source line and function of the state trace in text """
+        from .profile import read_profile
+
+        return read_profile(self, text)
+
     #--------------------------------------------------------------------------
     def add_function(self, func):
         name = func.__name__
@@ -219,6 +285,9 @@ class Thread(vtypes.VeriloggenNode):
         if fsm is None:
             fsm = self.fsm
 
+        if fsm is self.fsm:
+            self._add_profiler()
+
         functions = self._get_functions()
 
         cvisitor = compiler.CompileVisitor(self.m, self.name, self.clk, self.rst, fsm,
@@ -227,8 +296,7 @@ class Thread(vtypes.VeriloggenNode):
                                            self.start_frame,
                                            datawidth=self.datawidth, point=self.point)
 
-        text = textwrap.dedent(inspect.getsource(self.targ))
-        tree = ast.parse(text).body[0]
+        tree = compiler.get_function_ast(self.targ)
 
         # stack a new scope frame
         cvisitor.pushScope(ftype='call')
@@ -267,10 +335,22 @@ class Thread(vtypes.VeriloggenNode):
         # return to the previous scope frame
         cvisitor.popScope()
 
+        self.pipelined_loops.extend(cvisitor.pipelined_loops)
+        self.unrolled_loops.extend(cvisitor.unrolled_loops)
+
+        if (self.merge_states or self.auto_parallel) and fsm is self.fsm:
+            self._merge_states(cvisitor)
+
+        if fsm is self.fsm:
+            self.source_map.update(sorted(cvisitor.source_map.items()))
+
         return self.return_value
 
-    def _synthesize_run_fsm(self, parent_fsm, args, kwargs, cond=None):
-        start_flag = (parent_fsm.state == parent_fsm.current)
+    def _synthesize_run_fsm(self, parent_fsm, args, kwargs, cond=None,
+                            template=None):
+        self._add_profiler()
+
+        start_flag = parent_fsm.here
 
         if self.called is None:
             self.called = self.m.Reg(
@@ -291,8 +371,7 @@ class Thread(vtypes.VeriloggenNode):
                                            self.start_frame,
                                            datawidth=self.datawidth)
 
-        text = textwrap.dedent(inspect.getsource(self.targ))
-        tree = ast.parse(text).body[0]
+        tree = compiler.get_function_ast(self.targ)
 
         # stack a new scope frame
         cvisitor.pushScope(ftype='call')
@@ -459,6 +538,14 @@ class Thread(vtypes.VeriloggenNode):
         if self.end_state is not None:
             return self.return_value
 
+        # copy the FSM of another thread of the same function
+        if template is not None:
+            self.return_value = self._relocate(template)
+            return self.return_value
+
+        sizes = compiler._get_sizes(self.m, self.fsm)
+        cvisitor.intrinsic_calls = []
+
         # call AST
         args_text = ', '.join(args_code + kwargs_code)
         call_code = ''.join([self.targ.__name__, '(', args_text, ')'])
@@ -476,22 +563,336 @@ class Thread(vtypes.VeriloggenNode):
         # return to the previous scope frame
         cvisitor.popScope()
 
+        self.pipelined_loops.extend(cvisitor.pipelined_loops)
+        self.unrolled_loops.extend(cvisitor.unrolled_loops)
+
+        if self.merge_states or self.auto_parallel:
+            self._merge_states(cvisitor)
+
+        self.source_map.update(sorted(cvisitor.source_map.items()))
+
+        # the items added by the intrinsic calls are made again in relocation
+        self.intrinsic_calls = cvisitor.intrinsic_calls
+        new_sizes = compiler._get_sizes(self.m, self.fsm)
+        calls = self.intrinsic_calls
+
+        items = [self.m.items[i] for i in
+                 _get_added_range(calls, 'items', sizes['items'], new_sizes['items'])]
+        self.local_vars = [item for item in items
+                           if isinstance(item, vtypes._Variable)]
+        if calls and (self.merge_states or self.auto_parallel):
+            self.relocation_issue = 'an intrinsic method is called in merged states'
+        elif any([_is_thread_call(call) for call in calls]):
+            self.relocation_issue = 'a thread is called'
+        elif len(self.local_vars) != len(items):
+            self.relocation_issue = 'a non-variable item is added'
+        elif _get_added_range(calls, 'hook', sizes['hook'], new_sizes['hook']):
+            self.relocation_issue = 'a hook is added'
+        elif _get_added_range(calls, 'seq', sizes['seq'], new_sizes['seq']):
+            self.relocation_issue = 'a statement is added to the Seq'
+        elif not self._is_relocatable_fsm():
+            self.relocation_issue = 'a statement cannot be copied'
+        self.relocatable = self.relocation_issue is None
+
         return self.return_value
 
-    def _get_functions(self):
-        codes = []
+    def _merge_states(self, cvisitor):
+        protected = (self.start_state, self.fsm.current)
+        merger = StateScheduler if self.auto_parallel else StateMerger
+        self.state_merger = merger(self.fsm, protected,
+                                   cvisitor.intrinsic_states)
+        self.state_merger.merge(self.start_state)
+
+    def _add_profiler(self):
+        """ display the previous state and its cycles at every state transition """
+
+        if not self.profile or self.profile_count is not None:
+            return
+
+        fsm = self.fsm
+        prev = fsm._add_delayed_state(1)
+        self.profile_count = self.m.Reg(
+            '_'.join(['', self.name, 'profile_count']), 32, initval=0)
+
+        fsm.seq.If(fsm.state != prev)(
+            vtypes.Display('(' + self.name + ' profile) state:%d, cycles:%d',
+                           prev, self.profile_count),
+            self.profile_count(1)
+        )
+        fsm.seq.If(fsm.state == prev)(
+            self.profile_count.inc()
+        )
+
+    def _is_relocatable_fsm(self):
+        """ all the statements can be visited by _RelocateVisitor """
+
+        visitor = SubstSrcVisitor()
+        try:
+            for index, statements in self._get_body_items():
+                visitor.visit(statements)
+            for index, jumps in self._get_jump_items():
+                for dst, cond, else_dst in jumps:
+                    visitor.visit(cond)
+            for delay, index, statements in self._get_delayed_body_items():
+                visitor.visit(statements)
+            if isinstance(self.return_value, vtypes.VeriloggenNode):
+                visitor.visit(self.return_value)
+            for call in self.intrinsic_calls:
+                _get_variables(call.args[1:])
+                _get_variables(list(call.kwargs.values()))
+                _get_variables(call.ret)
+        except TypeError:
+            return False
+
+        return True
+
+    def _relocate(self, template):
+        """
+        copy the FSM of targ compiled by template,
+        replacing the variables of template with new ones of this thread
+        """
+
+        src = template.fsm
+        dst = self.fsm
+
+        rename_dict = OrderedDict()
+        rename_dict[src.state.name] = dst.state
+
+        for name, var in template.args_dict.items():
+            if isinstance(var, vtypes._Variable):
+                rename_dict[var.name] = self.args_dict[name]
+
+        marks = set()
+        for index, mark in src.mark.items():
+            rename_dict[mark.name] = dst._add_mark(index)
+            marks.add(id(mark))
+        dst.max_index = max(dst.max_index, src.max_index)
+
+        delayed_state = dict([(id(var), delay)
+                              for delay, var in src.delayed_state.items()])
+
+        new_vars = []
+        for var in template.local_vars:
+            if id(var) in marks:
+                continue
+
+            new_var = self._copy_variable(var, template.name)
+            rename_dict[var.name] = new_var
+            new_vars.append((var, new_var))
+
+            if id(var) in delayed_state:
+                dst.delayed_state[delayed_state[id(var)]] = new_var
+            if var.name in src.delayed_cond:
+                dst.delayed_cond[new_var.name] = new_var
+
+        visitor = _RelocateVisitor(rename_dict)
+
+        for var, new_var in new_vars:
+            if isinstance(var.width, vtypes.VeriloggenNode):
+                new_var.width = visitor.visit(var.width)
+            if isinstance(var.initval, vtypes.VeriloggenNode):
+                new_var.initval = visitor.visit(var.initval)
+
+        # the variables made by the intrinsic calls of template
+        # must be replaced with the ones made by the calls of this thread
+        for call in template.intrinsic_calls:
+            for item in self.m.items[call.before['items']:call.after['items']]:
+                if isinstance(item, vtypes._Variable):
+                    visitor.private.add(item.name)
+
+        # copy the statements in the order of the compilation,
+        # calling the intrinsics again in place of their statements
+        begin = None
+        for call in template.intrinsic_calls:
+            self._copy_fsm(template, visitor, begin, call.before)
+            self._replay(template, call, visitor)
+            begin = call.after
+
+        self._copy_fsm(template, visitor, begin, None)
+
+        dst.delay_amount = max(dst.delay_amount, src.delay_amount)
+        dst.tmp_count = src.tmp_count
+        dst._set_index(src.current)
+
+        self.local_vars = [new_var for var, new_var in new_vars]
+        self.relocatable = True
+        self.state_merger = template.state_merger
+        self.source_map.update(template.source_map)
+
+        if isinstance(template.return_value, vtypes.VeriloggenNode):
+            return visitor.visit(template.return_value)
+
+        return template.return_value
+
+    def _copy_fsm(self, template, visitor, begin, end):
+        """
+        copy the statements and the jumps of template,
+        which are added between the sizes of begin and end (None: first or last)
+        """
+
+        dst = self.fsm
+
+        def get_slice(key, items):
+            start = 0 if begin is None else begin.get(key, 0)
+            stop = len(items) if end is None else end.get(key, 0)
+            return items[start:stop]
+
+        for index, statements in template._get_body_items():
+            statements = visitor.visit(get_slice(('body', index), statements))
+            dst.body[index].extend(statements)
+            dst._add_dst_var(statements)
+
+        for index, jumps in template._get_jump_items():
+            for dst_index, cond, else_dst in get_slice(('jump', index), jumps):
+                dst._add_jump(index, dst_index, visitor.visit(cond), else_dst)
+
+        for delay, index, statements in template._get_delayed_body_items():
+            statements = visitor.visit(get_slice(('delayed', delay, index), statements))
+            dst.delayed_body[delay][index].extend(statements)
+            dst._add_dst_var(statements)
+
+    def _replay(self, template, call, visitor):
+        """ call an intrinsic of template again with this thread """
+
+        dst = self.fsm
+        dst._set_index(call.state)
+        dst.tmp_count = call.tmp_count
+
+        args = [dst] + _relocate_value(visitor, call.args[1:])
+        kwargs = OrderedDict([(key, _relocate_value(visitor, value))
+                              for key, value in call.kwargs.items()])
+        ret = call.func(*args, **kwargs)
+
+        # the returned variables are referred by the following statements
+        for var, new_var in zip(_get_variables(call.ret), _get_variables(ret)):
+            if var is not new_var:
+                visitor.rename_dict[var.name] = new_var
+
+        for delay, var in template.fsm.delayed_state.items():
+            if var.name not in visitor.rename_dict and delay in dst.delayed_state:
+                visitor.rename_dict[var.name] = dst.delayed_state[delay]
+
+    def _copy_variable(self, var, template_name):
+        if template_name in var.name:
+            name = var.name.replace(template_name, self.name, 1)
+        else:
+            name = '_'.join([var.name, self.name])
+
+        if self.m.find_identifier(name) is not None:
+            name = compiler._tmp_name(name)
+
+        ret = copy.copy(var)
+        ret.name = name
+        ret.subst = []
+        ret.assign_value = None
+        self.m.add_object(ret)
+        return ret
+
+    def _get_body_items(self):
+        """ statements of targ, which follow the binding of the arguments """
+
+        return [(index, statements)
+                for index, statements in sorted(self.fsm.body.items(),
+                                                key=lambda x: x[0])
+                if index > self.start_state]
+
+    def _get_jump_items(self):
+        return [(index, jumps)
+                for index, jumps in sorted(self.fsm.jump.items(),
+                                           key=lambda x: x[0])
+                if index > self.start_state]
+
+    def _get_delayed_body_items(self):
+        ret = []
+        for delay, body in sorted(self.fsm.delayed_body.items(),
+                                  key=lambda x: x[0]):
+            for index, statements in sorted(body.items(), key=lambda x: x[0]):
+                if index > self.start_state:
+                    ret.append((delay, index, statements))
+        return ret
 
-        for func_name, func in self.function_lib.items():
-            codes.append(textwrap.dedent(inspect.getsource(func)))
+    def _get_functions(self):
+        funcs = list(self.function_lib.values())
 
         if self.targ.__name__ not in self.function_lib:
-            codes.append(textwrap.dedent(inspect.getsource(self.targ)))
+            funcs.append(self.targ)
+
+        return compiler.get_functions(funcs)
+
+
+def _get_added_range(calls, key, begin, end):
+    """ indexes of the items between begin and end, not added by the intrinsic calls """
+
+    ret = []
+    for call in calls:
+        ret.extend(range(begin, call.before[key]))
+        begin = call.after[key]
+
+    ret.extend(range(begin, end))
+    return ret
+
+
+def _is_thread_call(call):
+    from .pool import ThreadPool
+    obj = getattr(call.func, '__self__', None)
+    return isinstance(obj, (Thread, ThreadPool))
+
+
+def _get_variables(value):
+    """ variables in a value, which is an argument or a return value of an intrinsic """
+
+    if isinstance(value, (tuple, list)):
+        return [var for v in value for var in _get_variables(v)]
+
+    if not isinstance(value, vtypes._Numeric):
+        return []
+
+    visitor = SubstSrcVisitor()
+    visitor.visit(value)
+    return list(visitor.srcs.values())
+
+
+def _relocate_value(visitor, value):
+    if isinstance(value, (tuple, list)):
+        return type(value)([_relocate_value(visitor, v) for v in value])
+
+    if isinstance(value, (vtypes._Numeric, vtypes.Subst)):
+        return visitor.visit(value)
+
+    return value
+
+
+class _RelocateVisitor(SrcRenameVisitor):
+    """ replace variables by name in both sides of the assignments """
+
+    def __init__(self, rename_dict):
+        SrcRenameVisitor.__init__(self, rename_dict)
+        # names of the variables which cannot be shared with the template
+        self.private = set()
+
+    def visit__Variable(self, node):
+        if node.name in self.private and node.name not in self.rename_dict:
+            raise ValueError("'%s' made by an intrinsic method cannot be copied" %
+                             node.name)
+        return SrcRenameVisitor.visit__Variable(self, node)
+
+    def visit(self, node):
+        if isinstance(node, vtypes._Constant):
+            return node
+        return SrcRenameVisitor.visit(self, node)
 
-        text = '\n'.join(codes)
-        _ast = ast.parse(text)
+    def visit__BinaryOperator(self, node):
+        ret = copy.copy(node)
+        ret.left = self.visit(node.left)
+        ret.right = self.visit(node.right)
+        return ret
 
-        functionvisitor = compiler.FunctionVisitor()
-        functionvisitor.visit(_ast)
-        functions = functionvisitor.getFunctions()
+    def visit__UnaryOperator(self, node):
+        ret = copy.copy(node)
+        ret.right = self.visit(node.right)
+        return ret
 
-        return functions
+    def visit_Subst(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        return vtypes.Subst(left, right, node.blk, node.ldelay, node.rdelay)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+import re
 import functools
 import inspect
 from collections import OrderedDict
@@ -98,24 +99,52 @@ def unset_parallel(fsm):
     fsm.goto_next()
 
 
-def Lock(m, name, clk, rst, width=32):
+arbiters = ('round_robin', 'age')
+
+
+def Lock(m, name, clk, rst, width=32, arbiter=None, stats=False):
     """ alias of Mutex class """
-    return Mutex(m, name, clk, rst, width)
+    return Mutex(m, name, clk, rst, width, arbiter, stats)
+
+
+def _check_arbiter(arbiter):
+    if arbiter is not None and arbiter not in arbiters:
+        raise ValueError("arbiter must be one of %s or None, not '%s'" %
+                         (', '.join(["'%s'" % a for a in arbiters]),
+                          str(arbiter)))
 
 
 class Mutex(object):
+    """
+    arbiter: arbitration of the simultaneous lock requests.
+             None: fixed priority (the latest compiled requester wins),
+             'round_robin': the next requester of the last granted one,
+             'age': the requester which has waited for the longest cycles.
+             Both of the arbiters grant the lock in a single cycle.
+    stats: display the waiting cycles of every acquisition in simulation,
+           which are summarized by read_stats()
+    """
+
     __intrinsics__ = ('lock', 'try_lock', 'unlock',
                       'acquire', 'release')
 
-    def __init__(self, m, name, clk, rst, width=32):
+    def __init__(self, m, name, clk, rst, width=32, arbiter=None, stats=False):
+
+        _check_arbiter(arbiter)
 
         self.m = m
         self.name = name
         self.clk = clk
         self.rst = rst
         self.width = width
+        self.arbiter = arbiter
+        self.stats = stats
 
-        self.seq = Seq(self.m, self.name, self.clk, self.rst)
+        # the arbiter and the counters are added when the requesters are fixed
+        nohook = arbiter is not None or stats
+        self.seq = Seq(self.m, self.name, self.clk, self.rst, nohook=nohook)
+        if nohook:
+            self.m.add_hook(self.implement)
 
         self.lock_reg = self.m.Reg(
             '_'.join(['', self.name, 'lock_reg']), initval=0)
@@ -125,6 +154,10 @@ class Mutex(object):
         self.id_map = OrderedDict()
         self.id_map_count = 0
 
+        # lock ID -> conditions of the requests and the waiting cycles
+        self.requests = OrderedDict()
+        self.waits = OrderedDict()
+
     def lock(self, fsm):
         name = fsm.name
         new_lock_id = self._get_id(name)
@@ -135,19 +168,18 @@ class Mutex(object):
         # try
         try_state = fsm.current
 
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         try_cond = vtypes.Not(self.lock_reg)
         fsm_cond = vtypes.Ors(try_cond, self.lock_id == new_lock_id)
 
-        self.seq.If(state_cond, try_cond)(
-            self.lock_reg(1),
-            self.lock_id(new_lock_id)
-        )
+        self._request(new_lock_id, state_cond, try_cond)
 
+        self._add_wait(fsm, new_lock_id, vtypes.Not(fsm_cond))
         fsm.If(fsm_cond).goto_next()
 
         # verify
         cond = vtypes.Ands(self.lock_reg, self.lock_id == new_lock_id)
+        self._add_wait(fsm, new_lock_id, vtypes.Not(cond))
         fsm.If(vtypes.Not(cond)).goto(try_state)  # try again
         fsm.If(cond).goto_next()  # OK
 
@@ -163,13 +195,10 @@ class Mutex(object):
         # try
         try_state = fsm.current
 
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         try_cond = vtypes.Not(self.lock_reg)
 
-        self.seq.If(state_cond, try_cond)(
-            self.lock_reg(1),
-            self.lock_id(new_lock_id)
-        )
+        self._request(new_lock_id, state_cond, try_cond)
 
         fsm.goto_next()
 
@@ -190,7 +219,7 @@ class Mutex(object):
         if new_lock_id > 2 ** self.width - 1:
             raise ValueError('too many lock IDs')
 
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
 
         self.seq.If(state_cond, self.lock_id == new_lock_id)(
             self.lock_reg(0)
@@ -207,6 +236,166 @@ class Mutex(object):
 
         return self.id_map[name]
 
+    def _request(self, lock_id, state_cond, try_cond):
+        if self.arbiter is None:
+            self.seq.If(state_cond, try_cond)(
+                self.lock_reg(1),
+                self.lock_id(lock_id)
+            )
+            return
+
+        self.requests.setdefault(lock_id, []).append(
+            vtypes.Ands(state_cond, try_cond))
+
+    def _add_wait(self, fsm, lock_id, cond):
+        fsm.add_stall('lock', cond)
+        self.waits.setdefault(lock_id, []).append(
+            vtypes.Ands(fsm.here, cond))
+
+    def implement(self):
+        wait_counts = OrderedDict()
+        if self.arbiter == 'age' or self.stats:
+            wait_counts = self._make_wait_counts()
+
+        if self.arbiter == 'round_robin':
+            self._make_round_robin_arbiter()
+        elif self.arbiter == 'age':
+            self._make_age_arbiter(wait_counts)
+
+        if self.stats:
+            self._make_stats(wait_counts)
+
+        self.seq.make_always()
+
+    def _make_wait_counts(self):
+        """ cycles waiting for the lock since the last acquisition """
+
+        acquired = vtypes.Ands(self.lock_reg,
+                               vtypes.Not(self.seq.Prev(self.lock_reg, 1)))
+
+        wait_counts = OrderedDict()
+        for lock_id, conds in sorted(self.waits.items(), key=lambda x: x[0]):
+            wait_count = self.m.Reg('_'.join(['', self.name, 'wait_count', str(lock_id)]),
+                                    self.width, initval=0)
+            wait_counts[lock_id] = wait_count
+
+            self.seq.If(vtypes.Ors(*conds))(
+                wait_count.inc()
+            )
+            self.seq.If(acquired, self.lock_id == lock_id)(
+                wait_count(0)
+            )
+
+        return wait_counts
+
+    def _make_round_robin_arbiter(self):
+        if not self.requests:
+            return
+
+        last_id = self.m.Reg('_'.join(['', self.name, 'last_id']),
+                             self.width, initval=0)
+
+        requests = [(lock_id, vtypes.Ors(*conds))
+                    for lock_id, conds in sorted(self.requests.items(),
+                                                 key=lambda x: x[0])]
+
+        # the requesters after the last granted one, and then from the first
+        pat = [(vtypes.Ands(req, last_id < lock_id), lock_id)
+               for lock_id, req in requests]
+        pat.extend([(req, lock_id) for lock_id, req in requests])
+        pat.append((None, 0))
+
+        grant_id = self._make_grant(requests, pat)
+        self.seq.If(vtypes.Ors(*[req for lock_id, req in requests]))(
+            last_id(grant_id)
+        )
+
+    def _make_age_arbiter(self, wait_counts):
+        if not self.requests:
+            return
+
+        requests = [(lock_id, vtypes.Ors(*conds))
+                    for lock_id, conds in sorted(self.requests.items(),
+                                                 key=lambda x: x[0])]
+
+        def get_age(lock_id):
+            if lock_id in wait_counts:
+                return wait_counts[lock_id]
+            return vtypes.Int(0)
+
+        # the oldest requester, or the first one of the oldest ones
+        pat = []
+        for lock_id, req in requests:
+            age = get_age(lock_id)
+            conds = [req]
+            for other_id, other_req in requests:
+                if other_id == lock_id:
+                    continue
+                other_age = get_age(other_id)
+                older = age > other_age if other_id < lock_id else age >= other_age
+                conds.append(vtypes.Ors(vtypes.Not(other_req), older))
+            pat.append((vtypes.Ands(*conds), lock_id))
+        pat.append((None, 0))
+
+        self._make_grant(requests, pat)
+
+    def _make_grant(self, requests, pat):
+        grant_id = self.m.Wire('_'.join(['', self.name, 'grant_id']), self.width)
+        grant_id.assign(vtypes.PatternMux(pat))
+
+        self.seq.If(vtypes.Ors(*[req for lock_id, req in requests]))(
+            self.lock_reg(1),
+            self.lock_id(grant_id)
+        )
+
+        return grant_id
+
+    def _make_stats(self, wait_counts):
+        acquired = vtypes.Ands(self.lock_reg,
+                               vtypes.Not(self.seq.Prev(self.lock_reg, 1)))
+
+        pat = [(self.lock_id == lock_id, wait_count)
+               for lock_id, wait_count in wait_counts.items()]
+        pat.append((None, 0))
+        wait = vtypes.PatternMux(pat)
+
+        self.seq.If(acquired)(
+            vtypes.Display('(' + self.name + ' mutex) lock_id:%d, wait:%d',
+                           self.lock_id, wait)
+        )
+
+    def read_stats(self, text):
+        """
+        statistics of the acquisitions displayed in simulation (stats=True)
+        returns: OrderedDict of the requester (FSM) name to an OrderedDict
+                 of the number of the acquisitions, the total and the maximum
+                 of the waiting cycles
+        """
+
+        pattern = re.compile(r'\(%s mutex\) lock_id:\s*(\d+), wait:\s*(\d+)' %
+                             re.escape(self.name))
+
+        names = dict([(lock_id, name) for name, lock_id in self.id_map.items()])
+
+        ret = OrderedDict()
+        for name in self.id_map.keys():
+            ret[name] = OrderedDict([('num_acquisitions', 0),
+                                     ('wait_cycles', 0),
+                                     ('max_wait_cycles', 0)])
+
+        for line in text.splitlines():
+            match = pattern.search(line)
+            if match is None:
+                continue
+
+            name = names[int(match.group(1))]
+            wait = int(match.group(2))
+            ret[name]['num_acquisitions'] += 1
+            ret[name]['wait_cycles'] += wait
+            ret[name]['max_wait_cycles'] = max(ret[name]['max_wait_cycles'], wait)
+
+        return ret
+
     def acquire(self, fsm, blocking=True):
         """ alias of lock() """
 
@@ -227,10 +416,21 @@ class Mutex(object):
 class _MutexFunction(object):
     __intrinsics__ = ('lock', 'try_lock', 'unlock')
 
+    # arbiter and stats of the Mutex, which is created at the first use
+    mutex_arbiter = None
+    mutex_stats = False
+
+    def _set_mutex_options(self, arbiter=None, stats=False):
+        _check_arbiter(arbiter)
+        self.mutex = None
+        self.mutex_arbiter = arbiter
+        self.mutex_stats = stats
+
     def _check_mutex(self, fsm):
         if self.mutex is None:
             self.mutex = Mutex(self.m, '_'.join(
-                ['', self.name, 'mutex']), self.clk, self.rst)
+                ['', self.name, 'mutex']), self.clk, self.rst,
+                arbiter=self.mutex_arbiter, stats=self.mutex_stats)
 
     def lock(self, fsm):
         self._check_mutex(fsm)
@@ -248,7 +448,7 @@ class _MutexFunction(object):
 class Barrier(object):
     __intrinsics__ = ('wait', )
 
-    def __init__(self, m, name, clk, rst, numparties):
+    def __init__(self, m, name, clk, rst, numparties, arbiter=None, stats=False):
 
         self.m = m
         self.name = name
@@ -264,7 +464,8 @@ class Barrier(object):
         self.done = self.m.Reg(
             '_'.join(['', self.name, 'barrier_done']), initval=0)
         self.mutex = Mutex(self.m, '_'.join(
-            ['', self.name, 'barrier_mutex']), self.clk, self.rst)
+            ['', self.name, 'barrier_mutex']), self.clk, self.rst,
+            arbiter=arbiter, stats=stats)
 
         # reset condition
         self.seq(
@@ -279,7 +480,7 @@ class Barrier(object):
 
         self.mutex.lock(fsm)
 
-        state_cond = fsm.state == fsm.current
+        state_cond = fsm.here
         self.seq.If(state_cond)(
             self.count.inc()
         )
@@ -315,7 +516,7 @@ class Shared(_MutexFunction):
             name = self._value.name
             self.seq = Seq(m, '_'.join(['seq', name]), clk, rst)
 
-        cond = fsm.state == fsm.current
+        cond = fsm.here
 
         def getval(v, p):
             if isinstance(p, (tuple, list)):
@@ -344,4 +545,5 @@ class Shared(_MutexFunction):
             clk = fsm.clk
             rst = fsm.rst
             name = self._value.name
-            self.mutex = Mutex(m, '_'.join(['', name, 'mutex']), clk, rst)
+            self.mutex = Mutex(m, '_'.join(['', name, 'mutex']), clk, rst,
+                               arbiter=self.mutex_arbiter, stats=self.mutex_stats)
@@ -0,0 +1,477 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import ast
+import copy
+from collections import OrderedDict
+
+import veriloggen.core.vtypes as vtypes
+
+from .ram import RAM, MultibankRAM
+
+
+def unroll(iterable, factor=None):
+    """
+    marks a for-loop of a thread to be unrolled at compile time.
+
+    iterable: range() with constant arguments, or a list of values
+    factor: number of the iterations replicated in the body of the loop.
+            None unrolls all the iterations.
+    In Python, the loop is executed as an ordinary loop.
+    """
+
+    if factor is not None and (not isinstance(factor, int) or factor < 1):
+        raise ValueError('factor must be a positive int or None.')
+
+    return iterable
+
+
+class UnrolledValue(ast.expr):
+    """ an AST node which refers to a value of the loop variable """
+
+    _fields = ()
+
+    def __init__(self, value=None):
+        ast.expr.__init__(self)
+        self.value = value
+
+    def __deepcopy__(self, memo):
+        # the value itself may be a variable of the module
+        return UnrolledValue(self.value)
+
+
+class UnrolledGroup(ast.stmt):
+    """ an AST node of the copies of a statement issued in the same state """
+
+    _fields = ()
+
+    def __init__(self, unroller=None, statements=None, banks=None):
+        ast.stmt.__init__(self)
+        self.unroller = unroller
+        self.statements = statements
+        # bank of a MultibankRAM accessed by each statement
+        self.banks = banks
+
+
+class LoopUnroller(object):
+    """
+    Compile-time unrolling of a for-loop of a thread.
+
+    Each copy of the body refers to its own value of the loop variable.
+    When the iterations do not depend on each other, the copies are
+    interleaved statement by statement: the variables defined in each
+    iteration are renamed for each copy, and the copies of an assignment
+    are executed in the same state. The copies of a read or a write of a
+    MultibankRAM are also issued in the same state, when the banks of the
+    addresses are determined at compile time and are distinct.
+    Otherwise, the copies are executed one after another.
+    """
+
+    def __init__(self, cvisitor, iter_name, body):
+        self.cvisitor = cvisitor
+        self.iter_name = iter_name
+        self.body = body
+        self.num_copies = 0
+        self.num_parallel_states = 0
+        self.interleaved = self.is_interleavable()
+
+    def unroll(self, values, iter_values=None):
+        """
+        returns the statements of the copies of the body
+
+        values: AST nodes of the loop variable of the copies
+        iter_values: (begin, step, count) of the loop variable register
+                     referred by the copies in a partially unrolled loop
+        """
+
+        self.num_copies += len(values)
+
+        if not self.interleaved:
+            ret = []
+            for value in values:
+                ret.extend(self.copy_body(value, None))
+            return ret
+
+        bodies = [self.copy_body(value, None if i == len(values) - 1 else i)
+                  for i, value in enumerate(values)]
+
+        ret = []
+        for orig, statements in zip(self.body, zip(*bodies)):
+            ret.extend(self.make_groups(orig, list(statements),
+                                        values, iter_values))
+        return ret
+
+    def copy_body(self, value, index):
+        if index is None:
+            rename_dict = {}
+        else:
+            rename_dict = OrderedDict(
+                [(name, '_'.join([name, 'unroll', str(index)]))
+                 for name in self.get_private_variables()])
+
+        transformer = _RenameTransformer(self.iter_name, value, rename_dict)
+        return [transformer.visit(copy.deepcopy(statement))
+                for statement in self.body]
+
+    # -------------------------------------------------------------------------
+    def is_interleavable(self):
+        """ the copies can be interleaved statement by statement """
+
+        private = self.get_private_variables()
+        accessed = OrderedDict()
+        written = OrderedDict()
+
+        for index, statement in enumerate(self.body):
+            if not isinstance(statement, (ast.Assign, ast.AugAssign, ast.Expr)):
+                return False
+
+            try:
+                reads, writes = self.get_accesses(statement)
+            except TypeError:
+                return False
+
+            for name in reads | writes:
+                accessed.setdefault(name, set()).add(index)
+            for name in writes:
+                written.setdefault(name, set()).add(index)
+
+        # a loop-carried variable or a written RAM must be accessed
+        # by only one statement, so that the order of its accesses is kept
+        for name in written.keys():
+            if name not in private and len(accessed[name]) > 1:
+                return False
+
+        return True
+
+    def get_private_variables(self):
+        """ variables which are assigned before they are read in an iteration """
+
+        private = []
+        accessed = set()
+        for statement in self.body:
+            if isinstance(statement, ast.Assign):
+                accessed.update(_get_load_names(statement.value))
+                for target in statement.targets:
+                    if (isinstance(target, ast.Name) and target.id not in accessed and
+                            target.id not in private):
+                        private.append(target.id)
+                    accessed.update(_get_store_names(target))
+            else:
+                accessed.update(_get_load_names(statement))
+                accessed.update(_get_store_names(statement))
+        return private
+
+    def get_accesses(self, statement):
+        """ variables and resources read and written by a statement """
+
+        reads = set()
+        writes = set()
+
+        for node in ast.walk(statement):
+            if isinstance(node, ast.Name):
+                if isinstance(node.ctx, ast.Store):
+                    if node.id == self.iter_name:
+                        raise ValueError("loop variable '%s' cannot be assigned "
+                                         "in an unrolled loop" % self.iter_name)
+                    writes.add(node.id)
+                else:
+                    reads.add(node.id)
+
+            if isinstance(node, (ast.Assign, ast.AugAssign)):
+                targets = (node.targets if isinstance(node, ast.Assign)
+                           else [node.target])
+                for target in targets:
+                    if not _is_name_target(target):
+                        # an attribute or an item of an object
+                        raise TypeError('unknown side effect')
+                if isinstance(node, ast.AugAssign):
+                    reads.add(node.target.id)
+
+            if not isinstance(node, ast.Call):
+                continue
+
+            if isinstance(node.func, ast.Name):
+                if node.func.id == 'print':
+                    writes.add(('print', ))
+                    continue
+                if node.func.id in ('int', 'len'):
+                    continue
+                raise TypeError('unknown side effect')
+
+            if (isinstance(node.func, ast.Attribute) and
+                    node.func.attr in ('read', 'write')):
+                ram = self.cvisitor.visit(node.func.value)
+                if isinstance(ram, (RAM, MultibankRAM)):
+                    key = ('ram', id(ram))
+                    if node.func.attr == 'write':
+                        writes.add(key)
+                    else:
+                        reads.add(key)
+                    continue
+
+            raise TypeError('unknown side effect')
+
+        return reads, writes
+
+    # -------------------------------------------------------------------------
+    def make_groups(self, orig, statements, values, iter_values):
+        private = self.get_private_variables()
+
+        ram = self.get_multibank_ram(orig)
+        if ram is not None and (isinstance(orig, ast.Expr) or
+                                orig.targets[0].id in private):
+            banks = [self.get_bank(ram, statement, value, iter_values)
+                     for statement, value in zip(statements, values)]
+            if None not in banks:
+                ret = []
+                group = []
+                group_banks = []
+                for statement, bank in zip(statements, banks):
+                    if bank in group_banks:
+                        ret.append(self.make_group(group, group_banks))
+                        group = []
+                        group_banks = []
+                    group.append(statement)
+                    group_banks.append(bank)
+                ret.append(self.make_group(group, group_banks))
+                return ret
+
+        if (isinstance(orig, ast.Assign) and len(orig.targets) == 1 and
+                isinstance(orig.targets[0], ast.Name) and
+                orig.targets[0].id in private and not _has_call(orig.value)):
+            return [self.make_group(statements)]
+
+        return statements
+
+    def make_group(self, statements, banks=None):
+        if len(statements) > 1:
+            self.num_parallel_states += 1
+        return UnrolledGroup(self, statements, banks)
+
+    def get_multibank_ram(self, statement):
+        if isinstance(statement, ast.Assign):
+            if len(statement.targets) != 1 or not isinstance(statement.targets[0], ast.Name):
+                return None
+            call = statement.value
+            method = 'read'
+        elif isinstance(statement, ast.Expr):
+            call = statement.value
+            method = 'write'
+        else:
+            return None
+
+        if (not isinstance(call, ast.Call) or not isinstance(call.func, ast.Attribute) or
+                call.func.attr != method):
+            return None
+
+        ram = self.cvisitor.visit(call.func.value)
+        if not isinstance(ram, MultibankRAM):
+            return None
+
+        args = self.get_ram_args(statement)
+        if args is None:
+            return None
+
+        for sub in ram.rams:
+            if not isinstance(sub, RAM):
+                return None
+
+        return ram
+
+    def get_ram_args(self, statement):
+        call = statement.value
+        names = (('addr', 'port') if call.func.attr == 'read' else
+                 ('addr', 'wdata', 'port'))
+
+        if len(call.args) > len(names):
+            return None
+
+        args = OrderedDict(zip(names, call.args))
+        for key in call.keywords:
+            if key.arg not in names or key.arg in args:
+                return None
+            args[key.arg] = key.value
+
+        for name in names[:-1]:
+            if name not in args:
+                return None
+
+        port = self.cvisitor.visit(args['port']) if 'port' in args else 0
+        try:
+            args['port'] = vtypes.to_int(port)
+        except TypeError:
+            return None
+
+        return args
+
+    def get_bank(self, ram, statement, value, iter_values):
+        """ bank of the address, if it is determined at compile time """
+
+        addr = self.get_ram_args(statement)['addr']
+        mask = ram.numbanks - 1
+
+        if iter_values is None:
+            iter_values = (None, )
+        else:
+            # an address is a polynomial of the iteration count,
+            # so that its bank has the period of numbanks iterations
+            begin, step, count = iter_values
+            iter_values = [begin + i * step
+                           for i in range(min(count, ram.numbanks))]
+
+        banks = set()
+        for iter_value in iter_values:
+            v = self.evaluate(addr, iter_value)
+            if v is None:
+                return None
+            banks.add(v & mask)
+
+        if len(banks) != 1:
+            return None
+
+        return banks.pop()
+
+    def evaluate(self, node, iter_value):
+        """
+        value of an address which is a polynomial of the loop variable,
+        None if it is not a constant
+        """
+
+        if isinstance(node, UnrolledValue):
+            return node.value if isinstance(node.value, int) else None
+
+        if isinstance(node, ast.Constant):
+            return node.value if isinstance(node.value, int) else None
+
+        if isinstance(node, ast.Name):
+            if node.id == self.iter_name:
+                return iter_value
+            try:
+                value = self.cvisitor.getVariable(node.id)
+            except NameError:
+                return None
+            return value if isinstance(value, int) else None
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            v = self.evaluate(node.operand, iter_value)
+            return -v if v is not None else None
+
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult)):
+            left = self.evaluate(node.left, iter_value)
+            right = self.evaluate(node.right, iter_value)
+            if left is None or right is None:
+                return None
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Sub):
+                return left - right
+            return left * right
+
+        return None
+
+    # -------------------------------------------------------------------------
+    def compile_group(self, group):
+        cvisitor = self.cvisitor
+
+        if group.banks is not None:
+            return self.compile_bank_group(group)
+
+        for statement in group.statements:
+            right = cvisitor.visit(statement.value)
+            left = cvisitor.visit(statement.targets[0])
+            cvisitor._assign(left, right)
+
+        cvisitor.setFsm()
+        cvisitor.incFsmCount()
+
+    def compile_bank_group(self, group):
+        cvisitor = self.cvisitor
+        fsm = cvisitor.fsm
+        cond = fsm.here
+        # the RAM ports refer to the state
+        cvisitor.intrinsic_states.add(fsm.current)
+
+        rvalid = None
+        binds = []
+
+        for statement, bank in zip(group.statements, group.banks):
+            ram = cvisitor.visit(statement.value.func.value)
+            args = self.get_ram_args(statement)
+            addr = cvisitor.visit(args['addr']) >> ram.shift
+            sub = ram.rams[bank]
+
+            if isinstance(statement, ast.Expr):
+                wdata = cvisitor.visit(args['wdata'])
+                sub.write_rtl(addr, wdata, args['port'], cond)
+                continue
+
+            rdata, rvalid = sub.read_rtl(addr, args['port'], cond)
+            var = cvisitor.getVariable(statement.targets[0].id, store=True)
+            binds.append((var, rdata))
+
+        if rvalid is None:
+            cvisitor.setFsm()
+            cvisitor.incFsmCount()
+            return
+
+        for var, rdata in binds:
+            cvisitor.setBind(var, rdata, rvalid)
+
+        cvisitor.setFsm(cond=rvalid)
+        cvisitor.incFsmCount()
+
+    def get_stats(self):
+        ret = OrderedDict()
+        ret['num_copies'] = self.num_copies
+        ret['interleaved'] = self.interleaved
+        ret['num_parallel_states'] = self.num_parallel_states
+        return ret
+
+
+class _RenameTransformer(ast.NodeTransformer):
+
+    def __init__(self, iter_name, value, rename_dict):
+        self.iter_name = iter_name
+        self.value = value
+        self.rename_dict = rename_dict
+
+    def visit_Name(self, node):
+        if node.id == self.iter_name:
+            if isinstance(node.ctx, ast.Store):
+                raise ValueError("loop variable '%s' cannot be assigned "
+                                 "in an unrolled loop" % self.iter_name)
+            return copy.deepcopy(self.value)
+        if node.id in self.rename_dict:
+            return ast.copy_location(
+                ast.Name(id=self.rename_dict[node.id], ctx=node.ctx), node)
+        return node
+
+
+def _get_load_names(node):
+    return set([n.id for n in ast.walk(node)
+                if isinstance(n, ast.Name) and not isinstance(n.ctx, ast.Store)] +
+               [n.target.id for n in ast.walk(node)
+                if isinstance(n, ast.AugAssign) and isinstance(n.target, ast.Name)])
+
+
+def _get_store_names(node):
+    return set([n.id for n in ast.walk(node)
+                if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)])
+
+
+def _is_name_target(node):
+    if isinstance(node, ast.Name):
+        return True
+    if isinstance(node, (ast.Tuple, ast.List)):
+        for elt in node.elts:
+            if not _is_name_target(elt):
+                return False
+        return True
+    return False
+
+
+def _has_call(node):
+    for n in ast.walk(node):
+        if isinstance(n, ast.Call):
+            return True
+    return False
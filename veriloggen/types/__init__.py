@@ -2,7 +2,9 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 from .fixed import reset as fixed_reset
+from .rom import reset as rom_reset
 
 
 def reset():
     fixed_reset()
+    rom_reset()
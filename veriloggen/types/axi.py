@@ -2453,7 +2453,7 @@ class AxiMemoryModel(AxiSlave):
     def read(self, fsm, addr):
         """ intrinsic for thread """
 
-        cond = fsm.state == fsm.current
+        cond = fsm.here
         rdata = self.m.TmpReg(self.mem_datawidth, initval=0, signed=True)
         num_bytes = self.mem_datawidth // 8
 
@@ -2468,7 +2468,7 @@ class AxiMemoryModel(AxiSlave):
     def write(self, fsm, addr, wdata):
         """ intrinsic for thread """
 
-        cond = fsm.state == fsm.current
+        cond = fsm.here
         num_bytes = self.mem_datawidth // 8
 
         wdata_wire = self.m.TmpWire(self.mem_datawidth)
@@ -2486,7 +2486,7 @@ class AxiMemoryModel(AxiSlave):
     def read_word(self, fsm, word_index, byte_offset, bits=8):
         """ intrinsic method word-indexed read """
 
-        cond = fsm.state == fsm.current
+        cond = fsm.here
         rdata = self.m.TmpReg(bits, initval=0, signed=True)
         num_bytes = int(math.ceil(bits / 8))
         addr = vtypes.Add(byte_offset,
@@ -2506,7 +2506,7 @@ class AxiMemoryModel(AxiSlave):
     def write_word(self, fsm, word_index, byte_offset, wdata, bits=8):
         """ intrinsic method word-indexed write """
 
-        cond = fsm.state == fsm.current
+        cond = fsm.here
         rdata = self.m.TmpReg(bits, initval=0, signed=True)
         num_bytes = int(math.ceil(bits / 8))
         addr = vtypes.Add(byte_offset,
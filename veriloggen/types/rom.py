@@ -8,7 +8,46 @@ from veriloggen.core.module import Module
 from . import util
 
 
-def mkROMDefinition(name, values, size, datawidth, sync=False, with_enable=False):
+# key: contents of a ROM, value: module definition
+_rom_definitions = {}
+
+# key: file name of a memory image, value: written contents
+_memimg_contents = {}
+
+
+def reset():
+    _rom_definitions.clear()
+    _memimg_contents.clear()
+
+
+def getROMDefinition(name, values, size, datawidth, sync=False, with_enable=False,
+                     memimg=None):
+    """
+    returns a ROM definition shared by the ROMs of the same contents,
+    or makes a new definition named 'name'
+    """
+
+    if not all([isinstance(v, int) for v in values]):
+        return mkROMDefinition(name, values, size, datawidth, sync, with_enable,
+                               memimg)
+
+    key = (tuple(values), size, datawidth, sync, with_enable, memimg)
+    if key in _rom_definitions:
+        return _rom_definitions[key]
+
+    m = mkROMDefinition(name, values, size, datawidth, sync, with_enable,
+                        memimg)
+    _rom_definitions[key] = m
+    return m
+
+
+def mkROMDefinition(name, values, size, datawidth, sync=False, with_enable=False,
+                    memimg=None):
+    """
+    memimg: file name of the contents loaded by $readmemh,
+    instead of a Case statement
+    """
+
     if not sync and with_enable:
         raise ValueError('Async ROM cannot have enable signals')
 
@@ -25,10 +64,19 @@ def mkROMDefinition(name, values, size, datawidth, sync=False, with_enable=False
     else:
         alw = m.Always()
 
-    patterns = [vtypes.When(i)(val(v, blk=not sync))
-                for i, v in enumerate(values)]
+    if memimg is not None:
+        to_memory_image(memimg, values, datawidth)
+        mem = m.Reg('mem', datawidth, 2 ** size)
+        m.Initial(
+            vtypes.Systask('readmemh', memimg, mem)
+        )
+        body = val(mem[addr], blk=not sync)
+
+    else:
+        patterns = [vtypes.When(i)(val(v, blk=not sync))
+                    for i, v in enumerate(values)]
 
-    body = vtypes.Case(addr)(*patterns)
+        body = vtypes.Case(addr)(*patterns)
 
     if with_enable:
         body = vtypes.If(enable)(body)
@@ -40,6 +88,33 @@ def mkROMDefinition(name, values, size, datawidth, sync=False, with_enable=False
     return m
 
 
+def to_memory_image(filename, values, datawidth):
+    """
+    writes the values as hexadecimal words, one word per line.
+    A file name can be reused only for the same contents until reset().
+    """
+
+    mask = 2 ** datawidth - 1
+    fmt = '%%0%dx\n' % int(math.ceil(datawidth / 4))
+
+    words = []
+    for v in values:
+        if not isinstance(v, int):
+            raise TypeError("not supported type: '%s'" % str(type(v)))
+        words.append(fmt % (v & mask))
+
+    contents = ''.join(words)
+    if _memimg_contents.get(filename, contents) != contents:
+        raise ValueError("memory image '%s' is already written with "
+                         "different contents." % filename)
+    _memimg_contents[filename] = contents
+
+    with open(filename, 'w') as f:
+        f.write(contents)
+
+    return len(values)
+
+
 class _ROM_RTL(object):
 
     def __init__(self, m, name, clk, addr, values, enable=None, datawidth=None):